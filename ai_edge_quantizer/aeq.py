@@ -24,6 +24,7 @@ import sys
 
 import os
 import io
+from ai_edge_quantizer import calibrator
 from ai_edge_quantizer import qtyping
 from ai_edge_quantizer import quantizer
 from ai_edge_quantizer.utils import litertlm_utils
@@ -226,6 +227,38 @@ def quantize_tflite(
   return 0
 
 
+def estimate_memory(
+    model_file: str,
+    recipe: str,
+    calibration_mode: str = "CALIBRATION_PRESERVE_ALL_TENSORS",
+    batch_size: int = 1,
+    num_workers: int = 1,
+) -> int:
+  """Prints the estimated peak memory of quantizing a TFLite model.
+
+  Args:
+    model_file: Path to the .tflite file to be quantized.
+    recipe: Recipe name or path to the .json file with the quantization recipe.
+    calibration_mode: Name of the calibration mode to estimate, if the recipe
+      needs calibration.
+    batch_size: The number of samples per calibration invocation.
+    num_workers: The number of calibration worker processes.
+
+  Returns:
+    `0` on success and a non-zero exit code otherwise.
+  """
+  qt = quantizer.Quantizer(model_file)
+  qt.load_quantization_recipe(recipe)
+  estimate = qt.estimate_peak_memory(
+      mode=calibrator.CalibrationMode[calibration_mode],
+      batch_size=batch_size,
+      num_workers=num_workers,
+  )
+  print(f"Estimated peak memory of quantizing {model_file}:")
+  print(estimate)
+  return 0
+
+
 def parse_args(args: Sequence[str]) -> argparse.Namespace:
   """Parses command-line arguments.
 
@@ -263,10 +296,52 @@ def parse_args(args: Sequence[str]) -> argparse.Namespace:
       action="store_true",
       help="Overwrite exisiting output files without requesting user input.",
   )
+  parser.add_argument(
+      "--estimate_memory",
+      action="store_true",
+      help=(
+          "Print the estimated peak memory of each phase of the quantization"
+          " of a .tflite file instead of quantizing it."
+      ),
+  )
+  parser.add_argument(
+      "--calibration_mode",
+      default="CALIBRATION_PRESERVE_ALL_TENSORS",
+      choices=[
+          "CALIBRATION_PRESERVE_ALL_TENSORS",
+          "CALIBRATION_PROFILER_BASED",
+          "HYBRID",
+          "LAYERWISE",
+      ],
+      help="Calibration mode to estimate with `--estimate_memory`.",
+  )
+  parser.add_argument(
+      "--batch_size",
+      type=int,
+      default=1,
+      help="Calibration batch size to estimate with `--estimate_memory`.",
+  )
+  parser.add_argument(
+      "--num_workers",
+      type=int,
+      default=1,
+      help="Calibration workers to estimate with `--estimate_memory`.",
+  )
   return parser.parse_args(args[1:])
 
 
 def main(parsed_args: argparse.Namespace) -> int:
+  if getattr(parsed_args, "estimate_memory", False):
+    if not parsed_args.model_file.endswith(".tflite"):
+      logging.error("`--estimate_memory` only supports .tflite files.")
+      return 1
+    return estimate_memory(
+        model_file=parsed_args.model_file,
+        recipe=parsed_args.recipe,
+        calibration_mode=parsed_args.calibration_mode,
+        batch_size=parsed_args.batch_size,
+        num_workers=parsed_args.num_workers,
+    )
   if parsed_args.model_file.endswith(".tflite"):
     return quantize_tflite(
         model_file=parsed_args.model_file,
@@ -14,8 +14,10 @@
 # ==============================================================================
 
 import argparse
+import io
 import pathlib
 import tempfile
+from unittest import mock
 
 from absl.testing import absltest
 from absl.testing import parameterized
@@ -177,6 +179,33 @@ class AeqTest(parameterized.TestCase):
           quantized_litertlm.get_section_buffer(0),
       )
 
+  def test_estimate_memory(self):
+    model_file = str(
+        pathlib.Path(TEST_DATA_PREFIX_PATH)
+        / "tests/models/conv_fc_mnist.tflite"
+    )
+    parsed_args = aeq.parse_args([
+        "aeq",
+        f"--model_file={model_file}",
+        "--recipe=default_a8w8",
+        "--estimate_memory",
+        "--calibration_mode=HYBRID",
+    ])
+
+    with mock.patch("sys.stdout", new_callable=io.StringIO) as stdout:
+      self.assertEqual(aeq.main(parsed_args), 0)
+    self.assertIn("calibration (HYBRID)", stdout.getvalue())
+    self.assertIn("peak:", stdout.getvalue())
+
+  def test_estimate_memory_rejects_litertlm_file(self):
+    parsed_args = aeq.parse_args([
+        "aeq",
+        "--model_file=model.litertlm",
+        "--recipe=default_a8w8",
+        "--estimate_memory",
+    ])
+    self.assertEqual(aeq.main(parsed_args), 1)
+
 
 if __name__ == "__main__":
   absltest.main()
@@ -26,6 +26,7 @@ from ai_edge_quantizer.algorithms.uniform_quantize import common_quantize
 from ai_edge_quantizer.algorithms.uniform_quantize import dequantized_weight_recovery
 from ai_edge_quantizer.algorithms.uniform_quantize import gptq
 from ai_edge_quantizer.algorithms.uniform_quantize import hadamard_rotation
+from ai_edge_quantizer.algorithms.uniform_quantize import histogram
 from ai_edge_quantizer.algorithms.uniform_quantize import mse
 from ai_edge_quantizer.algorithms.uniform_quantize import naive_min_max_quantize
 from ai_edge_quantizer.algorithms.uniform_quantize import octav
@@ -73,6 +74,8 @@ class AlgorithmName(str, enum.Enum):
   MSE = mse.ALGORITHM_KEY
   GPTQ = gptq.ALGORITHM_KEY
   OSCAR = oscar.ALGORITHM_KEY
+  HISTOGRAM_PERCENTILE = histogram.PERCENTILE_ALGORITHM_KEY
+  HISTOGRAM_KL = histogram.KL_ALGORITHM_KEY
 
 
 ### MIN/MAX_UNIFORM_QUANT ###
@@ -478,3 +481,37 @@ for (
       materialize_func=materialize_func,  # pyrefly: ignore[bad-argument-type]
       update_qsv_func=qsv_utils.oscar_and_moving_average_update,  # pyrefly: ignore[bad-argument-type]
   )
+
+# Register the histogram algorithms. Both collect a histogram of the
+# activations during calibration and only differ in how the clipping range is
+# derived from it at materialization time.
+_HISTOGRAM_ALGORITHM_TO_GET_TENSOR_QUANT_PARAMS_FUNC = immutabledict({
+    AlgorithmName.HISTOGRAM_PERCENTILE: (
+        histogram.get_percentile_tensor_quant_params
+    ),
+    AlgorithmName.HISTOGRAM_KL: histogram.get_kl_tensor_quant_params,
+})
+for (
+    algorithm_name,
+    get_tensor_quant_params_func,
+) in _HISTOGRAM_ALGORITHM_TO_GET_TENSOR_QUANT_PARAMS_FUNC.items():
+  register_op_quant_config_validation_func(
+      algorithm_name,
+      common_quantize.check_op_quantization_config,
+  )
+  register_config_check_policy_func(
+      algorithm_name,
+      default_policy.DEFAULT_CONFIG_CHECK_POLICY,
+  )
+  for op_name, materialize_func in MIN_MAX_OP_NAME_MATERIALIZE_FUNC_DICT.items():
+    register_quantized_op(
+        algorithm_name,
+        op_name,
+        naive_min_max_quantize.init_qsvs,
+        calibration_func=histogram.calibrate,  # pyrefly: ignore[bad-argument-type]
+        materialize_func=functools.partial(
+            materialize_func,
+            get_tensor_quant_params_func,
+        ),
+        update_qsv_func=qsv_utils.histogram_and_min_max_update,  # pyrefly: ignore[bad-argument-type]
+    )
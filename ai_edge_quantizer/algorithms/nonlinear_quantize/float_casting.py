@@ -157,7 +157,7 @@ def materialize_fc_conv(
       quant_params = qtyping.NonLinearQuantParams(
           num_bits=16, quantized_data=weight_content.astype(np.float16)
       )
-      tensor_quant_params_cache.insert(
+      quant_params = tensor_quant_params_cache.insert(
           weight_tensor.buffer, _FP16_QUANT_CONFIG, quant_params
       )
     op2weight_params = qtyping.OpToTensorParams(
@@ -272,7 +272,7 @@ def materialize_conv2d_transpose(
       quant_params = qtyping.NonLinearQuantParams(
           num_bits=16, quantized_data=weight_content.astype(np.float16)
       )
-      tensor_quant_params_cache.insert(
+      quant_params = tensor_quant_params_cache.insert(
           weight_tensor.buffer, _FP16_QUANT_CONFIG, quant_params
       )
     op2weight_params = qtyping.OpToTensorParams(
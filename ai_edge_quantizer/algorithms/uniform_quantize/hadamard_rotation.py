@@ -256,7 +256,7 @@ def _materialize_fully_connected(
         tensor_data,
         None,
     )
-    tensor_quant_params_cache.insert(
+    quant_params = tensor_quant_params_cache.insert(
         weight_tensor.buffer,
         op_info.op_quant_config.weight_tensor_config,
         quant_params,
@@ -427,7 +427,7 @@ def _materialize_embedding_lookup(
         None,
     )
     if tensor_quant_params_cache:
-      tensor_quant_params_cache.insert(
+      quant_params = tensor_quant_params_cache.insert(
           embedding_tensor.buffer,
           op_info.op_quant_config.weight_tensor_config,  # pyrefly: ignore[bad-argument-type]
           quant_params,
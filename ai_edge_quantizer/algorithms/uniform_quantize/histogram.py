@@ -0,0 +1,302 @@
+# Copyright 2024 The AI Edge Quantizer Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+"""Implements histogram-based activation calibration.
+
+During calibration, a bounded-memory histogram (`DynamicHistogram`) of every
+activation tensor is collected next to its min/max. At materialization time,
+the activation clipping range is derived from the histogram, either by
+percentile or by minimizing the KL divergence (entropy calibration) between the
+float and the quantized distributions. Weights are quantized with min/max.
+"""
+
+from collections.abc import MutableMapping, Sequence
+from typing import Any, Optional
+
+import numpy as np
+
+from ai_edge_quantizer import qtyping
+from ai_edge_quantizer.algorithms.uniform_quantize import common_quantize
+from ai_edge_quantizer.algorithms.uniform_quantize import naive_min_max_quantize
+from ai_edge_quantizer.utils import histogram_utils
+
+PERCENTILE_ALGORITHM_KEY = "HISTOGRAM_PERCENTILE"
+KL_ALGORITHM_KEY = "HISTOGRAM_KL"
+
+# Bin budget of the histogram of each tensor.
+MAX_BINS = 2048
+# Percentile of the values kept by the percentile clipping, on each side.
+_DEFAULT_PERCENTILE = 99.99
+# Upper bound on the number of clipping thresholds evaluated by the KL search.
+_MAX_KL_CANDIDATES = 256
+
+
+def calibrate(
+    tfl_op: qtyping.OperatorT,
+    graph_info: qtyping.GraphInfo,
+    tensor_content_map: MutableMapping[str, np.ndarray],
+    inputs_to_ignore: Sequence[int] | None = None,
+    outputs_to_ignore: Sequence[int] | None = None,
+    valid_range: tuple[float, float] = (-3e38, 3e38),
+) -> dict[str, qtyping.QSV]:
+  """Collects min/max plus a histogram of the activations of the op.
+
+  Args:
+    tfl_op: The tfl operation.
+    graph_info: Graph information needed to perform quantization for the op.
+    tensor_content_map: A map of tensor name to tensor content.
+    inputs_to_ignore: Input tensor indices to ignore.
+    outputs_to_ignore: Output tensor indices to ignore.
+    valid_range: The valid range for tensor content, excluding the boundaries.
+      Values outside this range are ignored by both min/max and histogram.
+
+  Returns:
+    A dictionary mapping tensor names to the collected QSVs.
+  """
+  op_qsvs = {}
+  min_val, max_val = valid_range
+
+  tensor_ids = common_quantize.get_tensor_indices_requiring_calibration(
+      tfl_op, graph_info, inputs_to_ignore, outputs_to_ignore
+  )
+  for tensor_idx in tensor_ids:
+    result = common_quantize.collect_activation_tensor_statistics(
+        tensor_idx,
+        graph_info,
+        tensor_content_map,
+        valid_float_range_min=min_val,
+        valid_float_range_max=max_val,
+    )
+    if result is None:
+      continue
+    tensor_name, tensor_content, tensor_qsvs = result
+
+    # Values outside of [min, max] are the ones excluded by the valid range.
+    data = tensor_content.ravel()
+    data = data[
+        (data >= tensor_qsvs["min"].item()) & (data <= tensor_qsvs["max"].item())
+    ]
+    histogram = histogram_utils.DynamicHistogram(max_tensor_bins=MAX_BINS)
+    histogram.add(data.astype(np.float64, copy=False))
+    tensor_qsvs["histogram"] = histogram.to_dict()
+    op_qsvs[tensor_name] = tensor_qsvs
+
+  return op_qsvs
+
+
+def _get_histogram(tensor_qsv: dict[str, Any]) -> Any:
+  """Returns the per-tensor 1D histogram stored in the QSV, if any."""
+  histogram_dict = tensor_qsv.get("histogram")
+  if not histogram_dict:
+    return None
+  histogram = histogram_utils.DynamicHistogram.from_dict(
+      histogram_dict, max_tensor_bins=MAX_BINS
+  )
+  if histogram.axis is not None or not histogram.initialized:
+    return None
+  return histogram
+
+
+def get_percentile_range(
+    counts: np.ndarray,
+    bin_edges: np.ndarray,
+    percentile: float = _DEFAULT_PERCENTILE,
+) -> tuple[float, float]:
+  """Returns the range holding `percentile`% of the values on each side.
+
+  Values are assumed uniformly distributed within each bin.
+
+  Args:
+    counts: The histogram bin counts.
+    bin_edges: The histogram bin edges (`len(counts) + 1` values).
+    percentile: The percentile of the values kept on each side, e.g., 99.99
+      clips the 0.01% smallest and the 0.01% largest values.
+
+  Returns:
+    The (min, max) clipping range.
+  """
+  cdf = np.concatenate(([0.0], np.cumsum(counts, dtype=np.float64)))
+  total = cdf[-1]
+  if total == 0:
+    return float(bin_edges[0]), float(bin_edges[-1])
+  tail = total * (100.0 - percentile) / 100.0
+  range_min, range_max = np.interp([tail, total - tail], cdf, bin_edges)
+  return float(range_min), float(range_max)
+
+
+def _kl_divergence(p: np.ndarray, q: np.ndarray) -> float:
+  """Returns KL(p || q) for unnormalized, smoothed distributions."""
+  p = p / p.sum()
+  q = q / q.sum()
+  mask = p > 0
+  return float(np.sum(p[mask] * np.log(p[mask] / q[mask])))
+
+
+def get_kl_range(
+    counts: np.ndarray,
+    bin_edges: np.ndarray,
+    num_bits: int,
+) -> tuple[float, float]:
+  """Returns the clipping range minimizing the KL divergence.
+
+  This is the entropy calibration of TensorRT: the magnitude histogram is
+  clipped at each candidate threshold (outliers are folded into the last bin),
+  quantized into `2**num_bits` levels (or half of them when the values have
+  both signs) and expanded back, and the threshold minimizing the KL divergence
+  between the clipped and the quantized distributions is selected.
+
+  Args:
+    counts: The histogram bin counts.
+    bin_edges: The histogram bin edges (`len(counts) + 1` values).
+    num_bits: The number of bits of the quantized values.
+
+  Returns:
+    The (min, max) clipping range.
+  """
+  # Only consider the occupied range, the histogram range is padded.
+  occupied = np.flatnonzero(counts)
+  if occupied.size == 0:
+    return float(bin_edges[0]), float(bin_edges[-1])
+  counts = counts[occupied[0] : occupied[-1] + 1]
+  bin_edges = bin_edges[occupied[0] : occupied[-1] + 2]
+  data_min, data_max = float(bin_edges[0]), float(bin_edges[-1])
+  bin_width = bin_edges[1] - bin_edges[0]
+  # Fold the histogram into a histogram of the magnitudes.
+  centers = (bin_edges[:-1] + bin_edges[1:]) / 2
+  max_abs = max(abs(data_min), abs(data_max))
+  num_abs_bins = max(int(np.ceil(max_abs / bin_width)), 1)
+  abs_counts, abs_edges = np.histogram(
+      np.abs(centers),
+      bins=num_abs_bins,
+      range=(0.0, num_abs_bins * bin_width),
+      weights=counts.astype(np.float64),
+  )
+  one_sided = data_min >= 0 or data_max <= 0
+  num_levels = 2**num_bits if one_sided else 2 ** (num_bits - 1)
+  if num_abs_bins <= num_levels or abs_counts.sum() == 0:
+    return data_min, data_max
+
+  step = max((num_abs_bins - num_levels) // _MAX_KL_CANDIDATES, 1)
+  best_kl, best_threshold = np.inf, num_abs_bins
+  for threshold in range(num_levels, num_abs_bins + 1, step):
+    clipped = abs_counts[:threshold]
+    # Reference distribution: outliers are folded into the last bin.
+    p = clipped.copy()
+    p[-1] += abs_counts[threshold:].sum()
+    # Quantized distribution: merge into `num_levels` levels, then spread each
+    # level uniformly over its non-empty bins.
+    level = np.arange(threshold) * num_levels // threshold
+    nonzero = clipped > 0
+    level_sums = np.bincount(level, weights=clipped, minlength=num_levels)
+    level_nonzero = np.bincount(level, weights=nonzero, minlength=num_levels)
+    q = np.where(
+        nonzero, level_sums[level] / np.maximum(level_nonzero[level], 1), 0.0
+    )
+    if not q.any():
+      continue
+    # Smooth so that the divergence is defined where p > 0 and q == 0.
+    kl = _kl_divergence(p + 1e-10, q + 1e-10)
+    if kl < best_kl:
+      best_kl, best_threshold = kl, threshold
+  threshold_value = float(abs_edges[best_threshold])
+  return max(data_min, -threshold_value), min(data_max, threshold_value)
+
+
+def _get_tensor_quant_params(
+    op_info: qtyping.OpInfo,
+    tensor_quant_config: qtyping.TensorQuantizationConfig,
+    tensor_content: Optional[np.ndarray],
+    tensor_qsv: Optional[dict[str, Any]],
+    use_kl: bool,
+) -> qtyping.UniformQuantParams:
+  """Returns the quantization parameters with a histogram clipping range."""
+  histogram = None
+  if tensor_content is None and tensor_qsv is not None:
+    histogram = _get_histogram(tensor_qsv)
+  # Weights (and activations without histogram) use min/max.
+  if histogram is None:
+    return naive_min_max_quantize.get_tensor_quant_params(
+        op_info, tensor_quant_config, tensor_content, tensor_qsv
+    )
+
+  counts = histogram.counts
+  bin_edges = histogram.lower_bound + np.arange(len(counts) + 1) * (
+      histogram.bin_width
+  )
+  if use_kl:
+    range_min, range_max = get_kl_range(
+        counts, bin_edges, tensor_quant_config.num_bits
+    )
+  else:
+    range_min, range_max = get_percentile_range(counts, bin_edges)
+  # The histogram bins are padded, so the range is bounded by the actual
+  # min/max.
+  clipped_qsv = {
+      "min": np.maximum(tensor_qsv["min"], range_min),  # pyrefly: ignore[unsupported-operation]
+      "max": np.minimum(tensor_qsv["max"], range_max),  # pyrefly: ignore[unsupported-operation]
+  }
+  return naive_min_max_quantize.get_tensor_quant_params(
+      op_info, tensor_quant_config, tensor_content, clipped_qsv
+  )
+
+
+def get_percentile_tensor_quant_params(
+    op_info: qtyping.OpInfo,
+    tensor_quant_config: qtyping.TensorQuantizationConfig,
+    tensor_content: Optional[np.ndarray] = None,
+    tensor_qsv: Optional[dict[str, Any]] = None,
+) -> qtyping.UniformQuantParams:
+  """Returns the quantization parameters with percentile activation clipping.
+
+  Args:
+    op_info: Aggregated information about the op (e.g., quantization config).
+    tensor_quant_config: The quantization config for the tensor.
+    tensor_content: The content of the tensor. When None, the tensor is an
+      activation and is clipped with its histogram; otherwise it is quantized
+      with naive_min_max_quantize.
+    tensor_qsv: A dictionary containing the min/max (and histogram) of the
+      tensor.
+
+  Returns:
+    The quantization parameters for the tensor.
+  """
+  return _get_tensor_quant_params(
+      op_info, tensor_quant_config, tensor_content, tensor_qsv, use_kl=False
+  )
+
+
+def get_kl_tensor_quant_params(
+    op_info: qtyping.OpInfo,
+    tensor_quant_config: qtyping.TensorQuantizationConfig,
+    tensor_content: Optional[np.ndarray] = None,
+    tensor_qsv: Optional[dict[str, Any]] = None,
+) -> qtyping.UniformQuantParams:
+  """Returns the quantization parameters with KL activation clipping.
+
+  Args:
+    op_info: Aggregated information about the op (e.g., quantization config).
+    tensor_quant_config: The quantization config for the tensor.
+    tensor_content: The content of the tensor. When None, the tensor is an
+      activation and is clipped with its histogram; otherwise it is quantized
+      with naive_min_max_quantize.
+    tensor_qsv: A dictionary containing the min/max (and histogram) of the
+      tensor.
+
+  Returns:
+    The quantization parameters for the tensor.
+  """
+  return _get_tensor_quant_params(
+      op_info, tensor_quant_config, tensor_content, tensor_qsv, use_kl=True
+  )
@@ -0,0 +1,176 @@
+# Copyright 2024 The AI Edge Quantizer Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+from collections.abc import Sequence
+from unittest import mock
+
+from absl.testing import absltest
+from absl.testing import parameterized
+import numpy as np
+
+from ai_edge_quantizer import qtyping
+from ai_edge_quantizer.algorithms.uniform_quantize import histogram
+from ai_edge_quantizer.utils import histogram_utils
+from ai_edge_quantizer.utils import tfl_flatbuffer_utils
+
+
+def _create_tensor(name: str, shape: Sequence[int]) -> qtyping.TensorT:
+  tensor = qtyping.TensorT()
+  tensor.name = name.encode("utf-8")
+  tensor.shape = list(shape)
+  return tensor
+
+
+def _create_op(
+    inputs: Sequence[int], outputs: Sequence[int]
+) -> qtyping.OperatorT:
+  op = qtyping.OperatorT()
+  op.inputs = list(inputs)
+  op.outputs = list(outputs)
+  return op
+
+
+def _get_activation_qsv(data: np.ndarray) -> qtyping.QSV:
+  hist = histogram_utils.DynamicHistogram(max_tensor_bins=histogram.MAX_BINS)
+  hist.add(data)
+  return {
+      "min": np.array([[np.min(data)]]),
+      "max": np.array([[np.max(data)]]),
+      "histogram": hist.to_dict(),
+  }
+
+
+class HistogramTest(parameterized.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    rng = np.random.default_rng(0)
+    # Gaussian activations with a few large outliers.
+    self._data = np.concatenate(
+        [rng.standard_normal(100000), [-50.0, 60.0]]
+    ).reshape(1, -1)
+    self._op_info = qtyping.OpInfo(
+        op=_create_op(inputs=[0], outputs=[1]),
+        op_name=qtyping.TFLOperationName.FULLY_CONNECTED,
+        subgraph_op_index=0,
+        op_quant_config=qtyping.OpQuantizationConfig(),
+    )
+    self._tensor_quant_config = qtyping.TensorQuantizationConfig(
+        num_bits=8,
+        symmetric=False,
+        granularity=qtyping.QuantGranularity.TENSORWISE,
+    )
+
+  def test_calibrate_collects_min_max_and_histogram(self):
+    op = _create_op(inputs=[0], outputs=[1])
+    graph_info = qtyping.GraphInfo(
+        subgraph_tensors=[
+            _create_tensor("input", shape=(1, 4)),
+            _create_tensor("output", shape=(1, 4)),
+        ],
+        buffers=[],
+    )
+    tensor_content_map = {
+        "input": np.array([[1.0, 2.0, -1e39, 4.0]]),
+        "output": np.array([[-3.0, 0.0, 3.0, 6.0]]),
+    }
+    self.enter_context(
+        mock.patch.object(
+            tfl_flatbuffer_utils,
+            "get_tensor_name",
+            side_effect=["input", "output"],
+            autospec=True,
+            spec_set=True,
+        )
+    )
+    self.enter_context(
+        mock.patch.object(
+            tfl_flatbuffer_utils,
+            "get_tensor_data",
+            return_value=None,
+            autospec=True,
+            spec_set=True,
+        )
+    )
+
+    qsvs = histogram.calibrate(op, graph_info, tensor_content_map)
+
+    self.assertAlmostEqual(qsvs["input"]["min"], 1.0)
+    self.assertAlmostEqual(qsvs["input"]["max"], 4.0)
+    self.assertEqual(qsvs["input"]["num_samples"], 1)
+    # The value outside of the valid range is not in the histogram.
+    input_hist = histogram_utils.DynamicHistogram.from_dict(
+        qsvs["input"]["histogram"]
+    )
+    self.assertEqual(np.sum(input_hist.counts), 3)
+    self.assertAlmostEqual(input_hist.global_min[0], 1.0)
+    output_hist = histogram_utils.DynamicHistogram.from_dict(
+        qsvs["output"]["histogram"]
+    )
+    self.assertEqual(np.sum(output_hist.counts), 4)
+
+  def test_get_percentile_range(self):
+    counts = np.array([1, 98, 1])
+    bin_edges = np.array([0.0, 1.0, 2.0, 3.0])
+    range_min, range_max = histogram.get_percentile_range(
+        counts, bin_edges, percentile=99.0
+    )
+    self.assertAlmostEqual(range_min, 1.0)
+    self.assertAlmostEqual(range_max, 2.0)
+
+  def test_get_kl_range_keeps_range_without_outliers(self):
+    counts = np.ones(200, dtype=np.int64)
+    bin_edges = np.linspace(-1.0, 1.0, 201)
+    range_min, range_max = histogram.get_kl_range(counts, bin_edges, num_bits=8)
+    self.assertAlmostEqual(range_min, -1.0)
+    self.assertAlmostEqual(range_max, 1.0)
+
+  @parameterized.named_parameters(
+      ("percentile", histogram.get_percentile_tensor_quant_params),
+      ("kl", histogram.get_kl_tensor_quant_params),
+  )
+  def test_get_tensor_quant_params_clips_activation_outliers(
+      self, get_tensor_quant_params_func
+  ):
+    qsv = _get_activation_qsv(self._data)
+    quant_params = get_tensor_quant_params_func(
+        op_info=self._op_info,
+        tensor_quant_config=self._tensor_quant_config,
+        tensor_qsv=qsv,
+    )
+    quant_range = quant_params.scale.item() * 255
+    # The min/max range is 110 wide, the clipping range only covers the bulk
+    # of the gaussian.
+    self.assertLess(quant_range, 20.0)
+    self.assertGreater(quant_range, 4.0)
+    self.assertEqual(quant_params.scale.shape, qsv["min"].shape)
+
+  @parameterized.named_parameters(
+      ("percentile", histogram.get_percentile_tensor_quant_params),
+      ("kl", histogram.get_kl_tensor_quant_params),
+  )
+  def test_get_tensor_quant_params_falls_back_to_min_max_without_histogram(
+      self, get_tensor_quant_params_func
+  ):
+    quant_params = get_tensor_quant_params_func(
+        op_info=self._op_info,
+        tensor_quant_config=self._tensor_quant_config,
+        tensor_qsv={"min": np.array([[-1.0]]), "max": np.array([[1.0]])},
+    )
+    self.assertAlmostEqual(quant_params.scale.item(), 2.0 / 255)
+
+
+if __name__ == "__main__":
+  absltest.main()
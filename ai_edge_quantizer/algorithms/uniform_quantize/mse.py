@@ -119,7 +119,12 @@ def get_tensor_quant_params(
       ),
   )
 
-  quantized_vars = uniform_quantize_tensor.uniform_quantize(
+  quantize = (
+      uniform_quantize_tensor.deferred_uniform_quantize
+      if op_info.defer_quantized_data
+      else uniform_quantize_tensor.uniform_quantize
+  )
+  quantized_vars = quantize(
       tensor_content,
       quant_params,
       uniform_quantize_tensor.is_blockwise(tensor_quant_config.granularity),
@@ -548,7 +548,7 @@ def _get_or_compute_weight_quant_params(
       tensor_data,
       tensor_qsv={"mu2": mu2},
   )
-  tensor_quant_params_cache.insert(
+  quant_params = tensor_quant_params_cache.insert(
       weight_tensor.buffer,
       weight_config,
       quant_params,
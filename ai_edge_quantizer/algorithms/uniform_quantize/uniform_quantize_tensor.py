@@ -16,12 +16,16 @@
 """Uniform quantize in tensor level."""
 
 import dataclasses
-from typing import Any, Optional, Sequence
+import math
+from typing import Any, Optional, Sequence, Union
 import ml_dtypes
 import numpy as np
 from ai_edge_quantizer import qtyping
 from ai_edge_quantizer.utils import tfl_flatbuffer_utils
 
+# The size of the input data quantized at once by `deferred_uniform_quantize`.
+_DEFERRED_QUANTIZE_CHUNK_BYTES = 32 * 1024 * 1024
+
 
 @dataclasses.dataclass(frozen=True)
 class IntType:
@@ -362,6 +366,115 @@ def uniform_quantize(
   return ret
 
 
+def _is_external_buffer_view(tensor_data: np.ndarray) -> bool:
+  """Checks if `tensor_data` views a buffer not owned by a numpy array."""
+  base = tensor_data
+  while isinstance(base, np.ndarray):
+    base = base.base
+  return base is not None
+
+
+def _can_slice_rows(
+    param: Optional[np.ndarray], tensor_data: np.ndarray
+) -> bool:
+  """Checks if `param` can be sliced along the rows of `tensor_data`."""
+  return (
+      param is None
+      or param.ndim < tensor_data.ndim
+      or param.shape[0] in (1, tensor_data.shape[0])
+  )
+
+
+def _slice_rows(
+    param: Optional[np.ndarray], tensor_data: np.ndarray, start: int, end: int
+) -> Optional[np.ndarray]:
+  """Slices the rows `[start, end)` of `param` if it varies across rows."""
+  if (
+      param is None
+      or param.ndim < tensor_data.ndim
+      or param.shape[0] != tensor_data.shape[0]
+  ):
+    return param
+  return param[start:end]
+
+
+def deferred_uniform_quantize(
+    tensor_data: np.ndarray,
+    quantization_params: qtyping.UniformQuantParams,
+    is_blockwise_quant: bool = False,
+) -> Union[np.ndarray, qtyping.LazyQuantizedData]:
+  """Uniform quantize a tensor when its quantized data is used.
+
+  The quantized data is computed by `uniform_quantize` in chunks of rows (i.e.,
+  entries of the leading dimension), so it matches the eagerly quantized data.
+  Only tensors viewing an external buffer, e.g. the weights of the float model,
+  are deferred, since deferring the quantization of a derived array would keep
+  it alive. The other tensors, and those whose quantization parameters don't
+  split along the rows, are quantized eagerly.
+
+  Args:
+    tensor_data: The tensor to be quantized.
+    quantization_params: The quantization parameters.
+    is_blockwise_quant: Whether the tensor is blockwise quantized.
+
+  Returns:
+    The quantized tensor, or a `LazyQuantizedData` computing it.
+  """
+  if (
+      tensor_data.ndim == 0
+      or tensor_data.size == 0
+      or not _is_external_buffer_view(tensor_data)
+      or (is_blockwise_quant and quantization_params.quantized_dimension == 0)
+  ):
+    return uniform_quantize(
+        tensor_data, quantization_params, is_blockwise_quant
+    )
+  if not is_blockwise_quant:
+    quantization_params = fix_quantization_params_rank(
+        tensor_data, quantization_params
+    )
+  if not all(
+      _can_slice_rows(param, tensor_data)
+      for param in (quantization_params.scale, quantization_params.zero_point)
+  ):
+    return uniform_quantize(
+        tensor_data, quantization_params, is_blockwise_quant
+    )
+
+  def compute_rows(start: int, end: int) -> np.ndarray:
+    return uniform_quantize(
+        tensor_data[start:end],
+        dataclasses.replace(
+            quantization_params,
+            scale=_slice_rows(
+                quantization_params.scale, tensor_data, start, end
+            ),
+            zero_point=_slice_rows(
+                quantization_params.zero_point, tensor_data, start, end
+            ),
+        ),
+        is_blockwise_quant,
+    )
+
+  # Validate the quantization parameters now rather than at serialization.
+  first_row = compute_rows(0, 1)
+
+  # Use chunks of about `_DEFERRED_QUANTIZE_CHUNK_BYTES` of input data, holding
+  # a multiple of 8 values so that each chunk can be packed on its own.
+  row_size = tensor_data.size // tensor_data.shape[0]
+  alignment = 8 // math.gcd(row_size, 8)
+  rows_per_chunk = _DEFERRED_QUANTIZE_CHUNK_BYTES // (
+      row_size * tensor_data.dtype.itemsize
+  )
+  rows_per_chunk = max(rows_per_chunk // alignment, 1) * alignment
+  return qtyping.LazyQuantizedData(
+      shape=tensor_data.shape,
+      dtype=first_row.dtype,
+      compute_rows=compute_rows,
+      rows_per_chunk=rows_per_chunk,
+  )
+
+
 def uniform_dequantize(
     tensor_data: np.ndarray,
     quantization_params: qtyping.UniformQuantParams,
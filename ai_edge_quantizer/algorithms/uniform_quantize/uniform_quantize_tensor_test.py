@@ -16,6 +16,7 @@
 """Tests for tensor_utils."""
 
 import dataclasses
+from unittest import mock
 
 from absl.testing import absltest
 from absl.testing import parameterized
@@ -225,6 +226,97 @@ class TensorUtilsTest(parameterized.TestCase):
           is_blockwise_quant=True,
       )
 
+  @parameterized.named_parameters(
+      dict(
+          testcase_name="channelwise_dim0",
+          quantized_dimension=0,
+          block_size=0,
+          num_bits=8,
+      ),
+      dict(
+          testcase_name="channelwise_dim1",
+          quantized_dimension=1,
+          block_size=0,
+          num_bits=4,
+      ),
+      dict(
+          testcase_name="tensorwise",
+          quantized_dimension=None,
+          block_size=0,
+          num_bits=8,
+      ),
+      dict(
+          testcase_name="blockwise",
+          quantized_dimension=1,
+          block_size=4,
+          num_bits=4,
+      ),
+  )
+  def test_deferred_uniform_quantize_matches_uniform_quantize(
+      self, quantized_dimension, block_size, num_bits
+  ):
+    # Quantize a few rows at a time.
+    self.enter_context(
+        mock.patch.object(
+            uniform_quantize_tensor, "_DEFERRED_QUANTIZE_CHUNK_BYTES", 64
+        )
+    )
+    float_data = np.random.default_rng(0).normal(size=(10, 8))
+    float_data = float_data.astype(np.float32)
+    # Only views of an external buffer, e.g. the model's, are deferred.
+    tensor = np.frombuffer(float_data.tobytes(), np.float32).reshape(10, 8)
+    if block_size:
+      abs_max = np.max(np.abs(float_data.reshape(10, -1, block_size)), axis=2)
+    elif quantized_dimension is None:
+      abs_max = np.max(np.abs(float_data), keepdims=True)
+    else:
+      abs_max = np.max(
+          np.abs(float_data), axis=1 - quantized_dimension, keepdims=True
+      )
+    quant_params = qtyping.UniformQuantParams(
+        quantized_dimension=quantized_dimension,
+        block_size=block_size,
+        num_bits=num_bits,
+        scale=abs_max / 2 ** (num_bits - 1),
+        zero_point=np.zeros_like(abs_max, dtype=np.int32),
+        symmetric=True,
+    )
+    is_blockwise_quant = block_size > 0
+
+    quantized_tensor = uniform_quantize_tensor.deferred_uniform_quantize(
+        tensor, quant_params, is_blockwise_quant
+    )
+
+    self.assertIsInstance(quantized_tensor, qtyping.LazyQuantizedData)
+    self.assertGreater(len(list(quantized_tensor.iter_chunks())), 1)
+    expected_tensor = uniform_quantize_tensor.uniform_quantize(
+        float_data, quant_params, is_blockwise_quant
+    )
+    self.assertEqual(quantized_tensor.dtype, expected_tensor.dtype)
+    np.testing.assert_array_equal(
+        np.asarray(quantized_tensor), expected_tensor
+    )
+
+  def test_deferred_uniform_quantize_of_owned_data_is_eager(self):
+    tensor = np.array([[-3.0, 1.3], [2.4, 16.0]])
+    quant_params = qtyping.UniformQuantParams(
+        quantized_dimension=0,
+        num_bits=4,
+        scale=np.array([1.2666667]),
+        zero_point=np.array([-6]),
+        symmetric=False,
+    )
+
+    quantized_tensor = uniform_quantize_tensor.deferred_uniform_quantize(
+        tensor, quant_params
+    )
+
+    self.assertIsInstance(quantized_tensor, np.ndarray)
+    np.testing.assert_array_equal(
+        quantized_tensor,
+        uniform_quantize_tensor.uniform_quantize(tensor, quant_params),
+    )
+
   @parameterized.parameters(
       (
           8,
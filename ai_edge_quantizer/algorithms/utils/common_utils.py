@@ -15,13 +15,16 @@
 
 """Common utils for uniform quantization algorithms."""
 
-from collections.abc import MutableMapping, Sequence
+from collections.abc import Iterable, Iterator, MutableMapping, Sequence
+import contextlib
 import dataclasses
 import enum
+import threading
 from typing import Any, Optional
 import numpy as np
 from ai_edge_quantizer import qtyping
 from ai_edge_quantizer.algorithms.uniform_quantize import uniform_quantize_tensor
+from ai_edge_quantizer.utils import quantized_data_store as quantized_data_store_lib
 from ai_edge_quantizer.utils import tfl_flatbuffer_utils
 
 _TFLOpName = qtyping.TFLOperationName
@@ -50,13 +53,53 @@ class TensorQuantParamsCache:
 
   Cache of `UniformQuantParams|NonLinearQuantParams` objects keyed on a tuple of
   the buffer ID and the `TensorQuantizationConfig` used to compute it.
+
+  When ops are materialized concurrently, an op holds the locks of its buffers
+  (see `lock_buffers`) across its lookups and inserts, so that the params of a
+  shared buffer are computed once.
+
+  If a `QuantizedDataStore` is set, the quantized data of the inserted params is
+  moved to it, so that the cached params don't keep it resident. Deferred
+  quantized data (`LazyQuantizedData`) holds nothing and is kept as is. Callers
+  must use the params returned by `insert`.
   """
 
-  def __init__(self):
+  def __init__(
+      self,
+      quantized_data_store: Optional[
+          quantized_data_store_lib.QuantizedDataStore
+      ] = None,
+  ):
+    self._quantized_data_store = quantized_data_store
     self._cache: MutableMapping[
         TensorQuantParamsCacheKey,
         qtyping.UniformQuantParams | qtyping.NonLinearQuantParams,
     ] = {}
+    self._buffer_locks: dict[int, threading.Lock] = {}
+    self._buffer_locks_lock = threading.Lock()
+
+  @contextlib.contextmanager
+  def lock_buffers(self, buffer_ids: Iterable[int]) -> Iterator[None]:
+    """Exclusively locks the cache entries of the buffers.
+
+    Locks are acquired in increasing buffer ID order, so that concurrent
+    callers can't deadlock.
+
+    Args:
+      buffer_ids: The IDs of the buffers to lock.
+
+    Yields:
+      None, while the buffers are locked.
+    """
+    with self._buffer_locks_lock:
+      locks = [
+          self._buffer_locks.setdefault(buffer_id, threading.Lock())
+          for buffer_id in sorted(set(buffer_ids))
+      ]
+    with contextlib.ExitStack() as stack:
+      for lock in locks:
+        stack.enter_context(lock)
+      yield
 
   def lookup(
       self, buffer_id: int, quant_config: qtyping.TensorQuantizationConfig
@@ -73,6 +116,15 @@ class TensorQuantParamsCache:
       quant_config: qtyping.TensorQuantizationConfig,
       quant_params: qtyping.UniformQuantParams | qtyping.NonLinearQuantParams,
   ) -> qtyping.UniformQuantParams | qtyping.NonLinearQuantParams:
+    if self._quantized_data_store is not None and isinstance(
+        quant_params.quantized_data, np.ndarray
+    ):
+      quant_params = dataclasses.replace(
+          quant_params,
+          quantized_data=self._quantized_data_store.store(
+              quant_params.quantized_data
+          ),
+      )
     self._cache[(buffer_id, quant_config)] = quant_params
     return quant_params
 
@@ -279,7 +331,7 @@ def _get_tensor_transformation_params_wrapper(
         ) from e
       # Update the cache if we have a key.
       if is_constant:
-        tensor_quant_params_cache.insert(
+        quant_params = tensor_quant_params_cache.insert(
             tensor.buffer, tensor_quant_config, quant_params
         )
   return get_tensor_transformation_params(
@@ -14,6 +14,7 @@
 # ==============================================================================
 
 import collections
+import threading
 from unittest import mock
 
 from absl.testing import absltest
@@ -22,6 +23,7 @@ import numpy as np
 from ai_edge_quantizer import default_policy
 from ai_edge_quantizer import qtyping
 from ai_edge_quantizer.algorithms.utils import common_utils
+from ai_edge_quantizer.utils import quantized_data_store
 from ai_edge_quantizer.utils import tfl_flatbuffer_utils
 
 
@@ -664,5 +666,47 @@ class CommonUtilsTest(parameterized.TestCase):
       )
 
 
+class TensorQuantParamsCacheTest(absltest.TestCase):
+
+  def test_lock_buffers_is_exclusive(self):
+    cache = common_utils.TensorQuantParamsCache()
+    acquired = threading.Event()
+
+    def lock_buffer():
+      with cache.lock_buffers([1]):
+        acquired.set()
+
+    with cache.lock_buffers([2, 1, 2]):
+      # Other buffers can be locked concurrently.
+      with cache.lock_buffers([3]):
+        pass
+      thread = threading.Thread(target=lock_buffer)
+      thread.start()
+      self.assertFalse(acquired.wait(timeout=0.1))
+    thread.join()
+    self.assertTrue(acquired.is_set())
+
+  def test_insert_moves_quantized_data_to_store(self):
+    store = quantized_data_store.QuantizedDataStore(
+        self.create_tempdir().full_path
+    )
+    cache = common_utils.TensorQuantParamsCache(store)
+    quant_config = qtyping.TensorQuantizationConfig(num_bits=8)
+    quant_params = qtyping.UniformQuantParams(
+        num_bits=8,
+        quantized_dimension=None,
+        scale=np.ones(1, dtype=np.float32),
+        zero_point=np.zeros(1, dtype=np.int32),
+        quantized_data=np.arange(8, dtype=np.int8),
+    )
+    inserted_params = cache.insert(0, quant_config, quant_params)
+    self.assertEqual(inserted_params, quant_params)
+    self.assertIsNot(
+        inserted_params.quantized_data, quant_params.quantized_data
+    )
+    self.assertEqual(store.size_bytes, 8)
+    self.assertIs(cache.lookup(0, quant_config), inserted_params)
+
+
 if __name__ == "__main__":
   absltest.main()
@@ -15,10 +15,18 @@
 
 """Quantization Calibration."""
 
-from collections.abc import Iterable, Mapping
+from collections.abc import Iterable, Iterator, Mapping, MutableMapping, Sized
 import copy
+import dataclasses
 import enum
-import json
+import importlib
+import itertools
+import multiprocessing
+import operator
+import queue
+import tempfile
+import time
+import traceback
 from typing import Any, Callable, cast
 
 import numpy as np
@@ -26,12 +34,19 @@ from typing_extensions import override
 
 import os
 import io
+from ai_edge_litert.tools import flatbuffer_utils
+from ai_edge_litert.tools import mmap_utils
 from ai_edge_quantizer import algorithm_manager
 from ai_edge_quantizer import default_policy as policy
 from ai_edge_quantizer import qtyping
 from ai_edge_quantizer import recipe
 from ai_edge_quantizer import recipe_manager
+from ai_edge_quantizer.algorithms.uniform_quantize import common_quantize
+from ai_edge_quantizer.utils import activation_cache as activation_cache_lib
+from ai_edge_quantizer.utils import calibration_checkpoint
 from ai_edge_quantizer.utils import calibration_utils
+from ai_edge_quantizer.utils import model_graph_index
+from ai_edge_quantizer.utils import prefetch_utils
 from ai_edge_quantizer.utils import progress_utils
 from ai_edge_quantizer.utils import qsv_utils
 from ai_edge_quantizer.utils import tfl_flatbuffer_utils
@@ -53,11 +68,22 @@ class CalibrationMode(enum.Enum):
     CALIBRATION_PROFILER_BASED: Use TFLite's internal C++ profiler-based
       calibration. It is faster than CALIBRATION_PRESERVE_ALL_TENSORS but offers
       less flexibility in terms of what statistics can be collected.
+    HYBRID: Profiler-based min/max for all tensors, plus targeted capture of
+      the tensors whose algorithm needs richer statistics (e.g., the GPTQ
+      hessian or the OSCAR mu2). Only those tensors are kept alive and read
+      back, so it runs at close to profiler speed and memory.
+    LAYERWISE: HYBRID with a bound on the memory of the captured tensors. The
+      captured tensors are split into chunks of consecutive ops that fit the
+      calibrator's `memory_budget_bytes`, and each chunk is captured by its own
+      pass over the samples. For very large models whose captured tensors
+      don't fit in memory at once.
   """
   INFERENCE = 1
   CALIBRATION_PRESERVE_ALL_TENSORS = 2
   CALIBRATION = 2
   CALIBRATION_PROFILER_BASED = 3
+  HYBRID = 4
+  LAYERWISE = 5
 
 
 _SignatureInput = dict[str, Any]  # input_argument_name -> tensor_value.
@@ -67,6 +93,15 @@ _SignatureOutput = dict[
 _MISSING_FUNC = cast(
     Callable[[qtyping.QSV, qtyping.QSV], qtyping.QSV], object()
 )
+# Marks that no signature has been calibrated yet (None is a valid key).
+_NO_SIGNATURE = object()
+# Status of the messages sent by parallel calibration workers.
+_WORKER_RESULT = "result"
+_WORKER_ERROR = "error"
+_QUEUE_POLL_INTERVAL_SECONDS = 0.1
+# Maximum number of samples calibrated by `CalibrationSignatureRunner` before
+# their deferred QSV updates are applied.
+_MAX_PENDING_QSV_UPDATE_SAMPLES = 64
 
 
 class CalibrationInterpreter:
@@ -119,14 +154,19 @@ class CalibrationInterpreter:
     return self._calibrator.get_model_qsvs()
 
   def save_calibration_result(
-      self, output_path: str, extra_metadata: Mapping[str, str] | None = None
+      self,
+      output_path: str,
+      extra_metadata: Mapping[str, str] | None = None,
+      binary: bool = False,
   ) -> None:
     """Saves the calibration results."""
     if self._mode == CalibrationMode.INFERENCE:
       raise ValueError(
           "Calibration results are not available in INFERENCE mode."
       )
-    self._calibrator.save_calibration_result(output_path, extra_metadata)
+    self._calibrator.save_calibration_result(
+        output_path, extra_metadata, binary=binary
+    )
 
   def get_signature_list(self) -> list[str]:
     """Returns the signature list."""
@@ -134,7 +174,14 @@ class CalibrationInterpreter:
 
 
 class CalibrationSignatureRunner:
-  """Wrapper around TFL signature runner to enable calibration."""
+  """Wrapper around TFL signature runner to enable calibration.
+
+  In calibration mode, each call invokes the signature and calibrates on its
+  inputs. The variables are never reset between calls, so a stateful signature
+  (e.g., KV cache decoding) can be calibrated step by step. The QSV updates are
+  deferred and applied in batches, and whenever the calibration results are
+  read.
+  """
 
   def __init__(
       self,
@@ -169,15 +216,10 @@ class CalibrationSignatureRunner:
   def __call__(self, **kwargs):
     if self._mode == CalibrationMode.INFERENCE:
       return self._signature_runner(**kwargs)
-    self._calibrator.calibrate(
-        calibration_dataset={self._signature_key: [kwargs]},  # pyrefly: ignore[bad-argument-type]
-        model_recipe_manager=self._recipe_manager,
-        cache_output=True,
-    )
-    outputs = self._calibrator.get_cached_output()
-    assert len(outputs) == 1
-    self._calibrator.clear_cached_output()
-    return outputs[0]
+    with progress_utils.ProgressBar(None, enable=False) as pbar:
+      return self._calibrator._calibrate_sample(  # pylint: disable=protected-access
+          self._signature_key, kwargs, self._recipe_manager, pbar
+      )
 
   def get_input_details(self):
     """Returns the input details of the model."""
@@ -188,6 +230,219 @@ class CalibrationSignatureRunner:
     return self._signature_runner.get_output_details()
 
 
+@dataclasses.dataclass(frozen=True)
+class CalibrationPlanEntry:
+  """An op to calibrate in a calibration plan.
+
+  Attributes:
+    op: The op (or IO operator) to calibrate.
+    op_key: The op name used to look up the quantization recipe.
+    algorithm_name: The quantization algorithm selected by the recipe.
+    calibrate_func: The calibration function of the algorithm for the op.
+    update_func: The function to update the QSVs produced by the op.
+    tensor_indices: Indices (in the subgraph) of the tensors that may require
+      calibration statistics for the op.
+  """
+
+  op: Any
+  op_key: qtyping.TFLOperationName
+  algorithm_name: str
+  calibrate_func: Callable[..., dict[str, qtyping.QSV]]
+  update_func: Callable[[qtyping.QSV, qtyping.QSV], qtyping.QSV]
+  tensor_indices: tuple[int, ...]
+
+
+@dataclasses.dataclass(frozen=True)
+class CalibrationSubgraphPlan:
+  """The ops to calibrate in a subgraph, in execution order.
+
+  Attributes:
+    subgraph_index: The index of the subgraph in the model.
+    graph_info: The graph info passed to the calibration functions.
+    num_ops: The number of ops in the subgraph (for progress reporting).
+    entries: The ops to calibrate.
+    readback_tensor_names: Index to name of the tensors to read back from the
+      interpreter for each sample: the non-constant tensors of the calibrated
+      ops.
+  """
+
+  subgraph_index: int
+  graph_info: qtyping.GraphInfo
+  num_ops: int
+  entries: tuple[CalibrationPlanEntry, ...]
+  readback_tensor_names: dict[int, str]
+
+
+@dataclasses.dataclass(frozen=True)
+class CalibrationPlan:
+  """A calibration plan for a signature, compiled from the recipe.
+
+  The plan resolves everything that doesn't depend on the calibration data
+  (op keys, scopes, recipe lookups and calibration/update functions) once, so
+  that each calibration sample only replays it.
+
+  Attributes:
+    signature_key: The signature the plan was compiled for.
+    recipe_version: The version of the recipe the plan was compiled from.
+    subgraphs: The subgraphs to calibrate, in the order they are visited (the
+      main subgraph first, followed by the subgraphs invoked by its ops).
+  """
+
+  signature_key: str | None
+  recipe_version: int
+  subgraphs: tuple[CalibrationSubgraphPlan, ...]
+
+
+@dataclasses.dataclass(frozen=True)
+class CalibrationCheckpointConfig:
+  """Periodic checkpointing of a calibration.
+
+  A checkpoint is written every `every_n_samples` samples and/or every
+  `every_seconds` seconds, and at the end of the calibration. Checkpoints are
+  incremental, only the QSVs updated since the previous checkpoint are written.
+
+  Attributes:
+    directory: The directory to write the checkpoints to.
+    every_n_samples: Write a checkpoint after this many calibrated samples.
+    every_seconds: Write a checkpoint when this many seconds have elapsed since
+      the previous one.
+    resume: Whether to resume from the checkpoint in `directory`, if any. The
+      QSVs and metadata are restored, and the samples already calibrated are
+      skipped (i.e., consumed from the dataset without running the model). If
+      False, an existing checkpoint is discarded.
+  """
+
+  directory: str
+  every_n_samples: int | None = None
+  every_seconds: float | None = None
+  resume: bool = True
+
+  def __post_init__(self):
+    if self.every_n_samples is not None and self.every_n_samples < 1:
+      raise ValueError(
+          f"every_n_samples must be positive, got {self.every_n_samples}."
+      )
+    if self.every_seconds is not None and self.every_seconds <= 0:
+      raise ValueError(
+          f"every_seconds must be positive, got {self.every_seconds}."
+      )
+
+  def is_due(self, num_samples: int, elapsed_seconds: float) -> bool:
+    """Returns whether a checkpoint is due.
+
+    Args:
+      num_samples: The number of samples calibrated since the last checkpoint.
+      elapsed_seconds: The time elapsed since the last checkpoint.
+    """
+    if self.every_n_samples is not None and num_samples >= self.every_n_samples:
+      return True
+    return self.every_seconds is not None and (
+        elapsed_seconds >= self.every_seconds
+    )
+
+
+@dataclasses.dataclass(frozen=True)
+class EarlyStoppingConfig:
+  """Early stopping of a signature calibration once its QSVs have converged.
+
+  Only the min/max QSVs (updated with `qsv_utils.moving_average_update` or
+  `qsv_utils.min_max_update`) are monitored. A sample is stable if none of them
+  moved by more than `tolerance`, relative to the tensor range. The remaining
+  samples of a signature dataset are skipped after `window` consecutive stable
+  samples. Richer statistics (e.g., GPTQ hessians) are not monitored, they are
+  accumulated over the samples calibrated until then.
+
+  Attributes:
+    tolerance: The maximum relative change of a min/max QSV for a sample to be
+      stable.
+    window: The number of consecutive stable samples after which the signature
+      calibration stops.
+    min_samples: The minimum number of samples to calibrate per signature.
+  """
+
+  tolerance: float = 1e-3
+  window: int = 32
+  min_samples: int = 0
+
+  def __post_init__(self):
+    if self.tolerance < 0:
+      raise ValueError(
+          f"tolerance must be non-negative, got {self.tolerance}."
+      )
+    if self.window < 1:
+      raise ValueError(f"window must be positive, got {self.window}.")
+    if self.min_samples < 0:
+      raise ValueError(
+          f"min_samples must be non-negative, got {self.min_samples}."
+      )
+
+
+def _get_relative_qsv_change(qsv: qtyping.QSV, new_qsv: qtyping.QSV) -> float:
+  """Returns the largest min/max change between two QSVs, relative to range."""
+  new_min = np.asarray(new_qsv["min"])
+  new_max = np.asarray(new_qsv["max"])
+  old_min = np.asarray(qsv["min"])
+  old_max = np.asarray(qsv["max"])
+  if old_min.shape != new_min.shape or old_max.shape != new_max.shape:
+    return np.inf
+  value_range = np.maximum(new_max - new_min, np.finfo(np.float32).tiny)
+  change = np.maximum(np.abs(new_min - old_min), np.abs(new_max - old_max))
+  return float(np.max(change / value_range, initial=0.0))
+
+
+class _ConvergenceMonitor:
+  """Tracks the convergence of the min/max QSVs over a signature dataset."""
+
+  def __init__(self, config: EarlyStoppingConfig):
+    self._config = config
+    self._num_samples = 0
+    self._num_stable_samples = 0
+    # Tensor name to its QSV after the previous sample. QSVs are replaced (not
+    # mutated) by the update functions, so keeping a reference is enough.
+    self._previous_qsvs: dict[str, qtyping.QSV] = {}
+
+  def update(
+      self,
+      model_qsvs: Mapping[str, qtyping.QSV],
+      qsv_update_funcs: Mapping[
+          str, Callable[[qtyping.QSV, qtyping.QSV], qtyping.QSV]
+      ],
+      num_samples: int = 1,
+  ) -> bool:
+    """Records a calibration step.
+
+    Args:
+      model_qsvs: The QSVs of the model tensors after the step.
+      qsv_update_funcs: Tensor name to the function used to update its QSV.
+      num_samples: The number of samples calibrated by the step (i.e., its batch
+        size). A stable step counts as that many stable samples.
+
+    Returns:
+      Whether the QSVs have converged.
+    """
+    self._num_samples += num_samples
+    is_stable = True
+    for tensor_name, update_func in qsv_update_funcs.items():
+      if update_func not in qsv_utils.MIN_MAX_UPDATE_FUNCS:
+        continue
+      qsv = model_qsvs[tensor_name]
+      previous_qsv = self._previous_qsvs.get(tensor_name)
+      if previous_qsv is qsv:
+        continue  # Not updated by this sample.
+      self._previous_qsvs[tensor_name] = qsv
+      if previous_qsv is None or is_stable and (
+          _get_relative_qsv_change(previous_qsv, qsv) > self._config.tolerance
+      ):
+        is_stable = False
+    self._num_stable_samples = (
+        self._num_stable_samples + num_samples if is_stable else 0
+    )
+    return (
+        self._num_samples >= self._config.min_samples
+        and self._num_stable_samples >= self._config.window
+    )
+
+
 class Calibrator:
   """Base class and factory for TFLite model calibrators.
 
@@ -216,6 +471,7 @@ class Calibrator:
           [qtyping.QSV, qtyping.QSV],
           qtyping.QSV,
       ] = _MISSING_FUNC,
+      memory_budget_bytes: int | None = None,
   ) -> "Calibrator":
     """Creates a new instance of the appropriate calibrator subclass.
 
@@ -225,6 +481,11 @@ class Calibrator:
       mode: The mode of the calibrator. Check the docstring of CalibrationMode
         for more details.
       qsv_update_func: The function to update the QSVs across calibration steps.
+      memory_budget_bytes: The memory budget of the LAYERWISE mode (see
+        `CalibrationMode`). It bounds the estimated size of the tensors captured
+        at once, and of the samples buffered to replay them for each chunk. If
+        None, all the tensors are captured at once, as in HYBRID mode. Ignored
+        in other modes.
 
     Returns:
       An instance of the appropriate calibrator subclass based on the mode.
@@ -238,7 +499,7 @@ class Calibrator:
           "Please use the Calibrator factory class instead."
       )
 
-    del float_tflite, num_threads, qsv_update_func
+    del float_tflite, num_threads, qsv_update_func, memory_budget_bytes
 
     if mode == CalibrationMode.INFERENCE:
       return super().__new__(_InferenceOnlyCalibrator)  # pyrefly: ignore[bad-argument-type]
@@ -246,6 +507,10 @@ class Calibrator:
       return super().__new__(_PreserveAllTensorsCalibrator)  # pyrefly: ignore[bad-argument-type]
     elif mode == CalibrationMode.CALIBRATION_PROFILER_BASED:
       return super().__new__(_ProfilerBasedCalibrator)  # pyrefly: ignore[bad-argument-type]
+    elif mode == CalibrationMode.HYBRID:
+      return super().__new__(_HybridCalibrator)  # pyrefly: ignore[bad-argument-type]
+    elif mode == CalibrationMode.LAYERWISE:
+      return super().__new__(_LayerwiseCalibrator)  # pyrefly: ignore[bad-argument-type]
     else:
       raise ValueError(f"Unsupported calibration mode: {mode}")
 
@@ -258,12 +523,29 @@ class Calibrator:
           [qtyping.QSV, qtyping.QSV],
           qtyping.QSV,
       ] = _MISSING_FUNC,
+      memory_budget_bytes: int | None = None,
   ):
     """Initializes the Calibrator. Check details in docstring of __new__."""
-    del mode  # Used only in __new__ and passed to __init__ automatically.
+    if memory_budget_bytes is not None and memory_budget_bytes <= 0:
+      raise ValueError(
+          f"memory_budget_bytes must be positive, got {memory_budget_bytes}."
+      )
+    # Kept to re-create the calibrator in worker processes.
+    self._float_tflite = float_tflite
+    self._num_threads = num_threads
+    self._mode = mode
+    self._memory_budget_bytes = memory_budget_bytes
 
     self._flatbuffer_model = tfl_flatbuffer_utils.read_model(float_tflite)
-    self._tfl_interpreter = self._create_interpreter(float_tflite, num_threads)
+    self._graph_index = model_graph_index.ModelGraphIndex(
+        self._flatbuffer_model
+    )
+    # The interpreter of the float model is borrowed from the interpreter pool,
+    # and returned to it by `close`.
+    self._tfl_interpreter = self._create_interpreter(
+        float_tflite, num_threads, pooled=True
+    )
+    self._pooled_interpreter: tfl.Interpreter | None = self._tfl_interpreter
     if qsv_update_func is _MISSING_FUNC:
       self._qsv_update_func = qsv_utils.moving_average_update
       self._is_custom_qsv_update_func = False
@@ -273,22 +555,76 @@ class Calibrator:
     # Tensor name to tensor content.
     self._tensor_content_map: dict[str, Any] = {}
     # QSV of all the tensors in the model.
-    self._model_qsvs: dict[str, qtyping.QSV] = {}
+    self._model_qsvs: MutableMapping[str, qtyping.QSV] = {}
+    # Tensor name to the function used to update its QSV, and the number of
+    # calibration steps folded into it. Used to merge QSVs across workers.
+    self._qsv_update_funcs: dict[
+        str, Callable[[qtyping.QSV, qtyping.QSV], qtyping.QSV]
+    ] = {}
+    self._qsv_num_updates: dict[str, int] = {}
+    # Signature key to the recipe manager and the calibration plan compiled
+    # from it.
+    self._calibration_plans: dict[
+        str | None, tuple[recipe_manager.RecipeManager, CalibrationPlan]
+    ] = {}
     # Cached output of the model.
     self._cached_output: list[_SignatureOutput] = []
     # Metadata for the calibration result.
     self._metadata: dict[str, Any] = {"num_samples_calibrated": 0}
+    # Activation cache used by the current calibration, and the hash of the
+    # model (computed on first use).
+    self._activation_cache: activation_cache_lib.ActivationCache | None = None
+    self._model_hash: str | None = None
+    # Tensor name to the min/max QSV updates (QSV, update function) deferred by
+    # `_calibrate_sample` until `_flush_qsv_updates`, and the number of samples
+    # they come from.
+    self._defer_qsv_updates = False
+    self._pending_qsv_updates: dict[
+        str,
+        list[
+            tuple[
+                qtyping.QSV, Callable[[qtyping.QSV, qtyping.QSV], qtyping.QSV]
+            ]
+        ],
+    ] = {}
+    self._num_pending_samples = 0
 
   def _create_interpreter(
       self,
       float_tflite: str | bytes,
       num_threads: int,
+      pooled: bool = False,
   ) -> tfl.Interpreter:
-    """Creates the TFLite interpreter."""
+    """Creates the TFLite interpreter.
+
+    Args:
+      float_tflite: The path to the TFLite model or the model content as bytes.
+      num_threads: The number of threads to use for the TFLite interpreter.
+      pooled: Whether to borrow the interpreter from the interpreter pool.
+
+    Returns:
+      The TFLite interpreter.
+    """
     raise NotImplementedError(
         "Subclasses must implement _create_interpreter()."
     )
 
+  def close(self) -> None:
+    """Returns the interpreter of the float model to the interpreter pool.
+
+    The calibration results remain available, but the calibrator must not be
+    used to calibrate afterwards.
+    """
+    self._release_pooled_interpreter()
+
+  def _release_pooled_interpreter(self) -> None:
+    """Returns the interpreter of the float model to the interpreter pool."""
+    if self._pooled_interpreter is not None:
+      tfl_interpreter_utils.get_interpreter_pool().release(
+          self._pooled_interpreter
+      )
+      self._pooled_interpreter = None
+
   def _calibrate_step(
       self,
       signature_key: str | None,
@@ -309,33 +645,609 @@ class Calibrator:
     """
     raise NotImplementedError("Subclasses must implement _calibrate_step().")
 
+  def _finish_calibration_steps(self) -> None:
+    """Finishes the calibration steps deferred by `_calibrate_step`.
+
+    Called before the variables are reset and before the QSVs are saved to a
+    checkpoint. Calibrators that run each sample as soon as it is received
+    have nothing to finish.
+    """
+
+  def _finish_calibration(self) -> None:
+    """Releases the resources only needed while `calibrate` runs."""
+
   def calibrate(
       self,
       calibration_dataset: Mapping[str, Iterable[_SignatureInput]],
       model_recipe_manager: recipe_manager.RecipeManager,
       cache_output: bool = False,
+      checkpoint_config: CalibrationCheckpointConfig | None = None,
+      early_stopping_config: EarlyStoppingConfig | None = None,
+      prefetch_depth: int = 0,
+      activation_cache: activation_cache_lib.ActivationCache | None = None,
+      batch_size: int = 1,
   ) -> None:
-    """Calibrates the model."""
-    total_ops = self._get_total_operations(calibration_dataset)
+    """Calibrates the model.
+
+    Each signature dataset is consumed exactly once in a streaming fashion, so
+    one-shot generators, unbounded iterators and data loaders can be used
+    without materializing the calibration set in memory.
+
+    Args:
+      calibration_dataset: A mapping from signature key to an iterable of
+        signature inputs. The progress bar uses the dataset's `__len__` (or
+        `__length_hint__`) if available, otherwise an indeterminate progress
+        display is shown.
+      model_recipe_manager: The recipe manager that contains the quantization
+        recipes.
+      cache_output: Whether to cache the output of the model during calibration.
+      checkpoint_config: If set, the calibration is checkpointed periodically
+        and resumed from an existing checkpoint (see
+        `CalibrationCheckpointConfig`). When resuming, the dataset must yield
+        the same samples in the same order as in the checkpointed run. The
+        variables of a stateful signature are not restored, so the first
+        samples calibrated after resuming in the middle of its dataset see
+        freshly reset variables.
+      early_stopping_config: If set, the calibration of a signature stops once
+        its min/max QSVs have converged (see `EarlyStoppingConfig`), and the
+        rest of its dataset is not consumed. The number of samples calibrated
+        for each early stopped signature is recorded in the
+        "early_stopped_signatures" metadata.
+      prefetch_depth: If positive, the samples are read from the datasets by a
+        background thread, up to `prefetch_depth` samples ahead of the
+        calibration, so that producing them overlaps with running the model.
+        Datasets can then also be async iterables. Exceptions raised by a
+        dataset are re-raised here. Note that the samples read ahead of an
+        early stop are consumed from the dataset.
+      activation_cache: If set, the model tensors of each sample are read from
+        the cache instead of invoking the model when they have been cached
+        (e.g., by the calibration with another recipe, or by
+        `model_validator.compare_model`), and are cached otherwise. Only
+        supported in CALIBRATION_PRESERVE_ALL_TENSORS mode, and not for
+        stateful signatures.
+      batch_size: The maximum number of consecutive samples of a signature that
+        are stacked along their leading (batch) dimension and calibrated by a
+        single model invocation. Only signatures whose inputs all have a
+        resizable leading dimension are batched, and samples whose other
+        dimensions or dtypes differ are not stacked together. Min/max, GPTQ,
+        OSCAR and histogram QSVs don't depend on the batching, while a moving
+        average QSV is updated once per batch. Cached outputs, if any, are
+        batched too. Don't batch the samples of a stateful signature, which are
+        expected to be calibrated one after the other.
+
+    Raises:
+      ValueError: If `activation_cache` is used in another mode, if
+        `early_stopping_config` is used in LAYERWISE mode, or if `batch_size`
+        is not positive.
+    """
+    if batch_size < 1:
+      raise ValueError(f"batch_size must be positive, got {batch_size}.")
+    self._flush_qsv_updates()
+    if (
+        early_stopping_config is not None
+        and self._mode == CalibrationMode.LAYERWISE
+    ):
+      # The QSVs of the samples buffered for the next pass are not updated
+      # yet, so they would look converged.
+      raise ValueError("Early stopping is not supported in LAYERWISE mode.")
+    if (
+        activation_cache is not None
+        and self._mode != CalibrationMode.CALIBRATION_PRESERVE_ALL_TENSORS
+    ):
+      raise ValueError(
+          "The activation cache is only supported in"
+          " CALIBRATION_PRESERVE_ALL_TENSORS mode."
+      )
+    self._activation_cache = activation_cache
+    checkpointer = None
+    position = calibration_checkpoint.DatasetPosition()
+    if checkpoint_config is not None:
+      checkpointer = calibration_checkpoint.CalibrationCheckpointer(
+          checkpoint_config.directory
+      )
+      if checkpoint_config.resume and checkpointer.has_checkpoint():
+        self._model_qsvs, self._metadata, position, qsv_updates = (
+            checkpointer.load()
+        )
+        self._metadata.setdefault("num_samples_calibrated", 0)
+        self._restore_qsv_updates(qsv_updates)
+      else:
+        checkpointer.clear()
+    last_checkpoint_time = time.monotonic()
+    num_samples_since_checkpoint = 0
+
+    total_ops = self._get_total_operations(calibration_dataset, batch_size)
     with progress_utils.ProgressBar(
         total_steps=total_ops,
         description="Running Calibration:",
         disappear_on_finish=True,
     ) as pbar:
       for signature_key, dataset in calibration_dataset.items():
-        for data in dataset:
-          self._metadata["num_samples_calibrated"] += 1
-          self._calibrate_step(
-              signature_key, data, model_recipe_manager, cache_output, pbar
+        if signature_key in position.completed_signatures:
+          continue
+        num_consumed = position.num_samples_consumed.get(signature_key, 0)
+        monitor = None
+        if early_stopping_config is not None:
+          monitor = _ConvergenceMonitor(early_stopping_config)
+        with prefetch_utils.prefetch(dataset, prefetch_depth) as dataset_iter:
+          # Skip the samples already calibrated before resuming.
+          for _ in itertools.islice(dataset_iter, num_consumed):
+            pass
+          signature_batch_size = (
+              batch_size if self._is_batchable(signature_key) else 1
           )
+          for num_samples, data in _batch_samples(
+              dataset_iter, signature_batch_size
+          ):
+            self._metadata["num_samples_calibrated"] += num_samples
+            self._calibrate_step(
+                signature_key, data, model_recipe_manager, cache_output, pbar
+            )
+            num_consumed += num_samples
+            if monitor is not None and monitor.update(
+                self._model_qsvs, self._qsv_update_funcs, num_samples
+            ):
+              self._metadata.setdefault("early_stopped_signatures", {})[
+                  signature_key
+              ] = num_consumed
+              break
+            num_samples_since_checkpoint += num_samples
+            if (
+                checkpointer is not None
+                and checkpoint_config is not None
+                and checkpoint_config.is_due(
+                    num_samples_since_checkpoint,
+                    time.monotonic() - last_checkpoint_time,
+                )
+            ):
+              self._finish_calibration_steps()
+              position.num_samples_consumed[signature_key] = num_consumed
+              checkpointer.save(
+                  self._model_qsvs,
+                  self._metadata,
+                  position,
+                  self._get_qsv_updates(),
+              )
+              last_checkpoint_time = time.monotonic()
+              num_samples_since_checkpoint = 0
+        self._finish_calibration_steps()
+        position.num_samples_consumed[signature_key] = num_consumed
+        position.completed_signatures.append(signature_key)
         self._tfl_interpreter.reset_all_variables()
+    self._finish_calibration()
+    if checkpointer is not None:
+      checkpointer.save(
+          self._model_qsvs, self._metadata, position, self._get_qsv_updates()
+      )
+
+  def _get_qsv_updates(self) -> calibration_checkpoint.QsvUpdates:
+    """Returns how the QSVs have been updated, for a checkpoint."""
+    return calibration_checkpoint.QsvUpdates(
+        update_func_names={
+            tensor_name: _get_qualified_name(update_func)
+            for tensor_name, update_func in self._qsv_update_funcs.items()
+        },
+        num_updates=dict(self._qsv_num_updates),
+    )
+
+  def _restore_qsv_updates(
+      self, qsv_updates: calibration_checkpoint.QsvUpdates
+  ) -> None:
+    """Restores how the QSVs have been updated from a checkpoint.
+
+    Args:
+      qsv_updates: The QSV updates of the checkpoint.
 
-  def get_model_qsvs(self) -> dict[str, qtyping.QSV]:
+    Raises:
+      ValueError: If an update function can't be found.
+    """
+    self._qsv_update_funcs = {}
+    for tensor_name, func_name in qsv_updates.update_func_names.items():
+      if self._is_custom_qsv_update_func:
+        # The custom function updates all the QSVs.
+        self._qsv_update_funcs[tensor_name] = self._qsv_update_func
+      else:
+        self._qsv_update_funcs[tensor_name] = _get_function(func_name)
+    self._qsv_num_updates = dict(qsv_updates.num_updates)
+
+  def calibrate_parallel(
+      self,
+      calibration_dataset: Mapping[str, Iterable[_SignatureInput]],
+      model_recipe_manager: recipe_manager.RecipeManager,
+      num_workers: int,
+      num_threads_per_worker: int | None = None,
+      prefetch_depth: int = 0,
+  ) -> None:
+    """Calibrates the model with multiple worker processes.
+
+    The samples are streamed from this process to `num_workers` worker
+    processes, each of which runs its own calibrator on the samples it receives.
+    The worker QSVs are then merged with the associative merge functions in
+    `qsv_utils` and folded into the QSVs of this calibrator.
+
+    The result matches a sequential `calibrate` run as follows:
+      * min/max QSVs accumulated with `min_max_update` are identical.
+      * GPTQ hessians and OSCAR mu2 (sample-weighted averages) are identical up
+        to floating point rounding (~1e-6 relative for float32).
+      * moving average min/max QSVs are order dependent, so they are merged as
+        an average of the worker QSVs weighted by their number of updates. The
+        result is always within the range spanned by the worker QSVs, but can
+        differ from the sequential result by up to the spread of the per-shard
+        statistics.
+
+    Variables (e.g., KV caches) are reset whenever a worker switches signature,
+    so stateful signatures only carry state between the samples of a worker.
+
+    Args:
+      calibration_dataset: A mapping from signature key to an iterable of
+        signature inputs.
+      model_recipe_manager: The recipe manager that contains the quantization
+        recipes.
+      num_workers: The number of worker processes.
+      num_threads_per_worker: The number of interpreter threads per worker. By
+        default, the threads of this calibrator are split across the workers.
+      prefetch_depth: If positive, the samples are read from the datasets by a
+        background thread, up to `prefetch_depth` samples ahead of sending
+        them to the workers (see `calibrate`).
+
+    Raises:
+      ValueError: If `num_workers` is not positive, or if the QSV update
+        function has no merge function.
+      RuntimeError: If a worker fails or dies (e.g., is killed for lack of
+        memory).
+    """
+    if num_workers < 1:
+      raise ValueError(f"num_workers must be positive, got {num_workers}.")
+    self._flush_qsv_updates()
+    if self._is_custom_qsv_update_func:
+      # Fail early rather than after the whole dataset is consumed.
+      qsv_utils.get_merge_func(self._qsv_update_func)
+    if num_threads_per_worker is None:
+      num_threads_per_worker = max(1, self._num_threads // num_workers)
+    float_tflite = self._float_tflite
+    if not isinstance(float_tflite, (str, bytes)):
+      float_tflite = bytes(float_tflite)
+
+    # Spawn (rather than fork) so that workers don't inherit the interpreter.
+    context = multiprocessing.get_context("spawn")
+    task_queue = context.Queue(maxsize=2 * num_workers)
+    result_queue = context.Queue()
+    workers = [
+        context.Process(
+            target=_calibration_worker,
+            args=(
+                float_tflite,
+                num_threads_per_worker,
+                self._mode,
+                model_recipe_manager.get_quantization_recipe(),
+                self._qsv_update_func
+                if self._is_custom_qsv_update_func
+                else None,
+                self._memory_budget_bytes,
+                task_queue,
+                result_queue,
+            ),
+            daemon=True,
+        )
+        for _ in range(num_workers)
+    ]
+    for worker in workers:
+      worker.start()
+    try:
+      with progress_utils.ProgressBar(
+          total_steps=_get_total_samples(calibration_dataset),
+          description="Running Parallel Calibration:",
+          disappear_on_finish=True,
+      ) as pbar:
+        for signature_key, dataset in calibration_dataset.items():
+          with prefetch_utils.prefetch(dataset, prefetch_depth) as dataset_iter:
+            for data in dataset_iter:
+              _put_task(
+                  task_queue, result_queue, workers, (signature_key, data)
+              )
+              pbar.update_single_step()
+      for _ in workers:
+        _put_task(task_queue, result_queue, workers, None)
+      worker_results = [
+          _get_worker_result(result_queue, workers) for _ in workers
+      ]
+      for worker in workers:
+        worker.join()
+    finally:
+      for worker in workers:
+        if worker.is_alive():
+          worker.terminate()
+          worker.join()
+
+    self._merge_worker_results(worker_results)
+
+  def _merge_worker_results(
+      self, worker_results: list[tuple[Any, ...]]
+  ) -> None:
+    """Merges the QSVs of the calibration workers into this calibrator.
+
+    Args:
+      worker_results: The (model_qsvs, qsv_update_funcs, qsv_num_updates,
+        num_samples_calibrated) tuple of each worker.
+    """
+    merged_qsvs = {}
+    merged_num_updates = {}
+    for model_qsvs, update_funcs, num_updates, num_samples in worker_results:
+      for tensor_name, qsv in model_qsvs.items():
+        if tensor_name not in merged_qsvs:
+          merged_qsvs[tensor_name] = qsv
+          merged_num_updates[tensor_name] = num_updates[tensor_name]
+          self._qsv_update_funcs[tensor_name] = update_funcs[tensor_name]
+          continue
+        merge_func = qsv_utils.get_merge_func(update_funcs[tensor_name])
+        merged_qsvs[tensor_name] = merge_func(
+            merged_qsvs[tensor_name],
+            qsv,
+            merged_num_updates[tensor_name],
+            num_updates[tensor_name],
+        )
+        merged_num_updates[tensor_name] += num_updates[tensor_name]
+      self._metadata["num_samples_calibrated"] += num_samples
+
+    # Fold the merged QSVs into the existing ones as a single update step.
+    for tensor_name, qsv in merged_qsvs.items():
+      if tensor_name in self._model_qsvs:
+        qsv = self._qsv_update_funcs[tensor_name](
+            self._model_qsvs[tensor_name], qsv
+        )
+      self._model_qsvs[tensor_name] = qsv
+      self._qsv_num_updates[tensor_name] = (
+          self._qsv_num_updates.get(tensor_name, 0)
+          + merged_num_updates[tensor_name]
+      )
+
+  def _calibrate_from_queue(
+      self,
+      task_queue: Any,
+      model_recipe_manager: recipe_manager.RecipeManager,
+  ) -> None:
+    """Calibrates on (signature_key, data) tasks until a None task is received.
+
+    Args:
+      task_queue: The queue to get the tasks from.
+      model_recipe_manager: The recipe manager that contains the quantization
+        recipes.
+    """
+    current_signature_key = _NO_SIGNATURE
+    with progress_utils.ProgressBar(None, enable=False) as pbar:
+      while (task := task_queue.get()) is not None:
+        signature_key, data = task
+        if signature_key != current_signature_key:
+          self._finish_calibration_steps()
+          self._tfl_interpreter.reset_all_variables()
+          current_signature_key = signature_key
+        self._metadata["num_samples_calibrated"] += 1
+        self._calibrate_step(
+            signature_key, data, model_recipe_manager, False, pbar
+        )
+      self._finish_calibration_steps()
+    self._finish_calibration()
+
+  def _calibrate_sample(
+      self,
+      signature_key: str | None,
+      data: _SignatureInput,
+      model_recipe_manager: recipe_manager.RecipeManager,
+      pbar: progress_utils.ProgressBar,
+  ) -> _SignatureOutput:
+    """Calibrates a single sample and returns the signature output.
+
+    Unlike `calibrate`, the variables are not reset afterwards, so successive
+    calls can calibrate the steps of a stateful signature (e.g., KV cache
+    decoding). The min/max QSV updates are deferred and applied in batches by
+    `_flush_qsv_updates`, which is also called before the QSVs are read.
+
+    Args:
+      signature_key: The signature key for the data sample.
+      data: The input data for the signature.
+      model_recipe_manager: The recipe manager that contains the quantization
+        recipes.
+      pbar: The progress bar to update.
+
+    Returns:
+      The output of the signature.
+    """
+    self._activation_cache = None
+    self._defer_qsv_updates = True
+    try:
+      self._calibrate_step(
+          signature_key, data, model_recipe_manager, True, pbar
+      )
+      self._finish_calibration_steps()
+    finally:
+      self._defer_qsv_updates = False
+    self._metadata["num_samples_calibrated"] += 1
+    self._num_pending_samples += 1
+    if self._num_pending_samples >= _MAX_PENDING_QSV_UPDATE_SAMPLES:
+      self._flush_qsv_updates()
+    return self._cached_output.pop()
+
+  def _flush_qsv_updates(self) -> None:
+    """Applies the QSV updates deferred by `_calibrate_sample`."""
+    pending_updates = self._pending_qsv_updates
+    self._pending_qsv_updates = {}
+    self._num_pending_samples = 0
+    for tensor_name, updates in pending_updates.items():
+      self._flush_tensor_qsv_updates(tensor_name, updates)
+
+  def _flush_tensor_qsv_updates(
+      self,
+      tensor_name: str,
+      updates: list[
+          tuple[qtyping.QSV, Callable[[qtyping.QSV, qtyping.QSV], qtyping.QSV]]
+      ],
+  ) -> None:
+    """Applies the deferred QSV updates of a tensor, in order.
+
+    Consecutive updates with the same function are folded at once, so the QSVs
+    match those of immediate updates (up to rounding).
+
+    Args:
+      tensor_name: The name of the tensor.
+      updates: The deferred (QSV, update function) updates of the tensor.
+    """
+    for qsv_update_func, group in itertools.groupby(
+        updates, key=operator.itemgetter(1)
+    ):
+      self._fold_qsv_updates(
+          tensor_name, [qsv for qsv, _ in group], qsv_update_func
+      )
+
+  def get_calibration_plan(
+      self,
+      signature_key: str | None,
+      model_recipe_manager: recipe_manager.RecipeManager,
+  ) -> CalibrationPlan:
+    """Gets the calibration plan of a signature, compiling it if needed.
+
+    The plan is cached and only recompiled when a different recipe manager is
+    used or when the recipe has been modified.
+
+    Args:
+      signature_key: The signature key. If None, the default signature is used.
+      model_recipe_manager: The recipe manager that contains the quantization
+        recipes.
+
+    Returns:
+      The calibration plan for the signature.
+    """
+    cached = self._calibration_plans.get(signature_key)
+    if cached is not None:
+      cached_recipe_manager, plan = cached
+      if (
+          cached_recipe_manager is model_recipe_manager
+          and plan.recipe_version == model_recipe_manager.version
+      ):
+        return plan
+    plan = self._compile_calibration_plan(signature_key, model_recipe_manager)
+    self._calibration_plans[signature_key] = (model_recipe_manager, plan)
+    return plan
+
+  def _compile_calibration_plan(
+      self,
+      signature_key: str | None,
+      model_recipe_manager: recipe_manager.RecipeManager,
+  ) -> CalibrationPlan:
+    """Compiles the calibration plan of a signature.
+
+    Args:
+      signature_key: The signature key. If None, the default signature is used.
+      model_recipe_manager: The recipe manager that contains the quantization
+        recipes.
+
+    Returns:
+      The calibration plan for the signature.
+    """
+    op_codes = self._flatbuffer_model.operatorCodes
+    subgraph_plans = []
+    graph_infos = {}
+    subgraphs_inds = [
+        tfl_interpreter_utils.get_signature_main_subgraph_index(
+            self._tfl_interpreter, signature_key
+        )
+    ]
+    while subgraphs_inds:
+      subgraph_ind = subgraphs_inds.pop()
+      subgraph = self._flatbuffer_model.subgraphs[subgraph_ind]
+      if subgraph_ind not in graph_infos:
+        graph_infos[subgraph_ind] = qtyping.GraphInfo(
+            subgraph.tensors, self._flatbuffer_model.buffers
+        )
+      graph_info = graph_infos[subgraph_ind]
+      # Add input/output operators if they are not in the subgraph.
+      if not any(
+          isinstance(op, qtyping.IOOperator) for op in subgraph.operators
+      ):
+        subgraph.operators += self._graph_index.get_io_operators(subgraph_ind)
+      entries = []
+      for op_id, op in enumerate(subgraph.operators):
+        if isinstance(op, qtyping.IOOperator):
+          op_key = op.op_key
+        else:
+          op_code = op_codes[op.opcodeIndex].builtinCode
+          if op_code not in tfl_flatbuffer_utils.TFL_OP_CODE_TO_NAME:
+            continue
+          op_key = tfl_flatbuffer_utils.TFL_OP_CODE_TO_NAME[op_code]
+        # Query the quantization_recipe to get op quantization settings.
+        op_scope = self._graph_index.get_op_scope(subgraph_ind, op_id)
+        algorithm_name, _ = model_recipe_manager.get_quantization_configs(
+            op_key, op_scope
+        )
+        if algorithm_name == algorithm_manager.AlgorithmName.NO_QUANTIZE:
+          continue
+        if policy.is_non_quantizable_composite_op(op):
+          continue
+
+        # Query algorithm_manager to get the related calibration and update
+        # functions.
+        calibrate_func = algorithm_manager.get_quantization_func(
+            algorithm_name, op_key, qtyping.QuantizeMode.CALIBRATE
+        )
+        if not self._is_custom_qsv_update_func:
+          update_func = algorithm_manager.get_update_qsv_func(
+              algorithm_name, op_key
+          )
+        else:
+          update_func = self._qsv_update_func
+        entries.append(
+            CalibrationPlanEntry(
+                op=op,
+                op_key=op_key,
+                algorithm_name=algorithm_name,
+                calibrate_func=calibrate_func,
+                update_func=update_func,
+                tensor_indices=tuple(
+                    common_quantize.get_tensor_indices_requiring_calibration(
+                        op, graph_info
+                    )
+                ),
+            )
+        )
+        # Visit any subgraphs invoked as a side effect of the op.
+        subgraphs_inds.extend(
+            tfl_flatbuffer_utils.get_op_side_effect_subgraphs(op)
+        )
+      readback_tensor_names = {}
+      for entry in entries:
+        for tensor_index in entry.tensor_indices:
+          tensor = subgraph.tensors[tensor_index]
+          # Constant tensors don't need calibration.
+          if (
+              tfl_flatbuffer_utils.get_tensor_data(
+                  tensor, self._flatbuffer_model.buffers
+              )
+              is None
+          ):
+            readback_tensor_names[tensor_index] = (
+                tfl_flatbuffer_utils.get_tensor_name(tensor)
+            )
+      subgraph_plans.append(
+          CalibrationSubgraphPlan(
+              subgraph_index=subgraph_ind,
+              graph_info=graph_info,
+              num_ops=len(subgraph.operators),
+              entries=tuple(entries),
+              readback_tensor_names=readback_tensor_names,
+          )
+      )
+    return CalibrationPlan(
+        signature_key=signature_key,
+        recipe_version=model_recipe_manager.version,
+        subgraphs=tuple(subgraph_plans),
+    )
+
+  def get_model_qsvs(self) -> MutableMapping[str, qtyping.QSV]:
     """Get the model qsvs.
 
     Returns:
       A dictionary of tensor name to QSV.
     """
+    self._flush_qsv_updates()
     return self._model_qsvs
 
   def get_cached_output(self) -> list[_SignatureOutput]:
@@ -349,16 +1261,25 @@ class Calibrator:
   def reset_model_qsvs(self) -> None:
     """Reset the model qsvs."""
     self._model_qsvs = {}
+    self._qsv_update_funcs = {}
+    self._qsv_num_updates = {}
+    self._pending_qsv_updates = {}
+    self._num_pending_samples = 0
     self._metadata = {"num_samples_calibrated": 0}
 
-  def load_model_qsvs(self, model_qsvs: str | dict[str, qtyping.QSV]) -> None:
+  def load_model_qsvs(
+      self, model_qsvs: str | MutableMapping[str, qtyping.QSV]
+  ) -> None:
     """Load the model qsvs.
 
     Args:
-      model_qsvs: A dictionary of tensor name to QSV or a path to a JSON file
-        that contains the model qsvs (i.e., from save_calibration_result).
+      model_qsvs: A dictionary of tensor name to QSV or a path to a file that
+        contains the model qsvs (i.e., from save_calibration_result). Binary
+        files are memory-mapped and the QSVs are read lazily per tensor.
     """
-
+    # The loaded QSVs replace the ones the pending updates apply to.
+    self._pending_qsv_updates = {}
+    self._num_pending_samples = 0
     if isinstance(model_qsvs, str):
       self._model_qsvs, self._metadata = (
           calibration_utils.load_calibration_results(model_qsvs)
@@ -370,28 +1291,46 @@ class Calibrator:
       self._model_qsvs = copy.deepcopy(model_qsvs)
 
   def save_calibration_result(
-      self, file_path: str, extra_metadata: Mapping[str, str] | None = None
+      self,
+      file_path: str,
+      extra_metadata: Mapping[str, str] | None = None,
+      binary: bool = False,
   ) -> None:
-    """Saves the calibration result to a json file.
+    """Saves the calibration result to a json (or binary) file.
 
     Args:
       file_path: Path to save the calibration result.
       extra_metadata: Extra metadata to save.
+      binary: Whether to save in the binary format, which stores the arrays
+        raw and is memory-mapped by `load_model_qsvs`. Recommended for large
+        QSVs, e.g., GPTQ hessians.
     """
-    with open(file_path, "w") as f:
-      json.dump(
-          {
-              "model_qsvs": self._model_qsvs,
-              "metadata": {**self._metadata, **(extra_metadata or {})},
-          },
-          f,
-          cls=calibration_utils.NumpyEncoder,
-      )
+    self._flush_qsv_updates()
+    calibration_utils.save_calibration_results(
+        file_path,
+        self._model_qsvs,
+        {**self._metadata, **(extra_metadata or {})},
+        binary=binary,
+    )
 
   def get_signature_list(self) -> list[str]:
     """Get the signature list of the model."""
     return self._tfl_interpreter.get_signature_list()
 
+  def _get_activation_cache_key(
+      self, signature_key: str | None, data: _SignatureInput
+  ) -> tuple[str, str | None, str]:
+    """Returns the activation cache key of a calibration sample."""
+    if self._model_hash is None:
+      self._model_hash = activation_cache_lib.get_model_hash(
+          self._float_tflite
+      )
+    return (
+        self._model_hash,
+        signature_key,
+        activation_cache_lib.get_sample_id(data),
+    )
+
   def _update_qsvs(
       self,
       op_qsvs: dict[str, qtyping.QSV],
@@ -412,21 +1351,113 @@ class Calibrator:
     for tensor_name, qsv in op_qsvs.items():
       if tensor_name in ignore_tensor_names:
         continue
-      if tensor_name not in self._model_qsvs:
-        self._model_qsvs[tensor_name] = qsv
-      else:
-        updated_qsv = qsv_update_func(self._model_qsvs[tensor_name], qsv)
-        self._model_qsvs[tensor_name] = updated_qsv
+      self._update_qsv(tensor_name, qsv, qsv_update_func)
       updated_tensor_names.add(tensor_name)
     return updated_tensor_names
 
-  def _get_total_operations(self, calibration_dataset) -> int:
-    """Get the total number of OPs to go through while calibrating the model."""
-    data_sizes = {
-        key: len(list(dataset)) for key, dataset in calibration_dataset.items()
-    }
+  def _update_qsv(
+      self,
+      tensor_name: str,
+      qsv: qtyping.QSV,
+      qsv_update_func: Callable[[qtyping.QSV, qtyping.QSV], qtyping.QSV],
+  ) -> None:
+    """Updates the QSV of a tensor, or defers it (see `_calibrate_sample`).
+
+    Only the min/max updates, which can be folded at once, are deferred. The
+    other updates (e.g., of GPTQ hessians) are applied immediately, so that
+    their large QSVs aren't held until the flush.
+
+    Args:
+      tensor_name: The name of the tensor.
+      qsv: The QSV of the tensor for the new calibration step.
+      qsv_update_func: The function to update the QSVs across calibration steps.
+    """
+    if (
+        self._defer_qsv_updates
+        and qsv_update_func in qsv_utils.MIN_MAX_UPDATE_FUNCS
+    ):
+      self._pending_qsv_updates.setdefault(tensor_name, []).append(
+          (qsv, qsv_update_func)
+      )
+      return
+    if tensor_name in self._pending_qsv_updates:
+      # Keep the updates of the tensor in order.
+      self._flush_tensor_qsv_updates(
+          tensor_name, self._pending_qsv_updates.pop(tensor_name)
+      )
+    self._fold_qsv_updates(tensor_name, [qsv], qsv_update_func)
+
+  def _fold_qsv_updates(
+      self,
+      tensor_name: str,
+      qsvs: list[qtyping.QSV],
+      qsv_update_func: Callable[[qtyping.QSV, qtyping.QSV], qtyping.QSV],
+  ) -> None:
+    """Applies successive updates of the QSV of a tensor.
+
+    Args:
+      tensor_name: The name of the tensor.
+      qsvs: The QSVs of the tensor for the successive calibration steps.
+      qsv_update_func: The function to update the QSVs across calibration steps.
+    """
+    num_updates = len(qsvs)
+    if tensor_name in self._model_qsvs:
+      qsv = self._model_qsvs[tensor_name]
+    else:
+      qsv, qsvs = qsvs[0], qsvs[1:]
+    if qsvs and qsv_update_func is qsv_utils.min_max_update:
+      qsv = qsv_update_func(qsv, _reduce_min_max_qsvs(qsvs))
+    elif qsvs and qsv_update_func is qsv_utils.moving_average_update:
+      qsv = qsv_utils.moving_average_update_many(qsv, qsvs)
+    else:
+      for new_qsv in qsvs:
+        qsv = qsv_update_func(qsv, new_qsv)
+    self._model_qsvs[tensor_name] = qsv
+    self._qsv_update_funcs[tensor_name] = qsv_update_func
+    self._qsv_num_updates[tensor_name] = (
+        self._qsv_num_updates.get(tensor_name, 0) + num_updates
+    )
+
+  def _is_batchable(self, signature_key: str | None) -> bool:
+    """Returns whether the leading dimension of all signature inputs resizes."""
+    signature_runner = self._tfl_interpreter.get_signature_runner(
+        signature_key
+    )
+    return all(
+        len(input_detail["shape_signature"]) > 0
+        and input_detail["shape_signature"][0] == -1
+        for input_detail in signature_runner.get_input_details().values()
+    )
+
+  def _get_total_operations(
+      self,
+      calibration_dataset: Mapping[str, Iterable[_SignatureInput]],
+      batch_size: int = 1,
+  ) -> int | None:
+    """Get the total number of OPs to go through while calibrating the model.
+
+    The datasets are never iterated here, so that one-shot iterators are left
+    untouched for the calibration itself.
+
+    Args:
+      calibration_dataset: A mapping from signature key to an iterable of
+        signature inputs.
+      batch_size: The calibration batch size. The samples of batchable
+        signatures are assumed to all be stacked in full batches.
+
+    Returns:
+      The total number of OPs, or None if the size of any dataset is unknown.
+    """
+    data_sizes = {}
+    for key, dataset in calibration_dataset.items():
+      data_size = _get_dataset_size(dataset)
+      if data_size is None:
+        return None
+      data_sizes[key] = data_size
     total_ops = 0
     for key, value in data_sizes.items():
+      if batch_size > 1 and self._is_batchable(key):
+        value = -(-value // batch_size)
       subgraph_idx = tfl_interpreter_utils.get_signature_main_subgraph_index(
           self._tfl_interpreter, key
       )
@@ -439,8 +1470,8 @@ class Calibrator:
         if not any(
             isinstance(op, qtyping.IOOperator) for op in subgraph.operators
         ):
-          subgraph_operators += (
-              tfl_flatbuffer_utils.get_subgraph_input_output_operators(subgraph)
+          subgraph_operators += self._graph_index.get_io_operators(
+              subgraph_idx
           )
         total_operators += len(subgraph_operators)
         for op in subgraph_operators:
@@ -451,6 +1482,214 @@ class Calibrator:
     return total_ops
 
 
+def _get_dataset_size(dataset: Iterable[_SignatureInput]) -> int | None:
+  """Returns the number of samples declared by the dataset, if any.
+
+  Args:
+    dataset: An iterable of signature inputs.
+
+  Returns:
+    The value of `len(dataset)` or `dataset.__length_hint__()`, or None if the
+    dataset does not declare its size (e.g., generators).
+  """
+  if isinstance(dataset, Sized):
+    return len(dataset)
+  length_hint = operator.length_hint(dataset, -1)
+  return length_hint if length_hint >= 0 else None
+
+
+def _create_tfl_interpreter(
+    float_tflite: str | bytes, pooled: bool, **kwargs: Any
+) -> tfl.Interpreter:
+  """Creates a TFLite interpreter, or borrows one from the interpreter pool."""
+  if pooled:
+    return tfl_interpreter_utils.get_interpreter_pool().acquire(
+        float_tflite, **kwargs
+    )
+  return tfl_interpreter_utils.create_tfl_interpreter(float_tflite, **kwargs)
+
+
+def _get_qualified_name(func: Callable[..., Any]) -> str:
+  """Returns the "module:qualname" name of a function."""
+  return f"{func.__module__}:{func.__qualname__}"
+
+
+def _get_function(qualified_name: str) -> Callable[..., Any]:
+  """Returns the function with a name from `_get_qualified_name`."""
+  module_name, _, qualname = qualified_name.partition(":")
+  try:
+    func = importlib.import_module(module_name)
+    for attribute in qualname.split("."):
+      func = getattr(func, attribute)
+  except (ImportError, AttributeError) as e:
+    raise ValueError(f"Function {qualified_name} not found.") from e
+  return func
+
+
+def _reduce_min_max_qsvs(qsvs: list[qtyping.QSV]) -> qtyping.QSV:
+  """Reduces min/max QSVs as successive `qsv_utils.min_max_update` calls do."""
+  return {
+      "min": np.min(np.broadcast_arrays(*[qsv["min"] for qsv in qsvs]), axis=0),
+      "max": np.max(np.broadcast_arrays(*[qsv["max"] for qsv in qsvs]), axis=0),
+  }
+
+
+def _can_stack_samples(
+    sample: _SignatureInput, other_sample: _SignatureInput
+) -> bool:
+  """Returns whether two samples can be stacked along their batch dimension."""
+  if sample.keys() != other_sample.keys():
+    return False
+  for input_name, input_data in sample.items():
+    input_data = np.asarray(input_data)
+    other_input_data = np.asarray(other_sample[input_name])
+    if (
+        input_data.ndim == 0
+        or input_data.dtype != other_input_data.dtype
+        or input_data.shape[1:] != other_input_data.shape[1:]
+    ):
+      return False
+  return True
+
+
+def _stack_samples(samples: list[_SignatureInput]) -> _SignatureInput:
+  """Concatenates the inputs of the samples along their batch dimension."""
+  if len(samples) == 1:
+    return samples[0]
+  return {
+      input_name: np.concatenate(
+          [np.asarray(sample[input_name]) for sample in samples]
+      )
+      for input_name in samples[0]
+  }
+
+
+def _batch_samples(
+    samples: Iterable[_SignatureInput], batch_size: int
+) -> Iterator[tuple[int, _SignatureInput]]:
+  """Groups consecutive samples into batches of up to `batch_size` samples.
+
+  A batch is yielded as soon as it is full, so that no sample is read ahead of
+  its calibration (e.g., past an early stop). It is cut short when the next
+  sample cannot be stacked with it.
+
+  Args:
+    samples: The samples to batch.
+    batch_size: The maximum number of samples per batch.
+
+  Yields:
+    The number of samples in each batch, and the batched signature input.
+  """
+  batch = []
+  for sample in samples:
+    if batch and not _can_stack_samples(batch[0], sample):
+      yield len(batch), _stack_samples(batch)
+      batch = []
+    batch.append(sample)
+    if len(batch) == batch_size:
+      yield len(batch), _stack_samples(batch)
+      batch = []
+  if batch:
+    yield len(batch), _stack_samples(batch)
+
+
+def _get_total_samples(
+    calibration_dataset: Mapping[str, Iterable[_SignatureInput]],
+) -> int | None:
+  """Returns the total number of samples, or None if any size is unknown."""
+  total_samples = 0
+  for dataset in calibration_dataset.values():
+    data_size = _get_dataset_size(dataset)
+    if data_size is None:
+      return None
+    total_samples += data_size
+  return total_samples
+
+
+def _raise_worker_error(result_queue: Any) -> None:
+  """Raises if a calibration worker reported an error, without blocking."""
+  try:
+    status, *payload = result_queue.get_nowait()
+  except queue.Empty:
+    return
+  # Workers only report results after the last task.
+  if status == _WORKER_ERROR:
+    raise RuntimeError(f"Calibration worker failed:\n{payload[0]}")
+
+
+def _raise_dead_worker(workers: list[Any]) -> None:
+  """Raises if a calibration worker died without reporting (e.g., crashed)."""
+  for worker in workers:
+    if worker.exitcode is not None and worker.exitcode != 0:
+      raise RuntimeError(
+          f"Calibration worker {worker.name} (pid {worker.pid}) died with exit"
+          f" code {worker.exitcode}."
+      )
+
+
+def _put_task(
+    task_queue: Any, result_queue: Any, workers: list[Any], task: Any
+) -> None:
+  """Puts a task on the bounded task queue, failing fast on worker errors."""
+  while True:
+    try:
+      task_queue.put(task, timeout=_QUEUE_POLL_INTERVAL_SECONDS)
+      return
+    except queue.Full:
+      _raise_worker_error(result_queue)
+      _raise_dead_worker(workers)
+
+
+def _get_worker_result(
+    result_queue: Any, workers: list[Any]
+) -> tuple[Any, ...]:
+  """Gets the result of a calibration worker, raising on worker errors."""
+  while True:
+    try:
+      status, *payload = result_queue.get(
+          timeout=_QUEUE_POLL_INTERVAL_SECONDS
+      )
+      break
+    except queue.Empty:
+      _raise_dead_worker(workers)
+  if status != _WORKER_RESULT:
+    raise RuntimeError(f"Calibration worker failed:\n{payload[0]}")
+  return tuple(payload)
+
+
+def _calibration_worker(
+    float_tflite: str | bytes,
+    num_threads: int,
+    mode: CalibrationMode,
+    quantization_recipe: qtyping.ModelQuantizationRecipe,
+    qsv_update_func: Callable[[qtyping.QSV, qtyping.QSV], qtyping.QSV] | None,
+    memory_budget_bytes: int | None,
+    task_queue: Any,
+    result_queue: Any,
+) -> None:
+  """Entry point of the worker processes of `Calibrator.calibrate_parallel`."""
+  try:
+    calibrator = Calibrator(
+        float_tflite,
+        num_threads=num_threads,
+        mode=mode,
+        qsv_update_func=qsv_update_func or _MISSING_FUNC,
+        memory_budget_bytes=memory_budget_bytes,
+    )
+    model_recipe_manager = recipe_manager.RecipeManager()
+    model_recipe_manager.load_quantization_recipe(quantization_recipe)
+    calibrator._calibrate_from_queue(task_queue, model_recipe_manager)  # pylint: disable=protected-access
+    result_queue.put((
+        _WORKER_RESULT,
+        calibrator._model_qsvs,  # pylint: disable=protected-access
+        calibrator._qsv_update_funcs,  # pylint: disable=protected-access
+        calibrator._qsv_num_updates,  # pylint: disable=protected-access
+        calibrator._metadata["num_samples_calibrated"],  # pylint: disable=protected-access
+    ))
+  except Exception:  # pylint: disable=broad-exception-caught
+    result_queue.put((_WORKER_ERROR, traceback.format_exc()))
+
+
 class _InferenceOnlyCalibrator(Calibrator):
   """Calibrator that only supports inference and not calibration."""
 
@@ -459,9 +1698,11 @@ class _InferenceOnlyCalibrator(Calibrator):
       self,
       float_tflite: str | bytes,
       num_threads: int,
+      pooled: bool = False,
   ) -> tfl.Interpreter:
-    return tfl_interpreter_utils.create_tfl_interpreter(
+    return _create_tfl_interpreter(
         float_tflite,
+        pooled,
         use_xnnpack=True,
         num_threads=num_threads,
         preserve_all_tensors=False,
@@ -489,9 +1730,11 @@ class _PreserveAllTensorsCalibrator(Calibrator):
       self,
       float_tflite: str | bytes,
       num_threads: int,
+      pooled: bool = False,
   ) -> tfl.Interpreter:
-    return tfl_interpreter_utils.create_tfl_interpreter(
+    return _create_tfl_interpreter(
         float_tflite,
+        pooled,
         use_xnnpack=True,
         num_threads=num_threads,
         preserve_all_tensors=True,
@@ -506,85 +1749,81 @@ class _PreserveAllTensorsCalibrator(Calibrator):
       cache_output: bool,
       pbar: progress_utils.ProgressBar,
   ) -> None:
-    op_codes = self._flatbuffer_model.operatorCodes
-    # Step0: get subgraph index.
-    subgraph_idx = tfl_interpreter_utils.get_signature_main_subgraph_index(
-        self._tfl_interpreter, signature_key
-    )
+    # Step0: get the calibration plan (compiled once per signature/recipe).
+    plan = self.get_calibration_plan(signature_key, model_recipe_manager)
     # Initialize tensor names updated in this round of calibration.
     updated_tensor_names = set()
 
-    # Step1: run tfl interpreter on subgraph to get tensor content.
-    signature_output = tfl_interpreter_utils.invoke_interpreter_signature(
-        self._tfl_interpreter, data, signature_key
-    )
-    if cache_output:
-      self._cached_output.append(signature_output)
-
-    # Step2: go through each op in subgraph to update quantization
-    # statistic values.
-    subgraphs_inds = [subgraph_idx]
-    while subgraphs_inds:
-      subgraph_ind = subgraphs_inds.pop()
-      self._tensor_content_map.update(
-          tfl_interpreter_utils.get_tensor_name_to_content_map(
-              self._tfl_interpreter, subgraph_ind
-          )
-      )
-      subgraph = self._flatbuffer_model.subgraphs[subgraph_ind]
-      graph_info = qtyping.GraphInfo(
-          subgraph.tensors, self._flatbuffer_model.buffers
+    # Step1: run tfl interpreter on subgraph to get tensor content, unless the
+    # tensors are in the activation cache.
+    cached_tensors = None
+    cache_key = None
+    readback_tensor_names = set()
+    if self._activation_cache is not None and not cache_output:
+      cache_key = self._get_activation_cache_key(signature_key, data)
+      cached_tensors = self._activation_cache.get(*cache_key)
+      readback_tensor_names = set().union(*(
+          subgraph_plan.readback_tensor_names.values()
+          for subgraph_plan in plan.subgraphs
+      ))
+    tensors_to_cache = None
+    cache_complete = False
+    if cached_tensors is None or not cached_tensors.covers(
+        readback_tensor_names
+    ):
+      signature_output = tfl_interpreter_utils.invoke_interpreter_signature(
+          self._tfl_interpreter, data, signature_key
       )
-      # Add input/output operators if they are not in the subgraph.
-      if not any(
-          isinstance(op, qtyping.IOOperator) for op in subgraph.operators
-      ):
-        subgraph.operators += (
-            tfl_flatbuffer_utils.get_subgraph_input_output_operators(subgraph)
-        )
-      for op in subgraph.operators:
-        pbar.update_single_step()
-        if isinstance(op, qtyping.IOOperator):
-          op_key = op.op_key
+      if cache_output:
+        self._cached_output.append(signature_output)
+      if cache_key is not None:
+        # Keep the tensors already cached for other recipes.
+        tensors_to_cache = dict(cached_tensors or {})
+        if cached_tensors is not None:
+          readback_tensor_names |= cached_tensors.tensor_names
+          cache_complete = cached_tensors.complete
+      cached_tensors = None
+
+    # Step2: replay the plan to update quantization statistic values. Only
+    # the tensors that need QSVs are read back, as zero-copy views that are
+    # reduced right away and released before the next invocation.
+    try:
+      for subgraph_plan in plan.subgraphs:
+        if cached_tensors is not None:
+          subgraph_tensors = {
+              name: cached_tensors[name]
+              for name in subgraph_plan.readback_tensor_names.values()
+              if name in cached_tensors
+          }
         else:
-          op_code = op_codes[op.opcodeIndex].builtinCode
-          if op_code not in tfl_flatbuffer_utils.TFL_OP_CODE_TO_NAME:
-            continue
-          op_key = tfl_flatbuffer_utils.TFL_OP_CODE_TO_NAME[op_code]
-        # Step2.1: query the quantization_recipe to get op quantization
-        # settings.
-        op_scope = tfl_flatbuffer_utils.get_op_scope(op, subgraph.tensors)
-        algorithm_name, _ = model_recipe_manager.get_quantization_configs(
-            op_key, op_scope
-        )
-        if algorithm_name == algorithm_manager.AlgorithmName.NO_QUANTIZE:
-          continue
-        if policy.is_non_quantizable_composite_op(op):
-          continue
-
-        # Step2.2: query algorithm_manager to get/call the related
-        # calibration function.
-        calibrate_func = algorithm_manager.get_quantization_func(
-            algorithm_name, op_key, qtyping.QuantizeMode.CALIBRATE
-        )
-        op_qsvs = calibrate_func(op, graph_info, self._tensor_content_map)
-        # Step3: Update tensor qsvs with the new values. Ignore the tensor
-        # names that are already updated in this round of calibration.
-        if not self._is_custom_qsv_update_func:
-          qsvs_update_func = algorithm_manager.get_update_qsv_func(
-              algorithm_name, op_key
+          subgraph_tensors = tfl_interpreter_utils.get_tensor_name_to_view_map(
+              self._tfl_interpreter,
+              subgraph_plan.readback_tensor_names,
+              subgraph_plan.subgraph_index,
           )
-        else:
-          qsvs_update_func = self._qsv_update_func
-        op_updated_tensor_name = self._update_qsvs(
-            op_qsvs, updated_tensor_names, qsvs_update_func
-        )
-        updated_tensor_names.update(op_updated_tensor_name)
-
-        # Step4: Invoke any subgraphs invoked as a side effect of the op.
-        subgraphs_inds.extend(
-            tfl_flatbuffer_utils.get_op_side_effect_subgraphs(op)
+          if tensors_to_cache is not None:
+            tensors_to_cache.update(subgraph_tensors)
+        self._tensor_content_map.update(subgraph_tensors)
+        pbar.update_steps(subgraph_plan.num_ops)
+        for entry in subgraph_plan.entries:
+          op_qsvs = entry.calibrate_func(
+              entry.op, subgraph_plan.graph_info, self._tensor_content_map
+          )
+          # Step3: Update tensor qsvs with the new values. Ignore the tensor
+          # names that are already updated in this round of calibration.
+          op_updated_tensor_name = self._update_qsvs(
+              op_qsvs, updated_tensor_names, entry.update_func
+          )
+          updated_tensor_names.update(op_updated_tensor_name)
+      if tensors_to_cache is not None and self._activation_cache is not None:
+        self._activation_cache.put(
+            *cache_key,  # pyrefly: ignore[not-iterable]
+            tensors=tensors_to_cache,
+            tensor_names=readback_tensor_names,
+            complete=cache_complete,
         )
+    finally:
+      self._tensor_content_map.clear()
 
 
 class _ProfilerBasedCalibrator(Calibrator):
@@ -603,9 +1842,11 @@ class _ProfilerBasedCalibrator(Calibrator):
       self,
       float_tflite: str | bytes,
       num_threads: int,
+      pooled: bool = False,
   ) -> tfl.Interpreter:
-    return tfl_interpreter_utils.create_tfl_interpreter(
+    return _create_tfl_interpreter(
         float_tflite,
+        pooled,
         use_xnnpack=True,
         num_threads=num_threads,
         preserve_all_tensors=False,
@@ -625,6 +1866,28 @@ class _ProfilerBasedCalibrator(Calibrator):
     del model_recipe_manager  # Unused.
     del pbar  # Can't do per-op progress bar in this mode.
 
+    _, tensor_stats = self._invoke_with_calibration(
+        signature_key, data, cache_output
+    )
+    self._update_qsvs_from_tensor_stats(tensor_stats, set())
+
+  def _invoke_with_calibration(
+      self,
+      signature_key: str | None,
+      data: _SignatureInput,
+      cache_output: bool,
+  ) -> tuple[int, dict[str, Any]]:
+    """Invokes the signature while the profiler tracks tensor min/max.
+
+    Args:
+      signature_key: The signature key for the data sample.
+      data: The input data for the signature.
+      cache_output: Whether to cache the output of the model.
+
+    Returns:
+      A tuple of the index of the invoked subgraph and the profiler statistics
+      (tensor name to range).
+    """
     signature_defs = self._tfl_interpreter._get_full_signature_list()  # pylint: disable=protected-access
     if signature_key is None:
       if not signature_defs:
@@ -664,22 +1927,462 @@ class _ProfilerBasedCalibrator(Calibrator):
     )
 
     # Get inference result.
-    inference_result = {
-        output_name: cpp_interpreter.GetTensor(output_index, subgraph_index)
-        for output_name, output_index in outputs.items()
-    }
     if cache_output:
-      self._cached_output.append(inference_result)
+      self._cached_output.append({
+          output_name: cpp_interpreter.GetTensor(output_index, subgraph_index)
+          for output_name, output_index in outputs.items()
+      })
+    return subgraph_index, tensor_stats
+
+  def _update_qsvs_from_tensor_stats(
+      self, tensor_stats: dict[str, Any], ignore_tensor_names: set[str]
+  ) -> None:
+    """Updates the model QSVs with the profiler statistics.
 
-    # Update model QSVs with tensor_stats.
+    Args:
+      tensor_stats: The profiler statistics (tensor name to range).
+      ignore_tensor_names: A set of tensor names to ignore.
+    """
     for tensor_name, stats in tensor_stats.items():
+      if tensor_name in ignore_tensor_names:
+        continue
       # Wrap scalar values in numpy arrays to support .shape attribute.
       qsv = {
           "min": np.array([stats.min]),
           "max": np.array([stats.max]),
       }
-      existing_qsv = self._model_qsvs.get(tensor_name)
-      if existing_qsv is None:
-        self._model_qsvs[tensor_name] = qsv
-      else:
-        self._model_qsvs[tensor_name] = self._qsv_update_func(existing_qsv, qsv)
+      self._update_qsv(tensor_name, qsv, self._qsv_update_func)
+
+
+class _HybridCalibrator(_ProfilerBasedCalibrator):
+  """Calibrator combining profiler-based min/max with targeted tensor capture.
+
+  1. Ops whose algorithm needs statistics beyond min/max (i.e., whose QSV update
+  function is not a min/max one, such as GPTQ and OSCAR) are selected from the
+  calibration plan.
+  2. The non-constant tensors of these ops are added to the outputs of the
+  signature subgraph in a copy of the model, so the interpreter keeps them
+  alive through the invocation. The interpreter is re-created from this copy
+  whenever new tensors need to be captured.
+  3. Each sample runs with the profiler, as in CALIBRATION_PROFILER_BASED.
+  The captured tensors are then passed to the calibration functions of the
+  selected ops, and the profiler min/max is used for all other tensors.
+  4. Only tensors of the signature subgraphs can be captured. Ops in subgraphs
+  invoked by control flow ops require CALIBRATION_PRESERVE_ALL_TENSORS.
+  """
+
+  def __init__(
+      self,
+      float_tflite: str | bytes,
+      num_threads: int = 16,
+      mode: CalibrationMode = CalibrationMode.HYBRID,
+      qsv_update_func: Callable[
+          [qtyping.QSV, qtyping.QSV],
+          qtyping.QSV,
+      ] = _MISSING_FUNC,
+      memory_budget_bytes: int | None = None,
+  ):
+    super().__init__(
+        float_tflite, num_threads, mode, qsv_update_func, memory_budget_bytes
+    )
+    # Subgraph index to the indices of the tensors added to its outputs.
+    self._captured_tensor_indices: dict[int, frozenset[int]] = {}
+
+  def _get_capture_entries(
+      self, plan: CalibrationPlan
+  ) -> tuple[CalibrationSubgraphPlan, list[CalibrationPlanEntry]]:
+    """Gets the plan entries that need captured tensors.
+
+    Args:
+      plan: The calibration plan of the signature.
+
+    Returns:
+      A tuple of the signature subgraph plan and its entries that need
+      captured tensors.
+
+    Raises:
+      ValueError: If an op outside of the signature subgraph needs captured
+        tensors.
+    """
+    main_subgraph_plan = plan.subgraphs[0]
+    capture_entries = []
+    for subgraph_plan in plan.subgraphs:
+      for entry in subgraph_plan.entries:
+        update_func = algorithm_manager.get_update_qsv_func(
+            entry.algorithm_name, entry.op_key
+        )
+        if update_func in qsv_utils.MIN_MAX_UPDATE_FUNCS:
+          continue
+        if subgraph_plan is not main_subgraph_plan:
+          raise ValueError(
+              f"{entry.algorithm_name} calibration of {entry.op_key} in"
+              f" subgraph {subgraph_plan.subgraph_index} is not supported in"
+              " HYBRID mode, please use CALIBRATION_PRESERVE_ALL_TENSORS."
+          )
+        capture_entries.append(entry)
+    return main_subgraph_plan, capture_entries
+
+  def _capture_tensors(self, subgraph_index: int, tensor_indices: set[int]):
+    """Makes sure the interpreter keeps the given tensors alive.
+
+    Args:
+      subgraph_index: The index of the subgraph of the tensors.
+      tensor_indices: The indices of the tensors in the subgraph.
+    """
+    captured = self._captured_tensor_indices.get(subgraph_index, frozenset())
+    if tensor_indices <= captured:
+      return
+    self._captured_tensor_indices[subgraph_index] = captured | tensor_indices
+    self._create_capture_interpreter()
+
+  def _write_capture_model(self, model_path: str) -> None:
+    """Writes the model capturing `_captured_tensor_indices` to a file.
+
+    Args:
+      model_path: The path of the file to write.
+    """
+    # Re-read the model, as self._flatbuffer_model has IO operators added.
+    model = tfl_flatbuffer_utils.read_model(self._float_tflite)
+    for subgraph_ind, captured_indices in self._captured_tensor_indices.items():
+      subgraph = model.subgraphs[subgraph_ind]
+      existing_outputs = set(subgraph.outputs)
+      subgraph.outputs = list(subgraph.outputs) + sorted(
+          captured_indices - existing_outputs
+      )
+    mmap_utils.set_file_contents(
+        model_path, flatbuffer_utils.convert_object_to_bytearray(model)
+    )
+
+  def _create_capture_interpreter(self, model_path: str | None = None) -> None:
+    """Re-creates the interpreter to capture `_captured_tensor_indices`.
+
+    The interpreter is created from a file holding the capture model, so that
+    the model (weights included) stays file-backed.
+
+    Args:
+      model_path: The capture model of `_captured_tensor_indices`, written by
+        `_write_capture_model`. If None, it is written to a temporary file,
+        which is removed once loaded, the interpreter keeping it mapped.
+    """
+    # The interpreter of the float model is not used anymore.
+    self._release_pooled_interpreter()
+    if model_path is not None:
+      self._tfl_interpreter = self._create_interpreter(
+          model_path, self._num_threads
+      )
+      return
+    fd, model_path = tempfile.mkstemp(suffix=".tflite")
+    os.close(fd)
+    try:
+      self._write_capture_model(model_path)
+      self._tfl_interpreter = self._create_interpreter(
+          model_path, self._num_threads
+      )
+    finally:
+      os.remove(model_path)
+
+  @override
+  def _calibrate_step(
+      self,
+      signature_key: str | None,
+      data: _SignatureInput,
+      model_recipe_manager: recipe_manager.RecipeManager,
+      cache_output: bool,
+      pbar: progress_utils.ProgressBar,
+  ) -> None:
+    del pbar  # Can't do per-op progress bar in this mode.
+
+    plan = self.get_calibration_plan(signature_key, model_recipe_manager)
+    subgraph_plan, capture_entries = self._get_capture_entries(plan)
+    capture_tensor_names = {
+        tensor_index: subgraph_plan.readback_tensor_names[tensor_index]
+        for entry in capture_entries
+        for tensor_index in entry.tensor_indices
+        if tensor_index in subgraph_plan.readback_tensor_names
+    }
+    self._capture_tensors(
+        subgraph_plan.subgraph_index, set(capture_tensor_names)
+    )
+
+    subgraph_index, tensor_stats = self._invoke_with_calibration(
+        signature_key, data, cache_output
+    )
+
+    # Richer statistics for the captured tensors.
+    cpp_interpreter = self._tfl_interpreter._interpreter  # pylint: disable=protected-access
+    tensor_content_map = {
+        tensor_name: cpp_interpreter.GetTensor(tensor_index, subgraph_index)
+        for tensor_index, tensor_name in capture_tensor_names.items()
+    }
+    updated_tensor_names = set()
+    for entry in capture_entries:
+      op_qsvs = entry.calibrate_func(
+          entry.op, subgraph_plan.graph_info, tensor_content_map
+      )
+      updated_tensor_names.update(
+          self._update_qsvs(op_qsvs, updated_tensor_names, entry.update_func)
+      )
+    # Profiler min/max for all the other tensors.
+    self._update_qsvs_from_tensor_stats(tensor_stats, updated_tensor_names)
+
+
+@dataclasses.dataclass(frozen=True)
+class _CaptureChunk:
+  """Consecutive capture entries whose tensors are captured together.
+
+  Attributes:
+    entries: The plan entries of the chunk, in execution order.
+    tensor_names: Index to name of the tensors captured for the entries.
+  """
+
+  entries: list[CalibrationPlanEntry]
+  tensor_names: dict[int, str]
+
+
+class _LayerwiseCalibrator(_HybridCalibrator):
+  """HYBRID calibrator bounding the memory of the captured tensors.
+
+  1. The capture entries of the calibration plan (see _HybridCalibrator) are
+  split, in execution order, into chunks whose captured tensors fit
+  `memory_budget_bytes`, as estimated from their static shapes. An op whose
+  own tensors exceed the budget gets a chunk of its own.
+  2. If a single chunk is needed, the samples run as in HYBRID mode.
+  3. Otherwise, the samples are buffered until their size reaches the budget
+  (or the signature dataset ends), then replayed once per chunk, with the
+  interpreter re-created to capture only the tensors of that chunk. Only one
+  interpreter is alive at a time. The capture model of each chunk is written
+  to a temporary file the first time it is needed, and the interpreters are
+  created from these files across flushes, until the calibration finishes.
+  The profiler min/max of the first pass is used for the tensors that are not
+  captured, so the QSVs match HYBRID mode.
+  4. Each pass starts from reset variables. For a stateful signature (e.g.,
+  with a KV cache) to match a sequential run, the samples of its whole dataset
+  must fit the budget.
+  """
+
+  def __init__(
+      self,
+      float_tflite: str | bytes,
+      num_threads: int = 16,
+      mode: CalibrationMode = CalibrationMode.LAYERWISE,
+      qsv_update_func: Callable[
+          [qtyping.QSV, qtyping.QSV],
+          qtyping.QSV,
+      ] = _MISSING_FUNC,
+      memory_budget_bytes: int | None = None,
+  ):
+    super().__init__(
+        float_tflite, num_threads, mode, qsv_update_func, memory_budget_bytes
+    )
+    # Signature key to the calibration plan, the capture chunks computed from
+    # it, and the paths of the capture models of the chunks (None until
+    # written).
+    self._capture_chunks: dict[
+        str | None,
+        tuple[
+            CalibrationPlan,
+            CalibrationSubgraphPlan,
+            list[_CaptureChunk],
+            list[str | None],
+        ],
+    ] = {}
+    # Temporary directory of the capture models, while calibrating.
+    self._capture_model_dir: tempfile.TemporaryDirectory[str] | None = None
+    # (signature_key, data, model_recipe_manager, cache_output) of the samples
+    # buffered for the next passes, and their total size.
+    self._pending_samples: list[
+        tuple[
+            str | None, _SignatureInput, recipe_manager.RecipeManager, bool
+        ]
+    ] = []
+    self._pending_samples_bytes = 0
+
+  def _get_capture_chunks(
+      self, signature_key: str | None, plan: CalibrationPlan
+  ) -> tuple[CalibrationSubgraphPlan, list[_CaptureChunk]]:
+    """Splits the capture entries of a plan into chunks that fit the budget.
+
+    Args:
+      signature_key: The signature key of the plan.
+      plan: The calibration plan of the signature.
+
+    Returns:
+      A tuple of the signature subgraph plan and its capture chunks. There is
+      always at least one (possibly empty) chunk.
+    """
+    cached = self._capture_chunks.get(signature_key)
+    if cached is not None and cached[0] is plan:
+      return cached[1], cached[2]
+    subgraph_plan, capture_entries = self._get_capture_entries(plan)
+    subgraph_tensors = self._flatbuffer_model.subgraphs[
+        subgraph_plan.subgraph_index
+    ].tensors
+
+    chunks = []
+    entries, tensor_names, size_bytes = [], {}, 0
+    for entry in capture_entries:
+      entry_tensor_names = {
+          tensor_index: subgraph_plan.readback_tensor_names[tensor_index]
+          for tensor_index in entry.tensor_indices
+          if tensor_index in subgraph_plan.readback_tensor_names
+      }
+      entry_size_bytes = sum(
+          tfl_flatbuffer_utils.get_tensor_size_bytes(
+              subgraph_tensors[tensor_index]
+          )
+          for tensor_index in entry_tensor_names
+          if tensor_index not in tensor_names
+      )
+      if (
+          entries
+          and self._memory_budget_bytes is not None
+          and size_bytes + entry_size_bytes > self._memory_budget_bytes
+      ):
+        chunks.append(_CaptureChunk(entries, tensor_names))
+        entries, tensor_names, size_bytes = [], {}, 0
+        entry_size_bytes = sum(
+            tfl_flatbuffer_utils.get_tensor_size_bytes(
+                subgraph_tensors[tensor_index]
+            )
+            for tensor_index in entry_tensor_names
+        )
+      entries.append(entry)
+      tensor_names.update(entry_tensor_names)
+      size_bytes += entry_size_bytes
+    if entries or not chunks:
+      chunks.append(_CaptureChunk(entries, tensor_names))
+    self._capture_chunks[signature_key] = (
+        plan,
+        subgraph_plan,
+        chunks,
+        [None] * len(chunks),
+    )
+    return subgraph_plan, chunks
+
+  def _capture_chunk(self, signature_key: str | None, chunk_index: int) -> None:
+    """Makes the interpreter capture only the tensors of a chunk.
+
+    Args:
+      signature_key: The signature key of the chunk, whose chunks are computed
+        by `_get_capture_chunks`.
+      chunk_index: The index of the chunk to capture.
+    """
+    _, subgraph_plan, chunks, model_paths = self._capture_chunks[signature_key]
+    captured_tensor_indices = {
+        subgraph_plan.subgraph_index: frozenset(
+            chunks[chunk_index].tensor_names
+        )
+    }
+    if self._captured_tensor_indices == captured_tensor_indices:
+      self._tfl_interpreter.reset_all_variables()
+      return
+    self._captured_tensor_indices = captured_tensor_indices
+    # Release the previous interpreter before creating the next one.
+    self._tfl_interpreter = None  # pyrefly: ignore[bad-assignment]
+    if model_paths[chunk_index] is None:
+      if self._capture_model_dir is None:
+        self._capture_model_dir = tempfile.TemporaryDirectory()
+      fd, model_path = tempfile.mkstemp(
+          suffix=".tflite", dir=self._capture_model_dir.name
+      )
+      os.close(fd)
+      self._write_capture_model(model_path)
+      model_paths[chunk_index] = model_path
+    self._create_capture_interpreter(model_paths[chunk_index])
+
+  def _remove_capture_models(self) -> None:
+    """Removes the capture models of the chunks."""
+    if self._capture_model_dir is None:
+      return
+    # The current interpreter keeps its model mapped.
+    self._capture_model_dir.cleanup()
+    self._capture_model_dir = None
+    for _, _, _, model_paths in self._capture_chunks.values():
+      model_paths[:] = [None] * len(model_paths)
+
+  @override
+  def close(self) -> None:
+    super().close()
+    self._remove_capture_models()
+
+  @override
+  def _finish_calibration(self) -> None:
+    self._remove_capture_models()
+
+  @override
+  def _calibrate_step(
+      self,
+      signature_key: str | None,
+      data: _SignatureInput,
+      model_recipe_manager: recipe_manager.RecipeManager,
+      cache_output: bool,
+      pbar: progress_utils.ProgressBar,
+  ) -> None:
+    plan = self.get_calibration_plan(signature_key, model_recipe_manager)
+    _, chunks = self._get_capture_chunks(signature_key, plan)
+    if len(chunks) == 1:
+      self._finish_calibration_steps()
+      super()._calibrate_step(
+          signature_key, data, model_recipe_manager, cache_output, pbar
+      )
+      return
+
+    self._pending_samples.append(
+        (signature_key, data, model_recipe_manager, cache_output)
+    )
+    self._pending_samples_bytes += sum(
+        np.asarray(value).nbytes for value in data.values()
+    )
+    if (
+        self._memory_budget_bytes is not None
+        and self._pending_samples_bytes >= self._memory_budget_bytes
+    ):
+      self._finish_calibration_steps()
+
+  @override
+  def _finish_calibration_steps(self) -> None:
+    """Replays the buffered samples once per capture chunk."""
+    if not self._pending_samples:
+      return
+    samples = self._pending_samples
+    self._pending_samples = []
+    self._pending_samples_bytes = 0
+    signature_key, _, model_recipe_manager, _ = samples[0]
+    plan = self.get_calibration_plan(signature_key, model_recipe_manager)
+    subgraph_plan, chunks = self._get_capture_chunks(signature_key, plan)
+
+    # Profiler statistics of the first pass, and the tensors updated by the
+    # captured ops, for each sample.
+    sample_tensor_stats = []
+    updated_tensor_names = [set() for _ in samples]
+    for chunk_index, chunk in enumerate(chunks):
+      self._capture_chunk(signature_key, chunk_index)
+      cpp_interpreter = self._tfl_interpreter._interpreter  # pylint: disable=protected-access
+      for sample_index, (_, data, _, cache_output) in enumerate(samples):
+        subgraph_index, tensor_stats = self._invoke_with_calibration(
+            signature_key, data, cache_output and chunk_index == 0
+        )
+        if chunk_index == 0:
+          sample_tensor_stats.append(tensor_stats)
+        tensor_content_map = {
+            tensor_name: cpp_interpreter.GetTensor(tensor_index, subgraph_index)
+            for tensor_index, tensor_name in chunk.tensor_names.items()
+        }
+        for entry in chunk.entries:
+          op_qsvs = entry.calibrate_func(
+              entry.op, subgraph_plan.graph_info, tensor_content_map
+          )
+          updated_tensor_names[sample_index].update(
+              self._update_qsvs(
+                  op_qsvs,
+                  updated_tensor_names[sample_index],
+                  entry.update_func,
+              )
+          )
+    # Profiler min/max for all the other tensors.
+    for tensor_stats, sample_updated_tensor_names in zip(
+        sample_tensor_stats, updated_tensor_names
+    ):
+      self._update_qsvs_from_tensor_stats(
+          tensor_stats, sample_updated_tensor_names
+      )
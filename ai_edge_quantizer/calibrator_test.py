@@ -16,9 +16,12 @@
 """Tests for calibrator."""
 
 from collections.abc import Generator, Mapping
+import copy
+import dataclasses
 import json
 import pathlib
 from typing import Any
+from unittest import mock
 
 from absl.testing import absltest
 from absl.testing import parameterized
@@ -28,7 +31,12 @@ import os
 import io
 from ai_edge_quantizer import calibrator
 from ai_edge_quantizer import qtyping
+from ai_edge_quantizer import recipe
 from ai_edge_quantizer import recipe_manager
+from ai_edge_quantizer.utils import activation_cache
+from ai_edge_quantizer.utils import calibration_utils
+from ai_edge_quantizer.utils import progress_utils
+from ai_edge_quantizer.utils import qsv_utils
 from ai_edge_quantizer.utils import test_utils
 from ai_edge_quantizer.utils import tfl_interpreter_utils
 
@@ -44,6 +52,13 @@ TEST_MIN_VAL, TEST_MAX_VAL = -1, 1
 _RNG = np.random.default_rng(66)
 
 
+class _ExitOnUnpickle:
+  """Exits the process that unpickles it."""
+
+  def __reduce__(self):
+    return (os._exit, (3,))
+
+
 def _representative_dataset_gen(size=(1, 8), num_samples=10):
   for _ in range(num_samples):
     vals = np.random.rand(*size).astype(np.float32)
@@ -142,6 +157,197 @@ class CalibratorTestBase(absltest.TestCase):
     # Relu, only check the min
     self.assertSequenceAlmostEqual(output_qsv["min"].flatten(), [0])
 
+  def test_close_returns_interpreter_to_pool(self):
+    self._single_fc_model_init()
+    with open(self._test_model_path, "rb") as f:
+      model_content = f.read()
+    calib = calibrator.Calibrator(
+        model_content,
+        mode=self.mode,  # pytype: disable=wrong-arg-types
+    )
+    interpreter = calib._tfl_interpreter
+    calib.close()
+    calib.close()  # No-op.
+
+    # A calibrator of the same model reuses the interpreter.
+    calib = calibrator.Calibrator(
+        model_content,
+        mode=self.mode,  # pytype: disable=wrong-arg-types
+    )
+    self.assertIs(calib._tfl_interpreter, interpreter)
+    calib.close()
+
+  def test_calibrate_single_fc_with_generator_dataset_success(self):
+    self._single_fc_model_init()
+    _add_default_int8xint8_integer_recipe(self._recipe_manager)
+    calibration_data = {
+        tfl_interpreter_utils.DEFAULT_SIGNATURE_KEY: (
+            _representative_dataset_gen()
+        ),
+    }
+    self._calibrator.calibrate(calibration_data, self._recipe_manager)
+
+    # Every sample of the one-shot generator must be used for calibration.
+    self.assertEqual(self._calibrator._metadata["num_samples_calibrated"], 10)
+    model_tensor_qsvs = self._calibrator.get_model_qsvs()
+    self.assertLen(model_tensor_qsvs, 2)
+    input_qsv = model_tensor_qsvs["serving_default_input_1:0"]
+    self.assertSequenceAlmostEqual(
+        input_qsv["min"].flatten(), [TEST_MIN_VAL], delta=1e-5
+    )
+    self.assertSequenceAlmostEqual(
+        input_qsv["max"].flatten(), [TEST_MAX_VAL], delta=1e-5
+    )
+
+  def test_get_total_operations_is_none_for_generator_dataset(self):
+    self._single_fc_model_init()
+    dataset = _representative_dataset_gen()
+    calibration_data = {tfl_interpreter_utils.DEFAULT_SIGNATURE_KEY: dataset}
+    self.assertIsNone(self._calibrator._get_total_operations(calibration_data))
+    # The generator must not be consumed.
+    self.assertLen(list(dataset), 10)
+
+  def test_get_total_operations_uses_dataset_length(self):
+    self._single_fc_model_init()
+    total_ops = self._calibrator._get_total_operations(
+        self._representative_dataset
+    )
+    self.assertIsNotNone(total_ops)
+    self.assertEqual(total_ops % 10, 0)
+
+  def test_calibrate_parallel_matches_sequential_min_max(self):
+    self._test_model_path = str(
+        pathlib.Path(TEST_DATA_PREFIX_PATH) / "tests/models/single_fc.tflite"
+    )
+    _add_default_int8xint8_integer_recipe(self._recipe_manager)
+    sequential_calibrator = calibrator.Calibrator(
+        self._test_model_path,
+        mode=self.mode,  # pytype: disable=wrong-arg-types
+        qsv_update_func=qsv_utils.min_max_update,
+    )
+    sequential_calibrator.calibrate(
+        self._representative_dataset, self._recipe_manager
+    )
+    parallel_calibrator = calibrator.Calibrator(
+        self._test_model_path,
+        mode=self.mode,  # pytype: disable=wrong-arg-types
+        qsv_update_func=qsv_utils.min_max_update,
+    )
+    parallel_calibrator.calibrate_parallel(
+        self._representative_dataset, self._recipe_manager, num_workers=2
+    )
+
+    self.assertEqual(
+        parallel_calibrator._metadata["num_samples_calibrated"], 10
+    )
+    sequential_qsvs = sequential_calibrator.get_model_qsvs()
+    parallel_qsvs = parallel_calibrator.get_model_qsvs()
+    self.assertSameElements(parallel_qsvs.keys(), sequential_qsvs.keys())
+    for tensor_name, qsv in sequential_qsvs.items():
+      np.testing.assert_array_equal(
+          parallel_qsvs[tensor_name]["min"], qsv["min"]
+      )
+      np.testing.assert_array_equal(
+          parallel_qsvs[tensor_name]["max"], qsv["max"]
+      )
+
+  def test_calibrate_parallel_raises_when_worker_dies(self):
+    self._single_fc_model_init()
+    _add_default_int8xint8_integer_recipe(self._recipe_manager)
+    samples = self._representative_dataset[
+        tfl_interpreter_utils.DEFAULT_SIGNATURE_KEY
+    ]
+    # The worker receiving this sample exits abruptly, as if it crashed.
+    crashing_sample = {"input_1": _ExitOnUnpickle()}
+    with self.assertRaisesRegex(RuntimeError, "died with exit code 3"):
+      self._calibrator.calibrate_parallel(
+          {
+              tfl_interpreter_utils.DEFAULT_SIGNATURE_KEY: [
+                  crashing_sample,
+                  *samples,
+              ]
+          },
+          self._recipe_manager,
+          num_workers=2,
+      )
+
+  def test_calibrate_parallel_raises_for_unmergeable_update_func(self):
+    self._test_model_path = str(
+        pathlib.Path(TEST_DATA_PREFIX_PATH) / "tests/models/single_fc.tflite"
+    )
+    self._calibrator = calibrator.Calibrator(
+        self._test_model_path,
+        mode=self.mode,  # pytype: disable=wrong-arg-types
+        qsv_update_func=lambda qsv, new_qsv: new_qsv,
+    )
+    with self.assertRaisesRegex(ValueError, "No QSV merge function"):
+      self._calibrator.calibrate_parallel(
+          self._representative_dataset, self._recipe_manager, num_workers=2
+      )
+
+  def test_get_calibration_plan_single_fc(self):
+    self._single_fc_model_init()
+    _add_default_int8xint8_integer_recipe(self._recipe_manager)
+    plan = self._calibrator.get_calibration_plan(
+        tfl_interpreter_utils.DEFAULT_SIGNATURE_KEY, self._recipe_manager
+    )
+
+    self.assertLen(plan.subgraphs, 1)
+    subgraph_plan = plan.subgraphs[0]
+    self.assertEqual(subgraph_plan.subgraph_index, 0)
+    self.assertEqual(
+        [entry.op_key for entry in subgraph_plan.entries],
+        [
+            qtyping.TFLOperationName.FULLY_CONNECTED,
+            qtyping.TFLOperationName.INPUT,
+            qtyping.TFLOperationName.OUTPUT,
+        ],
+    )
+    for entry in subgraph_plan.entries:
+      self.assertEqual(
+          entry.algorithm_name, _AlgorithmName.MIN_MAX_UNIFORM_QUANT
+      )
+      self.assertNotEmpty(entry.tensor_indices)
+
+  def test_get_calibration_plan_reads_back_only_non_constant_tensors(self):
+    self._single_fc_model_init()
+    _add_default_int8xint8_integer_recipe(self._recipe_manager)
+    plan = self._calibrator.get_calibration_plan(
+        tfl_interpreter_utils.DEFAULT_SIGNATURE_KEY, self._recipe_manager
+    )
+
+    self.assertSameElements(
+        plan.subgraphs[0].readback_tensor_names.values(),
+        ["serving_default_input_1:0", "StatefulPartitionedCall:0"],
+    )
+
+  def test_get_calibration_plan_is_recompiled_when_recipe_changes(self):
+    self._single_fc_model_init()
+    _add_default_int8xint8_integer_recipe(self._recipe_manager)
+    plan = self._calibrator.get_calibration_plan(
+        tfl_interpreter_utils.DEFAULT_SIGNATURE_KEY, self._recipe_manager
+    )
+    self.assertIs(
+        self._calibrator.get_calibration_plan(
+            tfl_interpreter_utils.DEFAULT_SIGNATURE_KEY, self._recipe_manager
+        ),
+        plan,
+    )
+
+    self._recipe_manager.add_quantization_config(
+        regex=".*",
+        operation_name=qtyping.TFLOperationName.FULLY_CONNECTED,
+        algorithm_key=_AlgorithmName.NO_QUANTIZE,
+    )
+    new_plan = self._calibrator.get_calibration_plan(
+        tfl_interpreter_utils.DEFAULT_SIGNATURE_KEY, self._recipe_manager
+    )
+    self.assertIsNot(new_plan, plan)
+    self.assertNotIn(
+        qtyping.TFLOperationName.FULLY_CONNECTED,
+        [entry.op_key for entry in new_plan.subgraphs[0].entries],
+    )
+
   def test_calibration_cache_is_empty_when_off(self):
     self._single_fc_model_init()
     _add_default_int8xint8_integer_recipe(self._recipe_manager)
@@ -238,6 +444,326 @@ class CalibratorTestBase(absltest.TestCase):
     # Check if internal counter is updated.
     self.assertEqual(self._calibrator._metadata["num_samples_calibrated"], 10)
 
+  def test_calibrate_resumes_from_checkpoint(self):
+    self._single_fc_model_init()
+    _add_default_int8xint8_integer_recipe(self._recipe_manager)
+    samples = self._representative_dataset[
+        tfl_interpreter_utils.DEFAULT_SIGNATURE_KEY
+    ]
+    self._calibrator.calibrate(
+        self._representative_dataset, self._recipe_manager
+    )
+    expected_qsvs = copy.deepcopy(dict(self._calibrator.get_model_qsvs()))
+
+    def interrupted_dataset():
+      yield from samples[:7]
+      raise KeyboardInterrupt()
+
+    checkpoint_config = calibrator.CalibrationCheckpointConfig(
+        directory=self.create_tempdir().full_path, every_n_samples=3
+    )
+    self._single_fc_model_init()
+    with self.assertRaises(KeyboardInterrupt):
+      self._calibrator.calibrate(
+          {tfl_interpreter_utils.DEFAULT_SIGNATURE_KEY: interrupted_dataset()},
+          self._recipe_manager,
+          checkpoint_config=checkpoint_config,
+      )
+
+    # A new calibrator resumes after the 6 checkpointed samples.
+    calibrated_samples = []
+
+    def recording_dataset():
+      for sample in samples:
+        calibrated_samples.append(sample)
+        yield sample
+
+    self._single_fc_model_init()
+    self._calibrator.calibrate(
+        {tfl_interpreter_utils.DEFAULT_SIGNATURE_KEY: recording_dataset()},
+        self._recipe_manager,
+        checkpoint_config=checkpoint_config,
+    )
+
+    self.assertEqual(self._calibrator._metadata["num_samples_calibrated"], 10)
+    model_tensor_qsvs = self._calibrator.get_model_qsvs()
+    self.assertEqual(list(model_tensor_qsvs), list(expected_qsvs))
+    for tensor_name, qsv in expected_qsvs.items():
+      np.testing.assert_allclose(
+          model_tensor_qsvs[tensor_name]["min"], qsv["min"]
+      )
+      np.testing.assert_allclose(
+          model_tensor_qsvs[tensor_name]["max"], qsv["max"]
+      )
+
+    # The completed calibration is fully skipped when resumed again, unless
+    # resuming is disabled.
+    self._single_fc_model_init()
+    self._calibrator.calibrate(
+        self._representative_dataset,
+        self._recipe_manager,
+        checkpoint_config=checkpoint_config,
+    )
+    self.assertEqual(self._calibrator._metadata["num_samples_calibrated"], 10)
+    self._single_fc_model_init()
+    self._calibrator.calibrate(
+        self._representative_dataset,
+        self._recipe_manager,
+        checkpoint_config=dataclasses.replace(checkpoint_config, resume=False),
+    )
+    self.assertEqual(self._calibrator._metadata["num_samples_calibrated"], 10)
+    self.assertLen(calibrated_samples, 10)
+
+  def test_calibrate_resumed_from_checkpoint_matches_uninterrupted(self):
+    self._single_fc_model_init()
+    _add_default_int8xint8_integer_recipe(self._recipe_manager)
+    samples = self._representative_dataset[
+        tfl_interpreter_utils.DEFAULT_SIGNATURE_KEY
+    ]
+    self._calibrator.calibrate(
+        self._representative_dataset, self._recipe_manager
+    )
+    expected_update_funcs = dict(self._calibrator._qsv_update_funcs)
+    expected_num_updates = dict(self._calibrator._qsv_num_updates)
+
+    def interrupted_dataset():
+      yield from samples[:5]
+      raise KeyboardInterrupt()
+
+    checkpoint_config = calibrator.CalibrationCheckpointConfig(
+        directory=self.create_tempdir().full_path, every_n_samples=2
+    )
+    self._single_fc_model_init()
+    with self.assertRaises(KeyboardInterrupt):
+      self._calibrator.calibrate(
+          {tfl_interpreter_utils.DEFAULT_SIGNATURE_KEY: interrupted_dataset()},
+          self._recipe_manager,
+          checkpoint_config=checkpoint_config,
+      )
+    self._single_fc_model_init()
+    self._calibrator.calibrate(
+        self._representative_dataset,
+        self._recipe_manager,
+        checkpoint_config=checkpoint_config,
+    )
+
+    # The update functions and counts continue from the checkpoint, so that
+    # later updates and merges weigh the QSVs as in an uninterrupted run.
+    self.assertNotEmpty(expected_num_updates)
+    self.assertEqual(self._calibrator._qsv_update_funcs, expected_update_funcs)
+    self.assertEqual(self._calibrator._qsv_num_updates, expected_num_updates)
+
+  def test_checkpoint_config_is_due(self):
+    config = calibrator.CalibrationCheckpointConfig(
+        directory="unused", every_n_samples=4, every_seconds=60.0
+    )
+    self.assertFalse(config.is_due(num_samples=3, elapsed_seconds=59.0))
+    self.assertTrue(config.is_due(num_samples=4, elapsed_seconds=0.0))
+    self.assertTrue(config.is_due(num_samples=1, elapsed_seconds=60.0))
+    with self.assertRaisesRegex(ValueError, "every_n_samples"):
+      calibrator.CalibrationCheckpointConfig(
+          directory="unused", every_n_samples=0
+      )
+
+  def test_calibrate_stops_early_once_qsvs_converge(self):
+    self._single_fc_model_init()
+    _add_default_int8xint8_integer_recipe(self._recipe_manager)
+    sample = self._representative_dataset[
+        tfl_interpreter_utils.DEFAULT_SIGNATURE_KEY
+    ][0]
+    num_samples_drawn = 0
+
+    def repeated_dataset():
+      nonlocal num_samples_drawn
+      for _ in range(100):
+        num_samples_drawn += 1
+        yield sample
+
+    self._calibrator.calibrate(
+        {tfl_interpreter_utils.DEFAULT_SIGNATURE_KEY: repeated_dataset()},
+        self._recipe_manager,
+        early_stopping_config=calibrator.EarlyStoppingConfig(
+            tolerance=1e-6, window=4, min_samples=2
+        ),
+    )
+
+    # The first sample initializes the QSVs, the next 4 leave them unchanged.
+    self.assertEqual(num_samples_drawn, 5)
+    self.assertEqual(self._calibrator._metadata["num_samples_calibrated"], 5)
+    self.assertEqual(
+        self._calibrator._metadata["early_stopped_signatures"],
+        {tfl_interpreter_utils.DEFAULT_SIGNATURE_KEY: 5},
+    )
+    self.assertLen(self._calibrator.get_model_qsvs(), 2)
+
+  def test_calibrate_does_not_stop_early_before_convergence(self):
+    self._single_fc_model_init()
+    _add_default_int8xint8_integer_recipe(self._recipe_manager)
+    self._calibrator.calibrate(
+        self._representative_dataset,
+        self._recipe_manager,
+        early_stopping_config=calibrator.EarlyStoppingConfig(
+            tolerance=0.0, window=4
+        ),
+    )
+    self.assertEqual(self._calibrator._metadata["num_samples_calibrated"], 10)
+    self.assertNotIn(
+        "early_stopped_signatures", self._calibrator._metadata
+    )
+
+  def test_calibrate_with_batch_size_matches_unbatched(self):
+    self._single_fc_model_init()
+    _add_default_int8xint8_integer_recipe(self._recipe_manager)
+    unbatched_calibrator = calibrator.Calibrator(
+        self._test_model_path,
+        mode=self.mode,  # pytype: disable=wrong-arg-types
+        qsv_update_func=qsv_utils.min_max_update,
+    )
+    unbatched_calibrator.calibrate(
+        self._representative_dataset, self._recipe_manager
+    )
+    batched_calibrator = calibrator.Calibrator(
+        self._test_model_path,
+        mode=self.mode,  # pytype: disable=wrong-arg-types
+        qsv_update_func=qsv_utils.min_max_update,
+    )
+    with mock.patch.object(
+        batched_calibrator,
+        "_calibrate_step",
+        wraps=batched_calibrator._calibrate_step,
+    ) as calibrate_step:
+      batched_calibrator.calibrate(
+          self._representative_dataset, self._recipe_manager, batch_size=4
+      )
+
+    # The 10 samples are calibrated in batches of 4, 4 and 2.
+    batch_sizes = [
+        call.args[1]["input_1"].shape[0] for call in calibrate_step.mock_calls
+    ]
+    self.assertEqual(batch_sizes, [4, 4, 2])
+    self.assertEqual(batched_calibrator._metadata["num_samples_calibrated"], 10)
+    expected_qsvs = unbatched_calibrator.get_model_qsvs()
+    model_tensor_qsvs = batched_calibrator.get_model_qsvs()
+    self.assertCountEqual(model_tensor_qsvs, expected_qsvs)
+    for tensor_name, qsv in expected_qsvs.items():
+      np.testing.assert_allclose(
+          model_tensor_qsvs[tensor_name]["min"], qsv["min"]
+      )
+      np.testing.assert_allclose(
+          model_tensor_qsvs[tensor_name]["max"], qsv["max"]
+      )
+
+  def test_calibrate_does_not_batch_static_batch_signature(self):
+    self._test_model_path = str(
+        pathlib.Path(TEST_DATA_PREFIX_PATH)
+        / "tests/models/single_fc_bias.tflite"
+    )
+    self._calibrator = calibrator.Calibrator(
+        self._test_model_path,
+        mode=self.mode,  # pytype: disable=wrong-arg-types
+    )
+    _add_default_int8xint8_integer_recipe(self._recipe_manager)
+    calibration_data = tfl_interpreter_utils.create_random_normal_input_data(
+        self._test_model_path, num_samples=3, random_seed=0
+    )
+    self.assertFalse(self._calibrator._is_batchable(None))
+    self._calibrator.calibrate(
+        calibration_data, self._recipe_manager, batch_size=2
+    )
+    self.assertEqual(self._calibrator._metadata["num_samples_calibrated"], 3)
+
+  def test_calibrate_invalid_batch_size_raises_error(self):
+    self._single_fc_model_init()
+    with self.assertRaisesRegex(ValueError, "batch_size must be positive"):
+      self._calibrator.calibrate(
+          self._representative_dataset, self._recipe_manager, batch_size=0
+      )
+
+  def test_calibrate_with_prefetch(self):
+    self._single_fc_model_init()
+    _add_default_int8xint8_integer_recipe(self._recipe_manager)
+    self._calibrator.calibrate(
+        self._representative_dataset, self._recipe_manager
+    )
+    expected_qsvs = copy.deepcopy(dict(self._calibrator.get_model_qsvs()))
+
+    self._single_fc_model_init()
+    self._calibrator.calibrate(
+        {
+            key: iter(samples)
+            for key, samples in self._representative_dataset.items()
+        },
+        self._recipe_manager,
+        prefetch_depth=3,
+    )
+    model_tensor_qsvs = self._calibrator.get_model_qsvs()
+    self.assertEqual(list(model_tensor_qsvs), list(expected_qsvs))
+    for tensor_name, qsv in expected_qsvs.items():
+      np.testing.assert_array_equal(
+          model_tensor_qsvs[tensor_name]["min"], qsv["min"]
+      )
+      np.testing.assert_array_equal(
+          model_tensor_qsvs[tensor_name]["max"], qsv["max"]
+      )
+
+  def test_calibrate_with_prefetch_reraises_dataset_error(self):
+    self._single_fc_model_init()
+    _add_default_int8xint8_integer_recipe(self._recipe_manager)
+
+    def failing_dataset():
+      yield from self._representative_dataset[
+          tfl_interpreter_utils.DEFAULT_SIGNATURE_KEY
+      ][:2]
+      raise ValueError("corrupted sample")
+
+    with self.assertRaisesRegex(ValueError, "corrupted sample"):
+      self._calibrator.calibrate(
+          {tfl_interpreter_utils.DEFAULT_SIGNATURE_KEY: failing_dataset()},
+          self._recipe_manager,
+          prefetch_depth=2,
+      )
+    self.assertEqual(self._calibrator._metadata["num_samples_calibrated"], 2)
+
+  def test_early_stopping_config_validation(self):
+    with self.assertRaisesRegex(ValueError, "window"):
+      calibrator.EarlyStoppingConfig(window=0)
+    with self.assertRaisesRegex(ValueError, "tolerance"):
+      calibrator.EarlyStoppingConfig(tolerance=-1.0)
+
+  def test_save_and_load_binary_calibration_result(self):
+    self._single_fc_model_init()
+    _add_default_int8xint8_integer_recipe(self._recipe_manager)
+    self._calibrator.calibrate(
+        self._representative_dataset, self._recipe_manager
+    )
+    expected_qsvs = copy.deepcopy(dict(self._calibrator.get_model_qsvs()))
+    temp_file = self.create_tempfile().full_path
+    self._calibrator.save_calibration_result(temp_file, binary=True)
+
+    self._calibrator.reset_model_qsvs()
+    self._calibrator.load_model_qsvs(temp_file)
+
+    model_tensor_qsvs = self._calibrator.get_model_qsvs()
+    self.assertIsInstance(
+        model_tensor_qsvs, calibration_utils.MappedCalibrationResults
+    )
+    self.assertEqual(list(model_tensor_qsvs), list(expected_qsvs))
+    for tensor_name, qsv in expected_qsvs.items():
+      np.testing.assert_array_equal(
+          model_tensor_qsvs[tensor_name]["min"], qsv["min"]
+      )
+      np.testing.assert_array_equal(
+          model_tensor_qsvs[tensor_name]["max"], qsv["max"]
+      )
+    self.assertEqual(self._calibrator._metadata["num_samples_calibrated"], 10)
+
+    # Calibration can be resumed from the mapped QSVs.
+    self._calibrator.calibrate(
+        self._representative_dataset, self._recipe_manager
+    )
+    self.assertEqual(self._calibrator._metadata["num_samples_calibrated"], 20)
+    self.assertLen(self._calibrator.get_model_qsvs(), len(expected_qsvs))
+
   def test_save_and_load_calibration_result_with_metadata(self):
     self._single_fc_model_init()
     # Setup some QSV
@@ -355,10 +881,59 @@ class CalibratorTestBase(absltest.TestCase):
 class CalibratorPreserveAllTensorsTest(CalibratorTestBase):
   mode = _CalibrationMode.CALIBRATION_PRESERVE_ALL_TENSORS
 
+  def test_calibrate_with_activation_cache(self):
+    _add_default_int8xint8_integer_recipe(self._recipe_manager)
+    cache = activation_cache.ActivationCache(
+        self.create_tempdir().full_path
+    )
+    self._single_fc_model_init()
+    self._calibrator.calibrate(
+        self._representative_dataset,
+        self._recipe_manager,
+        activation_cache=cache,
+    )
+    expected_qsvs = copy.deepcopy(dict(self._calibrator.get_model_qsvs()))
+    self.assertLen(cache, 10)
+
+    # A second calibration reads all the tensors from the cache.
+    self._single_fc_model_init()
+    with mock.patch.object(
+        tfl_interpreter_utils,
+        "invoke_interpreter_signature",
+        wraps=tfl_interpreter_utils.invoke_interpreter_signature,
+    ) as mock_invoke:
+      self._calibrator.calibrate(
+          self._representative_dataset,
+          self._recipe_manager,
+          activation_cache=cache,
+      )
+    mock_invoke.assert_not_called()
+    model_tensor_qsvs = self._calibrator.get_model_qsvs()
+    self.assertEqual(list(model_tensor_qsvs), list(expected_qsvs))
+    for tensor_name, qsv in expected_qsvs.items():
+      np.testing.assert_array_equal(
+          model_tensor_qsvs[tensor_name]["min"], qsv["min"]
+      )
+      np.testing.assert_array_equal(
+          model_tensor_qsvs[tensor_name]["max"], qsv["max"]
+      )
+
 
 class CalibratorProfilerBasedTest(CalibratorTestBase):
   mode = _CalibrationMode.CALIBRATION_PROFILER_BASED
 
+  def test_calibrate_with_activation_cache_raises_error(self):
+    self._single_fc_model_init()
+    cache = activation_cache.ActivationCache(
+        self.create_tempdir().full_path
+    )
+    with self.assertRaisesRegex(ValueError, "activation cache"):
+      self._calibrator.calibrate(
+          self._representative_dataset,
+          self._recipe_manager,
+          activation_cache=cache,
+      )
+
 
 class CalibratorAlreadyQuantizedModelTest(parameterized.TestCase):
 
@@ -387,6 +962,77 @@ class CalibratorAlreadyQuantizedModelTest(parameterized.TestCase):
     _ = calibrator.Calibrator(test_model_path, mode=mode)
 
 
+class CalibratorHybridTest(CalibratorTestBase):
+  mode = _CalibrationMode.HYBRID
+
+
+class CalibratorLayerwiseTest(CalibratorTestBase):
+  mode = _CalibrationMode.LAYERWISE
+
+  def test_calibrate_stops_early_once_qsvs_converge(self):
+    self._single_fc_model_init()
+    _add_default_int8xint8_integer_recipe(self._recipe_manager)
+    with self.assertRaisesRegex(ValueError, "not supported in LAYERWISE"):
+      self._calibrator.calibrate(
+          self._representative_dataset,
+          self._recipe_manager,
+          early_stopping_config=calibrator.EarlyStoppingConfig(),
+      )
+
+  def test_calibrate_does_not_stop_early_before_convergence(self):
+    self.skipTest("Early stopping is not supported in LAYERWISE mode.")
+
+  def test_invalid_memory_budget_raises_error(self):
+    with self.assertRaisesRegex(ValueError, "must be positive"):
+      calibrator.Calibrator(
+          str(
+              pathlib.Path(TEST_DATA_PREFIX_PATH)
+              / "tests/models/single_fc.tflite"
+          ),
+          mode=self.mode,
+          memory_budget_bytes=0,
+      )
+
+
+class BatchSamplesTest(absltest.TestCase):
+
+  def test_batch_samples(self):
+    samples = [
+        {"x": np.full((1, 2), i, dtype=np.float32)} for i in range(3)
+    ] + [
+        {"x": np.zeros((1, 3), dtype=np.float32)},
+        {"x": np.zeros((2, 3), dtype=np.float32)},
+    ]
+    batches = list(calibrator._batch_samples(samples, batch_size=2))
+
+    # The samples with a different inner shape start a new batch.
+    self.assertEqual(
+        [(num_samples, data["x"].shape) for num_samples, data in batches],
+        [(2, (2, 2)), (1, (1, 2)), (2, (3, 3))],
+    )
+    np.testing.assert_array_equal(batches[0][1]["x"][:, 0], [0, 1])
+    # A sample calibrated on its own is not copied.
+    self.assertIs(batches[1][1], samples[2])
+
+  def test_batch_samples_does_not_read_ahead(self):
+    num_samples_drawn = 0
+
+    def dataset():
+      nonlocal num_samples_drawn
+      for _ in range(5):
+        num_samples_drawn += 1
+        yield {"x": np.zeros((1,), dtype=np.float32)}
+
+    batches = calibrator._batch_samples(dataset(), batch_size=2)
+    next(batches)
+    self.assertEqual(num_samples_drawn, 2)
+
+  def test_batch_samples_does_not_stack_scalars(self):
+    samples = [{"x": np.float32(i)} for i in range(2)]
+    batches = list(calibrator._batch_samples(samples, batch_size=2))
+    self.assertEqual([num_samples for num_samples, _ in batches], [1, 1])
+
+
 class CalibratorToyGemma2Test(parameterized.TestCase):
 
   def setUp(self):
@@ -485,6 +1131,23 @@ class CalibrationInterpreterTestBase(absltest.TestCase):
     self.assertIn("serving_default_input_1:0", qsvs)
     self.assertIsNotNone(output)
 
+  def test_calibration_mode_closes_progress_bar(self):
+    interpreter = calibrator.CalibrationInterpreter(
+        self._test_model_path,
+        mode=self.mode,  # pytype: disable=wrong-arg-types
+    )
+    runner = interpreter.get_signature_runner()
+    input_data = np.random.rand(1, 8).astype(np.float32)
+    with mock.patch.object(
+        progress_utils.ProgressBar,
+        "close",
+        autospec=True,
+        side_effect=progress_utils.ProgressBar.close,
+    ) as mock_close:
+      runner(input_1=input_data)
+      runner(input_1=input_data)
+    self.assertEqual(mock_close.call_count, 2)
+
   def test_save_calibration_result(self):
     interpreter = calibrator.CalibrationInterpreter(
         self._test_model_path,
@@ -549,11 +1212,101 @@ class CalibrationInterpreterTestBase(absltest.TestCase):
       )
 
 
+  def test_runner_matches_calibrate(self):
+    samples = [
+        {"input_1": np.random.rand(1, 8).astype(np.float32)} for _ in range(10)
+    ]
+    recipe_mngr = recipe_manager.RecipeManager()
+    recipe_mngr.load_quantization_recipe(recipe.static_wi8_ai8())
+    for qsv_update_func in qsv_utils.MIN_MAX_UPDATE_FUNCS:
+      with self.subTest(qsv_update_func=qsv_update_func.__name__):
+        calib = calibrator.Calibrator(
+            self._test_model_path,
+            mode=self.mode,  # pytype: disable=wrong-arg-types
+            qsv_update_func=qsv_update_func,
+        )
+        calib.calibrate(
+            {tfl_interpreter_utils.DEFAULT_SIGNATURE_KEY: samples}, recipe_mngr
+        )
+        interpreter = calibrator.CalibrationInterpreter(
+            self._test_model_path,
+            mode=self.mode,  # pytype: disable=wrong-arg-types
+            qsv_update_func=qsv_update_func,
+        )
+        runner = interpreter.get_signature_runner()
+        for sample in samples:
+          runner(**sample)
+
+        # The QSV updates are deferred until the results are read.
+        self.assertNotEmpty(interpreter._calibrator._pending_qsv_updates)
+        qsvs = interpreter.get_calibration_results()
+        self.assertEmpty(interpreter._calibrator._pending_qsv_updates)
+        expected_qsvs = calib.get_model_qsvs()
+        self.assertCountEqual(qsvs, expected_qsvs)
+        # The deferred moving averages are folded in closed form.
+        for tensor_name, qsv in expected_qsvs.items():
+          np.testing.assert_allclose(
+              qsvs[tensor_name]["min"], qsv["min"], rtol=1e-6
+          )
+          np.testing.assert_allclose(
+              qsvs[tensor_name]["max"], qsv["max"], rtol=1e-6
+          )
+        self.assertEqual(
+            interpreter._calibrator._qsv_num_updates, calib._qsv_num_updates
+        )
+        self.assertEqual(
+            interpreter._calibrator._metadata["num_samples_calibrated"], 10
+        )
+
+  def test_runner_does_not_reset_variables(self):
+    interpreter = calibrator.CalibrationInterpreter(
+        self._test_model_path,
+        mode=self.mode,  # pytype: disable=wrong-arg-types
+    )
+    runner = interpreter.get_signature_runner()
+    with mock.patch.object(
+        interpreter._calibrator._tfl_interpreter, "reset_all_variables"
+    ) as reset_all_variables:
+      for _ in range(3):
+        runner(input_1=np.random.rand(1, 8).astype(np.float32))
+    reset_all_variables.assert_not_called()
+
+
 class CalibrationInterpreterPreserveAllTensorsTest(
     CalibrationInterpreterTestBase
 ):
   mode = _CalibrationMode.CALIBRATION_PRESERVE_ALL_TENSORS
 
+  def test_runner_applies_gptq_updates_immediately(self):
+    recipe_mngr = recipe_manager.RecipeManager()
+    recipe_mngr.add_quantization_config(
+        regex=".*",
+        operation_name=qtyping.TFLOperationName.FULLY_CONNECTED,
+        algorithm_key=_AlgorithmName.GPTQ,
+        op_config=qtyping.OpQuantizationConfig(
+            weight_tensor_config=_TENSOR_QUANT_CONFIG(num_bits=8),
+            compute_precision=_ComputePrecision.FLOAT,
+            skip_checks=True,
+        ),
+    )
+    interpreter = calibrator.CalibrationInterpreter(
+        self._test_model_path,
+        mode=self.mode,  # pytype: disable=wrong-arg-types
+    )
+    runner = calibrator.CalibrationSignatureRunner(
+        interpreter._calibrator,
+        mode=self.mode,  # pytype: disable=wrong-arg-types
+        quantization_recipe=recipe_mngr.get_quantization_recipe(),
+    )
+    for _ in range(3):
+      runner(input_1=np.random.rand(1, 8).astype(np.float32))
+      # The hessians are folded as they come rather than held until a flush.
+      self.assertEmpty(interpreter._calibrator._pending_qsv_updates)
+
+    input_name = "serving_default_input_1:0"
+    self.assertIn("hessian", interpreter._calibrator._model_qsvs[input_name])
+    self.assertEqual(interpreter._calibrator._qsv_num_updates[input_name], 3)
+
 
 class CalibrationInterpreterProfilerBasedTest(CalibrationInterpreterTestBase):
   mode = _CalibrationMode.CALIBRATION_PROFILER_BASED
@@ -570,12 +1323,12 @@ class CalibrationModesComparisonTest(parameterized.TestCase):
     _add_default_int8xint8_integer_recipe(self._recipe_manager)
 
   def _get_random_input_data(
-      self, model_path: str
+      self, model_path: str, num_samples: int = 1
   ) -> dict[str, list[dict[str, np.ndarray]]]:
     with open(model_path, "rb") as f:
       tflite_model = f.read()
     return tfl_interpreter_utils.create_random_normal_input_data(
-        tflite_model, num_samples=1, random_seed=0
+        tflite_model, num_samples=num_samples, random_seed=0
     )
 
   def _compare_qsvs(
@@ -643,6 +1396,204 @@ class CalibrationModesComparisonTest(parameterized.TestCase):
         calib_preserve.get_model_qsvs(), calib_profiler.get_model_qsvs()
     )
 
+  @parameterized.named_parameters(
+      dict(testcase_name="single_fc", model_name="single_fc.tflite"),
+      dict(testcase_name="conv_mnist", model_name="conv_fc_mnist.tflite"),
+  )
+  def test_hybrid_mode_matches_preserve_all_tensors_with_gptq(
+      self, model_name: str
+  ) -> None:
+    model_path = str(
+        pathlib.Path(TEST_DATA_PREFIX_PATH) / "tests/models" / model_name
+    )
+    self._recipe_manager.add_quantization_config(
+        regex=".*",
+        operation_name=qtyping.TFLOperationName.FULLY_CONNECTED,
+        algorithm_key=_AlgorithmName.GPTQ,
+        op_config=qtyping.OpQuantizationConfig(
+            weight_tensor_config=_TENSOR_QUANT_CONFIG(num_bits=8),
+            compute_precision=_ComputePrecision.FLOAT,
+            skip_checks=True,
+        ),
+    )
+    calib_preserve = calibrator.Calibrator(
+        model_path, mode=_CalibrationMode.CALIBRATION_PRESERVE_ALL_TENSORS
+    )
+    calib_hybrid = calibrator.Calibrator(
+        model_path, mode=_CalibrationMode.HYBRID
+    )
+    input_data_map = self._get_random_input_data(model_path)
+    calib_preserve.calibrate(input_data_map, self._recipe_manager)
+    calib_hybrid.calibrate(input_data_map, self._recipe_manager)
+
+    qsvs_preserve = calib_preserve.get_model_qsvs()
+    qsvs_hybrid = calib_hybrid.get_model_qsvs()
+    self._compare_qsvs(qsvs_preserve, qsvs_hybrid)
+    hessian_tensor_names = [
+        name for name, qsv in qsvs_preserve.items() if "hessian" in qsv
+    ]
+    self.assertNotEmpty(hessian_tensor_names)
+    for tensor_name in hessian_tensor_names:
+      np.testing.assert_allclose(
+          qsvs_hybrid[tensor_name]["hessian"],
+          qsvs_preserve[tensor_name]["hessian"],
+          rtol=1e-5,
+          atol=1e-5,
+      )
+
+  def test_hybrid_mode_creates_capture_interpreter_from_file(self) -> None:
+    model_path = str(
+        pathlib.Path(TEST_DATA_PREFIX_PATH) / "tests/models/single_fc.tflite"
+    )
+    self._recipe_manager.add_quantization_config(
+        regex=".*",
+        operation_name=qtyping.TFLOperationName.FULLY_CONNECTED,
+        algorithm_key=_AlgorithmName.GPTQ,
+        op_config=qtyping.OpQuantizationConfig(
+            weight_tensor_config=_TENSOR_QUANT_CONFIG(num_bits=8),
+            compute_precision=_ComputePrecision.FLOAT,
+            skip_checks=True,
+        ),
+    )
+    calib_hybrid = calibrator.Calibrator(
+        model_path, mode=_CalibrationMode.HYBRID
+    )
+    with mock.patch.object(
+        calib_hybrid,
+        "_create_interpreter",
+        wraps=calib_hybrid._create_interpreter,
+    ) as create_interpreter:
+      calib_hybrid.calibrate(
+          self._get_random_input_data(model_path, num_samples=2),
+          self._recipe_manager,
+      )
+
+    # The capture model is loaded from a file, which is removed once loaded.
+    create_interpreter.assert_called_once()
+    capture_model = create_interpreter.call_args.args[0]
+    self.assertIsInstance(capture_model, str)
+    self.assertFalse(os.path.exists(capture_model))
+
+  @parameterized.named_parameters(
+      # All the captured tensors fit: runs as HYBRID.
+      dict(testcase_name="unbounded", memory_budget_bytes=None, num_chunks=1),
+      # One chunk per FC, the samples are replayed in windows of 3 and 2.
+      dict(testcase_name="two_chunks", memory_budget_bytes=6400, num_chunks=2),
+      # One chunk per FC, each sample is replayed on its own.
+      dict(testcase_name="tiny_budget", memory_budget_bytes=1, num_chunks=2),
+  )
+  def test_layerwise_mode_matches_hybrid_with_gptq(
+      self, memory_budget_bytes: int | None, num_chunks: int
+  ) -> None:
+    model_path = str(
+        pathlib.Path(TEST_DATA_PREFIX_PATH)
+        / "tests/models/conv_fc_mnist.tflite"
+    )
+    self._recipe_manager.add_quantization_config(
+        regex=".*",
+        operation_name=qtyping.TFLOperationName.FULLY_CONNECTED,
+        algorithm_key=_AlgorithmName.GPTQ,
+        op_config=qtyping.OpQuantizationConfig(
+            weight_tensor_config=_TENSOR_QUANT_CONFIG(num_bits=8),
+            compute_precision=_ComputePrecision.FLOAT,
+            skip_checks=True,
+        ),
+    )
+    calib_hybrid = calibrator.Calibrator(
+        model_path, mode=_CalibrationMode.HYBRID
+    )
+    calib_layerwise = calibrator.Calibrator(
+        model_path,
+        mode=_CalibrationMode.LAYERWISE,
+        memory_budget_bytes=memory_budget_bytes,
+    )
+    input_data_map = self._get_random_input_data(model_path, num_samples=5)
+    calib_hybrid.calibrate(input_data_map, self._recipe_manager)
+    with mock.patch.object(
+        calib_layerwise,
+        "_write_capture_model",
+        wraps=calib_layerwise._write_capture_model,
+    ) as write_capture_model:
+      calib_layerwise.calibrate(input_data_map, self._recipe_manager)
+
+    plan = calib_layerwise.get_calibration_plan(None, self._recipe_manager)
+    _, chunks = calib_layerwise._get_capture_chunks(None, plan)
+    self.assertLen(chunks, num_chunks)
+    # The capture model of each chunk is written once, whatever the number of
+    # replays, and removed once the calibration finishes.
+    self.assertEqual(write_capture_model.call_count, num_chunks)
+    for call in write_capture_model.call_args_list:
+      self.assertFalse(os.path.exists(call.args[0]))
+    self.assertEmpty(calib_layerwise._pending_samples)
+    qsvs_hybrid = calib_hybrid.get_model_qsvs()
+    qsvs_layerwise = calib_layerwise.get_model_qsvs()
+    self._compare_qsvs(qsvs_hybrid, qsvs_layerwise)
+    hessian_tensor_names = [
+        name for name, qsv in qsvs_hybrid.items() if "hessian" in qsv
+    ]
+    self.assertNotEmpty(hessian_tensor_names)
+    for tensor_name in hessian_tensor_names:
+      np.testing.assert_allclose(
+          qsvs_layerwise[tensor_name]["hessian"],
+          qsvs_hybrid[tensor_name]["hessian"],
+          rtol=1e-6,
+      )
+      self.assertEqual(
+          calib_layerwise._qsv_num_updates[tensor_name],
+          calib_hybrid._qsv_num_updates[tensor_name],
+      )
+
+  @parameterized.named_parameters(
+      dict(
+          testcase_name="preserve_all_tensors",
+          mode=_CalibrationMode.CALIBRATION_PRESERVE_ALL_TENSORS,
+      ),
+      dict(testcase_name="hybrid", mode=_CalibrationMode.HYBRID),
+  )
+  def test_batched_calibration_matches_unbatched_with_gptq(
+      self, mode: _CalibrationMode
+  ) -> None:
+    model_path = str(
+        pathlib.Path(TEST_DATA_PREFIX_PATH)
+        / "tests/models/conv_fc_mnist.tflite"
+    )
+    self._recipe_manager.add_quantization_config(
+        regex=".*",
+        operation_name=qtyping.TFLOperationName.FULLY_CONNECTED,
+        algorithm_key=_AlgorithmName.GPTQ,
+        op_config=qtyping.OpQuantizationConfig(
+            weight_tensor_config=_TENSOR_QUANT_CONFIG(num_bits=8),
+            compute_precision=_ComputePrecision.FLOAT,
+            skip_checks=True,
+        ),
+    )
+    input_data_map = self._get_random_input_data(model_path, num_samples=5)
+    calib_unbatched = calibrator.Calibrator(model_path, mode=mode)
+    calib_unbatched.calibrate(input_data_map, self._recipe_manager)
+    calib_batched = calibrator.Calibrator(model_path, mode=mode)
+    calib_batched.calibrate(
+        input_data_map, self._recipe_manager, batch_size=3
+    )
+
+    qsvs_unbatched = calib_unbatched.get_model_qsvs()
+    qsvs_batched = calib_batched.get_model_qsvs()
+    hessian_tensor_names = [
+        name for name, qsv in qsvs_unbatched.items() if "hessian" in qsv
+    ]
+    self.assertNotEmpty(hessian_tensor_names)
+    for tensor_name in hessian_tensor_names:
+      # The hessian is averaged over the samples, whatever their batching.
+      np.testing.assert_allclose(
+          qsvs_batched[tensor_name]["hessian"],
+          qsvs_unbatched[tensor_name]["hessian"],
+          rtol=1e-5,
+          atol=1e-6,
+      )
+      self.assertEqual(
+          qsvs_batched[tensor_name]["num_samples"],
+          qsvs_unbatched[tensor_name]["num_samples"],
+      )
+
   @parameterized.named_parameters(
       dict(testcase_name="single_fc", model_name="single_fc.tflite"),
       dict(testcase_name="conv_mnist", model_name="conv_fc_mnist.tflite"),
@@ -0,0 +1,510 @@
+# Copyright 2024 The AI Edge Quantizer Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+"""Static estimation of the peak memory of a quantization run.
+
+The model and the recipe are walked without running the model, so that the
+calibration mode, batch size or number of workers of a run can be chosen before
+starting it. The estimates are approximate: tensor sizes come from the static
+shapes (dynamic dimensions count as 1), activations are assumed to scale
+linearly with the batch size, and the overhead of Python objects is ignored.
+"""
+
+from collections.abc import Callable
+import dataclasses
+import itertools
+import os
+from typing import Any, Optional
+
+import numpy as np
+
+from ai_edge_quantizer import algorithm_manager
+from ai_edge_quantizer import calibrator
+from ai_edge_quantizer import default_policy as policy
+from ai_edge_quantizer import qtyping
+from ai_edge_quantizer import recipe_manager
+from ai_edge_quantizer.algorithms.uniform_quantize import histogram
+from ai_edge_quantizer.utils import progress_utils
+from ai_edge_quantizer.utils import qsv_utils
+from ai_edge_quantizer.utils import tfl_flatbuffer_utils
+
+_CalibrationMode = calibrator.CalibrationMode
+
+# Approximate size of a min/max QSV: two small arrays in a dict.
+_MIN_MAX_QSV_BYTES = 256
+# Bytes of a large float tensor quantized at once (see
+# `uniform_quantize_tensor.uniform_quantize`).
+_QUANTIZE_CHUNK_BYTES = 32 * 1024 * 1024
+# Calibration modes the estimate supports.
+_CALIBRATION_MODES = (
+    _CalibrationMode.CALIBRATION_PRESERVE_ALL_TENSORS,
+    _CalibrationMode.CALIBRATION_PROFILER_BASED,
+    _CalibrationMode.HYBRID,
+    _CalibrationMode.LAYERWISE,
+)
+
+
+@dataclasses.dataclass(frozen=True)
+class MemoryEstimate:
+  """The estimated memory of a quantization run, in bytes.
+
+  Attributes:
+    calibration_mode: The calibration mode the estimate is for, or None if the
+      recipe doesn't need calibration.
+    model_bytes: The float model, resident throughout the run.
+    calibration_activation_bytes: The activations kept by the interpreter(s)
+      and read back by the calibration, including the interpreter model copies
+      of the calibration workers.
+    qsv_bytes: The calibration statistics (QSVs), kept until the quantization
+      parameters are generated.
+    quantized_params_bytes: The quantized tensor data, as generated (one byte
+      per element up to 8 bits).
+    params_generation_scratch_bytes: The largest temporary memory needed to
+      quantize a single tensor (e.g., the GPTQ hessian inverse).
+    packed_params_bytes: The sub-byte (int2/int4) tensor data packed during
+      the transformation.
+    serialized_model_bytes: The serialized quantized model.
+    stream_quantized_data: Whether the quantized tensor data is streamed to
+      memory-mapped files (or deferred to the serialization) rather than held
+      in memory, in which case it isn't resident after the generation.
+  """
+
+  calibration_mode: Optional[_CalibrationMode]
+  model_bytes: int
+  calibration_activation_bytes: int
+  qsv_bytes: int
+  quantized_params_bytes: int
+  params_generation_scratch_bytes: int
+  packed_params_bytes: int
+  serialized_model_bytes: int
+  stream_quantized_data: bool = False
+
+  @property
+  def phase_peak_bytes(self) -> dict[str, int]:
+    """The estimated peak memory of each phase of the run."""
+    phases = {}
+    resident_params_bytes = (
+        0 if self.stream_quantized_data else self.quantized_params_bytes
+    )
+    if self.calibration_mode is not None:
+      phases["calibration"] = (
+          self.model_bytes + self.calibration_activation_bytes + self.qsv_bytes
+      )
+    phases["params_generation"] = (
+        self.model_bytes
+        + self.qsv_bytes
+        + resident_params_bytes
+        + self.params_generation_scratch_bytes
+    )
+    phases["transformation"] = (
+        self.model_bytes
+        + resident_params_bytes
+        + self.packed_params_bytes
+    )
+    phases["serialization"] = (
+        phases["transformation"] + self.serialized_model_bytes
+    )
+    return phases
+
+  @property
+  def peak_bytes(self) -> int:
+    """The estimated peak memory of the whole run."""
+    return max(self.phase_peak_bytes.values())
+
+  def __str__(self) -> str:
+    lines = []
+    for phase, num_bytes in self.phase_peak_bytes.items():
+      if phase == "calibration":
+        phase = f"calibration ({self.calibration_mode.name})"  # pyrefly: ignore[missing-attribute]
+      lines.append(f"{phase}: {progress_utils.format_bytes(num_bytes)}")
+    lines.append(f"peak: {progress_utils.format_bytes(self.peak_bytes)}")
+    return "\n".join(lines)
+
+
+@dataclasses.dataclass(frozen=True)
+class _QuantizedOp:
+  """An op of the model that the recipe quantizes."""
+
+  op: Any
+  op_key: qtyping.TFLOperationName
+  algorithm_name: str
+  op_quant_config: qtyping.OpQuantizationConfig
+
+
+def _is_constant(tensor: Any, buffers: list[Any]) -> bool:
+  return buffers[tensor.buffer].data is not None
+
+
+def _get_num_elements(tensor: Any) -> int:
+  shape = tensor.shape if tensor.shape is not None else []
+  return int(np.prod([max(int(dim), 1) for dim in shape]))
+
+
+def _get_quantized_itemsize(num_bits: int) -> int:
+  """Returns the bytes per element of unpacked quantized data."""
+  if num_bits <= 8:
+    return 1
+  elif num_bits <= 16:
+    return 2
+  elif num_bits <= 32:
+    return 4
+  return 8
+
+
+def _get_quantized_ops(
+    flatbuffer_model: qtyping.ModelT,
+    model_recipe_manager: recipe_manager.RecipeManager,
+) -> list[list[_QuantizedOp]]:
+  """Gets the ops of each subgraph that the recipe quantizes."""
+  op_codes = flatbuffer_model.operatorCodes
+  quantized_ops = []
+  for subgraph in flatbuffer_model.subgraphs:
+    subgraph_ops = []
+    for op in subgraph.operators:
+      op_code = op_codes[op.opcodeIndex].builtinCode
+      if op_code not in tfl_flatbuffer_utils.TFL_OP_CODE_TO_NAME:
+        continue
+      op_key = tfl_flatbuffer_utils.TFL_OP_CODE_TO_NAME[op_code]
+      op_scope = tfl_flatbuffer_utils.get_op_scope(op, subgraph.tensors)
+      algorithm_name, op_quant_config = (
+          model_recipe_manager.get_quantization_configs(op_key, op_scope)
+      )
+      if algorithm_name == algorithm_manager.AlgorithmName.NO_QUANTIZE:
+        continue
+      if policy.is_non_quantizable_composite_op(op):
+        continue
+      subgraph_ops.append(
+          _QuantizedOp(op, op_key, algorithm_name, op_quant_config)
+      )
+    quantized_ops.append(subgraph_ops)
+  return quantized_ops
+
+
+def _get_calibrated_tensor_indices(
+    op: Any, subgraph: Any, buffers: list[Any]
+) -> list[int]:
+  """Gets the non-constant tensors of an op, which the calibration reads."""
+  return [
+      tensor_index
+      for tensor_index in itertools.chain(op.inputs, op.outputs)
+      if tensor_index != -1
+      and not _is_constant(subgraph.tensors[tensor_index], buffers)
+  ]
+
+
+def _get_peak_live_activation_bytes(subgraph: Any, buffers: list[Any]) -> int:
+  """Estimates the peak size of the activations alive at once in a subgraph.
+
+  Each non-constant tensor is alive from the op producing it (or the start of
+  the subgraph for its inputs and variables) to its last consumer (or the end
+  of the subgraph for its outputs and variables).
+
+  Args:
+    subgraph: The subgraph.
+    buffers: The buffers of the model.
+
+  Returns:
+    The estimated peak size in bytes.
+  """
+  num_ops = len(subgraph.operators)
+  first_use: dict[int, int] = {}
+  last_use: dict[int, int] = {}
+  for tensor_index in subgraph.inputs:
+    first_use[tensor_index] = 0
+    last_use[tensor_index] = 0
+  for op_index, op in enumerate(subgraph.operators):
+    for tensor_index in itertools.chain(op.inputs, op.outputs):
+      if tensor_index == -1:
+        continue
+      first_use.setdefault(tensor_index, op_index)
+      last_use[tensor_index] = op_index
+  for tensor_index in subgraph.outputs:
+    last_use[tensor_index] = num_ops
+
+  size_deltas = [0] * (num_ops + 2)
+  for tensor_index, start in first_use.items():
+    tensor = subgraph.tensors[tensor_index]
+    if _is_constant(tensor, buffers):
+      continue
+    end = last_use[tensor_index]
+    if tensor.isVariable:
+      start, end = 0, num_ops
+    size_bytes = tfl_flatbuffer_utils.get_tensor_size_bytes(tensor)
+    size_deltas[start] += size_bytes
+    size_deltas[end + 1] -= size_bytes
+  return max(itertools.accumulate(size_deltas), default=0)
+
+
+def _get_qsv_bytes(
+    update_func: Callable[[qtyping.QSV, qtyping.QSV], qtyping.QSV],
+    tensor: Any,
+) -> int:
+  """Estimates the size of the QSV of a tensor."""
+  channels = int(tensor.shape[-1]) if tensor.shape is not None else 1
+  channels = max(channels, 1)
+  if update_func is qsv_utils.gptq_and_moving_average_update:
+    # A float64 hessian over the channels.
+    return _MIN_MAX_QSV_BYTES + 8 * channels * channels
+  if update_func is qsv_utils.oscar_and_moving_average_update:
+    # Float64 second moments of the channels.
+    return _MIN_MAX_QSV_BYTES + 8 * channels
+  if update_func is qsv_utils.histogram_and_min_max_update:
+    return _MIN_MAX_QSV_BYTES + 8 * histogram.MAX_BINS
+  return _MIN_MAX_QSV_BYTES
+
+
+def _estimate_calibration(
+    flatbuffer_model: qtyping.ModelT,
+    quantized_ops: list[list[_QuantizedOp]],
+    calibration_mode: _CalibrationMode,
+    batch_size: int,
+    memory_budget_bytes: Optional[int],
+) -> tuple[int, int]:
+  """Estimates the activation and QSV bytes of the calibration.
+
+  Returns:
+    A tuple of the activation bytes of a single interpreter, and the QSV bytes.
+  """
+  buffers = flatbuffer_model.buffers
+  live_activation_bytes = 0
+  all_activation_bytes = 0
+  readback_bytes = 0
+  captured_bytes = 0
+  largest_capture_bytes = 0
+  qsv_bytes = 0
+  qsv_tensor_names = set()
+  for subgraph, subgraph_ops in zip(flatbuffer_model.subgraphs, quantized_ops):
+    # Each subgraph has its own arena.
+    live_activation_bytes += _get_peak_live_activation_bytes(subgraph, buffers)
+    all_activation_bytes += sum(
+        tfl_flatbuffer_utils.get_tensor_size_bytes(tensor)
+        for tensor in subgraph.tensors
+        if not _is_constant(tensor, buffers)
+    )
+    readback_tensor_indices = set()
+    captured_tensor_indices = set()
+    for quantized_op in subgraph_ops:
+      update_func = algorithm_manager.get_update_qsv_func(
+          quantized_op.algorithm_name, quantized_op.op_key
+      )
+      tensor_indices = _get_calibrated_tensor_indices(
+          quantized_op.op, subgraph, buffers
+      )
+      readback_tensor_indices.update(tensor_indices)
+      if update_func not in qsv_utils.MIN_MAX_UPDATE_FUNCS:
+        new_indices = set(tensor_indices) - captured_tensor_indices
+        captured_tensor_indices.update(new_indices)
+        largest_capture_bytes = max(
+            largest_capture_bytes,
+            sum(
+                tfl_flatbuffer_utils.get_tensor_size_bytes(
+                    subgraph.tensors[tensor_index]
+                )
+                for tensor_index in tensor_indices
+            ),
+        )
+      for tensor_index in tensor_indices:
+        tensor = subgraph.tensors[tensor_index]
+        tensor_name = tfl_flatbuffer_utils.get_tensor_name(tensor)
+        if tensor_name in qsv_tensor_names:
+          continue
+        qsv_tensor_names.add(tensor_name)
+        qsv_bytes += _get_qsv_bytes(update_func, tensor)
+    readback_bytes += sum(
+        tfl_flatbuffer_utils.get_tensor_size_bytes(subgraph.tensors[index])
+        for index in readback_tensor_indices
+    )
+    captured_bytes += sum(
+        tfl_flatbuffer_utils.get_tensor_size_bytes(subgraph.tensors[index])
+        for index in captured_tensor_indices
+    )
+
+  live_activation_bytes *= batch_size
+  if calibration_mode == _CalibrationMode.CALIBRATION_PRESERVE_ALL_TENSORS:
+    # All the tensors are kept, and those of the quantized ops are read back.
+    activation_bytes = (all_activation_bytes + readback_bytes) * batch_size
+  elif calibration_mode == _CalibrationMode.CALIBRATION_PROFILER_BASED:
+    activation_bytes = live_activation_bytes
+  else:
+    # The captured tensors are kept as outputs and read back.
+    captured_bytes *= batch_size
+    largest_capture_bytes *= batch_size
+    if (
+        calibration_mode == _CalibrationMode.LAYERWISE
+        and memory_budget_bytes is not None
+        and captured_bytes > memory_budget_bytes
+    ):
+      # One chunk is captured at a time, and the samples buffered to replay
+      # them take up to another budget.
+      captured_bytes = max(memory_budget_bytes, largest_capture_bytes)
+      live_activation_bytes += memory_budget_bytes
+    activation_bytes = live_activation_bytes + 2 * captured_bytes
+  return activation_bytes, qsv_bytes
+
+
+def _estimate_params(
+    flatbuffer_model: qtyping.ModelT,
+    quantized_ops: list[list[_QuantizedOp]],
+    stream_quantized_data: bool = False,
+) -> tuple[int, int, int, int]:
+  """Estimates the memory of the quantized tensor data.
+
+  Args:
+    flatbuffer_model: The float model.
+    quantized_ops: The ops of each subgraph that the recipe quantizes.
+    stream_quantized_data: Whether the quantized data is streamed, in which
+      case the quantized data of a tensor is only resident while the tensor is
+      quantized, so it counts towards the scratch bytes.
+
+  Returns:
+    A tuple of the quantized data bytes, the largest scratch bytes to quantize
+    a tensor, the bytes of the sub-byte data packed during the transformation,
+    and the change of the model size from replacing float data with quantized
+    data.
+  """
+  buffers = flatbuffer_model.buffers
+  quantized_bytes = 0
+  scratch_bytes = 0
+  packed_bytes = 0
+  model_size_change_bytes = 0
+  visited_buffers = set()
+  for subgraph, subgraph_ops in zip(flatbuffer_model.subgraphs, quantized_ops):
+    for quantized_op in subgraph_ops:
+      op_quant_config = quantized_op.op_quant_config
+      weight_config = op_quant_config.weight_tensor_config
+      if weight_config is None:
+        continue
+      for tensor_index in quantized_op.op.inputs:
+        if tensor_index == -1:
+          continue
+        tensor = subgraph.tensors[tensor_index]
+        if (
+            not _is_constant(tensor, buffers)
+            or tensor.buffer in visited_buffers
+            or tfl_flatbuffer_utils.TENSOR_CODE_TO_TYPE[tensor.type]
+            not in ("FLOAT32", "FLOAT16", "BFLOAT16")
+        ):
+          continue
+        shape = tensor.shape if tensor.shape is not None else []
+        if len(shape) >= 2:
+          num_bits = weight_config.num_bits
+        elif op_quant_config.activation_tensor_config is not None:
+          # Biases of integer ops are quantized to 32 bits.
+          num_bits = 32
+        else:
+          continue
+        visited_buffers.add(tensor.buffer)
+        float_bytes = tfl_flatbuffer_utils.get_tensor_size_bytes(tensor)
+        num_elements = _get_num_elements(tensor)
+        tensor_quantized_bytes = num_elements * _get_quantized_itemsize(
+            num_bits
+        )
+        quantized_bytes += tensor_quantized_bytes
+        serialized_bytes = tensor_quantized_bytes
+        if num_bits in (2, 4):
+          serialized_bytes = (num_elements * num_bits + 7) // 8
+          packed_bytes += serialized_bytes
+        model_size_change_bytes += serialized_bytes - float_bytes
+
+        # Float temporaries of the (chunked) quantization.
+        tensor_scratch_bytes = 2 * min(float_bytes, _QUANTIZE_CHUNK_BYTES)
+        if stream_quantized_data:
+          tensor_scratch_bytes += tensor_quantized_bytes
+        if quantized_op.algorithm_name == algorithm_manager.AlgorithmName.GPTQ:
+          # A copy of the weights, the quantized weights and the inverse of
+          # the float64 hessian over the input channels.
+          channels = max(int(shape[-1]), 1) if shape else 1
+          tensor_scratch_bytes = (
+              float_bytes + tensor_quantized_bytes + 8 * channels * channels
+          )
+        scratch_bytes = max(scratch_bytes, tensor_scratch_bytes)
+  return quantized_bytes, scratch_bytes, packed_bytes, model_size_change_bytes
+
+
+def estimate_peak_memory(
+    float_model: qtyping.Path | qtyping.BufferType,
+    model_recipe_manager: recipe_manager.RecipeManager,
+    calibration_mode: _CalibrationMode = (
+        _CalibrationMode.CALIBRATION_PRESERVE_ALL_TENSORS
+    ),
+    batch_size: int = 1,
+    num_workers: int = 1,
+    memory_budget_bytes: Optional[int] = None,
+    stream_quantized_data: bool = False,
+) -> MemoryEstimate:
+  """Estimates the peak memory of each phase of a quantization run.
+
+  Args:
+    float_model: The float model path or content.
+    model_recipe_manager: The recipe manager with the quantization recipe.
+    calibration_mode: The calibration mode to estimate. Ignored if the recipe
+      doesn't need calibration.
+    batch_size: The number of samples per calibration invocation.
+    num_workers: The number of calibration workers (see
+      `Calibrator.calibrate_parallel`).
+    memory_budget_bytes: The memory budget of the LAYERWISE calibration mode.
+    stream_quantized_data: Whether the quantized data is streamed to
+      memory-mapped files (see `Quantizer.quantize`).
+
+  Returns:
+    The memory estimate.
+
+  Raises:
+    ValueError: If the calibration mode is not supported, or if `batch_size`
+      or `num_workers` is not positive.
+  """
+  if calibration_mode not in _CALIBRATION_MODES:
+    raise ValueError(f"Unsupported calibration mode: {calibration_mode}.")
+  if batch_size < 1:
+    raise ValueError(f"batch_size must be positive, got {batch_size}.")
+  if num_workers < 1:
+    raise ValueError(f"num_workers must be positive, got {num_workers}.")
+  if isinstance(float_model, (str, os.PathLike)):
+    float_model = tfl_flatbuffer_utils.get_model_content(float_model)
+  model_bytes = len(float_model)  # pyrefly: ignore[bad-argument-type]
+  flatbuffer_model = tfl_flatbuffer_utils.read_model(float_model)
+  quantized_ops = _get_quantized_ops(flatbuffer_model, model_recipe_manager)
+
+  activation_bytes = qsv_bytes = 0
+  if model_recipe_manager.need_calibration():
+    activation_bytes, qsv_bytes = _estimate_calibration(
+        flatbuffer_model,
+        quantized_ops,
+        calibration_mode,
+        batch_size,
+        memory_budget_bytes,
+    )
+    if num_workers > 1:
+      # Each worker process has its own model, activations and QSVs.
+      activation_bytes = num_workers * (
+          model_bytes + activation_bytes + qsv_bytes
+      )
+  else:
+    calibration_mode = None
+
+  quantized_bytes, scratch_bytes, packed_bytes, model_size_change_bytes = (
+      _estimate_params(flatbuffer_model, quantized_ops, stream_quantized_data)
+  )
+  return MemoryEstimate(
+      calibration_mode=calibration_mode,
+      model_bytes=model_bytes,
+      calibration_activation_bytes=activation_bytes,
+      qsv_bytes=qsv_bytes,
+      quantized_params_bytes=quantized_bytes,
+      params_generation_scratch_bytes=scratch_bytes,
+      packed_params_bytes=packed_bytes,
+      serialized_model_bytes=max(model_bytes + model_size_change_bytes, 0),
+      stream_quantized_data=stream_quantized_data,
+  )
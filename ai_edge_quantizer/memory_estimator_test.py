@@ -0,0 +1,234 @@
+# Copyright 2024 The AI Edge Quantizer Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+import pathlib
+
+from absl.testing import absltest
+from absl.testing import parameterized
+
+from ai_edge_quantizer import algorithm_manager
+from ai_edge_quantizer import calibrator
+from ai_edge_quantizer import memory_estimator
+from ai_edge_quantizer import qtyping
+from ai_edge_quantizer import recipe_manager
+from ai_edge_quantizer.utils import test_utils
+
+_CalibrationMode = calibrator.CalibrationMode
+_TFLOpName = qtyping.TFLOperationName
+
+TEST_DATA_PREFIX_PATH = test_utils.get_path_to_datafile(".")
+
+
+def _get_model_path(model_name: str) -> str:
+  return str(pathlib.Path(TEST_DATA_PREFIX_PATH) / "tests/models" / model_name)
+
+
+def _add_static_config(
+    model_recipe_manager: recipe_manager.RecipeManager,
+    algorithm_key: str = algorithm_manager.AlgorithmName.MIN_MAX_UNIFORM_QUANT,
+) -> None:
+  model_recipe_manager.add_static_config(
+      regex=".*",
+      operation_name=_TFLOpName.FULLY_CONNECTED,
+      activation_num_bits=8,
+      weight_num_bits=8,
+      algorithm_key=algorithm_key,
+  )
+
+
+class MemoryEstimatorTest(parameterized.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self._recipe_manager = recipe_manager.RecipeManager()
+
+  def test_estimate_single_fc_static_quantization(self):
+    _add_static_config(self._recipe_manager)
+    estimate = memory_estimator.estimate_peak_memory(
+        _get_model_path("single_fc.tflite"),
+        self._recipe_manager,
+        calibration_mode=_CalibrationMode.CALIBRATION_PROFILER_BASED,
+    )
+
+    # The [1, 8] float input and the [1, 16] float output are alive at once.
+    self.assertEqual(estimate.calibration_activation_bytes, (8 + 16) * 4)
+    # The [16, 8] weight is quantized to int8 and the [16] bias to int32.
+    self.assertEqual(estimate.quantized_params_bytes, 16 * 8 + 16 * 4)
+    self.assertEqual(estimate.packed_params_bytes, 0)
+    self.assertLess(estimate.serialized_model_bytes, estimate.model_bytes)
+    self.assertCountEqual(
+        estimate.phase_peak_bytes,
+        ["calibration", "params_generation", "transformation", "serialization"],
+    )
+    self.assertEqual(
+        estimate.peak_bytes, max(estimate.phase_peak_bytes.values())
+    )
+    self.assertIn("calibration (CALIBRATION_PROFILER_BASED)", str(estimate))
+
+  def test_estimate_calibration_modes(self):
+    _add_static_config(self._recipe_manager)
+    model_path = _get_model_path("conv_fc_mnist.tflite")
+
+    def get_activation_bytes(mode, **kwargs):
+      return memory_estimator.estimate_peak_memory(
+          model_path, self._recipe_manager, calibration_mode=mode, **kwargs
+      ).calibration_activation_bytes
+
+    profiler_bytes = get_activation_bytes(
+        _CalibrationMode.CALIBRATION_PROFILER_BASED
+    )
+    self.assertGreater(profiler_bytes, 0)
+    self.assertGreater(
+        get_activation_bytes(_CalibrationMode.CALIBRATION_PRESERVE_ALL_TENSORS),
+        profiler_bytes,
+    )
+    # No tensor needs to be captured for min/max.
+    self.assertEqual(
+        get_activation_bytes(_CalibrationMode.HYBRID), profiler_bytes
+    )
+    self.assertEqual(
+        get_activation_bytes(
+            _CalibrationMode.CALIBRATION_PROFILER_BASED, batch_size=4
+        ),
+        4 * profiler_bytes,
+    )
+    self.assertGreater(
+        get_activation_bytes(
+            _CalibrationMode.CALIBRATION_PROFILER_BASED, num_workers=2
+        ),
+        2 * profiler_bytes,
+    )
+
+  def test_estimate_gptq(self):
+    _add_static_config(
+        self._recipe_manager, algorithm_manager.AlgorithmName.GPTQ
+    )
+    model_path = _get_model_path("conv_fc_mnist.tflite")
+    profiler_estimate = memory_estimator.estimate_peak_memory(
+        model_path,
+        self._recipe_manager,
+        calibration_mode=_CalibrationMode.CALIBRATION_PROFILER_BASED,
+    )
+    hybrid_estimate = memory_estimator.estimate_peak_memory(
+        model_path,
+        self._recipe_manager,
+        calibration_mode=_CalibrationMode.HYBRID,
+    )
+    layerwise_estimate = memory_estimator.estimate_peak_memory(
+        model_path,
+        self._recipe_manager,
+        calibration_mode=_CalibrationMode.LAYERWISE,
+        memory_budget_bytes=1,
+    )
+
+    # The first FC input has 1568 channels, so its float64 hessian alone takes
+    # 1568 * 1568 * 8 bytes.
+    self.assertGreater(hybrid_estimate.qsv_bytes, 1568 * 1568 * 8)
+    self.assertGreater(
+        hybrid_estimate.params_generation_scratch_bytes, 1568 * 1568 * 8
+    )
+    self.assertGreater(
+        hybrid_estimate.calibration_activation_bytes,
+        profiler_estimate.calibration_activation_bytes,
+    )
+    self.assertLess(
+        layerwise_estimate.calibration_activation_bytes,
+        hybrid_estimate.calibration_activation_bytes,
+    )
+
+  def test_estimate_int4_weight_only_quantization(self):
+    self._recipe_manager.add_weight_only_config(
+        regex=".*", operation_name=_TFLOpName.FULLY_CONNECTED, num_bits=4
+    )
+    estimate = memory_estimator.estimate_peak_memory(
+        _get_model_path("single_fc.tflite"), self._recipe_manager
+    )
+
+    self.assertIsNone(estimate.calibration_mode)
+    self.assertNotIn("calibration", estimate.phase_peak_bytes)
+    self.assertEqual(estimate.calibration_activation_bytes, 0)
+    # The [16, 8] weight is quantized to one byte per element, then packed
+    # to two elements per byte. The bias stays float.
+    self.assertEqual(estimate.quantized_params_bytes, 16 * 8)
+    self.assertEqual(estimate.packed_params_bytes, 16 * 8 // 2)
+    self.assertEqual(
+        estimate.model_bytes - estimate.serialized_model_bytes,
+        16 * 8 * 4 - 16 * 8 // 2,
+    )
+
+  def test_estimate_streamed_quantized_data(self):
+    _add_static_config(self._recipe_manager)
+    model_path = _get_model_path("conv_fc_mnist.tflite")
+    in_memory_estimate = memory_estimator.estimate_peak_memory(
+        model_path, self._recipe_manager
+    )
+    streamed_estimate = memory_estimator.estimate_peak_memory(
+        model_path, self._recipe_manager, stream_quantized_data=True
+    )
+
+    self.assertEqual(
+        streamed_estimate.quantized_params_bytes,
+        in_memory_estimate.quantized_params_bytes,
+    )
+    # The quantized data isn't resident once it has been generated.
+    in_memory_phases = in_memory_estimate.phase_peak_bytes
+    streamed_phases = streamed_estimate.phase_peak_bytes
+    self.assertEqual(
+        in_memory_phases["transformation"] - streamed_phases["transformation"],
+        in_memory_estimate.quantized_params_bytes,
+    )
+    self.assertLess(
+        streamed_phases["params_generation"],
+        in_memory_phases["params_generation"],
+    )
+
+  def test_estimate_from_path_like_model(self):
+    _add_static_config(self._recipe_manager)
+    model_path = _get_model_path("single_fc.tflite")
+    estimate = memory_estimator.estimate_peak_memory(
+        pathlib.Path(model_path), self._recipe_manager
+    )
+
+    self.assertEqual(
+        estimate,
+        memory_estimator.estimate_peak_memory(model_path, self._recipe_manager),
+    )
+
+  @parameterized.named_parameters(
+      dict(
+          testcase_name="inference_mode",
+          kwargs=dict(calibration_mode=_CalibrationMode.INFERENCE),
+          error_regex="Unsupported calibration mode",
+      ),
+      dict(
+          testcase_name="zero_batch_size",
+          kwargs=dict(batch_size=0),
+          error_regex="batch_size must be positive",
+      ),
+      dict(
+          testcase_name="zero_workers",
+          kwargs=dict(num_workers=0),
+          error_regex="num_workers must be positive",
+      ),
+  )
+  def test_invalid_arguments_raise_error(self, kwargs, error_regex):
+    with self.assertRaisesRegex(ValueError, error_regex):
+      memory_estimator.estimate_peak_memory(
+          _get_model_path("single_fc.tflite"), self._recipe_manager, **kwargs
+      )
+
+
+if __name__ == "__main__":
+  absltest.main()
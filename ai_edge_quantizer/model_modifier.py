@@ -17,7 +17,7 @@
 
 import logging
 import mmap
-from typing import TypeVar
+from typing import Optional, TypeVar
 
 import numpy as np
 
@@ -26,6 +26,8 @@ from ai_edge_litert.tools import mmap_utils
 from ai_edge_quantizer import qtyping
 from ai_edge_quantizer import transformation_instruction_generator
 from ai_edge_quantizer import transformation_performer
+from ai_edge_quantizer.transformations import transformation_utils
+from ai_edge_quantizer.utils import model_graph_index
 from ai_edge_quantizer.utils import tfl_flatbuffer_utils
 
 
@@ -38,12 +40,32 @@ def _round_up_16(offset: int) -> int:
   return (offset + 15) & ~15
 
 
+def _get_underlying_view(data: np.ndarray) -> memoryview | None:
+  """Returns the `memoryview` that `data` was created from, if it spans it."""
+  base = data.base
+  while isinstance(base, np.ndarray):
+    base = base.base
+  if (
+      not isinstance(base, memoryview)
+      or not base.contiguous
+      or base.nbytes != data.nbytes
+      or not data.flags.c_contiguous
+  ):
+    return None
+  view = base.cast("B")
+  if np.frombuffer(view, dtype=np.uint8).ctypes.data != data.ctypes.data:
+    return None
+  return view
+
+
 class _PackedBufferData:
   """Holds a `ModelT`'s buffer data for packing."""
 
   data_size: int
   packed_size: int
-  data_for_buffer_id: dict[int, memoryview]
+  data_for_buffer_id: dict[
+      int, memoryview | transformation_utils.LazyBufferData
+  ]
 
   def __init__(self, model: qtyping.ModelT, min_size_bytes: int = 1024):
     self.data_for_buffer_id = {}
@@ -51,11 +73,18 @@ class _PackedBufferData:
     self.packed_size = 0
     for buffer_id, buffer in enumerate(model.buffers):
       if buffer.data is not None and min_size_bytes <= len(buffer.data):
-        # Convert the buffer data to a `memoryview` of its bytes.
         buffer_data = buffer.data
-        if not isinstance(buffer_data, np.ndarray):
-          buffer_data = np.array(buffer_data, dtype=np.uint8)
-        buffer_data = memoryview(np.ravel(buffer_data).view(np.uint8))
+        # Lazy data is kept as is, and only computed when it is packed.
+        if not isinstance(buffer_data, transformation_utils.LazyBufferData):
+          # Convert the buffer data to a `memoryview` of its bytes.
+          if not isinstance(buffer_data, np.ndarray):
+            buffer_data = np.array(buffer_data, dtype=np.uint8)
+          # Keep the view of the underlying (e.g., memory-mapped) buffer if
+          # any, so that its pages can be released once packed.
+          if (mapped_data := _get_underlying_view(buffer_data)) is not None:
+            buffer_data = mapped_data
+          else:
+            buffer_data = memoryview(np.ravel(buffer_data).view(np.uint8))
 
         # Add this buffer to the list of buffers.
         self.data_for_buffer_id[buffer_id] = buffer_data
@@ -70,6 +99,13 @@ class _PackedBufferData:
     )
 
 
+def _materialize_lazy_buffers(model: qtyping.ModelT) -> None:
+  """Computes the data of the buffers holding `LazyBufferData`, in place."""
+  for buffer in model.buffers:
+    if isinstance(buffer.data, transformation_utils.LazyBufferData):
+      buffer.data = buffer.data.materialize()
+
+
 T = TypeVar("T")
 
 
@@ -102,13 +138,22 @@ def _copy_with_views(value: T) -> T:
 class ModelModifier:
   """Model Modifier class that produce the final quantized TFlite model."""
 
-  def __init__(self, float_model: qtyping.ModelT):
+  def __init__(
+      self,
+      float_model: qtyping.ModelT,
+      graph_index: Optional[model_graph_index.ModelGraphIndex] = None,
+  ):
     """Constructor.
 
     Args:
       float_model: the original TFlite model.
+      graph_index: the index of the graph of `float_model`, if shared with
+        other stages. Built from `float_model` otherwise.
     """
     self._model: qtyping.ModelT = float_model
+    if graph_index is None:
+      graph_index = model_graph_index.ModelGraphIndex(float_model)
+    self._graph_index = graph_index
 
     self._transformation_instruction_generator = (
         transformation_instruction_generator.TransformationInstructionsGenerator()
@@ -117,12 +162,8 @@ class ModelModifier:
         transformation_performer.TransformationPerformer()
     )
 
-  def _get_tensor_processing_order(
-      self,
-      tensor_names: set[str],
-      flatbuffer_model: qtyping.ModelT,
-  ) -> list[str]:
-    """Get the tensor processing order obtained from `buffer_to_tensors`.
+  def _get_tensor_processing_order(self, tensor_names: set[str]) -> list[str]:
+    """Get the tensor processing order obtained from the buffer tensors.
 
     The processing order is used to ensure that last tensor in a buffer is
     processed the last. This is required for the correctness of buffer
@@ -130,17 +171,16 @@ class ModelModifier:
 
     Args:
       tensor_names: Names of the tensors that need to be processed.
-      flatbuffer_model: TFlite model.
 
     Returns:
       A list of tensor names in the processing order.
     """
-    buffer_to_tensors = tfl_flatbuffer_utils.buffer_to_tensors(flatbuffer_model)
+    buffer_to_tensor_ids = self._graph_index.get_buffer_to_tensor_ids()
 
     processing_order = []
-    for buffer_tensors in buffer_to_tensors.values():
-      for tensor in buffer_tensors:
-        tensor_name = tfl_flatbuffer_utils.get_tensor_name(tensor)
+    for buffer_tensor_ids in buffer_to_tensor_ids.values():
+      for subgraph_id, tensor_id in buffer_tensor_ids:
+        tensor_name = self._graph_index.get_tensor_name(subgraph_id, tensor_id)
         if tensor_name in tensor_names:
           processing_order.append(tensor_name)
 
@@ -168,12 +208,13 @@ class ModelModifier:
     # Make a copy of the model, but don't duplicate the buffer data.
     quantized_model = _copy_with_views(self._model)
 
+    # The index of the float model holds for its copy, until it is transformed.
     instructions = self._transformation_instruction_generator.quant_params_to_transformation_insts(
-        params, quantized_model, enable_progress_bar
+        params, quantized_model, enable_progress_bar, self._graph_index
     )
 
     tensor_processing_order = self._get_tensor_processing_order(
-        set(instructions.keys()), quantized_model
+        set(instructions.keys())
     )
 
     self._transformation_performer.transform_graph(
@@ -202,6 +243,7 @@ class ModelModifier:
     logging.info("Serializing model...")
     packed_buffer_data = _PackedBufferData(quantized_model)
     if packed_buffer_data.packed_size < 256 * 1024:
+      _materialize_lazy_buffers(quantized_model)
       serialized_quantized_model = self._serialize_small_model(quantized_model)
       if serialize_to_path:
         mmap_utils.set_file_contents(
@@ -311,6 +353,7 @@ class ModelModifier:
         buffer.data = None
         buffer.offset = 1
         buffer.size = 1
+    _materialize_lazy_buffers(quantized_model)
 
     # Serialize the model.
     model_buffer = flatbuffer_utils.convert_object_to_bytearray(quantized_model)
@@ -358,13 +401,16 @@ class ModelModifier:
       )
 
       # Pack the buffer at the end of the model_buffer.
-      model_buffer[
-          buffer_data_offset : buffer_data_offset + len(buffer_data)
-      ] = memoryview(buffer_data)
+      if isinstance(buffer_data, transformation_utils.LazyBufferData):
+        buffer_data.write_to(model_buffer, buffer_data_offset)
+      else:
+        model_buffer[
+            buffer_data_offset : buffer_data_offset + len(buffer_data)
+        ] = memoryview(buffer_data)
+        mmap_utils.advise_dont_need(buffer_data)
 
       # Increment the offset by the amount of data that we added, plus padding.
       buffer_data_offset = _round_up_16(buffer_data_offset + len(buffer_data))
-      mmap_utils.advise_dont_need(buffer_data)
       if isinstance(model_buffer, mmap.mmap):
         mmap_utils.advise_dont_need(model_buffer, 0, buffer_data_offset)
 
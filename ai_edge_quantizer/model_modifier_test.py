@@ -16,12 +16,15 @@
 """Tests for the ModelModifier class."""
 
 import gc
+import mmap
 import pathlib
 import tempfile
 import tracemalloc
+from unittest import mock
 
 from absl.testing import absltest
 from absl.testing import parameterized
+import numpy as np
 
 import os
 import io
@@ -31,6 +34,8 @@ from ai_edge_quantizer import model_modifier
 from ai_edge_quantizer import params_generator
 from ai_edge_quantizer import qtyping
 from ai_edge_quantizer import recipe_manager
+from ai_edge_quantizer.transformations import transformation_utils
+from ai_edge_quantizer.utils import quantized_data_store
 from ai_edge_quantizer.utils import test_utils
 from ai_edge_quantizer.utils import tfl_flatbuffer_utils
 
@@ -81,6 +86,19 @@ class ModelModifierTestSmallModel(BaseModelModifierTest):
         packed_buffer_data.packed_size, self._packed_buffer_data_size
     )
 
+  def test_pack_buffer_data_keeps_mapped_views(self):
+    store = quantized_data_store.QuantizedDataStore(
+        self.create_tempdir().full_path
+    )
+    data = np.arange(2048, dtype=np.int8)
+    self._model.buffers[1].data = store.store(data)
+    packed_buffer_data = model_modifier._PackedBufferData(self._model)
+    buffer_data = packed_buffer_data.data_for_buffer_id[1]
+    # The packed data is a view of the store's memory-mapped file, so that its
+    # pages can be released once serialized.
+    self.assertIsInstance(buffer_data.obj, mmap.mmap)
+    self.assertEqual(bytes(buffer_data), data.tobytes())
+
   def test_modify_model_succeeds_with_recipe(self):
     recipe_manager_instance = recipe_manager.RecipeManager()
     params_generator_instance = params_generator.ParamsGenerator(self._model)
@@ -118,6 +136,29 @@ class ModelModifierTestSmallModel(BaseModelModifierTest):
     self.assertTrue(os.path.exists(path))
     self.assertEqual(serialized_model, mmap_utils.get_file_contents(path))
 
+  def test_modify_model_with_deferred_quantized_data_matches_eager(self):
+    recipe_manager_instance = recipe_manager.RecipeManager()
+    recipe_manager_instance.load_quantization_recipe(self._global_recipe)
+    eager_params = params_generator.ParamsGenerator(
+        self._model
+    ).generate_quantization_parameters(recipe_manager_instance)
+    deferred_params = params_generator.ParamsGenerator(
+        self._model, defer_quantized_data=True
+    ).generate_quantization_parameters(recipe_manager_instance)
+
+    with mock.patch.object(
+        transformation_utils.LazyBufferData,
+        'write_to',
+        autospec=True,
+        side_effect=transformation_utils.LazyBufferData.write_to,
+    ) as mock_write_to:
+      deferred_model = self._model_modifier.modify_model(deferred_params)
+    # The weights are quantized when the model is serialized.
+    mock_write_to.assert_called()
+    self.assertEqual(
+        deferred_model, self._model_modifier.modify_model(eager_params)
+    )
+
   def test_modify_model_preserves_original_model(self):
     recipe_manager_instance = recipe_manager.RecipeManager()
     params_generator_instance = params_generator.ParamsGenerator(self._model)
@@ -15,7 +15,8 @@
 
 """function for validating output models."""
 
-from collections.abc import Callable, Iterable, Sequence
+from collections.abc import Callable, Iterable, Iterator, Sequence
+import contextlib
 import dataclasses
 import json
 import math
@@ -26,6 +27,8 @@ import numpy as np
 
 import os
 import io
+from ai_edge_quantizer.utils import activation_cache as activation_cache_lib
+from ai_edge_quantizer.utils import prefetch_utils
 from ai_edge_quantizer.utils import tfl_interpreter_utils as utils
 from ai_edge_quantizer.utils import validation_utils
 
@@ -60,14 +63,19 @@ class ComparisonResult:
     comparison_results: A dictionary of signature key and its comparison result.
   """
 
-  def __init__(self, reference_model: bytes, target_model: bytes):
+  def __init__(
+      self,
+      reference_model: Union[str, bytes],
+      target_model: Union[str, bytes],
+  ):
     """Initialize the ComparisonResult object.
 
     Args:
-      reference_model: Model which will be used as the reference.
-      target_model: Target model which will be compared against the reference.
-        We expect target_model and reference_model to have the same graph
-        structure.
+      reference_model: Model path or bytes, which will be used as the
+        reference.
+      target_model: Model path or bytes, which will be compared against the
+        reference. We expect target_model and reference_model to have the same
+        graph structure.
     """
     self._reference_model = reference_model
     self._target_model = target_model
@@ -142,10 +150,12 @@ class ComparisonResult:
           input_tensor_results[name] = result.pop(name)
 
       # Only get constant tensors from the main subgraph of the signature.
-      subgraph_index = utils.get_signature_main_subgraph_index(
-          utils.create_tfl_interpreter(self._reference_model),
-          signature_key,
-      )
+      with utils.borrow_tfl_interpreter(
+          self._reference_model, allocate_tensors=False
+      ) as interpreter:
+        subgraph_index = utils.get_signature_main_subgraph_index(
+            interpreter, signature_key
+        )
       for name in utils.get_constant_tensor_names(
           self._reference_model,
           subgraph_index,
@@ -177,8 +187,11 @@ class ComparisonResult:
 
   def get_model_size_reduction(self) -> tuple[int, float]:
     """Get the model size reduction in bytes and percentage."""
-    reduced_model_size = len(self._reference_model) - len(self._target_model)
-    reduction_perc = reduced_model_size / len(self._reference_model) * 100
+    reference_model_size = utils.get_model_size(self._reference_model)
+    reduced_model_size = reference_model_size - utils.get_model_size(
+        self._target_model
+    )
+    reduction_perc = reduced_model_size / reference_model_size * 100
     return reduced_model_size, reduction_perc
 
   def save(self, save_folder: str, model_name: str) -> None:
@@ -234,34 +247,23 @@ class ComparisonResult:
 
 
 def _setup_validation_interpreter(
-    model: bytes,
+    interpreter: Any,
     signature_input: dict[str, Any],
     signature_key: Optional[str],
-    use_xnnpack: bool,
-    num_threads: int,
-    preserve_all_tensors: bool = True,
-) -> tuple[Any, int, dict[str, Any]]:
-  """Setup the interpreter for validation given a signature key.
+) -> tuple[int, dict[str, Any]]:
+  """Invokes the interpreter for validation given a signature key.
 
   Args:
-    model: The model to be validated.
+    interpreter: The interpreter of the model to be validated. Its variables
+      are reset first, so that each sample is validated on its own.
     signature_input: A dictionary of input tensor name and its value.
     signature_key: The signature key to be used for invoking the models. If the
       model only has one signature, this can be set to None.
-    use_xnnpack: Whether to use xnnpack for the interpreter.
-    num_threads: The number of threads to use for the interpreter.
-    preserve_all_tensors: Whether to preserve all tensors.
 
   Returns:
-    A tuple of interpreter, subgraph_index and tensor_name_to_details.
+    A tuple of subgraph_index and tensor_name_to_details.
   """
-
-  interpreter = utils.create_tfl_interpreter(
-      tflite_model=model,
-      use_xnnpack=use_xnnpack,
-      num_threads=num_threads,
-      preserve_all_tensors=preserve_all_tensors,
-  )
+  interpreter.reset_all_variables()
   utils.invoke_interpreter_signature(
       interpreter, signature_input, signature_key
   )
@@ -273,13 +275,43 @@ def _setup_validation_interpreter(
       interpreter,
       subgraph_index,
   )
-  return interpreter, subgraph_index, tensor_name_to_details
+  return subgraph_index, tensor_name_to_details
+
+
+def _read_tensors(
+    interpreter: Any,
+    subgraph_index: int,
+    tensor_name_to_details: dict[str, Any],
+    tensor_names: Sequence[str],
+) -> Iterator[tuple[str, Any]]:
+  """Reads the tensors to compare from an invoked interpreter, one at a time.
+
+  Args:
+    interpreter: The invoked interpreter.
+    subgraph_index: The index of the subgraph of the tensors.
+    tensor_name_to_details: Tensor name to its details in the subgraph.
+    tensor_names: The names of the tensors to read.
+
+  Yields:
+    Tensor name and (dequantized) tensor data, skipping the string tensors and
+    the empty tensors, which can't be compared.
+  """
+  for tensor_name in tensor_names:
+    detail = tensor_name_to_details[tensor_name]
+    if detail['dtype'] == np.object_:
+      continue
+    # Ignore tensors where any dimension of the shape is 0.
+    if not np.all(detail['shape']):
+      continue
+    yield tensor_name, utils.get_tensor_data(
+        interpreter, detail, subgraph_index
+    )
 
 
 # TODO: b/330797129 - Enable multi-threaded evaluation.
 def compare_model(
-    reference_model: bytes,
-    target_model: bytes,
+    reference_model: Union[str, bytes],
+    target_model: Union[str, bytes],
     test_data: dict[str, Iterable[dict[str, Any]]],
     error_metrics: Optional[
         Sequence[validation_utils.ValidationErrorMetric]
@@ -288,6 +320,8 @@ def compare_model(
     use_xnnpack: bool = True,
     num_threads: int = 16,
     validate_output_tensors_only: bool = False,
+    prefetch_depth: int = 0,
+    activation_cache: Optional[activation_cache_lib.ActivationCache] = None,
 ) -> ComparisonResult:
   """Compares model tensors over a model signature using comparison functions.
 
@@ -296,10 +330,11 @@ def compare_model(
   difference).
 
   Args:
-    reference_model: Model which will be used as the reference
-    target_model: Target model which will be compared against the reference. We
-      expect reference_model and target_model have the inputs and outputs
-      signature.
+    reference_model: Model path or bytes, which will be used as the reference.
+      Passing the path keeps the model file-backed in the interpreters.
+    target_model: Target model path or bytes, which will be compared against
+      the reference. We expect reference_model and target_model have the
+      inputs and outputs signature.
     test_data: A mapping from the model's signature keys to their corresponding
       datasets. Each dataset is an iterable of samples, where a sample is a
       dictionary mapping the input tensor name to its data (e.g., numpy array).
@@ -316,6 +351,15 @@ def compare_model(
     num_threads: The number of threads to use for the interpreter.
     validate_output_tensors_only: If True, only compare output tensors.
       Otherwise, compare all tensors.
+    prefetch_depth: If positive, the samples are read from the datasets by a
+      background thread, up to `prefetch_depth` samples ahead of the
+      comparison, so that producing them overlaps with running the models.
+      Datasets can then also be async iterables.
+    activation_cache: If set, the reference model tensors of each sample are
+      read from the cache instead of invoking the reference model when they
+      have been cached (e.g., by the validation of another target model, or
+      by the calibration), and are cached otherwise. Must not be used with
+      stateful signatures.
 
   Returns:
     A ComparisonResult object containing the combined comparison results.
@@ -337,75 +381,140 @@ def compare_model(
   preserve_all_tensors = not validate_output_tensors_only
   model_comparison_result = ComparisonResult(reference_model, target_model)
 
-  for signature_key, signature_inputs in test_data.items():
-    comparison_results = {metric: {} for metric in error_metrics}
-    for signature_input in signature_inputs:
-      # Invoke the signature on both interpreters.
-      ref_interpreter, ref_subgraph_index, ref_tensor_name_to_details = (
-          _setup_validation_interpreter(
-              reference_model,
-              signature_input,
-              signature_key,
-              use_xnnpack,
-              num_threads,
-              preserve_all_tensors=preserve_all_tensors,
-          )
-      )
-      targ_interpreter, targ_subgraph_index, targ_tensor_name_to_details = (
-          _setup_validation_interpreter(
-              target_model,
-              signature_input,
-              signature_key,
-              use_xnnpack,
-              num_threads,
-              preserve_all_tensors=preserve_all_tensors,
-          )
-      )
-      # Compare the cached tensor value
-      tensor_names_to_compare = (
-          utils.get_output_tensor_names(reference_model, signature_key)
-          if validate_output_tensors_only
-          else list(ref_tensor_name_to_details.keys())
-      )
+  reference_model_hash = None
+  if activation_cache is not None:
+    reference_model_hash = activation_cache_lib.get_model_hash(reference_model)
 
-      for tensor_name in tensor_names_to_compare:
-        detail = ref_tensor_name_to_details[tensor_name]
-        if detail['dtype'] == np.object_:
-          continue
-        # Ignore tensors where any dimension of the shape is 0.
-        if not np.all(detail['shape']):
-          continue
-        if tensor_name in targ_tensor_name_to_details:
-          reference_data = utils.get_tensor_data(
-              ref_interpreter, detail, ref_subgraph_index
-          )
-          target_data = utils.get_tensor_data(
-              targ_interpreter,
-              targ_tensor_name_to_details[tensor_name],
-              targ_subgraph_index,
+  # The interpreters are borrowed from the interpreter pool once for all the
+  # samples, the reference one only if a sample is not in the activation cache.
+  interpreter_options = dict(
+      use_xnnpack=use_xnnpack,
+      num_threads=num_threads,
+      preserve_all_tensors=preserve_all_tensors,
+  )
+  with contextlib.ExitStack() as interpreters:
+    targ_interpreter = interpreters.enter_context(
+        utils.borrow_tfl_interpreter(target_model, **interpreter_options)
+    )
+    ref_interpreter = None
+    for signature_key, signature_inputs in test_data.items():
+      comparison_results = {metric: {} for metric in error_metrics}
+      output_tensor_names = utils.get_output_tensor_names(
+          reference_model, signature_key
+      )
+      with prefetch_utils.prefetch(
+          signature_inputs, prefetch_depth
+      ) as prefetched_inputs:
+        for signature_input in prefetched_inputs:
+          # Invoke the signature on both interpreters, unless the reference
+          # tensors are in the activation cache.
+          targ_subgraph_index, targ_tensor_name_to_details = (
+              _setup_validation_interpreter(
+                  targ_interpreter, signature_input, signature_key
+              )
           )
-          for metric, fn in zip(error_metrics, compare_fns):
-            if tensor_name not in comparison_results[metric]:
-              comparison_results[metric][tensor_name] = []
-            comparison_results[metric][tensor_name].append(
-                fn(target_data, reference_data)
+          reference_tensors = None
+          cache_key = None
+          if activation_cache is not None:
+            cache_key = (
+                reference_model_hash,
+                signature_key,
+                activation_cache_lib.get_sample_id(signature_input),
+            )
+            cached_tensors = activation_cache.get(*cache_key)
+            if cached_tensors is not None and (
+                cached_tensors.covers(output_tensor_names)
+                if validate_output_tensors_only
+                else cached_tensors.complete
+            ):
+              reference_tensors = cached_tensors
+          if reference_tensors is None:
+            if ref_interpreter is None:
+              ref_interpreter = interpreters.enter_context(
+                  utils.borrow_tfl_interpreter(
+                      reference_model, **interpreter_options
+                  )
+              )
+            ref_subgraph_index, ref_tensor_name_to_details = (
+                _setup_validation_interpreter(
+                    ref_interpreter, signature_input, signature_key
+                )
+            )
+            tensor_names_to_read = (
+                output_tensor_names
+                if validate_output_tensors_only
+                else list(ref_tensor_name_to_details.keys())
+            )
+            if cache_key is None:
+              # Only the tensors that are compared need to be read.
+              tensor_names_to_read = [
+                  tensor_name
+                  for tensor_name in tensor_names_to_read
+                  if tensor_name in targ_tensor_name_to_details
+              ]
+            reference_tensor_items = _read_tensors(
+                ref_interpreter,
+                ref_subgraph_index,
+                ref_tensor_name_to_details,
+                tensor_names_to_read,
+            )
+            if activation_cache is not None and cache_key is not None:
+              # All the tensors are needed at once to be cached.
+              reference_tensors = dict(reference_tensor_items)
+              activation_cache.put(
+                  *cache_key,
+                  tensors=reference_tensors,
+                  tensor_names=tensor_names_to_read,
+                  complete=not validate_output_tensors_only,
+              )
+          if reference_tensors is not None:
+            # Compare the cached tensor values.
+            tensor_names_to_compare = (
+                output_tensor_names
+                if validate_output_tensors_only
+                else list(reference_tensors)
+            )
+            reference_tensor_items = (
+                (tensor_name, reference_tensors[tensor_name])
+                for tensor_name in tensor_names_to_compare
+                if tensor_name in reference_tensors
             )
 
-    aggregated_results = {}
-    if error_metrics:
-      for tensor_name in comparison_results[error_metrics[0]].keys():
-        aggregated_results[tensor_name] = {}
-        for metric in error_metrics:
-          aggregated_results[tensor_name][metric.value] = float(
-              np.mean(comparison_results[metric][tensor_name])
-          )
+          # Without a cache, the reference tensors are read and compared one at
+          # a time.
+          for tensor_name, reference_data in reference_tensor_items:
+            if tensor_name in targ_tensor_name_to_details:
+              if not reference_data.flags.writeable:
+                # The comparison functions may modify their inputs in place, and
+                # the cached tensors are read-only.
+                reference_data = reference_data.copy()
+              target_data = utils.get_tensor_data(
+                  targ_interpreter,
+                  targ_tensor_name_to_details[tensor_name],
+                  targ_subgraph_index,
+              )
+              for metric, fn in zip(error_metrics, compare_fns):
+                if tensor_name not in comparison_results[metric]:
+                  comparison_results[metric][tensor_name] = []
+                comparison_results[metric][tensor_name].append(
+                    fn(target_data, reference_data)
+                )
+
+      aggregated_results = {}
+      if error_metrics:
+        for tensor_name in comparison_results[error_metrics[0]].keys():
+          aggregated_results[tensor_name] = {}
+          for metric in error_metrics:
+            aggregated_results[tensor_name][metric.value] = float(
+                np.mean(comparison_results[metric][tensor_name])
+            )
 
-    model_comparison_result.add_new_signature_results(
-        error_metrics,
-        aggregated_results,
-        signature_key,
-        validate_output_tensors_only,
-    )
+      model_comparison_result.add_new_signature_results(
+          error_metrics,
+          aggregated_results,
+          signature_key,
+          validate_output_tensors_only,
+      )
   return model_comparison_result
 
 
@@ -15,6 +15,7 @@
 
 import json
 import pathlib
+from unittest import mock
 
 from absl import flags
 from absl.testing import absltest
@@ -23,6 +24,7 @@ import numpy as np
 import os
 import io
 from ai_edge_quantizer import model_validator
+from ai_edge_quantizer.utils import activation_cache
 from ai_edge_quantizer.utils import test_utils
 from ai_edge_quantizer.utils import tfl_flatbuffer_utils
 from ai_edge_quantizer.utils import tfl_interpreter_utils
@@ -281,6 +283,113 @@ class ModelValidatorCompareTest(absltest.TestCase):
     self.assertAlmostEqual(constant_tensors['arith.constant1']['mse'], 0)
     self.assertLess(output_tensors['StatefulPartitionedCall:0']['mse'], 1e-5)
 
+  def test_model_validator_compare_with_prefetch(self):
+    error_metrics = [validation_utils.ValidationErrorMetric.MSE]
+    expected_result = model_validator.compare_model(
+        self.reference_model,  # pyrefly: ignore[bad-argument-type]
+        self.target_model,  # pyrefly: ignore[bad-argument-type]
+        self.test_data,  # pyrefly: ignore[bad-argument-type]
+        error_metrics=error_metrics,
+    )
+
+    async def async_samples(samples):
+      for sample in samples:
+        yield sample
+
+    comparison_result = model_validator.compare_model(
+        self.reference_model,  # pyrefly: ignore[bad-argument-type]
+        self.target_model,  # pyrefly: ignore[bad-argument-type]
+        {
+            key: async_samples(samples)
+            for key, samples in self.test_data.items()
+        },  # pyrefly: ignore[bad-argument-type]
+        error_metrics=error_metrics,
+        prefetch_depth=2,
+    )
+    self.assertEqual(
+        comparison_result.get_all_tensor_results(),
+        expected_result.get_all_tensor_results(),
+    )
+
+  def test_model_validator_compare_reads_one_tensor_at_a_time(self):
+    events = []
+    get_tensor_data = tfl_interpreter_utils.get_tensor_data
+
+    def read_tensor(*args):
+      events.append('read')
+      return get_tensor_data(*args)
+
+    def compare(target_data, reference_data):
+      events.append('compare')
+      return validation_utils.mean_squared_difference(
+          target_data, reference_data
+      )
+
+    with mock.patch.object(
+        tfl_interpreter_utils, 'get_tensor_data', side_effect=read_tensor
+    ):
+      model_validator.compare_model(
+          self.reference_model,  # pyrefly: ignore[bad-argument-type]
+          self.target_model,  # pyrefly: ignore[bad-argument-type]
+          self.test_data,  # pyrefly: ignore[bad-argument-type]
+          error_metrics=[validation_utils.ValidationErrorMetric.MSE],
+          compare_fns=[compare],
+      )
+    # Without an activation cache, each reference tensor is compared with its
+    # target tensor before the next one is read. The constant tensors are read
+    # again once all are compared, to classify the results.
+    self.assertIn('compare', events)
+    num_events = len(events) - events[::-1].index('compare')
+    self.assertEqual(
+        events[:num_events], ['read', 'read', 'compare'] * (num_events // 3)
+    )
+
+  def test_model_validator_compare_with_activation_cache(self):
+    error_metrics = [validation_utils.ValidationErrorMetric.MSE]
+    cache = activation_cache.ActivationCache(self.create_tempdir().full_path)
+    expected_result = model_validator.compare_model(
+        self.reference_model,  # pyrefly: ignore[bad-argument-type]
+        self.target_model,  # pyrefly: ignore[bad-argument-type]
+        self.test_data,  # pyrefly: ignore[bad-argument-type]
+        error_metrics=error_metrics,
+        activation_cache=cache,
+    )
+    num_samples = len(self.test_data[self.signature_key])
+    self.assertLen(cache, num_samples)
+
+    # The second comparison only invokes the target model, for both the
+    # complete and the output only comparisons.
+    for validate_output_tensors_only in (False, True):
+      with mock.patch.object(
+          model_validator,
+          '_setup_validation_interpreter',
+          wraps=model_validator._setup_validation_interpreter,
+      ) as mock_setup:
+        comparison_result = model_validator.compare_model(
+            self.reference_model,  # pyrefly: ignore[bad-argument-type]
+            self.target_model,  # pyrefly: ignore[bad-argument-type]
+            self.test_data,  # pyrefly: ignore[bad-argument-type]
+            error_metrics=error_metrics,
+            validate_output_tensors_only=validate_output_tensors_only,
+            activation_cache=cache,
+        )
+      # A single interpreter, the target model one, is invoked per sample.
+      self.assertEqual(mock_setup.call_count, num_samples)
+      self.assertLen(
+          {id(call.args[0]) for call in mock_setup.call_args_list}, 1
+      )
+      if not validate_output_tensors_only:
+        self.assertEqual(
+            comparison_result.get_all_tensor_results(),
+            expected_result.get_all_tensor_results(),
+        )
+    self.assertLess(
+        comparison_result.get_all_tensor_results()[
+            'StatefulPartitionedCall:0'
+        ]['mse'],
+        1e-5,
+    )
+
   def test_model_validator_compare_validate_output_tensors_only(self):
     error_metrics = [validation_utils.ValidationErrorMetric.MSE]
     comparison_result = model_validator.compare_model(
@@ -15,8 +15,12 @@
 
 """Generate model tensor level quantization config."""
 
-from collections.abc import Sequence
+from collections.abc import Callable, Sequence
+from concurrent import futures
+import contextlib
 import copy
+import dataclasses
+import functools
 from typing import Any, Optional
 import warnings
 
@@ -26,18 +30,98 @@ from ai_edge_quantizer import default_policy as policy
 from ai_edge_quantizer import qtyping
 from ai_edge_quantizer import recipe_manager
 from ai_edge_quantizer.algorithms.utils import common_utils
+from ai_edge_quantizer.utils import model_graph_index
 from ai_edge_quantizer.utils import progress_utils
+from ai_edge_quantizer.utils import quant_params_cache as quant_params_cache_lib
+from ai_edge_quantizer.utils import quantized_data_store as quantized_data_store_lib
 from ai_edge_quantizer.utils import tfl_flatbuffer_utils
 
 _QuantTrans = qtyping.QuantTransformation
 _OpName = qtyping.TFLOperationName
 
 
+@dataclasses.dataclass(frozen=True)
+class _OpTask:
+  """The generation of the quantization parameters of an op.
+
+  Attributes:
+    buffer_indices: The indices of the buffers of the op's constant inputs.
+    results: The op's quantization params, if known without materializing.
+    materialize: Materializes the op's quantization params otherwise.
+    op_digest: The digest of the op context keying the persistent cache, if
+      any.
+    algorithm_name: The algorithm resolved for the op, recorded in its
+      `OpQuantResults`. None for the ops not quantized by an algorithm.
+    op_quant_config: The quantization config resolved for the op, recorded
+      with `algorithm_name`.
+  """
+
+  buffer_indices: tuple[int, ...]
+  results: Optional[list[qtyping.TensorTransformationParams]] = None
+  materialize: Optional[
+      Callable[[], list[qtyping.TensorTransformationParams]]
+  ] = None
+  op_digest: Optional[str] = None
+  algorithm_name: Optional[str] = None
+  op_quant_config: Optional[qtyping.OpQuantizationConfig] = None
+
+
+@dataclasses.dataclass(frozen=True)
+class OpQuantResults:
+  """The quantization parameters generated for an op by an algorithm.
+
+  Attributes:
+    algorithm_name: The algorithm resolved for the op.
+    op_quant_config: The quantization config resolved for the op.
+    results: The tensor quantization params of the op, before they are merged
+      into the model results.
+  """
+
+  algorithm_name: str
+  op_quant_config: qtyping.OpQuantizationConfig
+  results: list[qtyping.TensorTransformationParams]
+
+
 class ParamsGenerator:
   """Generate model tensor level quantization parameters."""
 
-  def __init__(self, float_tflite: qtyping.ModelT):
+  def __init__(
+      self,
+      float_tflite: qtyping.ModelT,
+      quant_params_cache: Optional[quant_params_cache_lib.QuantParamsCache] = (
+          None
+      ),
+      graph_index: Optional[model_graph_index.ModelGraphIndex] = None,
+      quantized_data_store: Optional[
+          quantized_data_store_lib.QuantizedDataStore
+      ] = None,
+      defer_quantized_data: bool = False,
+  ):
+    """Initializes the params generator.
+
+    Args:
+      float_tflite: The float model.
+      quant_params_cache: An optional persistent cache of the quantization
+        parameters of the weights, reused across runs and models.
+      graph_index: The index of the graph of `float_tflite`, if shared with
+        other stages. Built from `float_tflite` otherwise.
+      quantized_data_store: If set, the quantized data of the weights is moved
+        to this store as soon as it is computed, so that it doesn't stay
+        resident until the model is serialized.
+      defer_quantized_data: Whether the algorithms supporting it may defer the
+        quantization of the weights until the model is serialized (see
+        `qtyping.LazyQuantizedData`). Ignored if `quant_params_cache` is set,
+        since the cache stores the quantized data when it is generated.
+    """
     self.float_model: qtyping.ModelT = float_tflite
+    # Deferring the data would only move its quantization into the cache
+    # insertion, which needs the whole data at once.
+    self._defer_quantized_data = (
+        defer_quantized_data and quant_params_cache is None
+    )
+    if graph_index is None:
+      graph_index = model_graph_index.ModelGraphIndex(float_tflite)
+    self._graph_index = graph_index
 
     if not tfl_flatbuffer_utils.is_float_model(self.float_model):
       warnings.warn(
@@ -48,10 +132,24 @@ class ParamsGenerator:
 
     self._check_tensor_names_are_unique()
     self.buffer_to_tensors: dict[int, list[Any]] = (
-        tfl_flatbuffer_utils.buffer_to_tensors(self.float_model)
+        self._graph_index.get_buffer_to_tensors()
     )
     self.model_quant_results: dict[str, qtyping.TensorTransformationParams] = {}
-    self._tensor_quant_params_cache = common_utils.TensorQuantParamsCache()
+    # The results of the ops quantized by an algorithm, in the op order (None
+    # for the other ops), reusable by later runs on the same model.
+    self.op_quant_results: list[Optional[OpQuantResults]] = []
+    if quant_params_cache is None:
+      self._tensor_quant_params_cache = common_utils.TensorQuantParamsCache(
+          quantized_data_store
+      )
+    else:
+      self._tensor_quant_params_cache = (
+          quant_params_cache_lib.PersistentTensorQuantParamsCache(
+              quant_params_cache,
+              self.float_model.buffers,
+              quantized_data_store,
+          )
+      )
 
   def _get_total_operations(self) -> int:
     """Returns the total number of operations.
@@ -71,6 +169,10 @@ class ParamsGenerator:
       model_recipe_manager: recipe_manager.RecipeManager,
       model_qsvs: Optional[dict[str, qtyping.QSV]] = None,
       enable_progress_bar: bool | None = None,
+      num_workers: int = 1,
+      reusable_op_quant_results: Optional[
+          Sequence[Optional[OpQuantResults]]
+      ] = None,
   ) -> dict[str, qtyping.TensorTransformationParams]:
     """Generate the quantization parameters for the model.
 
@@ -80,12 +182,21 @@ class ParamsGenerator:
         obtained through calibration process.
       enable_progress_bar: Whether to enable the progress bar. By default, it is
         disabled for smaller models and enabled for larger models.
+      num_workers: The number of threads materializing the quantization
+        parameters of the ops. Algorithms spend most of their time in NumPy,
+        which releases the GIL, so independent ops are materialized
+        concurrently. The results are the same as with a single worker.
+      reusable_op_quant_results: The `op_quant_results` of a previous run on
+        the same model with the same QSVs. The results of the ops whose
+        resolved algorithm and config did not change are reused instead of
+        being materialized again.
 
     Returns:
       model_quant_results: The quantization parameters for tensors in the model.
 
     Raises:
       RuntimeError: If the calibration dataset is required but not provided.
+      ValueError: If `num_workers` is not positive.
     """
     if model_recipe_manager.need_calibration() and not model_qsvs:
       raise RuntimeError(
@@ -93,110 +204,232 @@ class ParamsGenerator:
           ' input recipe. This can be obtained by running calibration on sample'
           ' dataset.'
       )
+    if num_workers < 1:
+      raise ValueError(f'num_workers must be positive, got {num_workers}.')
 
     if model_qsvs is None:
       model_qsvs = {}
 
-    skip_subgraphs = set()
-    op_codes = self.float_model.operatorCodes
-
+    op_tasks = self._get_op_tasks(
+        model_recipe_manager, model_qsvs, reusable_op_quant_results
+    )
+    self.op_quant_results = []
     total_ops = self._get_total_operations()
-    with progress_utils.ProgressBar(
-        total_ops,
-        'Generating Quantization Parameters:',
-        enable=enable_progress_bar,
-        # Progress bar will be skipped for smaller models.
-    ) as progress_bar:
-      for sg_ind, subgraph in enumerate(self.float_model.subgraphs):
-
-        graph_info = qtyping.GraphInfo(
-            subgraph.tensors, self.float_model.buffers
-        )
-        # Add input/output operators to the subgraph.
-        subgraph_operators = subgraph.operators + (
-            tfl_flatbuffer_utils.get_subgraph_input_output_operators(subgraph)
+    with contextlib.ExitStack() as stack:
+      progress_bar = stack.enter_context(
+          progress_utils.ProgressBar(
+              total_ops,
+              'Generating Quantization Parameters:',
+              enable=enable_progress_bar,
+              # Progress bar will be skipped for smaller models.
+          )
+      )
+      if num_workers > 1:
+        executor = stack.enter_context(
+            futures.ThreadPoolExecutor(max_workers=num_workers)
         )
-        for subgraph_op_id, op in enumerate(subgraph_operators):
-          progress_bar.update_single_step()
-          # Get the op key.
-          if isinstance(op, qtyping.IOOperator):
-            op_key = op.op_key
-            subgraph_op_id = -1  # Virtual op, no real id.
-          else:
-            op_code = op_codes[op.opcodeIndex].builtinCode
-            # Do not quantize unknown ops.
-            if op_code not in tfl_flatbuffer_utils.TFL_OP_CODE_TO_NAME:
-              op_quant_results = self._get_params_for_no_quant_op(
-                  subgraph_op_id, op, subgraph.tensors
+        # `map` yields the results in the op order, keeping the merged results
+        # deterministic.
+        op_results = executor.map(self._run_op_task, op_tasks)
+      else:
+        op_results = map(self._run_op_task, op_tasks)
+      for op_task, op_quant_results in zip(op_tasks, op_results):
+        progress_bar.update_single_step()
+        # Reclaim memory for op's tensors that have data.
+        for buffer_idx in op_task.buffer_indices:
+          mmap_utils.advise_dont_need(self.float_model.buffers[buffer_idx].data)
+
+        if op_task.algorithm_name is not None:
+          # Merging and post-processing the results modifies them.
+          self.op_quant_results.append(
+              OpQuantResults(
+                  op_task.algorithm_name,
+                  op_task.op_quant_config,  # pyrefly: ignore[bad-argument-type]
+                  _copy_op_results(op_quant_results),
               )
-              self._update_model_quant_results(op_quant_results)
-              continue
-            op_key = tfl_flatbuffer_utils.TFL_OP_CODE_TO_NAME[op_code]
-
-            # Step1: query the quantization_recipe to get op config.
-          op_scope = tfl_flatbuffer_utils.get_op_scope(op, subgraph.tensors)
-          algorithm_name, op_quant_config = (
-              model_recipe_manager.get_quantization_configs(op_key, op_scope)
           )
+        else:
+          self.op_quant_results.append(None)
 
-          if sg_ind in skip_subgraphs or policy.is_non_quantizable_composite_op(
-              op
-          ):
-            algorithm_name = algorithm_manager.AlgorithmName.NO_QUANTIZE
+        # Step3: update the results.
+        self._update_model_quant_results(op_quant_results)
+    self._post_process_results()
+    return self.model_quant_results
 
-          if algorithm_name == algorithm_manager.AlgorithmName.NO_QUANTIZE:
-            side_effect_subgraphs = (
-                tfl_flatbuffer_utils.get_op_side_effect_subgraphs(op)
-            )
-            skip_subgraphs.update(side_effect_subgraphs)
+  def _get_op_tasks(
+      self,
+      model_recipe_manager: recipe_manager.RecipeManager,
+      model_qsvs: dict[str, qtyping.QSV],
+      reusable_op_quant_results: Optional[
+          Sequence[Optional[OpQuantResults]]
+      ] = None,
+  ) -> list[_OpTask]:
+    """Gets the tasks generating the quantization parameters of every op.
 
-            op_quant_results = self._get_params_for_no_quant_op(
-                subgraph_op_id, op, subgraph.tensors
-            )
+    Args:
+      model_recipe_manager: The recipe manager for the model.
+      model_qsvs: Quantization statistics values (QSVs) for the model.
+      reusable_op_quant_results: The op results of a previous run to reuse
+        (see `generate_quantization_parameters`).
 
-          else:
-            op_info = qtyping.OpInfo(
-                op, op_key, subgraph_op_id, op_quant_config
+    Returns:
+      The op tasks, in the order of the ops in the model.
+    """
+    op_tasks = []
+    skip_subgraphs = set()
+    op_codes = self.float_model.operatorCodes
+    for sg_ind, subgraph in enumerate(self.float_model.subgraphs):
+
+      graph_info = qtyping.GraphInfo(subgraph.tensors, self.float_model.buffers)
+      # Add input/output operators to the subgraph.
+      subgraph_operators = subgraph.operators + (
+          self._graph_index.get_io_operators(sg_ind)
+      )
+      for op_index, op in enumerate(subgraph_operators):
+        subgraph_op_id = op_index
+        buffer_indices = self._get_op_constant_buffer_indices(op, subgraph)
+        # Get the op key.
+        if isinstance(op, qtyping.IOOperator):
+          op_key = op.op_key
+          subgraph_op_id = -1  # Virtual op, no real id.
+        else:
+          op_code = op_codes[op.opcodeIndex].builtinCode
+          # Do not quantize unknown ops.
+          if op_code not in tfl_flatbuffer_utils.TFL_OP_CODE_TO_NAME:
+            op_tasks.append(
+                _OpTask(
+                    buffer_indices,
+                    results=self._get_params_for_no_quant_op(
+                        subgraph_op_id, op, subgraph.tensors
+                    ),
+                )
             )
-            # Step2: query algorithm_manager to get/call the related function.
-            materialize_func = algorithm_manager.get_quantization_func(
+            continue
+          op_key = tfl_flatbuffer_utils.TFL_OP_CODE_TO_NAME[op_code]
+
+          # Step1: query the quantization_recipe to get op config.
+        op_scope = self._graph_index.get_op_scope(sg_ind, op_index)
+        algorithm_name, op_quant_config = (
+            model_recipe_manager.get_quantization_configs(op_key, op_scope)
+        )
+
+        if sg_ind in skip_subgraphs or policy.is_non_quantizable_composite_op(
+            op
+        ):
+          algorithm_name = algorithm_manager.AlgorithmName.NO_QUANTIZE
+
+        if algorithm_name == algorithm_manager.AlgorithmName.NO_QUANTIZE:
+          side_effect_subgraphs = (
+              tfl_flatbuffer_utils.get_op_side_effect_subgraphs(op)
+          )
+          skip_subgraphs.update(side_effect_subgraphs)
+
+          op_tasks.append(
+              _OpTask(
+                  buffer_indices,
+                  results=self._get_params_for_no_quant_op(
+                      subgraph_op_id, op, subgraph.tensors
+                  ),
+              )
+          )
+
+        elif (
+            reusable_results := _get_reusable_op_results(
+                reusable_op_quant_results,
+                len(op_tasks),
                 algorithm_name,
-                op_key,
-                qtyping.QuantizeMode.MATERIALIZE,
+                op_quant_config,
             )
-            op_quant_results = materialize_func(
-                op_info=op_info,
-                graph_info=graph_info,
-                tensor_name_to_qsv=model_qsvs,
-                tensor_quant_params_cache=self._tensor_quant_params_cache,
+        ) is not None:
+          op_tasks.append(
+              _OpTask(
+                  buffer_indices,
+                  results=reusable_results,
+                  algorithm_name=algorithm_name,
+                  op_quant_config=op_quant_config,
+              )
+          )
+
+        else:
+          op_info = qtyping.OpInfo(
+              op,
+              op_key,
+              subgraph_op_id,
+              op_quant_config,
+              defer_quantized_data=self._defer_quantized_data,
+          )
+          # Step2: query algorithm_manager to get/call the related function.
+          materialize_func = algorithm_manager.get_quantization_func(
+              algorithm_name,
+              op_key,
+              qtyping.QuantizeMode.MATERIALIZE,
+          )
+          op_digest = None
+          if isinstance(
+              self._tensor_quant_params_cache,
+              quant_params_cache_lib.PersistentTensorQuantParamsCache,
+          ):
+            op_digest = _get_op_digest(
+                algorithm_name, op_info, subgraph.tensors, model_qsvs
             )
-          # Reclaim memory for op's tensors that have data.
-          for tensor_idx in list(op.inputs):
-            if tensor_idx != -1:
-              buffer_idx = subgraph.tensors[tensor_idx].buffer
-              if (
-                  buffer := self.float_model.buffers[buffer_idx]
-              ).data is not None:
-                mmap_utils.advise_dont_need(buffer.data)
-
-          # Step3: update the results.
-          self._update_model_quant_results(op_quant_results)
-    self._post_process_results()
-    return self.model_quant_results
+          op_tasks.append(
+              _OpTask(
+                  buffer_indices,
+                  materialize=functools.partial(
+                      materialize_func,
+                      op_info=op_info,
+                      graph_info=graph_info,
+                      tensor_name_to_qsv=model_qsvs,
+                      tensor_quant_params_cache=self._tensor_quant_params_cache,
+                  ),
+                  op_digest=op_digest,
+                  algorithm_name=algorithm_name,
+                  op_quant_config=op_quant_config,
+              )
+          )
+    return op_tasks
+
+  def _get_op_constant_buffer_indices(
+      self, op: Any, subgraph: qtyping.SubGraphT
+  ) -> tuple[int, ...]:
+    """Returns the indices of the buffers of the op's constant inputs."""
+    buffer_indices = []
+    for tensor_idx in list(op.inputs):
+      if tensor_idx != -1:
+        buffer_idx = subgraph.tensors[tensor_idx].buffer
+        if self.float_model.buffers[buffer_idx].data is not None:
+          buffer_indices.append(buffer_idx)
+    return tuple(buffer_indices)
+
+  def _run_op_task(
+      self, op_task: _OpTask
+  ) -> list[qtyping.TensorTransformationParams]:
+    """Runs an op task and returns the quantization params of the op."""
+    if op_task.materialize is None:
+      return op_task.results  # pyrefly: ignore[bad-return]
+    with contextlib.ExitStack() as stack:
+      # Ops sharing a buffer are serialized, so that the later ones find the
+      # buffer's quantization params in the cache instead of recomputing them.
+      stack.enter_context(
+          self._tensor_quant_params_cache.lock_buffers(op_task.buffer_indices)
+      )
+      if op_task.op_digest is not None:
+        stack.enter_context(
+            self._tensor_quant_params_cache.op_scope(  # pyrefly: ignore[missing-attribute]
+                op_task.op_digest
+            )
+        )
+      return op_task.materialize()
 
   def _check_tensor_names_are_unique(self):
     """Checks if the tensor names are unique in the model."""
-    global_tensor_names = set()
-    for subgraph in self.float_model.subgraphs:
-      for tensor in subgraph.tensors:
-        tensor_name = tfl_flatbuffer_utils.get_tensor_name(tensor)
-        if tensor_name in global_tensor_names:
-          raise ValueError(
-              'Tensor name %s is not unique in the model. Please check your'
-              ' model and rename the tensor as ParamsGenerator assumes tensor'
-              ' names are unique.' % tensor_name
-          )
-        global_tensor_names.add(tensor_name)
+    duplicate_tensor_names = self._graph_index.get_duplicate_tensor_names()
+    if duplicate_tensor_names:
+      raise ValueError(
+          'Tensor name %s is not unique in the model. Please check your'
+          ' model and rename the tensor as ParamsGenerator assumes tensor'
+          ' names are unique.' % duplicate_tensor_names[0]
+      )
 
   def _post_process_results(self) -> None:
     """Post process the quantization results.
@@ -463,6 +696,100 @@ class ParamsGenerator:
     self._mark_tensors_requiring_tensor_duplication(tensor_names_to_duplicate)
 
 
+def _copy_op_results(
+    op_results: list[qtyping.TensorTransformationParams],
+) -> list[qtyping.TensorTransformationParams]:
+  """Copies op results, sharing their quantization parameters."""
+
+  def copy_op_to_tensor_params(params):
+    return dataclasses.replace(
+        params, transformations=list(params.transformations)
+    )
+
+  return [
+      qtyping.TensorTransformationParams(
+          tensor_name=result.tensor_name,
+          producer=None
+          if result.producer is None
+          else copy_op_to_tensor_params(result.producer),
+          consumers=None
+          if result.consumers is None
+          else [copy_op_to_tensor_params(c) for c in result.consumers],
+      )
+      for result in op_results
+  ]
+
+
+def _get_reusable_op_results(
+    reusable_op_quant_results: Optional[Sequence[Optional[OpQuantResults]]],
+    op_index: int,
+    algorithm_name: str,
+    op_quant_config: qtyping.OpQuantizationConfig,
+) -> Optional[list[qtyping.TensorTransformationParams]]:
+  """Returns a copy of the reusable results of an op, if any.
+
+  Args:
+    reusable_op_quant_results: The op results of a previous run, if any.
+    op_index: The index of the op in the op order.
+    algorithm_name: The algorithm resolved for the op.
+    op_quant_config: The quantization config resolved for the op.
+
+  Returns:
+    The results of the op in the previous run, if it was resolved to the same
+    algorithm and config, or None.
+  """
+  if reusable_op_quant_results is None or op_index >= len(
+      reusable_op_quant_results
+  ):
+    return None
+  previous = reusable_op_quant_results[op_index]
+  if (
+      previous is None
+      or previous.algorithm_name != algorithm_name
+      or previous.op_quant_config != op_quant_config
+  ):
+    return None
+  return _copy_op_results(previous.results)
+
+
+def _get_op_digest(
+    algorithm_name: str,
+    op_info: qtyping.OpInfo,
+    subgraph_tensors: Sequence[Any],
+    model_qsvs: dict[str, qtyping.QSV],
+) -> str:
+  """Returns the digest of what the quantization params of an op depend on.
+
+  Besides its weights and their quantization configs, the params of an op
+  depend on the algorithm, the op config, the shapes and types of the op's
+  tensors and their QSVs.
+
+  Args:
+    algorithm_name: The algorithm materializing the op.
+    op_info: The op.
+    subgraph_tensors: The tensors of the op's subgraph.
+    model_qsvs: The QSVs of the model tensors.
+  """
+  tensors = []
+  qsvs = {}
+  for tensor_idx in list(op_info.op.inputs) + list(op_info.op.outputs):
+    if tensor_idx == -1:
+      tensors.append(None)
+      continue
+    tensor = subgraph_tensors[tensor_idx]
+    tensors.append((tensor.shape, tensor.type))
+    tensor_name = tfl_flatbuffer_utils.get_tensor_name(tensor)
+    if tensor_name in model_qsvs:
+      qsvs[tensor_name] = model_qsvs[tensor_name]
+  return quant_params_cache_lib.get_content_hash({
+      'algorithm': algorithm_name,
+      'op_name': op_info.op_name,
+      'op_config': op_info.op_quant_config.to_dict(),
+      'tensors': tensors,
+      'qsvs': qsvs,
+  })
+
+
 def _are_tensor_consumer_params_compatible(
     params: qtyping.TensorTransformationParams,
 ) -> bool:
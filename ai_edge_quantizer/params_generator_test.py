@@ -16,15 +16,19 @@
 from collections.abc import Generator
 import pathlib
 from typing import Any
+from unittest import mock
 
 from absl.testing import absltest
 from absl.testing import parameterized
 import numpy as np
 
+from ai_edge_quantizer import algorithm_manager
 from ai_edge_quantizer import calibrator
 from ai_edge_quantizer import params_generator
 from ai_edge_quantizer import qtyping
 from ai_edge_quantizer import recipe_manager
+from ai_edge_quantizer.algorithms.utils import common_utils
+from ai_edge_quantizer.utils import quant_params_cache
 from ai_edge_quantizer.utils import test_utils
 from ai_edge_quantizer.utils import tfl_flatbuffer_utils
 from ai_edge_quantizer.utils import tfl_interpreter_utils
@@ -588,6 +592,141 @@ class ParamsGeneratorTest(parameterized.TestCase):
     )
     self.assertLen(quant_params, 6)
 
+  @parameterized.parameters(
+      'tests/models/conv_fc_mnist.tflite',
+      'tests/models/weight_sharing_fcs.tflite',
+  )
+  def test_generate_params_with_workers_matches_serial(self, model_name):
+    model = tfl_flatbuffer_utils.read_model(
+        str(pathlib.Path(TEST_DATA_PREFIX_PATH) / model_name)
+    )
+    self._recipe_manager.add_weight_only_config(
+        regex='.*',
+        operation_name=qtyping.TFLOperationName.ALL_SUPPORTED,
+        num_bits=4,
+    )
+
+    def generate_params(num_workers):
+      with mock.patch.object(
+          common_utils.TensorQuantParamsCache,
+          'insert',
+          autospec=True,
+          side_effect=common_utils.TensorQuantParamsCache.insert,
+      ) as insert:
+        quant_params = params_generator.ParamsGenerator(
+            model
+        ).generate_quantization_parameters(
+            self._recipe_manager, num_workers=num_workers
+        )
+      return quant_params, insert.call_count
+
+    serial_params, serial_num_inserts = generate_params(num_workers=1)
+    parallel_params, parallel_num_inserts = generate_params(num_workers=4)
+    self.assertEqual(list(parallel_params), list(serial_params))
+    self.assertEqual(parallel_params, serial_params)
+    # The params of shared buffers are computed once.
+    self.assertEqual(parallel_num_inserts, serial_num_inserts)
+
+  def test_generate_params_reuses_unchanged_op_quant_results(self):
+    self._recipe_manager.add_weight_only_config(
+        regex='.*',
+        operation_name=qtyping.TFLOperationName.ALL_SUPPORTED,
+        num_bits=8,
+    )
+    previous_pg = params_generator.ParamsGenerator(self._test_model)
+    previous_pg.generate_quantization_parameters(self._recipe_manager)
+    self._recipe_manager.add_weight_only_config(
+        regex='.*',
+        operation_name=qtyping.TFLOperationName.FULLY_CONNECTED,
+        num_bits=4,
+    )
+
+    def generate_params(reusable_op_quant_results):
+      with mock.patch.object(
+          algorithm_manager,
+          'get_quantization_func',
+          wraps=algorithm_manager.get_quantization_func,
+      ) as get_quantization_func:
+        pg = params_generator.ParamsGenerator(self._test_model)
+        quant_params = pg.generate_quantization_parameters(
+            self._recipe_manager,
+            reusable_op_quant_results=reusable_op_quant_results,
+        )
+      return quant_params, get_quantization_func.call_count
+
+    expected_params, num_materialized_ops = generate_params(None)
+    quant_params, num_rematerialized_ops = generate_params(
+        previous_pg.op_quant_results
+    )
+    self.assertEqual(quant_params, expected_params)
+    # Only the fully connected ops are materialized again.
+    self.assertGreater(num_rematerialized_ops, 0)
+    self.assertLess(num_rematerialized_ops, num_materialized_ops)
+    # The reusable results are left unchanged by the runs reusing them.
+    quant_params, _ = generate_params(previous_pg.op_quant_results)
+    self.assertEqual(quant_params, expected_params)
+
+  def test_generate_params_with_quant_params_cache_reuses_params(self):
+    self._recipe_manager.add_weight_only_config(
+        regex='.*',
+        operation_name=qtyping.TFLOperationName.ALL_SUPPORTED,
+        num_bits=4,
+        algorithm_key=_AlgorithmName.OCTAV,
+    )
+    cache_directory = self.create_tempdir().full_path
+    expected_params = params_generator.ParamsGenerator(
+        self._test_model
+    ).generate_quantization_parameters(self._recipe_manager)
+
+    cache_cls = quant_params_cache.PersistentTensorQuantParamsCache
+
+    def generate_params():
+      with mock.patch.object(
+          cache_cls, 'insert', autospec=True, side_effect=cache_cls.insert
+      ) as insert:
+        quant_params = params_generator.ParamsGenerator(
+            self._test_model,
+            quant_params_cache.QuantParamsCache(cache_directory),
+        ).generate_quantization_parameters(self._recipe_manager)
+      return quant_params, insert.call_count
+
+    quant_params, num_inserts = generate_params()
+    self.assertEqual(quant_params, expected_params)
+    self.assertGreater(num_inserts, 0)
+    # All the weight params are read from the cache.
+    quant_params, num_inserts = generate_params()
+    self.assertEqual(quant_params, expected_params)
+    self.assertEqual(num_inserts, 0)
+
+  def test_generate_params_with_quant_params_cache_does_not_defer_data(self):
+    self._recipe_manager.add_weight_only_config(
+        regex='.*',
+        operation_name=qtyping.TFLOperationName.ALL_SUPPORTED,
+        num_bits=8,
+    )
+    quant_params = params_generator.ParamsGenerator(
+        self._test_model,
+        quant_params_cache.QuantParamsCache(self.create_tempdir().full_path),
+        defer_quantized_data=True,
+    ).generate_quantization_parameters(self._recipe_manager)
+
+    quantized_data = [
+        op_params.parameters.quantized_data
+        for tensor_params in quant_params.values()
+        for op_params in (tensor_params.consumers or [])
+        if isinstance(op_params.parameters, qtyping.UniformQuantParams)
+        and op_params.parameters.quantized_data is not None
+    ]
+    self.assertNotEmpty(quantized_data)
+    for data in quantized_data:
+      self.assertNotIsInstance(data, qtyping.LazyQuantizedData)
+
+  def test_generate_params_invalid_num_workers_raises_error(self):
+    with self.assertRaisesRegex(ValueError, 'num_workers must be positive'):
+      self._params_generator.generate_quantization_parameters(
+          self._recipe_manager, num_workers=0
+      )
+
   @parameterized.named_parameters(
       dict(
           testcase_name='different_quant_config_fc2_no_quant',
@@ -16,7 +16,7 @@
 """Type hinting support for AI Edge Quantizer."""
 
 import collections
-from collections.abc import MutableMapping
+from collections.abc import Iterator, MutableMapping
 import copy
 import dataclasses
 import enum
@@ -202,6 +202,71 @@ class QuantTransformation(enum.Enum):
   INSERT_MULTIPLY = 9
 
 
+class LazyQuantizedData:
+  """Quantized data computed on demand, in chunks of rows.
+
+  Stands for the `quantized_data` of the parameters of a large constant tensor,
+  so that its quantized data is only computed when the model is serialized,
+  one chunk at a time, straight into the output. `np.asarray` computes the
+  whole array.
+
+  Attributes:
+    shape: The shape of the quantized data.
+    dtype: The data type of the quantized data.
+    rows_per_chunk: The number of rows (i.e., entries of the leading dimension)
+      computed at once.
+  """
+
+  def __init__(
+      self,
+      shape: tuple[int, ...],
+      dtype: np.dtype,
+      compute_rows: Callable[[int, int], np.ndarray],
+      rows_per_chunk: int,
+  ):
+    """Initializes the lazy quantized data.
+
+    Args:
+      shape: The shape of the quantized data. Must have at least one dimension.
+      dtype: The data type of the quantized data.
+      compute_rows: Computes the quantized data of the rows in `[start, end)`.
+      rows_per_chunk: The number of rows computed at once.
+    """
+    self.shape = tuple(shape)
+    self.dtype = np.dtype(dtype)
+    self.rows_per_chunk = max(rows_per_chunk, 1)
+    self._compute_rows = compute_rows
+
+  @property
+  def ndim(self) -> int:
+    return len(self.shape)
+
+  @property
+  def size(self) -> int:
+    return int(np.prod(self.shape))
+
+  @property
+  def nbytes(self) -> int:
+    return self.size * self.dtype.itemsize
+
+  def iter_chunks(self) -> Iterator[np.ndarray]:
+    """Yields the flattened quantized data, one chunk of rows at a time."""
+    num_rows = self.shape[0]
+    for start in range(0, num_rows, self.rows_per_chunk):
+      end = min(start + self.rows_per_chunk, num_rows)
+      yield np.ravel(self._compute_rows(start, end))
+
+  def __array__(self, dtype=None, copy=None):
+    del copy  # A new array is always returned.
+    data = np.empty(self.size, dtype=self.dtype)
+    offset = 0
+    for chunk in self.iter_chunks():
+      data[offset : offset + chunk.size] = chunk
+      offset += chunk.size
+    data = data.reshape(self.shape)
+    return data if dtype is None else data.astype(dtype)
+
+
 @dataclasses.dataclass(frozen=True)
 class UniformQuantParams:
   """Parameters for uniform quantization.
@@ -212,7 +277,7 @@ class UniformQuantParams:
     scale: The scale of the quantization.
     zero_point: The zero point of the quantization.
     symmetric: Whether the quantization is symmetric (force zero_point to be 0).
-    quantized_data: The quantized data.
+    quantized_data: The quantized data, or a `LazyQuantizedData` computing it.
     block_size: The block size for blockwise quantization, block_size=0 meaning
       no blockwise quantization.
     hadamard: The Hadamard rotation parameters, if set. Hadamard rotation
@@ -255,7 +320,7 @@ class UniformQuantParams:
   scale: np.ndarray
   zero_point: np.ndarray
   symmetric: bool = True
-  quantized_data: Optional[np.ndarray] = None
+  quantized_data: Optional[Union[np.ndarray, LazyQuantizedData]] = None
   block_size: int = 0
   hadamard: Optional[HadamardRotationParams] = None
   custom_algorithm_param: Optional[dict[str, Any]] = None
@@ -573,12 +638,16 @@ class OpInfo:
     op_name: The name of the op.
     subgraph_op_index: The position of the op in the subgraph.
     op_quant_config: The quantization configuration for the op.
+    defer_quantized_data: Whether algorithms may return a `LazyQuantizedData`
+      as the quantized data of the op's weights, computed when the model is
+      serialized.
   """
 
   op: OperatorT
   op_name: TFLOperationName
   subgraph_op_index: int  # Position of the op in the subgraph.
   op_quant_config: OpQuantizationConfig
+  defer_quantized_data: bool = False
 
 
 # Data classes used by model modifier.
@@ -657,7 +726,12 @@ def _compare_array_or_none(
     return True  # Both None, so they're equal.
   if obj1 is None or obj2 is None:
     return False  # Only one is None, so they're different.
-  if id(obj1) == id(obj2) or obj1.data == obj2.data:
+  if id(obj1) == id(obj2):
+    return True
+  if isinstance(obj1, LazyQuantizedData) or isinstance(obj2, LazyQuantizedData):
+    # Computes the lazy data to compare it.
+    return np.array_equal(obj1, obj2)
+  if obj1.data == obj2.data:
     return True
   return np.array_equal(obj1, obj2)
 
@@ -104,6 +104,41 @@ class QtypingTest(absltest.TestCase):
     )
     self.assertNotEqual(quant_params, other)
 
+  def test_lazy_quantized_data(self):
+    data = np.arange(30, dtype=np.int8).reshape(5, 3, 2)
+    lazy_data = qtyping.LazyQuantizedData(
+        shape=data.shape,
+        dtype=data.dtype,
+        compute_rows=lambda start, end: data[start:end],
+        rows_per_chunk=2,
+    )
+    self.assertEqual(lazy_data.ndim, 3)
+    self.assertEqual(lazy_data.size, 30)
+    self.assertEqual(lazy_data.nbytes, 30)
+    self.assertEqual(
+        [chunk.size for chunk in lazy_data.iter_chunks()], [12, 12, 6]
+    )
+    np.testing.assert_array_equal(np.asarray(lazy_data), data)
+
+    # Lazy data compares equal to the data it computes.
+    quant_params = _create_dummy_uniform_quant_params(quantized_data=data)
+    self.assertEqual(
+        quant_params,
+        dataclasses.replace(quant_params, quantized_data=lazy_data),
+    )
+    self.assertNotEqual(
+        quant_params,
+        dataclasses.replace(
+            quant_params,
+            quantized_data=qtyping.LazyQuantizedData(
+                shape=data.shape,
+                dtype=data.dtype,
+                compute_rows=lambda start, end: data[start:end] + 1,
+                rows_per_chunk=2,
+            ),
+        ),
+    )
+
   def test_compare_custom_algorithm_param_when_same_object_is_equal(self):
     quant_params = _create_dummy_uniform_quant_params(
         custom_algorithm_param={
@@ -15,7 +15,7 @@
 
 """AI Edge Quantizer API."""
 
-from collections.abc import Iterable, Sequence
+from collections.abc import Iterable, MutableMapping, Sequence
 import dataclasses
 import json
 import logging
@@ -28,12 +28,17 @@ from ai_edge_litert.tools import mmap_utils
 from ai_edge_quantizer import algorithm_manager
 from ai_edge_quantizer import calibrator
 from ai_edge_quantizer import default_policy
+from ai_edge_quantizer import memory_estimator
 from ai_edge_quantizer import model_modifier
 from ai_edge_quantizer import model_validator
 from ai_edge_quantizer import params_generator
 from ai_edge_quantizer import qtyping
 from ai_edge_quantizer import recipe_manager
+from ai_edge_quantizer.utils import activation_cache as activation_cache_lib
+from ai_edge_quantizer.utils import model_graph_index
 from ai_edge_quantizer.utils import progress_utils
+from ai_edge_quantizer.utils import quant_params_cache as quant_params_cache_lib
+from ai_edge_quantizer.utils import quantized_data_store
 from ai_edge_quantizer.utils import recipe_utils
 from ai_edge_quantizer.utils import tfl_flatbuffer_utils
 from ai_edge_quantizer.utils import tfl_interpreter_utils
@@ -44,6 +49,11 @@ Path = str | pathlib.Path
 # Expose algorithm names and error metrics to users.
 AlgorithmName = algorithm_manager.AlgorithmName
 ValidationErrorMetric = validation_utils.ValidationErrorMetric
+CalibrationCheckpointConfig = calibrator.CalibrationCheckpointConfig
+EarlyStoppingConfig = calibrator.EarlyStoppingConfig
+ActivationCache = activation_cache_lib.ActivationCache
+QuantParamsCache = quant_params_cache_lib.QuantParamsCache
+MemoryEstimate = memory_estimator.MemoryEstimate
 
 _QuantRecipe = qtyping.ModelQuantizationRecipe
 _TFLOpName = qtyping.TFLOperationName
@@ -51,7 +61,7 @@ _OpQuantizationConfig = qtyping.OpQuantizationConfig
 _TensorQuantizationConfig = qtyping.TensorQuantizationConfig
 _TensorTransformationParams = dict[str, qtyping.TensorTransformationParams]
 _SignatureInput = dict[str, Any]  # input_argument_name -> tensor_value.
-_CalibrationResult = dict[str, qtyping.QSV]
+_CalibrationResult = MutableMapping[str, qtyping.QSV]
 _CalibrationMode = calibrator.CalibrationMode
 
 
@@ -161,6 +171,13 @@ class Quantizer:
         quantizing it again.
     """
     self._model_name = float_model if isinstance(float_model, Path) else None
+    # Interpreters are created from the model paths when they are known, so
+    # that they keep the models file-backed (rather than copying the buffers)
+    # and share their page cache.
+    self._float_model_path = _get_model_path(float_model)
+    self._previous_quantized_model_path = _get_model_path(
+        previous_quantized_model
+    )
 
     # Load the `float_model` as a buffer.
     self._float_model_buffer = memoryview(
@@ -183,6 +200,10 @@ class Quantizer:
     self._float_model: qtyping.ModelT = tfl_flatbuffer_utils.read_model(
         self._float_model_buffer
     )
+    # Shared by the params generation and the model modification.
+    self._float_model_graph_index = model_graph_index.ModelGraphIndex(
+        self._float_model
+    )
 
     self._recipe_manager: recipe_manager.RecipeManager = (
         recipe_manager.RecipeManager()
@@ -191,6 +212,12 @@ class Quantizer:
       self.load_quantization_recipe(quantization_recipe)
     self._result: QuantizationResult = QuantizationResult([{}], None)
     self._quantize_called = False
+    # The op results of the last incremental `quantize` call, and the
+    # calibration result they were generated with.
+    self._incremental_op_quant_results: Optional[
+        list[Optional[params_generator.OpQuantResults]]
+    ] = None
+    self._incremental_calibration_result: Optional[_CalibrationResult] = None
 
   def load_quantization_recipe(self, recipe: Union[Path, _QuantRecipe]) -> None:
     """Loads a quantization recipe.
@@ -369,25 +396,70 @@ class Quantizer:
   def calibrate(
       self,
       calibration_data: dict[str, Iterable[_SignatureInput]],
-      previous_calibration_result: Optional[_CalibrationResult] = None,
+      previous_calibration_result: Optional[
+          Union[str, _CalibrationResult]
+      ] = None,
       num_threads: int = 16,
       mode: _CalibrationMode = _CalibrationMode.CALIBRATION_PRESERVE_ALL_TENSORS,
+      num_workers: int = 1,
+      checkpoint_config: Optional[CalibrationCheckpointConfig] = None,
+      early_stopping_config: Optional[EarlyStoppingConfig] = None,
+      prefetch_depth: int = 0,
+      activation_cache: Optional[activation_cache_lib.ActivationCache] = None,
+      memory_budget_bytes: Optional[int] = None,
+      batch_size: int = 1,
   ) -> _CalibrationResult:
     """Calibrates the float model (required by static range quantization).
 
     Args:
-      calibration_data: Calibration data for a model signature.
-      previous_calibration_result: Previous calibration result to be loaded. The
+      calibration_data: Calibration data for a model signature. Each dataset
+        is consumed once in a streaming fashion, so generators and data loaders
+        can be used to feed large calibration sets at constant memory.
+      previous_calibration_result: Previous calibration result to be loaded, or
+        the path to a file saved by `Calibrator.save_calibration_result`. The
         calibration process will be resumed from the previous result.
       num_threads: Number of threads to use for calibration.
       mode: Calibration mode to use for calibration. Supported modes are
-        `CALIBRATION_PRESERVE_ALL_TENSORS` and `CALIBRATION_PROFILER_BASED`.
+        `CALIBRATION_PRESERVE_ALL_TENSORS`, `CALIBRATION_PROFILER_BASED`,
+        `HYBRID` and `LAYERWISE`.
+      num_workers: Number of worker processes to shard the calibration data
+        across. If greater than 1, `num_threads` is split across the workers and
+        the worker results are merged (see `Calibrator.calibrate_parallel` for
+        how the merged result compares to a sequential run).
+      checkpoint_config: If set, the calibration is checkpointed periodically
+        and resumed from the checkpoint if one exists (see
+        `CalibrationCheckpointConfig`). Not supported with `num_workers` > 1.
+      early_stopping_config: If set, the calibration of a signature stops once
+        its min/max QSVs have converged (see `EarlyStoppingConfig`). Not
+        supported with `num_workers` > 1.
+      prefetch_depth: If positive, the calibration samples are read by a
+        background thread, up to `prefetch_depth` samples ahead, so that
+        producing them overlaps with running the model. Datasets can then also
+        be async iterables.
+      activation_cache: If set, the float model tensors of the calibration
+        samples are read from (or written to) this cache, so that calibrating
+        the same samples with other recipes, or validating against the float
+        model, doesn't invoke the float model again. Only supported in
+        `CALIBRATION_PRESERVE_ALL_TENSORS` mode, and not with `num_workers` >
+        1.
+      memory_budget_bytes: The memory budget of the `LAYERWISE` mode, which
+        bounds the size of the tensors captured at once for algorithms that
+        need more than min/max (e.g., GPTQ). The captured ops are split into as
+        few chunks as fit the budget, each calibrated by its own pass over the
+        samples. Ignored in other modes.
+      batch_size: The maximum number of consecutive samples of a signature
+        stacked along their leading dimension and calibrated by a single model
+        invocation (see `Calibrator.calibrate`). Only signatures whose inputs
+        have a resizable leading dimension are batched. Not supported with
+        `num_workers` > 1.
 
     Returns:
       Calibration result ({tensor_name: tensor QSVs (e.g.,min/max)}).
 
     Raises:
-      ValueError: If the calibration result is insufficient.
+      ValueError: If the calibration result is insufficient, or if
+        `checkpoint_config`, `early_stopping_config`, `activation_cache` or
+        `batch_size` > 1 is used with multiple workers.
     """
     if not self.need_calibration:
       return {}
@@ -395,23 +467,97 @@ class Quantizer:
     if mode not in [
         _CalibrationMode.CALIBRATION_PRESERVE_ALL_TENSORS,
         _CalibrationMode.CALIBRATION_PROFILER_BASED,
+        _CalibrationMode.HYBRID,
+        _CalibrationMode.LAYERWISE,
     ]:
       raise ValueError(
           f'Unsupported calibration mode: {mode}. Supported modes are'
-          ' CALIBRATION_PRESERVE_ALL_TENSORS and'
-          ' CALIBRATION_PROFILER_BASED.'
+          ' CALIBRATION_PRESERVE_ALL_TENSORS, CALIBRATION_PROFILER_BASED,'
+          ' HYBRID and LAYERWISE.'
+      )
+    if checkpoint_config is not None and num_workers > 1:
+      raise ValueError(
+          'Calibration checkpointing is not supported with multiple workers.'
+      )
+    if early_stopping_config is not None and num_workers > 1:
+      raise ValueError(
+          'Calibration early stopping is not supported with multiple workers.'
+      )
+    if activation_cache is not None and num_workers > 1:
+      raise ValueError(
+          'The activation cache is not supported with multiple workers.'
+      )
+    if batch_size > 1 and num_workers > 1:
+      raise ValueError(
+          'Batched calibration is not supported with multiple workers.'
       )
 
     calib = calibrator.Calibrator(
-        self._float_model_buffer,  # pyrefly: ignore[bad-argument-type]
+        self._get_float_model_source(),  # pyrefly: ignore[bad-argument-type]
         num_threads=num_threads,
         mode=mode,
+        memory_budget_bytes=memory_budget_bytes,
     )
-    if previous_calibration_result is not None:
-      calib.load_model_qsvs(previous_calibration_result)
-    calib.calibrate(calibration_data, self._recipe_manager)
+    try:
+      if previous_calibration_result is not None:
+        calib.load_model_qsvs(previous_calibration_result)
+      if num_workers > 1:
+        calib.calibrate_parallel(
+            calibration_data,
+            self._recipe_manager,
+            num_workers=num_workers,
+            prefetch_depth=prefetch_depth,
+        )
+      else:
+        calib.calibrate(
+            calibration_data,
+            self._recipe_manager,
+            checkpoint_config=checkpoint_config,
+            early_stopping_config=early_stopping_config,
+            prefetch_depth=prefetch_depth,
+            activation_cache=activation_cache,
+            batch_size=batch_size,
+        )
+    finally:
+      # Return the interpreter to the pool for the next calibration.
+      calib.close()
     return calib.get_model_qsvs()
 
+  def estimate_peak_memory(
+      self,
+      mode: _CalibrationMode = _CalibrationMode.CALIBRATION_PRESERVE_ALL_TENSORS,
+      batch_size: int = 1,
+      num_workers: int = 1,
+      memory_budget_bytes: Optional[int] = None,
+      stream_quantized_data: bool = False,
+  ) -> MemoryEstimate:
+    """Statically estimates the peak memory of calibrating and quantizing.
+
+    The model and the current recipe are walked without running the model, so
+    that a run can be planned (e.g., its calibration mode, batch size or number
+    of workers) before starting it.
+
+    Args:
+      mode: The calibration mode to estimate (see `calibrate`).
+      batch_size: The number of samples per calibration invocation.
+      num_workers: The number of calibration worker processes.
+      memory_budget_bytes: The memory budget of the `LAYERWISE` mode.
+      stream_quantized_data: Whether the quantized data is streamed (see
+        `quantize`).
+
+    Returns:
+      The estimated peak memory of each phase of the run.
+    """
+    return memory_estimator.estimate_peak_memory(
+        self._float_model_buffer,  # pyrefly: ignore[bad-argument-type]
+        self._recipe_manager,
+        calibration_mode=mode,
+        batch_size=batch_size,
+        num_workers=num_workers,
+        memory_budget_bytes=memory_budget_bytes,
+        stream_quantized_data=stream_quantized_data,
+    )
+
   def _ensure_model_qsv_sufficient(
       self, calibration_result: _CalibrationResult
   ):
@@ -421,22 +567,23 @@ class Quantizer:
     empty_qsvs = [key for key, value in calibration_result.items() if not value]
 
     # Go over every signature and check if empty entry tensor belongs to it.
-    tfl_interpreter = tfl_interpreter_utils.create_tfl_interpreter(
-        self._float_model_buffer  # pyrefly: ignore[bad-argument-type]
-    )
-    for signature_key in tfl_interpreter.get_signature_list():
-      subgraph_idx = tfl_interpreter_utils.get_signature_main_subgraph_index(
-          tfl_interpreter, signature_key
-      )
+    with tfl_interpreter_utils.borrow_tfl_interpreter(
+        self._get_float_model_source(),  # pyrefly: ignore[bad-argument-type]
+        allocate_tensors=False,
+    ) as tfl_interpreter:
+      for signature_key in tfl_interpreter.get_signature_list():
+        subgraph_idx = tfl_interpreter_utils.get_signature_main_subgraph_index(
+            tfl_interpreter, signature_key
+        )
 
-      for tensor_detail in tfl_interpreter.get_tensor_details(subgraph_idx):
-        tensor_name = tensor_detail['name']
-        if tensor_name in empty_qsvs:
-          raise ValueError(
-              f'Missing QSVs (min/max) for tensor {tensor_name} in Signature'
-              f" '{signature_key}'. Please check if Signature"
-              f' {signature_key} has been calibrated.'
-          )
+        for tensor_detail in tfl_interpreter.get_tensor_details(subgraph_idx):
+          tensor_name = tensor_detail['name']
+          if tensor_name in empty_qsvs:
+            raise ValueError(
+                f'Missing QSVs (min/max) for tensor {tensor_name} in Signature'
+                f" '{signature_key}'. Please check if Signature"
+                f' {signature_key} has been calibrated.'
+            )
 
   def quantize(
       self,
@@ -444,6 +591,13 @@ class Quantizer:
       serialize_to_path: qtyping.Path | None = None,
       enable_progress_bar: bool | None = None,
       enable_progress_report: bool = True,
+      num_workers: int = 1,
+      quant_params_cache: Optional[
+          quant_params_cache_lib.QuantParamsCache
+      ] = None,
+      incremental: bool = False,
+      stream_quantized_data: bool = False,
+      quantized_data_dir: qtyping.Path | None = None,
   ) -> QuantizationResult:
     """Quantizes the float model.
 
@@ -463,6 +617,31 @@ class Quantizer:
       enable_progress_bar: Whether to enable the progress bar. By default, it is
         disabled for smaller models and enabled for larger models.
       enable_progress_report: Whether to generate a progress report.
+      num_workers: The number of threads generating the quantization
+        parameters of the ops concurrently. This speeds up weight-heavy
+        algorithms (e.g., GPTQ or OCTAV) without changing the result.
+      quant_params_cache: If set, the quantization parameters of the weights
+        are read from (or written to) this on-disk cache, so that quantizing
+        the model again (or a variant of it sharing weights) only quantizes the
+        weights that changed.
+      incremental: Whether to reuse the quantization parameters of the
+        previous incremental call. Only the ops whose resolved algorithm and
+        config changed since then (e.g., after editing a few rules of the
+        recipe) are quantized again, as long as the same calibration result is
+        used. The quantization parameters are kept for the next incremental
+        call, which holds them in memory.
+      stream_quantized_data: Whether to write the quantized data of each weight
+        to a temporary memory-mapped file as soon as it is computed, instead
+        of holding it in memory until the model is serialized. The weights
+        quantized by the min/max, MSE and OCTAV algorithms are only quantized
+        when the model is serialized, straight into the output, unless
+        `quant_params_cache` is set (the cache stores the quantized data as
+        soon as it is computed). This brings the peak memory down to about the
+        float model plus the largest tensors. Disabled by default, since the
+        temporary files need enough room in `quantized_data_dir`.
+      quantized_data_dir: The directory of the temporary files of the streamed
+        quantized data. If None, the default temporary directory is used,
+        which may be memory-backed (e.g., tmpfs) and then saves no memory.
 
     Returns:
       Quantization result.
@@ -486,7 +665,13 @@ class Quantizer:
       progress_report = None
 
     quant_params = self._get_quantization_params(
-        calibration_result, enable_progress_bar
+        calibration_result,
+        enable_progress_bar,
+        num_workers=num_workers,
+        quant_params_cache=quant_params_cache,
+        incremental=incremental,
+        stream_quantized_data=stream_quantized_data,
+        quantized_data_dir=quantized_data_dir,
     )
 
     quantized_model = self._get_quantized_model(
@@ -515,6 +700,8 @@ class Quantizer:
       validate_output_tensors_only: bool = False,
       save_folder: Optional[str] = None,
       model_name: Optional[str] = None,
+      prefetch_depth: int = 0,
+      activation_cache: Optional[activation_cache_lib.ActivationCache] = None,
   ) -> model_validator.ComparisonResult:
     """Numerical validation of the quantized model for a model signature.
 
@@ -541,6 +728,13 @@ class Quantizer:
       model_name: Name of the model, used in the output json file name. If None,
         it will be inferred from the original float model path or default to
         'model' if unavailable.
+      prefetch_depth: If positive, the test samples are read by a background
+        thread, up to `prefetch_depth` samples ahead, so that producing them
+        overlaps with running the models.
+      activation_cache: If set, the float model tensors of the test samples
+        are read from (or written to) this cache, so that validating other
+        quantized models on the same samples doesn't invoke the float model
+        again.
 
     Returns:
       A ComparisonResult object containing the combined comparison results.
@@ -548,17 +742,20 @@ class Quantizer:
     if test_data is None:
       # Create test data for all signatures in the model.
       test_data = tfl_interpreter_utils.create_random_normal_input_data(  # pyrefly: ignore[bad-assignment]
-          self._float_model_buffer, num_samples=1  # pyrefly: ignore[bad-argument-type]
+          self._get_float_model_source(), num_samples=1  # pyrefly: ignore[bad-argument-type]
       )
     if self._quantize_called:
       quantized_model = self._result.quantized_model
     else:
-      quantized_model = self.previous_quantized_model_buffer
+      quantized_model = (
+          self._previous_quantized_model_path
+          or self.previous_quantized_model_buffer
+      )
 
     if quantized_model is None:
       raise ValueError('No quantized model available to validate.')
     results = model_validator.compare_model(
-        self._float_model_buffer,  # pyrefly: ignore[bad-argument-type]
+        self._get_float_model_source(),  # pyrefly: ignore[bad-argument-type]
         quantized_model,  # pyrefly: ignore[bad-argument-type]
         test_data,  # pyrefly: ignore[bad-argument-type]
         error_metrics,
@@ -566,6 +763,8 @@ class Quantizer:
         use_xnnpack=use_xnnpack,
         num_threads=num_threads,
         validate_output_tensors_only=validate_output_tensors_only,
+        prefetch_depth=prefetch_depth,
+        activation_cache=activation_cache,
     )
     if save_folder:
       if model_name is None:
@@ -575,10 +774,21 @@ class Quantizer:
       results.save(save_folder, model_name=model_name)
     return results
 
+  def _get_float_model_source(self) -> Union[str, qtyping.BufferType]:
+    """Returns the float model path if known, or the float model buffer."""
+    return self._float_model_path or self._float_model_buffer
+
   def _get_quantization_params(
       self,
       calibration_result: Optional[_CalibrationResult] = None,
       enable_progress_bar: bool | None = None,
+      num_workers: int = 1,
+      quant_params_cache: Optional[
+          quant_params_cache_lib.QuantParamsCache
+      ] = None,
+      incremental: bool = False,
+      stream_quantized_data: bool = False,
+      quantized_data_dir: qtyping.Path | None = None,
   ) -> _TensorTransformationParams:
     """Gets the quantization parameters.
 
@@ -587,16 +797,54 @@ class Quantizer:
         needed, check with self.need_calibration).
       enable_progress_bar: Whether to enable the progress bar. By default, it is
         disabled for smaller models and enabled for larger models.
+      num_workers: The number of threads generating the quantization
+        parameters.
+      quant_params_cache: An optional on-disk cache of the quantization
+        parameters of the weights.
+      incremental: Whether to reuse the op results of the previous incremental
+        call, and to keep the op results for the next one.
+      stream_quantized_data: Whether to move the quantized data of the weights
+        to a temporary memory-mapped file as soon as it is computed, or to
+        defer its computation to the serialization when the algorithm supports
+        it.
+      quantized_data_dir: The directory of the temporary files of the streamed
+        quantized data, or None for the default temporary directory.
 
     Returns:
       A dictionary containing the quantization parameters.
     """
+    reusable_op_quant_results = None
+    if (
+        incremental
+        and calibration_result is self._incremental_calibration_result
+    ):
+      reusable_op_quant_results = self._incremental_op_quant_results
+    # Drop the previous op results, in case the generation fails.
+    self._incremental_op_quant_results = None
+    self._incremental_calibration_result = None
+
     params_generator_instance = params_generator.ParamsGenerator(
-        self._float_model
+        self._float_model,
+        quant_params_cache,
+        self._float_model_graph_index,
+        quantized_data_store.QuantizedDataStore(quantized_data_dir)
+        if stream_quantized_data
+        else None,
+        defer_quantized_data=stream_quantized_data,
     )
-    return params_generator_instance.generate_quantization_parameters(
-        self._recipe_manager, calibration_result, enable_progress_bar
+    quant_params = params_generator_instance.generate_quantization_parameters(
+        self._recipe_manager,
+        calibration_result,
+        enable_progress_bar,
+        num_workers=num_workers,
+        reusable_op_quant_results=reusable_op_quant_results,
     )
+    if incremental:
+      self._incremental_op_quant_results = (
+          params_generator_instance.op_quant_results
+      )
+      self._incremental_calibration_result = calibration_result
+    return quant_params
 
   def _get_quantized_model(
       self,
@@ -613,8 +861,19 @@ class Quantizer:
     Returns:
       The quantized model.
     """
-    model_modifier_instance = model_modifier.ModelModifier(self._float_model)
+    model_modifier_instance = model_modifier.ModelModifier(
+        self._float_model, self._float_model_graph_index
+    )
 
     return model_modifier_instance.modify_model(
         quant_params, serialize_to_path=serialize_to_path
     )
+
+
+def _get_model_path(
+    model: Optional[Union[Path, qtyping.BufferType]],
+) -> str | None:
+  """Returns the path of a model given as a path, or None for a buffer."""
+  if isinstance(model, (str, pathlib.Path)):
+    return os.fspath(model)
+  return None
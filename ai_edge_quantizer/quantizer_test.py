@@ -14,6 +14,8 @@
 # ==============================================================================
 
 import pathlib
+import tempfile
+from unittest import mock
 
 from absl.testing import absltest
 from absl.testing import parameterized
@@ -27,6 +29,9 @@ from ai_edge_quantizer import default_policy
 from ai_edge_quantizer import model_validator
 from ai_edge_quantizer import qtyping
 from ai_edge_quantizer import quantizer
+from ai_edge_quantizer.transformations import transformation_utils
+from ai_edge_quantizer.utils import model_graph_index
+from ai_edge_quantizer.utils import quantized_data_store
 from ai_edge_quantizer.utils import recipe_utils
 from ai_edge_quantizer.utils import test_utils
 from ai_edge_quantizer.utils import tfl_interpreter_utils
@@ -207,6 +212,7 @@ class QuantizerTest(parameterized.TestCase):
       mode=[
           _CalibrationMode.CALIBRATION_PRESERVE_ALL_TENSORS,
           _CalibrationMode.CALIBRATION_PROFILER_BASED,
+          _CalibrationMode.LAYERWISE,
       ],
   )
   def test_calibrate_required_recipe_succeeds(self, recipe_name, mode):
@@ -217,6 +223,79 @@ class QuantizerTest(parameterized.TestCase):
     calibration_result = self._quantizer.calibrate(calib_data, mode=mode)
     self.assertLen(calibration_result, 7)
 
+  def test_calibrate_reuses_pooled_interpreter(self):
+    self._quantizer.load_quantization_recipe('default_a8w8')
+    calib_data = _get_calibration_data()
+    self._quantizer.calibrate(calib_data)
+    with mock.patch.object(
+        tfl_interpreter_utils,
+        'create_tfl_interpreter',
+        wraps=tfl_interpreter_utils.create_tfl_interpreter,
+    ) as create_tfl_interpreter:
+      calibration_result = self._quantizer.calibrate(calib_data)
+    self.assertLen(calibration_result, 7)
+    create_tfl_interpreter.assert_not_called()
+
+  def test_interpreters_load_float_model_from_path(self):
+    self._quantizer.load_quantization_recipe('default_a8w8')
+    tfl_interpreter_utils.get_interpreter_pool().clear()
+    with mock.patch.object(
+        tfl_interpreter_utils.tfl,
+        'Interpreter',
+        wraps=tfl_interpreter_utils.tfl.Interpreter,
+    ) as interpreter_cls:
+      calibration_result = self._quantizer.calibrate(_get_calibration_data())
+      self._quantizer.quantize(calibration_result)
+      self._quantizer.validate()
+    model_paths = [
+        call.kwargs['model_path']
+        for call in interpreter_cls.call_args_list
+        if 'model_path' in call.kwargs
+    ]
+    self.assertNotEmpty(model_paths)
+    self.assertSameElements(model_paths, [self._test_model_path])
+    float_model_size = os.path.getsize(self._test_model_path)
+    for call in interpreter_cls.call_args_list:
+      if 'model_content' in call.kwargs:
+        self.assertNotEqual(
+            len(call.kwargs['model_content']), float_model_size
+        )
+
+  def test_calibrate_with_batch_size_succeeds(self):
+    self._quantizer.load_quantization_recipe('default_a8w8')
+    calibration_result = self._quantizer.calibrate(
+        _get_calibration_data(), batch_size=4
+    )
+    self.assertLen(calibration_result, 7)
+    with self.assertRaisesRegex(ValueError, 'not supported with multiple'):
+      self._quantizer.calibrate(
+          _get_calibration_data(), num_workers=2, batch_size=4
+      )
+
+  def test_estimate_peak_memory(self):
+    self._quantizer.load_quantization_recipe('default_a8w8')
+    estimate = self._quantizer.estimate_peak_memory(
+        mode=_CalibrationMode.CALIBRATION_PROFILER_BASED
+    )
+    self.assertEqual(
+        estimate.calibration_mode, _CalibrationMode.CALIBRATION_PROFILER_BASED
+    )
+    self.assertEqual(
+        estimate.model_bytes, len(self._quantizer._float_model_buffer)
+    )
+    self.assertGreater(estimate.quantized_params_bytes, 0)
+    self.assertGreaterEqual(
+        estimate.peak_bytes, estimate.phase_peak_bytes['calibration']
+    )
+    streamed_estimate = self._quantizer.estimate_peak_memory(
+        mode=_CalibrationMode.CALIBRATION_PROFILER_BASED,
+        stream_quantized_data=True,
+    )
+    self.assertLess(
+        streamed_estimate.phase_peak_bytes['transformation'],
+        estimate.phase_peak_bytes['transformation'],
+    )
+
   @parameterized.product(
       recipe_name=[
           'default_a8w8',
@@ -317,6 +396,113 @@ class QuantizerTest(parameterized.TestCase):
     ):
       self._quantizer.quantize()
 
+  def test_quantize_with_num_workers_matches_serial(self):
+    self._quantizer.load_quantization_recipe(self._test_recipe)
+    serial_model = bytes(self._quantizer.quantize().quantized_model)
+    parallel_model = bytes(
+        self._quantizer.quantize(num_workers=4).quantized_model
+    )
+    self.assertEqual(parallel_model, serial_model)
+
+  @parameterized.product(
+      model_file_name=(None, 'quantized_model.tflite'), num_bits=(8, 4)
+  )
+  def test_quantize_streaming_quantized_data_matches_in_memory(
+      self, model_file_name, num_bits
+  ):
+    self._quantizer.load_quantization_recipe(self._test_recipe)
+    if num_bits != 8:
+      self._quantizer.add_weight_only_config(
+          regex='.*',
+          operation_name=qtyping.TFLOperationName.FULLY_CONNECTED,
+          num_bits=num_bits,
+      )
+    serialize_to_path = None
+    if model_file_name is not None:
+      serialize_to_path = os.path.join(self._tmp_save_path, model_file_name)
+    in_memory_model = bytes(self._quantizer.quantize().quantized_model)
+    with mock.patch.object(
+        transformation_utils.LazyBufferData,
+        'write_to',
+        autospec=True,
+        side_effect=transformation_utils.LazyBufferData.write_to,
+    ) as mock_write_to:
+      streamed_model = bytes(
+          self._quantizer.quantize(
+              serialize_to_path=serialize_to_path, stream_quantized_data=True
+          ).quantized_model
+      )
+    # The weights are quantized when the model is serialized.
+    mock_write_to.assert_called()
+    self.assertEqual(streamed_model, in_memory_model)
+
+  def test_quantize_streams_quantized_data_to_directory(self):
+    self._quantizer.load_quantization_recipe(self._test_recipe)
+    quantized_data_dir = self.create_tempdir().full_path
+    with mock.patch.object(
+        quantized_data_store,
+        'QuantizedDataStore',
+        wraps=quantized_data_store.QuantizedDataStore,
+    ) as mock_store:
+      self._quantizer.quantize(
+          stream_quantized_data=True, quantized_data_dir=quantized_data_dir
+      )
+    mock_store.assert_called_once_with(quantized_data_dir)
+
+  def test_quantize_does_not_stream_quantized_data_by_default(self):
+    self._quantizer.load_quantization_recipe(self._test_recipe)
+    expected_model = bytes(self._quantizer.quantize().quantized_model)
+    # Whatever the model size, the default path needs no temporary files.
+    missing_dir = os.path.join(self.create_tempdir().full_path, 'missing')
+    with mock.patch.object(tempfile, 'tempdir', missing_dir):
+      with mock.patch.object(
+          quantized_data_store,
+          'QuantizedDataStore',
+          wraps=quantized_data_store.QuantizedDataStore,
+      ) as mock_store:
+        quantized_model = bytes(self._quantizer.quantize().quantized_model)
+    mock_store.assert_not_called()
+    self.assertEqual(quantized_model, expected_model)
+
+  def test_quantize_shares_float_model_graph_index(self):
+    self._quantizer.load_quantization_recipe(self._test_recipe)
+    with mock.patch.object(
+        model_graph_index,
+        'ModelGraphIndex',
+        wraps=model_graph_index.ModelGraphIndex,
+    ) as mock_graph_index:
+      self._quantizer.quantize()
+    # The index built with the quantizer is used by all the stages.
+    mock_graph_index.assert_not_called()
+
+  def test_quantize_incremental_matches_full(self):
+    self._quantizer.load_quantization_recipe(self._test_recipe)
+    self._quantizer.quantize(incremental=True)
+    self._quantizer.add_weight_only_config(
+        regex='.*',
+        operation_name=qtyping.TFLOperationName.FULLY_CONNECTED,
+        num_bits=4,
+    )
+    with mock.patch.object(
+        algorithm_manager,
+        'get_quantization_func',
+        wraps=algorithm_manager.get_quantization_func,
+    ) as get_quantization_func:
+      incremental_model = bytes(
+          self._quantizer.quantize(incremental=True).quantized_model
+      )
+    num_rematerialized_ops = get_quantization_func.call_count
+    with mock.patch.object(
+        algorithm_manager,
+        'get_quantization_func',
+        wraps=algorithm_manager.get_quantization_func,
+    ) as get_quantization_func:
+      full_model = bytes(self._quantizer.quantize().quantized_model)
+    self.assertEqual(incremental_model, full_model)
+    # Only the ops whose config changed are quantized again.
+    self.assertGreater(num_rematerialized_ops, 0)
+    self.assertLess(num_rematerialized_ops, get_quantization_func.call_count)
+
   def test_quantize_no_recipe_raise_error(self):
     qt = quantizer.Quantizer(self._test_model_path, None)
     error_message = 'Can not quantize without a quantization recipe.'
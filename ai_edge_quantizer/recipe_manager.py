@@ -83,6 +83,31 @@ class RecipeManager:
     self._scope_configs: collections.OrderedDict[
         str, list[OpQuantizationRecipe]
     ] = collections.OrderedDict()
+    # Incremented on every recipe modification.
+    self._version = 0
+    # The recipe compiled for `get_quantization_configs`, rebuilt when the
+    # recipe version changes: the precompiled scope regexes, the configs
+    # resolved for each (op, scope), and whether each (algorithm, op, config)
+    # passes the algorithm config checks.
+    self._compiled_version: Optional[int] = None
+    self._compiled_scopes: list[
+        tuple[re.Pattern[str], list[OpQuantizationRecipe]]
+    ] = []
+    self._resolved_configs: dict[
+        tuple[_TFLOpName, str], tuple[str, _OpQuantizationConfig]
+    ] = {}
+    self._config_check_results: dict[
+        tuple[str, _TFLOpName, _OpQuantizationConfig], bool
+    ] = {}
+
+  @property
+  def version(self) -> int:
+    """Returns a counter that changes whenever the recipe is modified.
+
+    Components that derive data from the recipe (e.g., calibration plans) use
+    it to detect that their cached data is stale.
+    """
+    return self._version
 
   def add_quantization_config(
       self,
@@ -121,6 +146,7 @@ class RecipeManager:
     config = OpQuantizationRecipe(
         regex, operation_name, algorithm_key, op_config
     )
+    self._version += 1
     # Special care if trying to set all ops to some config.
     if config.operation == _TFLOpName.ALL_SUPPORTED:
       self._scope_configs[regex] = [config]
@@ -175,12 +201,17 @@ class RecipeManager:
     Returns:
        A tuple of quantization algorithm, and quantization configuration.
     """
+    self._compile_recipe()
+    memo_key = (target_op_name, scope_name)
+    if memo_key in self._resolved_configs:
+      return self._resolved_configs[memo_key]
+
     result_key, result_config = (
         AlgorithmName.NO_QUANTIZE,
         _OpQuantizationConfig(),
     )
-    for scope_regex, recipes in self._scope_configs.items():
-      if re.search(scope_regex, scope_name):
+    for scope_pattern, recipes in self._compiled_scopes:
+      if scope_pattern.search(scope_name):
         for recipe in recipes:
           if (
               recipe.operation != _TFLOpName.ALL_SUPPORTED
@@ -190,17 +221,54 @@ class RecipeManager:
           selected_recipe = recipe
           if selected_recipe.algorithm_key != AlgorithmName.NO_QUANTIZE:
             # The selected recipe must contain a supported config.
-            try:
-              algorithm_manager.check_op_quantization_config(
-                  recipe.algorithm_key, target_op_name, recipe.op_config
-              )
-            except ValueError:
+            if not self._is_supported_config(
+                recipe.algorithm_key, target_op_name, recipe.op_config
+            ):
               continue  # Skip the recipe if it is not supported.
           result_config = selected_recipe.op_config
           result_key = selected_recipe.algorithm_key
 
+    self._resolved_configs[memo_key] = (result_key, result_config)
     return result_key, result_config
 
+  def _compile_recipe(self) -> None:
+    """Compiles the recipe for lookups, if it was modified since."""
+    if self._compiled_version == self._version:
+      return
+    self._compiled_scopes = [
+        (re.compile(scope_regex), recipes)
+        for scope_regex, recipes in self._scope_configs.items()
+    ]
+    self._resolved_configs = {}
+    self._config_check_results = {}
+    self._compiled_version = self._version
+
+  def _is_supported_config(
+      self,
+      algorithm_key: str,
+      target_op_name: _TFLOpName,
+      op_config: _OpQuantizationConfig,
+  ) -> bool:
+    """Returns whether the config passes the checks of the algorithm."""
+    check_key = (algorithm_key, target_op_name, op_config)
+    try:
+      return self._config_check_results[check_key]
+    except KeyError:
+      pass
+    except TypeError:
+      # The config has unhashable algorithm params, so it is checked anew.
+      check_key = None
+    try:
+      algorithm_manager.check_op_quantization_config(
+          algorithm_key, target_op_name, op_config
+      )
+      is_supported = True
+    except ValueError:
+      is_supported = False
+    if check_key is not None:
+      self._config_check_results[check_key] = is_supported
+    return is_supported
+
   def get_quantization_recipe(self) -> qtyping.ModelQuantizationRecipe:
     """Gets the full quantization recipe from the manager.
 
@@ -237,6 +305,7 @@ class RecipeManager:
         get_full_config.
     """
     self._scope_configs = collections.OrderedDict()
+    self._version += 1
     for config in quantization_recipe:
       self.add_quantization_config(
           config['regex'],
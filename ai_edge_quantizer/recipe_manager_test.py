@@ -16,6 +16,7 @@
 """Tests for recipe_manager.py."""
 
 import copy
+from unittest import mock
 
 from absl.testing import absltest
 from absl.testing import parameterized
@@ -289,6 +290,95 @@ class ConfiguratorTest(parameterized.TestCase):
     self.assertIsNotNone(weight_tensor_config)
     self.assertEqual(weight_tensor_config.num_bits, 4)
 
+  def test_version_changes_when_recipe_is_modified(self):
+    initial_version = self._recipe_manager.version
+    self._recipe_manager.add_quantization_config(
+        regex='.*',
+        operation_name=_TFLOpName.FULLY_CONNECTED,
+        algorithm_key=_AlgorithmName.MIN_MAX_UNIFORM_QUANT,
+        op_config=qtyping.OpQuantizationConfig(
+            weight_tensor_config=_TensorQuantConfig(num_bits=8),
+            compute_precision=_ComputePrecision.INTEGER,
+        ),
+    )
+    added_version = self._recipe_manager.version
+    self.assertNotEqual(added_version, initial_version)
+
+    self._recipe_manager.get_quantization_configs(
+        _TFLOpName.FULLY_CONNECTED, 'model/dense'
+    )
+    self.assertEqual(self._recipe_manager.version, added_version)
+
+    self._recipe_manager.load_quantization_recipe([])
+    self.assertNotEqual(self._recipe_manager.version, added_version)
+
+  def test_get_quantization_configs_is_memoized(self):
+    self._recipe_manager.add_quantization_config(
+        regex='.*/Dense.*',
+        operation_name=_TFLOpName.ALL_SUPPORTED,
+        algorithm_key=_AlgorithmName.MIN_MAX_UNIFORM_QUANT,
+        op_config=qtyping.OpQuantizationConfig(
+            weight_tensor_config=_TensorQuantConfig(num_bits=8),
+            compute_precision=_ComputePrecision.INTEGER,
+        ),
+    )
+    with mock.patch.object(
+        algorithm_manager,
+        'check_op_quantization_config',
+        wraps=algorithm_manager.check_op_quantization_config,
+    ) as mock_check:
+      for scope_name in ('model/Dense/op', 'model/Dense_1/op'):
+        for _ in range(2):
+          alg_key, op_config = self._recipe_manager.get_quantization_configs(
+              _TFLOpName.FULLY_CONNECTED, scope_name
+          )
+          self.assertEqual(alg_key, _AlgorithmName.MIN_MAX_UNIFORM_QUANT)
+          self.assertEqual(op_config.weight_tensor_config.num_bits, 8)  # pyrefly: ignore[missing-attribute]
+      # The config is checked once for all the scopes it matches.
+      mock_check.assert_called_once()
+
+      # Modifying the recipe invalidates the memoized configs.
+      self._recipe_manager.add_quantization_config(
+          regex='.*/Dense_1/.*',
+          operation_name=_TFLOpName.FULLY_CONNECTED,
+          algorithm_key=_AlgorithmName.NO_QUANTIZE,
+      )
+      alg_key, _ = self._recipe_manager.get_quantization_configs(
+          _TFLOpName.FULLY_CONNECTED, 'model/Dense_1/op'
+      )
+      self.assertEqual(alg_key, _AlgorithmName.NO_QUANTIZE)
+      alg_key, _ = self._recipe_manager.get_quantization_configs(
+          _TFLOpName.FULLY_CONNECTED, 'model/Dense/op'
+      )
+      self.assertEqual(alg_key, _AlgorithmName.MIN_MAX_UNIFORM_QUANT)
+
+  def test_get_quantization_configs_skips_unsupported_config(self):
+    # Configs for all the ops are only checked when they are looked up.
+    self._recipe_manager.add_quantization_config(
+        regex='.*',
+        operation_name=_TFLOpName.ALL_SUPPORTED,
+        algorithm_key=_AlgorithmName.MIN_MAX_UNIFORM_QUANT,
+        op_config=qtyping.OpQuantizationConfig(
+            weight_tensor_config=_TensorQuantConfig(num_bits=17),
+            compute_precision=_ComputePrecision.INTEGER,
+        ),
+    )
+    with mock.patch.object(
+        algorithm_manager,
+        'check_op_quantization_config',
+        wraps=algorithm_manager.check_op_quantization_config,
+    ) as mock_check:
+      for _ in range(2):
+        alg_key, _ = self._recipe_manager.get_quantization_configs(
+            _TFLOpName.FULLY_CONNECTED, 'model/Dense/op'
+        )
+        self.assertEqual(alg_key, _AlgorithmName.NO_QUANTIZE)
+        alg_key, _ = self._recipe_manager.get_quantization_configs(
+            _TFLOpName.FULLY_CONNECTED, 'model/Dense_1/op'
+        )
+        self.assertEqual(alg_key, _AlgorithmName.NO_QUANTIZE)
+      mock_check.assert_called_once()
+
   def test_add_unsupported_quantization_config(self):
     error_message = 'Unsupported operation'
     # Add unregistered operations.
@@ -19,13 +19,12 @@ Given quantization parameters, create a list of transformation instructions that
 can then be used by transformation_performer. Includes necessary optimizations
 """
 
-import collections
-from collections.abc import Iterator
 import dataclasses
 from typing import Optional
 from ai_edge_quantizer import qtyping
 from ai_edge_quantizer.algorithms.utils import common_utils
 from ai_edge_quantizer.utils import constrained_ops_utils
+from ai_edge_quantizer.utils import model_graph_index
 from ai_edge_quantizer.utils import progress_utils
 from ai_edge_quantizer.utils import tfl_flatbuffer_utils
 
@@ -170,14 +169,15 @@ class TransformationInstructionsGenerator:
     Args:
       float_tflite: the original TFlite model in bytearray or file path.
     """
+    # The graph info of the tensors, filled from the graph index on demand.
+    self._tensor_name_to_graph_info: dict[
+        str, TransformationInstructionsGenerator.TensorGraphInfo
+    ] = {}
+    self._graph_index: Optional[model_graph_index.ModelGraphIndex] = None
     if float_tflite is None:
-      self._tensor_name_to_graph_info: dict[
-          str, TransformationInstructionsGenerator.TensorGraphInfo
-      ] = {}
       self.flatbuffer_model: qtyping.ModelT = ()
     else:
-      self.flatbuffer_model = tfl_flatbuffer_utils.read_model(float_tflite)
-      self._create_tensor_name_to_graph_info_map()
+      self._set_flatbuffer_model(tfl_flatbuffer_utils.read_model(float_tflite))
     self._same_as_input_scale_ops = (
         constrained_ops_utils.get_constrained_op_list(
             _OpQuantConstraint.SAME_AS_INPUT_SCALE
@@ -201,48 +201,47 @@ class TransformationInstructionsGenerator:
     producer: int
     consumers: list[int]
 
-  def _tensor_info_generator(
-      self, subgraph_id: int, subgraph: qtyping.SubGraphT
-  ) -> Iterator[tuple[str, TensorGraphInfo]]:
-    """Generator function for tensor info.
+  def _set_flatbuffer_model(
+      self,
+      flatbuffer_model: qtyping.ModelT,
+      graph_index: Optional[model_graph_index.ModelGraphIndex] = None,
+  ) -> None:
+    """Sets the model to generate the instructions for.
 
     Args:
-      subgraph_id: Index for the given subgraph,
-      subgraph: Subgraph struct to generate tensor info on.
+      flatbuffer_model: The flatbuffer model to be quantized.
+      graph_index: The index of the graph of `flatbuffer_model`, or of a model
+        it is a copy of. Built from `flatbuffer_model` if not provided.
+    """
+    self.flatbuffer_model = flatbuffer_model
+    if graph_index is None:
+      graph_index = model_graph_index.ModelGraphIndex(flatbuffer_model)
+    self._graph_index = graph_index
+    self._tensor_name_to_graph_info = {}
 
-    Yields:
-      A tuple of tensor_name and TensorGraphInfo.
+  def _get_tensor_graph_info(self, tensor_name: str) -> TensorGraphInfo:
+    """Returns the graph info of a tensor.
+
+    Args:
+      tensor_name: The name of the tensor.
+
+    Raises:
+      KeyError: If the model has no tensor with this name.
     """
-    # Create mappings of the producers and consumers of each tensor.
-    consumers_for_tid = collections.defaultdict(list)
-    producer_of_tid = {}
-    for tid in subgraph.outputs:
-      consumers_for_tid[tid].append(-1)
-    for op_id, op in enumerate(subgraph.operators):
-      for tid in op.inputs:
-        consumers_for_tid[tid].append(op_id)
-      for tid in op.outputs:
-        producer_of_tid[tid] = op_id
-
-    # Loop over the tensors and pack their TensorGraphInfo.
-    for tensor_id, tensor in enumerate(subgraph.tensors):
-      consumers = consumers_for_tid[tensor_id]
-      producer = producer_of_tid.get(tensor_id, -1)
-      tensor_info = self.TensorGraphInfo(
-          tensor_id, subgraph_id, producer, consumers
+    if tensor_name not in self._tensor_name_to_graph_info:
+      if self._graph_index is None:
+        raise KeyError(tensor_name)
+      # TODO: b/333607428 - support graph input & output
+      subgraph_id, tensor_id = self._graph_index.get_tensor_location(
+          tensor_name
       )
-      tensor_name = tfl_flatbuffer_utils.get_tensor_name(tensor)
-      yield tensor_name, tensor_info
-
-  def _create_tensor_name_to_graph_info_map(self):
-    """Create a mapping between tensor name and tensor info."""
-    self._tensor_name_to_graph_info = {}
-    # TODO: b/333607428 - support graph input & output
-    for subgraph_id, subgraph in enumerate(self.flatbuffer_model.subgraphs):
-      for tensor_name, tensor_info in self._tensor_info_generator(
-          subgraph_id, subgraph
-      ):
-        self._tensor_name_to_graph_info[tensor_name] = tensor_info
+      self._tensor_name_to_graph_info[tensor_name] = self.TensorGraphInfo(
+          tensor_id,
+          subgraph_id,
+          self._graph_index.get_producer(subgraph_id, tensor_id),
+          self._graph_index.get_consumers(subgraph_id, tensor_id),
+      )
+    return self._tensor_name_to_graph_info[tensor_name]
 
   def _group_consumer_transformations(
       self, param: qtyping.TensorTransformationParams
@@ -337,7 +336,7 @@ class TransformationInstructionsGenerator:
     Returns:
       A list of transformation rules available for vertical optimization
     """
-    tensor_info = self._tensor_name_to_graph_info[param.tensor_name]
+    tensor_info = self._get_tensor_graph_info(param.tensor_name)
     transformations_available_for_vertical_optimization = []
     # we start at 1 because consumer groups in index 0 is the inital state
     # and does not contain actual information
@@ -378,7 +377,7 @@ class TransformationInstructionsGenerator:
     Returns:
       A list of transformation rules unavailable for vertical optimization
     """
-    tensor_info = self._tensor_name_to_graph_info[param.tensor_name]
+    tensor_info = self._get_tensor_graph_info(param.tensor_name)
     other_consumer_transformations = []
     for transformation_idx in range(2, len(consumer_group)):
       for group in consumer_group[transformation_idx]:
@@ -631,7 +630,7 @@ class TransformationInstructionsGenerator:
       Transformations to be applied to the given tensor.
     """
     # Setup the structure.
-    tensor_info = self._tensor_name_to_graph_info[param.tensor_name]
+    tensor_info = self._get_tensor_graph_info(param.tensor_name)
     tensor_trans_insts = qtyping.TensorTransformationInsts(
         param.tensor_name, tensor_info.subgraph_id, []
     )
@@ -835,6 +834,7 @@ class TransformationInstructionsGenerator:
       params: dict[str, qtyping.TensorTransformationParams],
       flatbuffer_model: Optional[qtyping.ModelT] = None,
       enable_progress_bar: bool | None = None,
+      graph_index: Optional[model_graph_index.ModelGraphIndex] = None,
   ) -> dict[str, qtyping.TensorTransformationInsts]:
     """Converts quantization params to transformation instructions.
 
@@ -845,14 +845,15 @@ class TransformationInstructionsGenerator:
       flatbuffer_model: the flatbuffer model to be quantized.
       enable_progress_bar: Whether to enable the progress bar. By default, it is
         disabled for smaller models and enabled for larger models.
+      graph_index: The index of the graph of `flatbuffer_model`, or of a model
+        it is a copy of. Built from `flatbuffer_model` if not provided.
 
     Returns:
       a dictionary with tensor name as key and transformation instructions as
       value
     """
     if flatbuffer_model is not None:
-      self.flatbuffer_model = flatbuffer_model
-      self._create_tensor_name_to_graph_info_map()
+      self._set_flatbuffer_model(flatbuffer_model, graph_index)
 
     insts = {}
     for tensor_name in params:
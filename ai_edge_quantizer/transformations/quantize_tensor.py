@@ -192,12 +192,22 @@ def quantize_tensor(
             buffer_id,
         )
       transformation_input.buffer_origin[buffer_id] = quant_params
-      transformation_input.model.buffers[buffer_id].data = (
-          transformation_utils.pack_data(
-              quant_params.num_bits,
-              np.ravel(np.asarray(quant_params.quantized_data)).view(np.uint8),
-          )
-      )
+      if isinstance(quant_params.quantized_data, qtyping.LazyQuantizedData):
+        # Quantize and pack the data when the model is serialized.
+        transformation_input.model.buffers[buffer_id].data = (
+            transformation_utils.LazyBufferData(
+                quant_params.quantized_data, quant_params.num_bits
+            )
+        )
+      else:
+        transformation_input.model.buffers[buffer_id].data = (
+            transformation_utils.pack_data(
+                quant_params.num_bits,
+                np.ravel(np.asarray(quant_params.quantized_data)).view(
+                    np.uint8
+                ),
+            )
+        )
 
   if isinstance(transformation_input.quant_params, qtyping.UniformQuantParams):
     if transformation_input.quant_params.block_size == 0:
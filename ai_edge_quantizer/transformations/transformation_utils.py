@@ -77,6 +77,53 @@ class HashableMemoryView:
     return self._mv == value
 
 
+class LazyBufferData:
+  """The packed data of a buffer, computed when the model is serialized.
+
+  Stands for the data of a buffer quantized with `LazyQuantizedData`. The
+  quantized data is computed and packed one chunk at a time, so that only a
+  chunk of it is resident at once. Every chunk but the last must hold a whole
+  number of packed bytes.
+
+  Attributes:
+    quantized_data: The quantized data of the buffer.
+    num_bits: The bit width the data is packed to.
+  """
+
+  def __init__(
+      self, quantized_data: qtyping.LazyQuantizedData, num_bits: int
+  ):
+    self.quantized_data = quantized_data
+    self.num_bits = num_bits
+
+  def __len__(self) -> int:
+    """Returns the size of the packed data, in bytes."""
+    if self.num_bits in (2, 4):
+      return (self.quantized_data.size * self.num_bits + 7) // 8
+    return self.quantized_data.nbytes
+
+  def write_to(self, destination: qtyping.BufferType, offset: int) -> None:
+    """Computes the packed data into `destination`, starting at `offset`.
+
+    Args:
+      destination: The writable buffer to write the data into.
+      offset: The offset of the data in `destination`.
+    """
+    end = offset + len(self)
+    for chunk in self.quantized_data.iter_chunks():
+      packed = pack_data(self.num_bits, chunk.view(np.uint8))
+      if offset + packed.size > end:
+        raise ValueError('The chunks are not aligned to whole packed bytes.')
+      destination[offset : offset + packed.size] = memoryview(packed)
+      offset += packed.size
+
+  def materialize(self) -> np.ndarray:
+    """Returns the packed data as an array of bytes."""
+    data = np.empty(len(self), dtype=np.uint8)
+    self.write_to(memoryview(data), 0)
+    return data
+
+
 def add_op_code(
     op_code: qtyping.OperatorCodeT,
     model_op_codes: list[qtyping.OperatorCodeT],
@@ -114,7 +161,7 @@ def add_op_code(
 
 
 def get_constant_buffer(
-    data: np.ndarray | qtyping.BufferType,
+    data: np.ndarray | qtyping.BufferType | LazyBufferData,
     model: qtyping.ModelT,
     force_duplicate_buffer: bool = False,
 ) -> int:
@@ -131,6 +178,15 @@ def get_constant_buffer(
   Returns:
     The index of the new buffer in the model.
   """
+  # Lazy data is never shared, as comparing it would compute it.
+  if isinstance(data, LazyBufferData):
+    new_buffer = qtyping.BufferT()
+    new_buffer.data = data
+    new_buffer.offset = 0
+    new_buffer.size = 0
+    model.buffers.append(new_buffer)
+    return len(model.buffers) - 1
+
   # Convert the data to a 1-D `memoryview`.
   if isinstance(data, np.ndarray):
     # in the case where the data is passed from quantization_params.
@@ -140,7 +196,9 @@ def get_constant_buffer(
   if not (id_for_buffer_data := getattr(model, '_id_for_buffer_data', None)):  # pyrefly: ignore[bad-assignment]
     id_for_buffer_data: dict[HashableMemoryView, int] = {}
     for buffer_id, buffer in enumerate(model.buffers):
-      if (buffer_data := buffer.data) is not None:
+      if (buffer_data := buffer.data) is not None and not isinstance(
+          buffer_data, LazyBufferData
+      ):
         id_for_buffer_data[HashableMemoryView(buffer_data)] = buffer_id
     model._id_for_buffer_data = id_for_buffer_data  # pylint: disable=protected-access
 
@@ -132,6 +132,51 @@ class TransformationUtilsTest(parameterized.TestCase):
         expected_buffer_data,
     )
 
+  @parameterized.parameters(2, 4, 8)
+  def test_lazy_buffer_data_matches_pack_data(self, num_bits):
+    data = np.random.default_rng(0).integers(
+        -(2 ** (num_bits - 1)), 2 ** (num_bits - 1), size=(7, 4), dtype=np.int8
+    )
+    buffer_data = transformation_utils.LazyBufferData(
+        qtyping.LazyQuantizedData(
+            shape=data.shape,
+            dtype=data.dtype,
+            compute_rows=lambda start, end: data[start:end],
+            rows_per_chunk=2,
+        ),
+        num_bits,
+    )
+    expected = transformation_utils.pack_data(num_bits, data.view(np.uint8))
+    self.assertLen(buffer_data, expected.size)
+    np.testing.assert_array_equal(buffer_data.materialize(), expected)
+
+    destination = bytearray(len(buffer_data) + 3)
+    buffer_data.write_to(destination, 3)
+    self.assertEqual(destination[3:], expected.tobytes())
+
+  def test_get_constant_buffer_does_not_share_lazy_data(self):
+    buffer_data = transformation_utils.LazyBufferData(
+        qtyping.LazyQuantizedData(
+            shape=(4,),
+            dtype=np.int8,
+            compute_rows=lambda start, end: np.zeros(end - start, np.int8),
+            rows_per_chunk=4,
+        ),
+        8,
+    )
+    first_buffer_idx = transformation_utils.get_constant_buffer(
+        buffer_data, self.model
+    )
+    second_buffer_idx = transformation_utils.get_constant_buffer(
+        buffer_data, self.model
+    )
+    self.assertNotEqual(first_buffer_idx, second_buffer_idx)
+    self.assertIs(self.model.buffers[first_buffer_idx].data, buffer_data)
+    # Other buffers can still be added once lazy data is in the model.
+    transformation_utils.get_constant_buffer(
+        np.zeros(4, dtype=np.int8), self.model
+    )
+
   @parameterized.named_parameters(
       dict(
           testcase_name="float32",
@@ -0,0 +1,172 @@
+# Copyright 2024 The AI Edge Quantizer Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+"""On-disk cache of the activations of a float model.
+
+Calibrating a float model against several recipes, or validating several
+quantized models against the same float model, invokes the float model on the
+same samples over and over. The cache stores the tensors of a float model
+invocation keyed by (model hash, signature key, sample id, tensor name), so
+that only the first run invokes the model.
+"""
+
+from collections.abc import Iterable, Iterator, Mapping
+import hashlib
+from typing import Any, Optional
+
+import numpy as np
+
+from ai_edge_litert.tools import mmap_utils
+from ai_edge_quantizer.utils import calibration_utils
+from ai_edge_quantizer.utils import file_cache
+
+# Key of the cached tensor array in the entries of a cache file.
+_VALUE_KEY = "value"
+# Metadata keys of a cache file: the names of the tensors the invocation was
+# read for (including the empty tensors, which are not stored), and whether
+# they are all the tensors of the main subgraph of the signature.
+_TENSOR_NAMES_METADATA_KEY = "tensor_names"
+_COMPLETE_METADATA_KEY = "complete"
+
+
+def get_model_hash(model: str | bytes) -> str:
+  """Returns the content hash of a model.
+
+  Args:
+    model: The model path or content.
+  """
+  if isinstance(model, str):
+    model = mmap_utils.get_file_contents(model)  # pyrefly: ignore[bad-assignment]
+  return hashlib.sha256(model).hexdigest()  # pyrefly: ignore[bad-argument-type]
+
+
+def get_sample_id(sample: Mapping[str, Any]) -> str:
+  """Returns the content hash of a signature input sample.
+
+  Args:
+    sample: The signature input (input name to value).
+  """
+  sample_hash = hashlib.sha256()
+  for input_name in sorted(sample):
+    value = np.asarray(sample[input_name])
+    sample_hash.update(input_name.encode("utf-8"))
+    sample_hash.update(f"{value.dtype.str}{value.shape}".encode("utf-8"))
+    if value.dtype.hasobject:
+      sample_hash.update(repr(value.tolist()).encode("utf-8"))
+    else:
+      sample_hash.update(np.ascontiguousarray(value).data)
+  return sample_hash.hexdigest()
+
+
+class CachedActivations(Mapping[str, np.ndarray]):
+  """The tensors of a cached invocation, memory-mapped from the cache file."""
+
+  def __init__(self, file_path: str):
+    self._entries = calibration_utils.MappedCalibrationResults(file_path)
+    self._tensor_names = frozenset(
+        self._entries.metadata.get(_TENSOR_NAMES_METADATA_KEY, ())
+    )
+
+  @property
+  def complete(self) -> bool:
+    """Whether all the tensors of the signature main subgraph are cached."""
+    return self._entries.metadata.get(_COMPLETE_METADATA_KEY, False)
+
+  @property
+  def tensor_names(self) -> frozenset[str]:
+    """The names of the tensors the invocation was cached for."""
+    return self._tensor_names
+
+  def covers(self, tensor_names: Iterable[str]) -> bool:
+    """Returns whether the invocation was cached for all `tensor_names`."""
+    return self._tensor_names.issuperset(tensor_names)
+
+  def __getitem__(self, tensor_name: str) -> np.ndarray:
+    return self._entries[tensor_name][_VALUE_KEY]
+
+  def __contains__(self, tensor_name: object) -> bool:
+    return tensor_name in self._entries
+
+  def __iter__(self) -> Iterator[str]:
+    return iter(self._entries)
+
+  def __len__(self) -> int:
+    return len(self._entries)
+
+
+class ActivationCache(file_cache.FileCache):
+  """An on-disk, size-capped cache of float model activations.
+
+  Each cached invocation (a model, signature and input sample) is stored in
+  one file, in the binary calibration result format, so its tensors are read
+  lazily from a memory-mapped file. When the cache exceeds its size cap, the
+  least recently used invocations are evicted. The recency is persisted as the
+  file modification time, so it carries over to other cache instances.
+
+  Skipping an invocation skips its side effects, so the cache must not be used
+  with stateful signatures (e.g., with a KV cache).
+  """
+
+  def get(
+      self, model_hash: str, signature_key: Optional[str], sample_id: str
+  ) -> Optional[CachedActivations]:
+    """Gets the cached tensors of an invocation.
+
+    Args:
+      model_hash: The model hash (see `get_model_hash`).
+      signature_key: The invoked signature.
+      sample_id: The id of the input sample (see `get_sample_id`).
+
+    Returns:
+      The cached tensors (tensor name to array), or None if the invocation is
+      not cached.
+    """
+    return self._read(
+        self._get_file_name(model_hash, signature_key, sample_id),
+        CachedActivations,
+    )
+
+  def put(
+      self,
+      model_hash: str,
+      signature_key: Optional[str],
+      sample_id: str,
+      tensors: Mapping[str, np.ndarray],
+      tensor_names: Optional[Iterable[str]] = None,
+      complete: bool = False,
+  ) -> None:
+    """Caches the tensors of an invocation, replacing the cached ones.
+
+    Args:
+      model_hash: The model hash (see `get_model_hash`).
+      signature_key: The invoked signature.
+      sample_id: The id of the input sample (see `get_sample_id`).
+      tensors: Tensor name to array.
+      tensor_names: The names of the tensors the invocation was read for, if
+        some are not in `tensors` (e.g., because they are empty). Defaults to
+        the names in `tensors`.
+      complete: Whether `tensor_names` are all the tensors of the main
+        subgraph of the signature.
+    """
+    if tensor_names is None:
+      tensor_names = tensors.keys()
+    self._write(
+        self._get_file_name(model_hash, signature_key, sample_id),
+        {name: {_VALUE_KEY: tensor} for name, tensor in tensors.items()},
+        {
+            _TENSOR_NAMES_METADATA_KEY: sorted(tensor_names),
+            _COMPLETE_METADATA_KEY: complete,
+        },
+    )
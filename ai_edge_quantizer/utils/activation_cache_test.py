@@ -0,0 +1,103 @@
+# Copyright 2024 The AI Edge Quantizer Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+from absl.testing import absltest
+import numpy as np
+
+import os
+import io
+from ai_edge_quantizer.utils import activation_cache
+
+
+def _tensors(value: float, size: int = 1024):
+  return {
+      "a": np.full((size,), value, dtype=np.float32),
+      "b": np.arange(4, dtype=np.int32),
+  }
+
+
+class ActivationCacheTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self._directory = self.create_tempdir().full_path
+
+  def test_get_sample_id(self):
+    sample = {"x": np.ones((2, 3), np.float32), "y": np.zeros(2, np.int32)}
+    same_sample = {"y": np.zeros(2, np.int32), "x": np.ones((2, 3), np.float32)}
+    self.assertEqual(
+        activation_cache.get_sample_id(sample),
+        activation_cache.get_sample_id(same_sample),
+    )
+    for other_sample in (
+        {**sample, "x": np.ones((3, 2), np.float32)},
+        {**sample, "x": np.ones((2, 3), np.float64)},
+        {**sample, "y": np.ones(2, np.int32)},
+    ):
+      self.assertNotEqual(
+          activation_cache.get_sample_id(sample),
+          activation_cache.get_sample_id(other_sample),
+      )
+
+  def test_put_and_get(self):
+    cache = activation_cache.ActivationCache(self._directory)
+    self.assertIsNone(cache.get("model", "sig", "sample"))
+    cache.put(
+        "model", "sig", "sample", _tensors(1.0), tensor_names=["a", "b", "c"]
+    )
+
+    # A new cache instance reads the entries from the directory.
+    cache = activation_cache.ActivationCache(self._directory)
+    cached = cache.get("model", "sig", "sample")
+    self.assertIsNotNone(cached)
+    self.assertEqual(sorted(cached), ["a", "b"])
+    np.testing.assert_array_equal(cached["a"], _tensors(1.0)["a"])
+    self.assertEqual(cached["b"].dtype, np.int32)
+    self.assertTrue(cached.covers(["a", "c"]))
+    self.assertFalse(cached.covers(["a", "d"]))
+    self.assertFalse(cached.complete)
+    self.assertIsNone(cache.get("model", "other_sig", "sample"))
+    self.assertIsNone(cache.get("other_model", "sig", "sample"))
+
+  def test_put_evicts_least_recently_used(self):
+    cache = activation_cache.ActivationCache(self._directory)
+    cache.put("model", None, "sample0", _tensors(0.0))
+    entry_size = cache.size_bytes
+    cache = activation_cache.ActivationCache(
+        self._directory, max_size_bytes=2 * entry_size
+    )
+    cache.put("model", None, "sample1", _tensors(1.0))
+    # Using sample0 makes sample1 the least recently used entry.
+    self.assertIsNotNone(cache.get("model", None, "sample0"))
+    cache.put("model", None, "sample2", _tensors(2.0))
+
+    self.assertLen(cache, 2)
+    self.assertEqual(cache.size_bytes, 2 * entry_size)
+    self.assertIsNone(cache.get("model", None, "sample1"))
+    self.assertIsNotNone(cache.get("model", None, "sample0"))
+    self.assertIsNotNone(cache.get("model", None, "sample2"))
+    self.assertLen(os.listdir(self._directory), 2)
+
+  def test_clear(self):
+    cache = activation_cache.ActivationCache(self._directory)
+    cache.put("model", None, "sample", _tensors(0.0))
+    cache.clear()
+    self.assertEmpty(os.listdir(self._directory))
+    self.assertEqual(cache.size_bytes, 0)
+    self.assertIsNone(cache.get("model", None, "sample"))
+
+
+if __name__ == "__main__":
+  absltest.main()
@@ -0,0 +1,209 @@
+# Copyright 2024 The AI Edge Quantizer Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+"""Incremental, crash-safe checkpoints of a running calibration."""
+
+from collections.abc import Mapping
+import dataclasses
+import json
+from typing import Any
+
+import os
+import io
+from ai_edge_quantizer import qtyping
+from ai_edge_quantizer.utils import calibration_utils
+
+# The manifest lists the checkpoint files to apply, in order. It is the last
+# file written by a checkpoint, so a checkpoint is only visible once complete.
+_MANIFEST_FILE_NAME = "manifest.json"
+_CHECKPOINT_FILE_NAME_FORMAT = "qsvs_{:06d}.bin"
+# Keys of the dataset position and of the QSV updates in the metadata of the
+# checkpoint files.
+_POSITION_METADATA_KEY = "dataset_position"
+_QSV_UPDATES_METADATA_KEY = "qsv_updates"
+
+
+@dataclasses.dataclass
+class DatasetPosition:
+  """Position of a calibration in its dataset.
+
+  Attributes:
+    num_samples_consumed: Signature key to the number of samples of its dataset
+      that have been calibrated.
+    completed_signatures: Keys of the signatures whose dataset has been fully
+      calibrated.
+  """
+
+  num_samples_consumed: dict[str, int] = dataclasses.field(
+      default_factory=dict
+  )
+  completed_signatures: list[str] = dataclasses.field(default_factory=list)
+
+
+@dataclasses.dataclass
+class QsvUpdates:
+  """How the QSVs of a calibration have been updated, to resume the updates.
+
+  Attributes:
+    update_func_names: Tensor name to the qualified name ("module:qualname")
+      of the function used to update its QSV.
+    num_updates: Tensor name to the number of calibration steps folded into
+      its QSV.
+  """
+
+  update_func_names: dict[str, str] = dataclasses.field(default_factory=dict)
+  num_updates: dict[str, int] = dataclasses.field(default_factory=dict)
+
+
+class CalibrationCheckpointer:
+  """Writes and reads incremental calibration checkpoints in a directory.
+
+  Each checkpoint writes a binary calibration result file holding only the
+  QSVs that changed since the previous checkpoint (a QSV changes when the
+  calibrator assigns a new QSV object to the tensor), then atomically replaces
+  the manifest listing the files to apply. Loading applies the files in order.
+  After `max_incremental_checkpoints` incremental files, the next checkpoint
+  writes all the QSVs and drops the previous files, which bounds the size of
+  the directory.
+  """
+
+  def __init__(self, directory: str, max_incremental_checkpoints: int = 16):
+    """Initializes the checkpointer.
+
+    Args:
+      directory: The checkpoint directory. Created if it doesn't exist.
+      max_incremental_checkpoints: The number of incremental checkpoint files
+        after which the checkpoints are compacted into a full one.
+    """
+    self._directory = directory
+    self._max_incremental_checkpoints = max_incremental_checkpoints
+    os.makedirs(directory, exist_ok=True)
+    # Checkpoint files listed in the manifest, and the index of the next one.
+    self._file_names: list[str] = []
+    self._next_file_index = 0
+    # Tensor name to the QSV object in the latest checkpoint.
+    self._saved_qsvs: dict[str, qtyping.QSV] = {}
+
+  @property
+  def _manifest_path(self) -> str:
+    return os.path.join(self._directory, _MANIFEST_FILE_NAME)
+
+  def has_checkpoint(self) -> bool:
+    """Returns whether the directory holds a complete checkpoint."""
+    return os.path.exists(self._manifest_path)
+
+  def load(
+      self,
+  ) -> tuple[
+      dict[str, qtyping.QSV], dict[str, Any], DatasetPosition, QsvUpdates
+  ]:
+    """Loads the latest checkpoint.
+
+    The QSV arrays are memory-mapped from the checkpoint files.
+
+    Returns:
+      A tuple of (model_qsvs, metadata, dataset position, QSV updates).
+    """
+    with open(self._manifest_path) as f:
+      manifest = json.load(f)
+    self._file_names = manifest["files"]
+    self._next_file_index = manifest["next_file_index"]
+
+    model_qsvs = {}
+    metadata = {}
+    for file_name in self._file_names:
+      file_qsvs, metadata = calibration_utils.load_calibration_results(
+          os.path.join(self._directory, file_name)
+      )
+      model_qsvs.update(file_qsvs.items())
+    position = DatasetPosition(**metadata.pop(_POSITION_METADATA_KEY, {}))
+    qsv_updates = QsvUpdates(**metadata.pop(_QSV_UPDATES_METADATA_KEY, {}))
+    self._saved_qsvs = dict(model_qsvs)
+    return model_qsvs, metadata, position, qsv_updates
+
+  def save(
+      self,
+      model_qsvs: Mapping[str, qtyping.QSV],
+      metadata: Mapping[str, Any],
+      position: DatasetPosition,
+      qsv_updates: QsvUpdates | None = None,
+  ) -> None:
+    """Writes a checkpoint of the QSVs changed since the previous one.
+
+    Args:
+      model_qsvs: The QSVs of the model tensors.
+      metadata: The calibration metadata.
+      position: The position of the calibration in its dataset.
+      qsv_updates: How the QSVs have been updated. Written in full by every
+        checkpoint, as it is small.
+    """
+    if qsv_updates is None:
+      qsv_updates = QsvUpdates()
+    compact = len(self._file_names) >= self._max_incremental_checkpoints
+    if compact:
+      changed_qsvs = dict(model_qsvs)
+    else:
+      changed_qsvs = {
+          name: qsv
+          for name, qsv in model_qsvs.items()
+          if self._saved_qsvs.get(name) is not qsv
+      }
+
+    file_name = _CHECKPOINT_FILE_NAME_FORMAT.format(self._next_file_index)
+    calibration_utils.save_calibration_results(
+        os.path.join(self._directory, file_name),
+        changed_qsvs,
+        {
+            **metadata,
+            _POSITION_METADATA_KEY: dataclasses.asdict(position),
+            _QSV_UPDATES_METADATA_KEY: dataclasses.asdict(qsv_updates),
+        },
+        binary=True,
+    )
+    obsolete_file_names = self._file_names if compact else []
+    self._file_names = [] if compact else self._file_names
+    self._file_names.append(file_name)
+    self._next_file_index += 1
+    self._write_manifest()
+    for obsolete_file_name in obsolete_file_names:
+      os.remove(os.path.join(self._directory, obsolete_file_name))
+    self._saved_qsvs.update(changed_qsvs)
+
+  def clear(self) -> None:
+    """Removes the checkpoint from the directory."""
+    if self.has_checkpoint():
+      with open(self._manifest_path) as f:
+        self._file_names = json.load(f)["files"]
+      os.remove(self._manifest_path)
+    for file_name in self._file_names:
+      file_path = os.path.join(self._directory, file_name)
+      if os.path.exists(file_path):
+        os.remove(file_path)
+    self._file_names = []
+    self._saved_qsvs = {}
+
+  def _write_manifest(self) -> None:
+    tmp_manifest_path = f"{self._manifest_path}.tmp"
+    with open(tmp_manifest_path, "w") as f:
+      json.dump(
+          {
+              "files": self._file_names,
+              "next_file_index": self._next_file_index,
+          },
+          f,
+      )
+      f.flush()
+      os.fsync(f.fileno())
+    os.replace(tmp_manifest_path, self._manifest_path)
@@ -0,0 +1,140 @@
+# Copyright 2024 The AI Edge Quantizer Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+from absl.testing import absltest
+import numpy as np
+
+import os
+import io
+from ai_edge_quantizer.utils import calibration_checkpoint
+from ai_edge_quantizer.utils import calibration_utils
+
+
+def _qsv(min_val: float, max_val: float):
+  return {"min": np.array([min_val]), "max": np.array([max_val])}
+
+
+class CalibrationCheckpointerTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self._directory = self.create_tempdir().full_path
+    self._checkpointer = calibration_checkpoint.CalibrationCheckpointer(
+        self._directory, max_incremental_checkpoints=3
+    )
+
+  def _checkpoint_files(self):
+    return sorted(
+        name for name in os.listdir(self._directory) if name.endswith(".bin")
+    )
+
+  def test_save_and_load(self):
+    model_qsvs = {"a": _qsv(-1.0, 1.0), "b": _qsv(0.0, 2.0)}
+    position = calibration_checkpoint.DatasetPosition(
+        num_samples_consumed={"sig": 5}, completed_signatures=["other_sig"]
+    )
+    qsv_updates = calibration_checkpoint.QsvUpdates(
+        update_func_names={"a": "module:update", "b": "module:update"},
+        num_updates={"a": 5, "b": 3},
+    )
+    self.assertFalse(self._checkpointer.has_checkpoint())
+    self._checkpointer.save(
+        model_qsvs, {"num_samples_calibrated": 5}, position, qsv_updates
+    )
+
+    checkpointer = calibration_checkpoint.CalibrationCheckpointer(
+        self._directory
+    )
+    self.assertTrue(checkpointer.has_checkpoint())
+    loaded_qsvs, metadata, loaded_position, loaded_qsv_updates = (
+        checkpointer.load()
+    )
+    self.assertEqual(list(loaded_qsvs), ["a", "b"])
+    np.testing.assert_array_equal(loaded_qsvs["b"]["max"], [2.0])
+    self.assertEqual(metadata, {"num_samples_calibrated": 5})
+    self.assertEqual(loaded_position, position)
+    self.assertEqual(loaded_qsv_updates, qsv_updates)
+
+  def test_save_is_incremental(self):
+    model_qsvs = {"a": _qsv(-1.0, 1.0), "b": _qsv(0.0, 2.0)}
+    position = calibration_checkpoint.DatasetPosition()
+    self._checkpointer.save(model_qsvs, {}, position)
+    model_qsvs["b"] = _qsv(-3.0, 3.0)
+    self._checkpointer.save(model_qsvs, {}, position)
+
+    files = self._checkpoint_files()
+    self.assertLen(files, 2)
+    delta, _ = calibration_utils.load_calibration_results(
+        os.path.join(self._directory, files[1])
+    )
+    self.assertEqual(list(delta), ["b"])
+
+    loaded_qsvs, _, _, _ = calibration_checkpoint.CalibrationCheckpointer(
+        self._directory
+    ).load()
+    np.testing.assert_array_equal(loaded_qsvs["a"]["min"], [-1.0])
+    np.testing.assert_array_equal(loaded_qsvs["b"]["min"], [-3.0])
+
+  def test_save_compacts_checkpoints(self):
+    model_qsvs = {"a": _qsv(-1.0, 1.0), "b": _qsv(0.0, 2.0)}
+    position = calibration_checkpoint.DatasetPosition()
+    for i in range(4):
+      model_qsvs["a"] = _qsv(-i, i)
+      self._checkpointer.save(model_qsvs, {}, position)
+
+    # The fourth checkpoint holds all the QSVs and replaces the others.
+    files = self._checkpoint_files()
+    self.assertLen(files, 1)
+    full, _ = calibration_utils.load_calibration_results(
+        os.path.join(self._directory, files[0])
+    )
+    self.assertEqual(list(full), ["a", "b"])
+    np.testing.assert_array_equal(full["a"]["max"], [3.0])
+
+  def test_incomplete_checkpoint_is_ignored(self):
+    model_qsvs = {"a": _qsv(-1.0, 1.0)}
+    position = calibration_checkpoint.DatasetPosition(
+        num_samples_consumed={"sig": 1}
+    )
+    self._checkpointer.save(model_qsvs, {}, position)
+    # A checkpoint file written by a process that died before updating the
+    # manifest.
+    calibration_utils.save_calibration_results(
+        os.path.join(self._directory, "qsvs_000001.bin"),
+        {"a": _qsv(-9.0, 9.0)},
+        {},
+        binary=True,
+    )
+
+    loaded_qsvs, _, loaded_position, _ = (
+        calibration_checkpoint.CalibrationCheckpointer(self._directory).load()
+    )
+    np.testing.assert_array_equal(loaded_qsvs["a"]["max"], [1.0])
+    self.assertEqual(loaded_position.num_samples_consumed, {"sig": 1})
+
+  def test_clear(self):
+    self._checkpointer.save(
+        {"a": _qsv(-1.0, 1.0)}, {}, calibration_checkpoint.DatasetPosition()
+    )
+    checkpointer = calibration_checkpoint.CalibrationCheckpointer(
+        self._directory
+    )
+    checkpointer.clear()
+    self.assertFalse(checkpointer.has_checkpoint())
+    self.assertEmpty(self._checkpoint_files())
+
+
+if __name__ == "__main__":
+  absltest.main()
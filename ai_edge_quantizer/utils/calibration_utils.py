@@ -15,8 +15,12 @@
 
 """Utilities for model calibration."""
 
+from collections.abc import Iterator, Mapping, MutableMapping
 import copy
 import json
+import mmap
+import struct
+import tempfile
 from typing import Any
 
 import numpy as np
@@ -36,6 +40,16 @@ _SignatureData = dict[
     str, list[str]
 ]  # signature_key -> list of signature_names.
 
+# The binary calibration result container is laid out as: the magic, the size
+# of the JSON header (little-endian uint64), the JSON header, then the raw
+# array data. The data section and every array in it are aligned to
+# _BINARY_ALIGNMENT bytes, so arrays can be mapped in place.
+BINARY_FORMAT_MAGIC = b"AEQQSV01"
+_BINARY_HEADER_SIZE_FORMAT = "<Q"
+_BINARY_ALIGNMENT = 64
+# Key marking an encoded array in the JSON header.
+_ARRAY_KEY = "__ndarray__"
+
 
 class NumpyEncoder(json.JSONEncoder):
   """JSON Encoder for Numpy types."""
@@ -50,17 +64,248 @@ class NumpyEncoder(json.JSONEncoder):
     return super().default(o)
 
 
+def _align(offset: int) -> int:
+  return -(-offset // _BINARY_ALIGNMENT) * _BINARY_ALIGNMENT
+
+
+class _BinaryQsvEncoder:
+  """Encodes QSVs into a JSON header plus a list of aligned arrays."""
+
+  def __init__(self):
+    self.arrays: list[tuple[int, np.ndarray]] = []
+    self.data_size = 0
+
+  def encode(self, value: Any) -> Any:
+    """Returns the JSON header entry of `value`, registering its arrays."""
+    if isinstance(value, np.ndarray):
+      if value.dtype.hasobject:
+        raise ValueError(
+            f"Arrays of dtype {value.dtype} can't be saved in the binary"
+            " calibration result format."
+        )
+      array = np.ascontiguousarray(value)
+      offset = _align(self.data_size)
+      self.arrays.append((offset, array))
+      self.data_size = offset + array.nbytes
+      return {
+          _ARRAY_KEY: {
+              "dtype": array.dtype.str,
+              "shape": list(array.shape),
+              "offset": offset,
+          }
+      }
+    if isinstance(value, Mapping):
+      return {key: self.encode(v) for key, v in value.items()}
+    if isinstance(value, (list, tuple)):
+      return [self.encode(v) for v in value]
+    if isinstance(value, np.generic):
+      return value.item()
+    return value
+
+
+def _decode_binary_qsv_value(
+    value: Any, buffer: mmap.mmap, data_start: int
+) -> Any:
+  """Decodes a JSON header entry, mapping its arrays from `buffer`."""
+  if isinstance(value, dict):
+    if _ARRAY_KEY in value:
+      spec = value[_ARRAY_KEY]
+      dtype = np.dtype(spec["dtype"])
+      shape = tuple(spec["shape"])
+      return np.frombuffer(
+          buffer,
+          dtype=dtype,
+          count=int(np.prod(shape, dtype=np.int64)),
+          offset=data_start + spec["offset"],
+      ).reshape(shape)
+    return {
+        key: _decode_binary_qsv_value(v, buffer, data_start)
+        for key, v in value.items()
+    }
+  if isinstance(value, list):
+    return [_decode_binary_qsv_value(v, buffer, data_start) for v in value]
+  return value
+
+
+def is_binary_calibration_result(file_path: str) -> bool:
+  """Returns whether the file is in the binary calibration result format."""
+  with open(file_path, "rb") as f:
+    return f.read(len(BINARY_FORMAT_MAGIC)) == BINARY_FORMAT_MAGIC
+
+
+class MappedCalibrationResults(MutableMapping[str, qtyping.QSV]):
+  """Calibration results lazily read from a memory-mapped binary file.
+
+  Only the JSON header is parsed on construction. The QSV of a tensor is
+  decoded on first access, and its arrays are read-only views into the mapped
+  file, so only the pages that are actually used are read from disk. QSVs that
+  are assigned or deleted are kept in memory, the file is never modified.
+  """
+
+  def __init__(self, file_path: str):
+    with open(file_path, "rb") as f:
+      self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic_size = len(BINARY_FORMAT_MAGIC)
+    if self._buffer[:magic_size] != BINARY_FORMAT_MAGIC:
+      raise ValueError(
+          f"{file_path} is not a binary calibration result file."
+      )
+    size_end = magic_size + struct.calcsize(_BINARY_HEADER_SIZE_FORMAT)
+    (header_size,) = struct.unpack(
+        _BINARY_HEADER_SIZE_FORMAT, self._buffer[magic_size:size_end]
+    )
+    header = json.loads(self._buffer[size_end : size_end + header_size])
+    self._data_start = _align(size_end + header_size)
+    self._encoded_qsvs: dict[str, Any] = header["model_qsvs"]
+    self.metadata: dict[str, Any] = header.get("metadata", {})
+    # Decoded (or assigned) QSVs, and tensors deleted from the file's QSVs.
+    self._qsvs: dict[str, qtyping.QSV] = {}
+    self._deleted: set[str] = set()
+
+  def __getitem__(self, tensor_name: str) -> qtyping.QSV:
+    if tensor_name in self._qsvs:
+      return self._qsvs[tensor_name]
+    if tensor_name in self._deleted or tensor_name not in self._encoded_qsvs:
+      raise KeyError(tensor_name)
+    qsv = _decode_binary_qsv_value(
+        self._encoded_qsvs[tensor_name], self._buffer, self._data_start
+    )
+    self._qsvs[tensor_name] = qsv
+    return qsv
+
+  def __setitem__(self, tensor_name: str, qsv: qtyping.QSV) -> None:
+    self._qsvs[tensor_name] = qsv
+
+  def __delitem__(self, tensor_name: str) -> None:
+    if tensor_name not in self:
+      raise KeyError(tensor_name)
+    self._qsvs.pop(tensor_name, None)
+    if tensor_name in self._encoded_qsvs:
+      self._deleted.add(tensor_name)
+
+  def __contains__(self, tensor_name: object) -> bool:
+    if tensor_name in self._qsvs:
+      return True
+    return (
+        tensor_name in self._encoded_qsvs and tensor_name not in self._deleted
+    )
+
+  def __iter__(self) -> Iterator[str]:
+    for tensor_name in self._encoded_qsvs:
+      if tensor_name not in self._deleted:
+        yield tensor_name
+    for tensor_name in self._qsvs:
+      if tensor_name not in self._encoded_qsvs:
+        yield tensor_name
+
+  def __len__(self) -> int:
+    num_added = sum(1 for name in self._qsvs if name not in self._encoded_qsvs)
+    return len(self._encoded_qsvs) - len(self._deleted) + num_added
+
+  def __copy__(self) -> "MappedCalibrationResults":
+    # The mapped file is read-only, so copies can share it.
+    new = object.__new__(type(self))
+    new.__dict__.update(self.__dict__)
+    new._qsvs = dict(self._qsvs)
+    new._deleted = set(self._deleted)
+    return new
+
+  def __deepcopy__(self, memo: dict[int, Any]) -> "MappedCalibrationResults":
+    new = self.__copy__()
+    new._qsvs = copy.deepcopy(self._qsvs, memo)
+    new.metadata = copy.deepcopy(self.metadata, memo)
+    return new
+
+  def __reduce__(self):
+    # mmap objects can't be pickled, pickle the materialized QSVs instead.
+    return (dict, (dict(self.items()),))
+
+
+def save_calibration_results(
+    file_path: str,
+    model_qsvs: Mapping[str, qtyping.QSV],
+    metadata: Mapping[str, Any],
+    binary: bool = False,
+) -> None:
+  """Saves calibration results to a file.
+
+  The file is written next to `file_path` then renamed, so an existing file is
+  atomically replaced (and stays valid for anyone who has it mapped).
+
+  Args:
+    file_path: Path to save the calibration results to.
+    model_qsvs: The QSVs of the model tensors.
+    metadata: The calibration metadata.
+    binary: Whether to use the binary format, which can be memory-mapped by
+      `load_calibration_results`, instead of JSON.
+  """
+  # A unique temporary file, so that concurrent writers don't collide.
+  fd, tmp_file_path = tempfile.mkstemp(
+      suffix=".tmp",
+      prefix=f"{os.path.basename(file_path)}.",
+      dir=os.path.dirname(os.path.abspath(file_path)),
+  )
+  try:
+    with open(fd, "wb" if binary else "w") as f:
+      if binary:
+        _write_binary_calibration_results(f, model_qsvs, metadata)
+      else:
+        json.dump(
+            {"model_qsvs": dict(model_qsvs), "metadata": dict(metadata)},
+            f,
+            cls=NumpyEncoder,
+        )
+      f.flush()
+      os.fsync(f.fileno())
+  except BaseException:
+    os.remove(tmp_file_path)
+    raise
+  os.replace(tmp_file_path, file_path)
+
+
+def _write_binary_calibration_results(
+    f: io.BufferedIOBase,
+    model_qsvs: Mapping[str, qtyping.QSV],
+    metadata: Mapping[str, Any],
+) -> None:
+  """Writes calibration results in the binary format to a file."""
+  encoder = _BinaryQsvEncoder()
+  header = json.dumps(
+      {
+          "model_qsvs": {
+              name: encoder.encode(qsv) for name, qsv in model_qsvs.items()
+          },
+          "metadata": dict(metadata),
+      },
+      cls=NumpyEncoder,
+  ).encode("utf-8")
+  f.write(BINARY_FORMAT_MAGIC)
+  f.write(struct.pack(_BINARY_HEADER_SIZE_FORMAT, len(header)))
+  f.write(header)
+  data_start = _align(f.tell())
+  for offset, array in encoder.arrays:
+    f.write(b"\0" * (data_start + offset - f.tell()))
+    f.write(array.data)
+
+
 def load_calibration_results(
     file_path: str,
-) -> tuple[dict[str, qtyping.QSV], dict[str, Any]]:
+) -> tuple[MutableMapping[str, qtyping.QSV], dict[str, Any]]:
   """Loads calibration results from a file.
 
+  Files in the binary format are memory-mapped and their QSVs are read lazily
+  (see `MappedCalibrationResults`); JSON files are parsed eagerly.
+
   Args:
     file_path: Path to the calibration results file.
 
   Returns:
     A tuple of (model_qsvs, metadata).
   """
+  if is_binary_calibration_result(file_path):
+    model_qsvs = MappedCalibrationResults(file_path)
+    return model_qsvs, dict(model_qsvs.metadata)
+
   with open(file_path) as json_file:
     data = json.load(json_file)
 
@@ -13,6 +13,11 @@
 # limitations under the License.
 # ==============================================================================
 
+from concurrent import futures
+import copy
+import os
+import pickle
+
 from absl.testing import absltest
 from absl.testing import parameterized
 import numpy as np
@@ -75,6 +80,162 @@ def _get_quant_parameters(
   return quant_params
 
 
+def _get_sample_qsvs():
+  return {
+      "tensor1": {
+          "min": np.array([[-1.0]], dtype=np.float32),
+          "max": np.array([[1.0]], dtype=np.float32),
+          "hessian": _RNG.random(size=(33, 33)),
+          "num_samples": np.int64(4),
+      },
+      "tensor2": {
+          "min": np.array([-2.0, -3.0]),
+          "max": np.array([2.0, 3.0]),
+          "histogram": {
+              "axis": None,
+              "channels": [{
+                  "hist_counts": np.array([1, 0, 2], dtype=np.int64),
+                  "bin_width": 0.5,
+                  "lower_bound": -1.0,
+              }],
+          },
+      },
+      "tensor3": {},
+  }
+
+
+class BinaryCalibrationResultsTest(parameterized.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self._qsvs = _get_sample_qsvs()
+    self._file_path = self.create_tempfile().full_path
+    calibration_utils.save_calibration_results(
+        self._file_path,
+        self._qsvs,
+        {"num_samples_calibrated": 4},
+        binary=True,
+    )
+
+  def _assert_qsvs_equal(self, actual, expected):
+    self.assertEqual(list(actual), list(expected))
+    for name, qsv in expected.items():
+      self.assertEqual(actual[name].keys(), qsv.keys())
+      for key in ("min", "max", "hessian", "num_samples"):
+        if key in qsv:
+          np.testing.assert_array_equal(actual[name][key], qsv[key])
+
+  def test_binary_round_trip(self):
+    self.assertTrue(
+        calibration_utils.is_binary_calibration_result(self._file_path)
+    )
+    results, metadata = calibration_utils.load_calibration_results(
+        self._file_path
+    )
+
+    self.assertIsInstance(results, calibration_utils.MappedCalibrationResults)
+    self.assertEqual(metadata, {"num_samples_calibrated": 4})
+    self._assert_qsvs_equal(results, self._qsvs)
+    self.assertEqual(results["tensor1"]["min"].dtype, np.float32)
+    self.assertEqual(results["tensor1"]["num_samples"], 4)
+    channel = results["tensor2"]["histogram"]["channels"][0]
+    np.testing.assert_array_equal(channel["hist_counts"], [1, 0, 2])
+    self.assertEqual(channel["lower_bound"], -1.0)
+    self.assertIsNone(results["tensor2"]["histogram"]["axis"])
+
+  def test_binary_arrays_are_aligned_read_only_views(self):
+    results, _ = calibration_utils.load_calibration_results(self._file_path)
+    hessian = results["tensor1"]["hessian"]
+    self.assertFalse(hessian.flags.writeable)
+    self.assertFalse(hessian.flags.owndata)
+    self.assertEqual(hessian.ctypes.data % 64, 0)
+    # Decoded QSVs are cached, so in-place updates of the dict are kept.
+    self.assertIs(results["tensor1"], results["tensor1"])
+
+  def test_mapped_results_are_mutable(self):
+    results, _ = calibration_utils.load_calibration_results(self._file_path)
+    results["tensor1"] = {"min": np.array([0.0]), "max": np.array([5.0])}
+    results["tensor4"] = {"min": np.array([0.0]), "max": np.array([1.0])}
+    del results["tensor2"]
+
+    self.assertEqual(list(results), ["tensor1", "tensor3", "tensor4"])
+    self.assertLen(results, 3)
+    self.assertNotIn("tensor2", results)
+    np.testing.assert_array_equal(results["tensor1"]["max"], [5.0])
+    with self.assertRaises(KeyError):
+      _ = results["tensor2"]
+
+  def test_mapped_results_deepcopy_and_pickle(self):
+    results, _ = calibration_utils.load_calibration_results(self._file_path)
+    copied = copy.deepcopy(results)
+    copied["tensor1"] = {}
+    self._assert_qsvs_equal(results, self._qsvs)
+
+    unpickled = pickle.loads(pickle.dumps(results))
+    self.assertIsInstance(unpickled, dict)
+    self._assert_qsvs_equal(unpickled, self._qsvs)
+
+  def test_save_overwrites_mapped_file(self):
+    results, _ = calibration_utils.load_calibration_results(self._file_path)
+    results["tensor3"] = {"min": np.array([0.0]), "max": np.array([1.0])}
+    calibration_utils.save_calibration_results(
+        self._file_path, results, {}, binary=True
+    )
+    # The previous mapping is still valid after the file was replaced.
+    self._assert_qsvs_equal(
+        results, {**self._qsvs, "tensor3": results["tensor3"]}
+    )
+    reloaded, _ = calibration_utils.load_calibration_results(self._file_path)
+    np.testing.assert_array_equal(reloaded["tensor3"]["max"], [1.0])
+    np.testing.assert_array_equal(
+        reloaded["tensor1"]["hessian"], self._qsvs["tensor1"]["hessian"]
+    )
+
+  def test_save_json_is_not_binary(self):
+    calibration_utils.save_calibration_results(
+        self._file_path, {"tensor1": self._qsvs["tensor1"]}, {}
+    )
+    self.assertFalse(
+        calibration_utils.is_binary_calibration_result(self._file_path)
+    )
+    results, _ = calibration_utils.load_calibration_results(self._file_path)
+    np.testing.assert_array_equal(results["tensor1"]["min"], [[-1.0]])
+
+  def test_save_binary_raises_for_object_arrays(self):
+    with self.assertRaisesRegex(ValueError, "binary calibration result"):
+      calibration_utils.save_calibration_results(
+          self._file_path,
+          {"tensor1": {"min": np.array([None])}},
+          {},
+          binary=True,
+      )
+    # The temporary file is removed.
+    self.assertEqual(
+        os.listdir(os.path.dirname(self._file_path)),
+        [os.path.basename(self._file_path)],
+    )
+
+  def test_concurrent_saves_use_unique_temporary_files(self):
+    def save(i):
+      calibration_utils.save_calibration_results(
+          self._file_path, self._qsvs, {"writer": i}, binary=True
+      )
+
+    with futures.ThreadPoolExecutor(max_workers=4) as executor:
+      list(executor.map(save, range(16)))
+
+    # The file holds the results of one of the writers.
+    results, metadata = calibration_utils.load_calibration_results(
+        self._file_path
+    )
+    self._assert_qsvs_equal(results, self._qsvs)
+    self.assertIn(metadata["writer"], range(16))
+    self.assertEqual(
+        os.listdir(os.path.dirname(self._file_path)),
+        [os.path.basename(self._file_path)],
+    )
+
+
 class CalibrationQsvAlignmentUtilsTest(parameterized.TestCase):
 
   def test_load_calibration_results(self):
@@ -0,0 +1,151 @@
+# Copyright 2024 The AI Edge Quantizer Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+"""Base class of the on-disk, size-capped caches."""
+
+import collections
+from collections.abc import Callable, Mapping
+import hashlib
+import json
+from typing import Any, Optional, TypeVar
+
+import os
+import io
+from ai_edge_quantizer.utils import calibration_utils
+
+_ENTRY_FILE_SUFFIX = ".bin"
+
+_T = TypeVar("_T")
+
+
+class FileCache:
+  """An on-disk cache storing one entry per file, with LRU eviction.
+
+  Entries are stored in the binary calibration result format, so their arrays
+  are read lazily from a memory-mapped file. When the cache exceeds its size
+  cap, the least recently used entries are evicted. The recency is persisted as
+  the file modification time, so it carries over to other cache instances.
+  """
+
+  def __init__(self, directory: str, max_size_bytes: Optional[int] = None):
+    """Initializes the cache.
+
+    Args:
+      directory: The cache directory. Created if it doesn't exist.
+      max_size_bytes: The maximum size of the cache files. If None, the cache
+        is unbounded.
+    """
+    if max_size_bytes is not None and max_size_bytes < 0:
+      raise ValueError(
+          f"max_size_bytes must be non-negative, got {max_size_bytes}."
+      )
+    self._directory = directory
+    self._max_size_bytes = max_size_bytes
+    os.makedirs(directory, exist_ok=True)
+    # File name to size, from the least to the most recently used.
+    self._entries: collections.OrderedDict[str, int] = (
+        collections.OrderedDict()
+    )
+    file_stats = []
+    for file_name in os.listdir(directory):
+      if file_name.endswith(_ENTRY_FILE_SUFFIX):
+        stat = os.stat(os.path.join(directory, file_name))
+        file_stats.append((stat.st_mtime_ns, file_name, stat.st_size))
+    for _, file_name, size in sorted(file_stats):
+      self._entries[file_name] = size
+    self._size_bytes = sum(self._entries.values())
+
+  @property
+  def size_bytes(self) -> int:
+    """The total size of the cache files."""
+    return self._size_bytes
+
+  def __len__(self) -> int:
+    return len(self._entries)
+
+  def _get_file_name(self, *key: Any) -> str:
+    """Returns the file name of the entry of a JSON-serializable key."""
+    encoded_key = json.dumps(key).encode("utf-8")
+    return hashlib.sha256(encoded_key).hexdigest() + _ENTRY_FILE_SUFFIX
+
+  def _read(
+      self, file_name: str, load_func: Callable[[str], _T]
+  ) -> Optional[_T]:
+    """Reads an entry, marking it as the most recently used.
+
+    Args:
+      file_name: The file name of the entry (see `_get_file_name`).
+      load_func: Loads the entry from its file path.
+
+    Returns:
+      The loaded entry, or None if it is not cached.
+    """
+    file_path = os.path.join(self._directory, file_name)
+    try:
+      entry = load_func(file_path)
+      os.utime(file_path)
+    except FileNotFoundError:
+      # Not cached, or evicted by another cache instance.
+      self._size_bytes -= self._entries.pop(file_name, 0)
+      return None
+    if file_name not in self._entries:
+      # Cached by another cache instance.
+      self._entries[file_name] = os.path.getsize(file_path)
+      self._size_bytes += self._entries[file_name]
+    self._entries.move_to_end(file_name)
+    return entry
+
+  def _write(
+      self,
+      file_name: str,
+      values: Mapping[str, Any],
+      metadata: Mapping[str, Any],
+  ) -> None:
+    """Writes an entry, replacing the cached one, then evicts entries.
+
+    Args:
+      file_name: The file name of the entry (see `_get_file_name`).
+      values: The values of the entry, in the calibration result format.
+      metadata: The metadata of the entry.
+    """
+    file_path = os.path.join(self._directory, file_name)
+    calibration_utils.save_calibration_results(
+        file_path, values, metadata, binary=True
+    )
+    self._size_bytes -= self._entries.pop(file_name, 0)
+    self._entries[file_name] = os.path.getsize(file_path)
+    self._size_bytes += self._entries[file_name]
+    self._evict()
+
+  def _evict(self) -> None:
+    """Evicts the least recently used entries until the cache fits its cap."""
+    if self._max_size_bytes is None:
+      return
+    # The most recently added entry is kept, even if it exceeds the cap.
+    while self._size_bytes > self._max_size_bytes and len(self._entries) > 1:
+      file_name, size = self._entries.popitem(last=False)
+      self._size_bytes -= size
+      file_path = os.path.join(self._directory, file_name)
+      if os.path.exists(file_path):
+        os.remove(file_path)
+
+  def clear(self) -> None:
+    """Removes all the cached entries."""
+    for file_name in self._entries:
+      file_path = os.path.join(self._directory, file_name)
+      if os.path.exists(file_path):
+        os.remove(file_path)
+    self._entries.clear()
+    self._size_bytes = 0
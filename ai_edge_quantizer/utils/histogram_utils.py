@@ -163,34 +163,104 @@ class _DynamicHistogram1D:
     bin_counts = np.bincount(indices, minlength=len(self.counts))
     self.counts += bin_counts
 
+  def _resample_into(
+      self, accum_counts: np.ndarray, other: '_DynamicHistogram1D'
+  ) -> None:
+    """Adds the counts of another histogram resampled onto this one's bins.
+
+    Each non-empty bin of `other` is spread over the overlapping bins of this
+    histogram, proportionally to the overlap width. All (source bin,
+    destination bin) overlap pairs are enumerated at once and accumulated in
+    source bin order, so the result is bit-identical to a bin-by-bin loop.
+
+    Args:
+      accum_counts: The float64 counts to accumulate into, aligned with this
+        histogram's bins.
+      other: The histogram to resample.
+    """
+    assert self.bin_width is not None
+    assert other.bin_width is not None
+    src_bins = np.flatnonzero(other.counts)
+    if src_bins.size == 0:
+      return
+    src_counts = other.counts[src_bins]
+    src_l = other.lower_bound + src_bins * other.bin_width
+    src_r = src_l + other.bin_width
+
+    start_idx = np.floor((src_l - self.lower_bound) / self.bin_width)
+    end_idx = np.ceil((src_r - self.lower_bound) / self.bin_width)
+    start_idx = np.maximum(start_idx.astype(np.int64), 0)
+    end_idx = np.minimum(end_idx.astype(np.int64), len(self.counts))
+    num_pairs = np.maximum(end_idx - start_idx, 0)
+
+    # Enumerate the overlapping destination bins of every source bin.
+    pair_src = np.repeat(np.arange(src_bins.size), num_pairs)
+    pair_offset = np.arange(pair_src.size) - np.repeat(
+        np.cumsum(num_pairs) - num_pairs, num_pairs
+    )
+    dst_bins = start_idx[pair_src] + pair_offset
+    dst_l = self.lower_bound + dst_bins * self.bin_width
+    dst_r = dst_l + self.bin_width
+
+    overlap_l = np.maximum(src_l[pair_src], dst_l)
+    overlap_r = np.minimum(src_r[pair_src], dst_r)
+    mask = overlap_l < overlap_r
+    frac = (overlap_r[mask] - overlap_l[mask]) / other.bin_width
+    # np.add.at is unbuffered and applies the updates in order.
+    np.add.at(accum_counts, dst_bins[mask], src_counts[pair_src[mask]] * frac)
+
   def _accumulate_resampled(self, other: '_DynamicHistogram1D') -> None:
     """Accumulates counts from another histogram using resampling."""
     accum_counts = self.counts.astype(np.float64)
+    self._resample_into(accum_counts, other)
+    self.counts = np.round(accum_counts).astype(np.int64)
 
-    for i, c in enumerate(other.counts):
-      if c == 0:
-        continue
-      l = other.lower_bound + i * other.bin_width  # pyrefly: ignore[unsupported-operation]
-      r = l + other.bin_width  # pyrefly: ignore[unsupported-operation]
+  def _copy_from(self, other: '_DynamicHistogram1D') -> None:
+    """Copies the bins of another histogram into this uninitialized one."""
+    self.bin_width = other.bin_width
+    self.counts = np.copy(other.counts)
+    self.lower_bound = other.lower_bound
+    self.initialized = True
 
-      start_idx = int(np.floor((l - self.lower_bound) / self.bin_width))  # pyrefly: ignore[unsupported-operation]
-      end_idx = int(np.ceil((r - self.lower_bound) / self.bin_width))  # pyrefly: ignore[unsupported-operation]
+  def merge_many(self, others: Sequence['_DynamicHistogram1D']) -> None:
+    """Merges several histograms into this one in a single pass.
 
-      start_idx = max(0, start_idx)
-      end_idx = min(len(self.counts), end_idx)
+    Unlike successive `merge` calls, the bin width and range are adjusted once
+    to fit all the histograms, and the resampled counts are rounded once
+    instead of after every merge.
 
-      for j in range(start_idx, end_idx):
-        sl = self.lower_bound + j * self.bin_width  # pyrefly: ignore[unsupported-operation]
-        sr = sl + self.bin_width  # pyrefly: ignore[unsupported-operation]
+    Args:
+      others: The histograms to merge.
+    """
+    for other in others:
+      self.global_min = min(self.global_min, other.global_min)
+      self.global_max = max(self.global_max, other.global_max)
 
-        overlap_l = max(l, sl)
-        overlap_r = min(r, sr)
+    others = [other for other in others if other.initialized]
+    if not others:
+      return
+    if not self.initialized:
+      self._copy_from(others[0])
+      others = others[1:]
+      if not others:
+        return
 
-        if overlap_l < overlap_r:
-          overlap_w = overlap_r - overlap_l
-          frac = overlap_w / other.bin_width  # pyrefly: ignore[unsupported-operation]
-          accum_counts[j] += c * frac
+    assert self.bin_width is not None
+    max_other_bin_width = max(other.bin_width for other in others)  # pyrefly: ignore[no-matching-overload]
+    while self.bin_width < max_other_bin_width:
+      self._double_bin_width_and_compact()
 
+    self._expand_to_fit(
+        min(other.lower_bound for other in others),
+        max(
+            other.lower_bound + len(other.counts) * other.bin_width  # pyrefly: ignore[unsupported-operation]
+            for other in others
+        ),
+    )
+
+    accum_counts = self.counts.astype(np.float64)
+    for other in others:
+      self._resample_into(accum_counts, other)
     self.counts = np.round(accum_counts).astype(np.int64)
 
   def merge(self, other: '_DynamicHistogram1D') -> None:
@@ -201,11 +271,7 @@ class _DynamicHistogram1D:
     if not other.initialized:
       return
     if not self.initialized:
-      # Copy other to self
-      self.bin_width = other.bin_width
-      self.counts = np.copy(other.counts)
-      self.lower_bound = other.lower_bound
-      self.initialized = True
+      self._copy_from(other)
       return
 
     assert self.bin_width is not None
@@ -415,8 +481,19 @@ class DynamicHistogram:
         if channel_data_finite.size > 0:
           self._impls[i].add(channel_data_finite)  # pyrefly: ignore[unsupported-operation]
 
-  def merge(self, other: 'DynamicHistogram') -> None:
-    """Merges another DynamicHistogram into this one."""
+  def _prepare_merge(self, other: 'DynamicHistogram') -> bool:
+    """Checks that `other` can be merged and initializes self if needed.
+
+    Args:
+      other: The histogram to merge into this one.
+
+    Returns:
+      Whether `other` holds any data to merge.
+
+    Raises:
+      ValueError: If the histograms have a different axis or number of
+        channels.
+    """
     # pylint: disable=protected-access
     if self.axis != other.axis:
       raise ValueError(
@@ -436,17 +513,45 @@ class DynamicHistogram:
       ]
 
     if self._impls is None or other._impls is None:
-      return
+      return False
 
     if len(self._impls) != len(other._impls):
       raise ValueError(
           'Cannot merge: different number of channels:'
           f' {len(self._impls)} vs {len(other._impls)}'
       )
+    return True
+
+  def merge(self, other: 'DynamicHistogram') -> None:
+    """Merges another DynamicHistogram into this one."""
+    # pylint: disable=protected-access
+    if not self._prepare_merge(other):
+      return
 
-    for self_impl, other_impl in zip(self._impls, other._impls):
+    for self_impl, other_impl in zip(self._impls, other._impls):  # pyrefly: ignore[no-matching-overload]
       self_impl.merge(other_impl)
 
+  def merge_many(self, others: Sequence['DynamicHistogram']) -> None:
+    """Merges several DynamicHistograms into this one.
+
+    Each channel is resampled in a single pass, which is faster and rounds
+    less than merging the histograms one by one.
+
+    Args:
+      others: The histograms to merge.
+
+    Raises:
+      ValueError: If the histograms have a different axis or number of
+        channels.
+    """
+    # pylint: disable=protected-access
+    others = [other for other in others if self._prepare_merge(other)]
+    if not others:
+      return
+
+    for i, self_impl in enumerate(self._impls):  # pyrefly: ignore[bad-argument-type]
+      self_impl.merge_many([other._impls[i] for other in others])  # pyrefly: ignore[unsupported-operation]
+
   def to_dict(self) -> dict[str, Any]:
     """Exports DynamicHistogram to a dictionary."""
     if not self.initialized:
@@ -15,6 +15,10 @@
 
 """Tests for dynamic histogram utility."""
 
+import os
+import time
+
+from absl import logging
 from absl.testing import absltest
 from absl.testing import parameterized
 import numpy as np
@@ -22,6 +26,42 @@ import numpy as np
 from ai_edge_quantizer.utils import histogram_utils
 
 
+def _reference_accumulate_resampled(self, other):
+  """The bin-by-bin resampling loop, used as a reference."""
+  accum_counts = self.counts.astype(np.float64)
+  for i, c in enumerate(other.counts):
+    if c == 0:
+      continue
+    l = other.lower_bound + i * other.bin_width
+    r = l + other.bin_width
+    start_idx = max(0, int(np.floor((l - self.lower_bound) / self.bin_width)))
+    end_idx = min(
+        len(self.counts), int(np.ceil((r - self.lower_bound) / self.bin_width))
+    )
+    for j in range(start_idx, end_idx):
+      sl = self.lower_bound + j * self.bin_width
+      sr = sl + self.bin_width
+      overlap_l = max(l, sl)
+      overlap_r = min(r, sr)
+      if overlap_l < overlap_r:
+        accum_counts[j] += c * ((overlap_r - overlap_l) / other.bin_width)
+  self.counts = np.round(accum_counts).astype(np.int64)
+
+
+def _create_random_histogram_1d(
+    rng: np.random.Generator, max_bins: int, loc: float, scale: float
+):
+  hist = histogram_utils._DynamicHistogram1D(max_bins=max_bins)
+  hist.add(rng.normal(loc, scale, size=10 * max_bins))
+  return hist
+
+
+def _copy_histogram_1d(hist):
+  return histogram_utils._DynamicHistogram1D.from_dict(
+      hist.to_dict(), max_bins=hist.max_bins
+  )
+
+
 class DynamicHistogramTensorTest(parameterized.TestCase):
   """Tests for DynamicHistogram in per-tensor mode (axis=None)."""
 
@@ -295,5 +335,158 @@ class DynamicHistogramChannelTest(parameterized.TestCase):
     np.testing.assert_array_equal(hist1.global_max, [1.5, 11.5])
 
 
+class DynamicHistogramMergeManyTest(parameterized.TestCase):
+  """Tests for vectorized resampling and batched merges."""
+
+  @parameterized.named_parameters(
+      ('same_width', 0.0, 1.0, 0.5, 1.0),
+      ('wider_other', 0.0, 1.0, 1.0, 4.0),
+      ('narrower_other', 0.0, 4.0, -1.0, 0.5),
+      ('disjoint', -10.0, 1.0, 10.0, 1.0),
+  )
+  def test_accumulate_resampled_matches_reference(
+      self, loc1, scale1, loc2, scale2
+  ):
+    rng = np.random.default_rng(0)
+    hist = _create_random_histogram_1d(rng, 2048, loc1, scale1)
+    other = _create_random_histogram_1d(rng, 2048, loc2, scale2)
+    other_upper_bound = other.lower_bound + len(other.counts) * other.bin_width
+    hist._expand_to_fit(other.lower_bound, other_upper_bound)
+    reference = _copy_histogram_1d(hist)
+
+    hist._accumulate_resampled(other)
+    _reference_accumulate_resampled(reference, other)
+
+    np.testing.assert_array_equal(hist.counts, reference.counts)
+
+  def test_merge_many_matches_sequential_merge_for_aligned_bins(self):
+    hists = []
+    for i in range(3):
+      hist = histogram_utils.DynamicHistogram(
+          max_tensor_bins=10, initial_bin_width=1.0
+      )
+      hist.add(np.array([0.0, 1.5, 2.5 + i]))
+      hists.append(hist)
+    sequential = histogram_utils.DynamicHistogram(
+        max_tensor_bins=10, initial_bin_width=1.0
+    )
+    for hist in hists:
+      sequential.merge(hist)
+
+    batched = histogram_utils.DynamicHistogram(
+        max_tensor_bins=10, initial_bin_width=1.0
+    )
+    batched.merge_many(hists)
+
+    np.testing.assert_array_equal(batched.counts, sequential.counts)
+    self.assertEqual(batched.lower_bound, sequential.lower_bound)
+    self.assertEqual(batched.bin_width, sequential.bin_width)
+    np.testing.assert_array_equal(batched.global_min, [0.0])
+    np.testing.assert_array_equal(batched.global_max, [4.5])
+
+  def test_merge_many_preserves_total_count(self):
+    rng = np.random.default_rng(0)
+    hists = []
+    for i in range(8):
+      hist = histogram_utils.DynamicHistogram(max_tensor_bins=256)
+      hist.add(rng.normal(i, 1.0 + i, size=1000))
+      hists.append(hist)
+    merged = histogram_utils.DynamicHistogram(max_tensor_bins=256)
+    merged.merge_many(hists)
+
+    self.assertLessEqual(len(merged.counts), 256)
+    # Rounding happens once per bin, not once per merged histogram.
+    self.assertAlmostEqual(np.sum(merged.counts), 8000, delta=256)
+    self.assertEqual(merged.global_min[0], min(h.global_min[0] for h in hists))
+    self.assertEqual(merged.global_max[0], max(h.global_max[0] for h in hists))
+
+  def test_merge_many_per_channel(self):
+    hists = []
+    for i in range(2):
+      hist = histogram_utils.DynamicHistogram(
+          max_tensor_bins=10, initial_bin_width=1.0, axis=-1
+      )
+      hist.add(np.array([[0.5 + i, 10.5 + i]]))
+      hists.append(hist)
+    hists.append(histogram_utils.DynamicHistogram(axis=-1))
+
+    merged = histogram_utils.DynamicHistogram(
+        max_tensor_bins=10, initial_bin_width=1.0, axis=-1
+    )
+    merged.merge_many(hists)
+
+    np.testing.assert_array_equal(merged._impls[0].counts, [1, 1])
+    np.testing.assert_array_equal(merged._impls[1].counts, [1, 1])
+    np.testing.assert_array_equal(merged.global_min, [0.5, 10.5])
+    np.testing.assert_array_equal(merged.global_max, [1.5, 11.5])
+
+  def test_merge_many_raises_for_different_axis(self):
+    hist = histogram_utils.DynamicHistogram(axis=0)
+    hist.add(np.array([[1.0]]))
+    with self.assertRaisesRegex(ValueError, 'different axis'):
+      histogram_utils.DynamicHistogram().merge_many([hist])
+
+
+@absltest.skipUnless(
+    os.environ.get('RUN_BENCHMARKS'), 'Set RUN_BENCHMARKS=1 to run.'
+)
+class DynamicHistogramBenchmarkTest(absltest.TestCase):
+  """Micro-benchmarks of histogram merges against the reference loop.
+
+  The timings are only logged, so the benchmarks are opt-in.
+  """
+
+  def _time(self, func, num_iters: int = 5) -> float:
+    start = time.perf_counter()
+    for _ in range(num_iters):
+      func()
+    return (time.perf_counter() - start) / num_iters
+
+  def test_benchmark_accumulate_resampled(self):
+    rng = np.random.default_rng(0)
+    hist = _create_random_histogram_1d(rng, 2048, 0.0, 1.0)
+    other = _create_random_histogram_1d(rng, 2048, 0.5, 1.0)
+
+    def run(accumulate_func):
+      target = _copy_histogram_1d(hist)
+      accumulate_func(target, other)
+
+    vectorized_time = self._time(
+        lambda: run(histogram_utils._DynamicHistogram1D._accumulate_resampled)
+    )
+    reference_time = self._time(lambda: run(_reference_accumulate_resampled))
+    logging.info(
+        'accumulate_resampled (2048 bins): vectorized %.3f ms, reference'
+        ' %.3f ms',
+        vectorized_time * 1e3,
+        reference_time * 1e3,
+    )
+
+  def test_benchmark_merge_many(self):
+    rng = np.random.default_rng(0)
+    hists = []
+    for i in range(32):
+      hist = histogram_utils.DynamicHistogram(max_tensor_bins=2048)
+      hist.add(rng.normal(0.1 * i, 1.0, size=20000))
+      hists.append(hist)
+
+    def merge_sequentially():
+      merged = histogram_utils.DynamicHistogram(max_tensor_bins=2048)
+      for hist in hists:
+        merged.merge(hist)
+
+    def merge_batched():
+      merged = histogram_utils.DynamicHistogram(max_tensor_bins=2048)
+      merged.merge_many(hists)
+
+    sequential_time = self._time(merge_sequentially, num_iters=3)
+    batched_time = self._time(merge_batched, num_iters=3)
+    logging.info(
+        'merge of 32 histograms (2048 bins): merge_many %.3f ms, merge %.3f ms',
+        batched_time * 1e3,
+        sequential_time * 1e3,
+    )
+
+
 if __name__ == '__main__':
   absltest.main()
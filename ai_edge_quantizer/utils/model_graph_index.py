@@ -0,0 +1,343 @@
+# Copyright 2024 The AI Edge Quantizer Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+"""Index of the graph of a model, shared by the quantization stages.
+
+Calibration, params generation, instruction generation and model modification
+all query the same facts about the graph of a model: the tensors using each
+buffer, the producer and the consumers of each tensor, the location of each
+tensor name, the scope of each op and the input/output operators of each
+subgraph. `ModelGraphIndex` derives them once per parsed model, with NumPy
+index arrays.
+"""
+
+from collections.abc import Iterable, Sequence
+import dataclasses
+from typing import Any, Optional
+
+import numpy as np
+
+from ai_edge_quantizer import qtyping
+from ai_edge_quantizer.utils import tfl_flatbuffer_utils
+
+# Op id of the graph output in the consumers of a tensor, and of a missing
+# producer.
+_NO_OP_ID = -1
+
+
+def _get_op_edges(
+    ops: Sequence[Any], op_ids: Iterable[int], tensors_attr: str
+) -> tuple[np.ndarray, np.ndarray]:
+  """Returns the (tensor id, op id) edges of the ops, for the valid tensors.
+
+  Args:
+    ops: The ops.
+    op_ids: The ids of the ops.
+    tensors_attr: The attribute of the ops listing the tensor ids, "inputs" or
+      "outputs".
+  """
+  tensor_ids = []
+  for op in ops:
+    op_tensor_ids = getattr(op, tensors_attr)
+    if op_tensor_ids is None:
+      op_tensor_ids = []
+    tensor_ids.append(np.asarray(op_tensor_ids, dtype=np.int64).reshape(-1))
+  if not tensor_ids:
+    return np.empty(0, np.int64), np.empty(0, np.int64)
+  edge_op_ids = np.repeat(
+      np.fromiter(op_ids, dtype=np.int64, count=len(ops)),
+      [len(ids) for ids in tensor_ids],
+  )
+  edge_tensor_ids = np.concatenate(tensor_ids)
+  is_valid = edge_tensor_ids >= 0
+  return edge_tensor_ids[is_valid], edge_op_ids[is_valid]
+
+
+@dataclasses.dataclass
+class _SubgraphIndex:
+  """Index of a subgraph.
+
+  Attributes:
+    num_ops: The number of ops in the subgraph, excluding the input/output
+      operators.
+    tensor_names: The name of each tensor.
+    tensor_buffers: The buffer id of each tensor.
+    producers: The op id of the producer of each tensor, or -1.
+    consumer_tensor_ids: The tensor ids of the consumer edges, unsorted.
+    consumer_op_ids: The op ids of the consumer edges, -1 for the graph
+      outputs.
+    io_operators: The input and output operators of the subgraph.
+    op_scopes: The scope of each op, followed by the input/output operators, or
+      None if not computed yet.
+    sorted_consumer_op_ids: The consumer op ids sorted by tensor id, then op
+      id. None when stale.
+    consumer_offsets: The offsets of the consumers of each tensor in
+      `sorted_consumer_op_ids`. None when stale.
+  """
+
+  num_ops: int
+  tensor_names: list[str]
+  tensor_buffers: np.ndarray
+  producers: np.ndarray
+  consumer_tensor_ids: np.ndarray
+  consumer_op_ids: np.ndarray
+  io_operators: list[qtyping.IOOperator]
+  op_scopes: list[Optional[str]]
+  sorted_consumer_op_ids: Optional[np.ndarray] = None
+  consumer_offsets: Optional[np.ndarray] = None
+
+
+class ModelGraphIndex:
+  """Index of the graph of a parsed model.
+
+  The index of each subgraph is built when first queried. Op ids follow the
+  order of the ops in the subgraph; the input and output operators of the
+  subgraph (see `get_io_operators`) come after its ops, as when the quantizer
+  appends them to the ops. Since the index only refers to tensors and ops by
+  their ids, it also holds for a copy of the model, until either is modified.
+  """
+
+  def __init__(self, model: qtyping.ModelT):
+    """Initializes the index.
+
+    Args:
+      model: The parsed model.
+    """
+    self._model = model
+    self._subgraphs: list[Optional[_SubgraphIndex]] = [None] * len(
+        model.subgraphs
+    )
+    # Tensor name to (subgraph id, tensor id), and the tensor names that are
+    # not unique in the model. Built when first queried.
+    self._tensor_locations: Optional[dict[str, tuple[int, int]]] = None
+    self._duplicate_tensor_names: list[str] = []
+    # Buffer id to the (subgraph id, tensor id) of the tensors using it. Built
+    # when first queried.
+    self._buffer_to_tensor_ids: Optional[
+        dict[int, list[tuple[int, int]]]
+    ] = None
+
+  @property
+  def model(self) -> qtyping.ModelT:
+    """The indexed model."""
+    return self._model
+
+  def _get_subgraph(self, subgraph_id: int) -> _SubgraphIndex:
+    """Returns the index of a subgraph, building it if needed."""
+    if (subgraph_index := self._subgraphs[subgraph_id]) is not None:
+      return subgraph_index
+    subgraph = self._model.subgraphs[subgraph_id]
+    # The calibrator appends the input/output operators to the ops.
+    ops = [
+        op
+        for op in subgraph.operators
+        if not isinstance(op, qtyping.IOOperator)
+    ]
+    num_tensors = len(subgraph.tensors)
+    producers = np.full(num_tensors, _NO_OP_ID, dtype=np.int64)
+    output_tensor_ids, output_op_ids = _get_op_edges(
+        ops, range(len(ops)), "outputs"
+    )
+    producers[output_tensor_ids] = output_op_ids
+    input_tensor_ids, input_op_ids = _get_op_edges(
+        ops, range(len(ops)), "inputs"
+    )
+    graph_output_ids = np.asarray(subgraph.outputs, dtype=np.int64).reshape(-1)
+    subgraph_index = _SubgraphIndex(
+        num_ops=len(ops),
+        tensor_names=[
+            tfl_flatbuffer_utils.get_tensor_name(tensor)
+            for tensor in subgraph.tensors
+        ],
+        tensor_buffers=np.fromiter(
+            (tensor.buffer for tensor in subgraph.tensors),
+            dtype=np.int64,
+            count=num_tensors,
+        ),
+        producers=producers,
+        consumer_tensor_ids=np.concatenate(
+            [graph_output_ids, input_tensor_ids]
+        ),
+        consumer_op_ids=np.concatenate([
+            np.full(len(graph_output_ids), _NO_OP_ID, dtype=np.int64),
+            input_op_ids,
+        ]),
+        io_operators=tfl_flatbuffer_utils.get_subgraph_input_output_operators(
+            subgraph
+        ),
+        op_scopes=[None] * (len(ops) + 2),
+    )
+    self._subgraphs[subgraph_id] = subgraph_index
+    return subgraph_index
+
+  def get_tensor_name(self, subgraph_id: int, tensor_id: int) -> str:
+    """Returns the name of a tensor."""
+    return self._get_subgraph(subgraph_id).tensor_names[tensor_id]
+
+  def _add_tensor_locations(
+      self, subgraph_id: int, first_tensor_id: int, tensor_names: list[str]
+  ) -> None:
+    """Adds the locations of tensors, recording the duplicate names."""
+    assert self._tensor_locations is not None
+    for tensor_id, tensor_name in enumerate(tensor_names, first_tensor_id):
+      if tensor_name in self._tensor_locations:
+        self._duplicate_tensor_names.append(tensor_name)
+      # The last tensor with a duplicate name wins.
+      self._tensor_locations[tensor_name] = (subgraph_id, tensor_id)
+
+  def _get_tensor_locations(self) -> dict[str, tuple[int, int]]:
+    """Returns the tensor name to location map, building it if needed."""
+    if self._tensor_locations is None:
+      self._tensor_locations = {}
+      for subgraph_id in range(len(self._subgraphs)):
+        self._add_tensor_locations(
+            subgraph_id, 0, self._get_subgraph(subgraph_id).tensor_names
+        )
+    return self._tensor_locations
+
+  def get_tensor_location(self, tensor_name: str) -> tuple[int, int]:
+    """Returns the (subgraph id, tensor id) of a tensor.
+
+    Args:
+      tensor_name: The name of the tensor. If it is not unique in the model,
+        the location of the last tensor with this name is returned.
+
+    Raises:
+      KeyError: If no tensor has this name.
+    """
+    return self._get_tensor_locations()[tensor_name]
+
+  def get_duplicate_tensor_names(self) -> list[str]:
+    """Returns the tensor names that are not unique in the model."""
+    self._get_tensor_locations()
+    return list(self._duplicate_tensor_names)
+
+  def get_producer(self, subgraph_id: int, tensor_id: int) -> int:
+    """Returns the op id of the producer of a tensor, or -1 if none."""
+    return int(self._get_subgraph(subgraph_id).producers[tensor_id])
+
+  def get_consumers(self, subgraph_id: int, tensor_id: int) -> list[int]:
+    """Returns the op ids of the consumers of a tensor.
+
+    Args:
+      subgraph_id: The id of the subgraph.
+      tensor_id: The id of the tensor.
+
+    Returns:
+      The op ids of the consumers, in increasing order and once per input
+      using the tensor. A graph output is listed as -1, first.
+    """
+    subgraph_index = self._get_subgraph(subgraph_id)
+    if subgraph_index.consumer_offsets is None:
+      order = np.lexsort(
+          (subgraph_index.consumer_op_ids, subgraph_index.consumer_tensor_ids)
+      )
+      subgraph_index.sorted_consumer_op_ids = subgraph_index.consumer_op_ids[
+          order
+      ]
+      subgraph_index.consumer_offsets = np.concatenate([
+          [0],
+          np.cumsum(
+              np.bincount(
+                  subgraph_index.consumer_tensor_ids,
+                  minlength=len(subgraph_index.tensor_names),
+              )
+          ),
+      ])
+    offsets = subgraph_index.consumer_offsets
+    return subgraph_index.sorted_consumer_op_ids[  # pyrefly: ignore[unsupported-operation]
+        offsets[tensor_id] : offsets[tensor_id + 1]
+    ].tolist()
+
+  def get_buffer_to_tensor_ids(self) -> dict[int, list[tuple[int, int]]]:
+    """Returns the (subgraph id, tensor id) of the tensors using each buffer.
+
+    The buffers and their tensors are in the order of the tensors in the
+    model, as in `tfl_flatbuffer_utils.buffer_to_tensors`.
+    """
+    if self._buffer_to_tensor_ids is None:
+      subgraph_indices = [
+          self._get_subgraph(subgraph_id)
+          for subgraph_id in range(len(self._subgraphs))
+      ]
+      tensor_buffers = np.concatenate(
+          [np.empty(0, np.int64)]
+          + [index.tensor_buffers for index in subgraph_indices]
+      )
+      subgraph_ids = np.repeat(
+          np.arange(len(subgraph_indices)),
+          [len(index.tensor_buffers) for index in subgraph_indices],
+      )
+      tensor_ids = np.concatenate(
+          [np.empty(0, np.int64)]
+          + [np.arange(len(index.tensor_buffers)) for index in subgraph_indices]
+      )
+      # A stable sort keeps the tensors of each buffer in the model order, and
+      # the first tensor of each buffer gives the order of the buffers.
+      order = np.argsort(tensor_buffers, kind="stable")
+      sorted_buffers = tensor_buffers[order]
+      group_starts = np.flatnonzero(
+          np.concatenate([[True], sorted_buffers[1:] != sorted_buffers[:-1]])
+      )[: len(order)]
+      group_ends = np.append(group_starts[1:], len(order))
+      self._buffer_to_tensor_ids = {}
+      for group_index in np.argsort(order[group_starts], kind="stable"):
+        group = order[group_starts[group_index] : group_ends[group_index]]
+        self._buffer_to_tensor_ids[int(tensor_buffers[group[0]])] = list(
+            zip(subgraph_ids[group].tolist(), tensor_ids[group].tolist())
+        )
+    return {
+        buffer_id: list(tensor_ids)
+        for buffer_id, tensor_ids in self._buffer_to_tensor_ids.items()
+    }
+
+  def get_buffer_to_tensors(self) -> dict[int, list[qtyping.TensorT]]:
+    """Returns the tensors of the model using each buffer.
+
+    Equivalent to `tfl_flatbuffer_utils.buffer_to_tensors(self.model)`.
+    """
+    return {
+        buffer_id: [
+            self._model.subgraphs[subgraph_id].tensors[tensor_id]
+            for subgraph_id, tensor_id in tensor_ids
+        ]
+        for buffer_id, tensor_ids in self.get_buffer_to_tensor_ids().items()
+    }
+
+  def get_io_operators(self, subgraph_id: int) -> list[qtyping.IOOperator]:
+    """Returns the input and output operators of a subgraph.
+
+    Same as `tfl_flatbuffer_utils.get_subgraph_input_output_operators`. Their
+    op ids are the number of ops in the subgraph, and the next one.
+    """
+    return list(self._get_subgraph(subgraph_id).io_operators)
+
+  def get_op_scope(self, subgraph_id: int, op_id: int) -> str:
+    """Returns the scope of an op (see `tfl_flatbuffer_utils.get_op_scope`).
+
+    Args:
+      subgraph_id: The id of the subgraph.
+      op_id: The id of the op, or of an input/output operator.
+    """
+    subgraph_index = self._get_subgraph(subgraph_id)
+    if (op_scope := subgraph_index.op_scopes[op_id]) is None:
+      subgraph = self._model.subgraphs[subgraph_id]
+      if op_id < subgraph_index.num_ops:
+        op = subgraph.operators[op_id]
+      else:
+        op = subgraph_index.io_operators[op_id - subgraph_index.num_ops]
+      op_scope = tfl_flatbuffer_utils.get_op_scope(op, subgraph.tensors)
+      subgraph_index.op_scopes[op_id] = op_scope
+    return op_scope
@@ -0,0 +1,114 @@
+# Copyright 2024 The AI Edge Quantizer Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+"""Tests for model_graph_index.py."""
+
+import collections
+import os
+
+from absl.testing import absltest
+from absl.testing import parameterized
+
+from ai_edge_quantizer.utils import model_graph_index
+from ai_edge_quantizer.utils import test_utils
+from ai_edge_quantizer.utils import tfl_flatbuffer_utils
+
+_TEST_DATA_PREFIX_PATH = test_utils.get_path_to_datafile("../tests/models")
+
+
+def _read_test_model(model_name):
+  return tfl_flatbuffer_utils.read_model(
+      os.path.join(_TEST_DATA_PREFIX_PATH, model_name)
+  )
+
+
+class ModelGraphIndexTest(parameterized.TestCase):
+
+  def _assert_index_matches_model(self, graph_index, model):
+    """Checks the index against the facts derived from the model."""
+    buffer_to_tensors = tfl_flatbuffer_utils.buffer_to_tensors(model)
+    self.assertEqual(
+        list(graph_index.get_buffer_to_tensors()), list(buffer_to_tensors)
+    )
+    for buffer_id, tensors in graph_index.get_buffer_to_tensors().items():
+      self.assertSequenceEqual(
+          [id(tensor) for tensor in tensors],
+          [id(tensor) for tensor in buffer_to_tensors[buffer_id]],
+      )
+    for subgraph_id, subgraph in enumerate(model.subgraphs):
+      consumers = collections.defaultdict(list)
+      producers = {}
+      for tensor_id in subgraph.outputs:
+        consumers[tensor_id].append(-1)
+      for op_id, op in enumerate(subgraph.operators):
+        for tensor_id in op.inputs:
+          consumers[tensor_id].append(op_id)
+        for tensor_id in op.outputs:
+          producers[tensor_id] = op_id
+      for tensor_id, tensor in enumerate(subgraph.tensors):
+        tensor_name = tfl_flatbuffer_utils.get_tensor_name(tensor)
+        self.assertEqual(
+            graph_index.get_tensor_name(subgraph_id, tensor_id), tensor_name
+        )
+        self.assertEqual(
+            graph_index.get_tensor_location(tensor_name),
+            (subgraph_id, tensor_id),
+        )
+        self.assertEqual(
+            graph_index.get_producer(subgraph_id, tensor_id),
+            producers.get(tensor_id, -1),
+        )
+        self.assertEqual(
+            graph_index.get_consumers(subgraph_id, tensor_id),
+            consumers[tensor_id],
+        )
+      io_operators = tfl_flatbuffer_utils.get_subgraph_input_output_operators(
+          subgraph
+      )
+      self.assertEqual(graph_index.get_io_operators(subgraph_id), io_operators)
+      for op_id, op in enumerate(subgraph.operators + io_operators):
+        self.assertEqual(
+            graph_index.get_op_scope(subgraph_id, op_id),
+            tfl_flatbuffer_utils.get_op_scope(op, subgraph.tensors),
+        )
+
+  @parameterized.parameters(
+      "conv_fc_mnist.tflite",
+      "weight_sharing_fcs.tflite",
+      "constant_tensor_and_buffer_only_sharing_weight_fcs.tflite",
+  )
+  def test_index_matches_model(self, model_name):
+    model = _read_test_model(model_name)
+    graph_index = model_graph_index.ModelGraphIndex(model)
+    self.assertIs(graph_index.model, model)
+    self.assertEmpty(graph_index.get_duplicate_tensor_names())
+    self._assert_index_matches_model(graph_index, model)
+
+  def test_get_duplicate_tensor_names(self):
+    graph_index = model_graph_index.ModelGraphIndex(
+        _read_test_model("duplicated_tensor_names.tflite")
+    )
+    self.assertNotEmpty(graph_index.get_duplicate_tensor_names())
+
+  def test_get_tensor_location_of_unknown_tensor_raises_error(self):
+    graph_index = model_graph_index.ModelGraphIndex(
+        _read_test_model("conv_fc_mnist.tflite")
+    )
+    with self.assertRaises(KeyError):
+      graph_index.get_tensor_location("unknown_tensor")
+
+
+if __name__ == "__main__":
+  absltest.main()
@@ -0,0 +1,179 @@
+# Copyright 2024 The AI Edge Quantizer Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+"""Background prefetching of calibration and validation samples."""
+
+import asyncio
+from collections.abc import AsyncIterable, Generator, Iterable, Iterator
+import contextlib
+import logging
+import queue
+import threading
+from typing import Any, Generic, TypeVar, Union
+
+_T = TypeVar("_T")
+
+# Interval at which a blocked producer checks whether it has been closed.
+_PUT_POLL_INTERVAL_SECONDS = 0.1
+# Default time `PrefetchIterator.close` waits for the producer thread to stop.
+_CLOSE_TIMEOUT_SECONDS = 1.0
+
+
+class _EndOfData:
+  """Marks the end of the prefetched iterable."""
+
+
+class _ProducerError:
+  """Wraps an exception raised while producing the samples."""
+
+  def __init__(self, error: BaseException):
+    self.error = error
+
+
+class PrefetchIterator(Generic[_T], Iterator[_T]):
+  """Iterates over an iterable whose items are produced by a background thread.
+
+  The thread reads up to `depth` items ahead of the consumer, so that producing
+  the items (e.g., decoding or tokenizing samples) overlaps with consuming them
+  (e.g., invoking the interpreter). Async iterables are consumed by an event
+  loop running in the thread. An exception raised by the iterable is re-raised
+  by `__next__` after the items produced before it.
+
+  The iterator should be closed (or used as a context manager) when it is not
+  fully consumed, to stop the thread. The items read ahead are then discarded.
+  The thread is a daemon, so a producer stuck in the iterable doesn't keep the
+  process alive.
+  """
+
+  def __init__(
+      self, iterable: Union[Iterable[_T], AsyncIterable[_T]], depth: int
+  ):
+    """Initializes the iterator and starts the producer thread.
+
+    Args:
+      iterable: The iterable (or async iterable) to prefetch.
+      depth: The maximum number of items read ahead of the consumer.
+
+    Raises:
+      ValueError: If `depth` is not positive.
+    """
+    if depth < 1:
+      raise ValueError(f"Prefetch depth must be positive, got {depth}.")
+    self._queue: queue.Queue[Any] = queue.Queue(maxsize=depth)
+    self._closed = threading.Event()
+    self._done = False
+    self._thread = threading.Thread(
+        target=self._produce, args=(iterable,), daemon=True
+    )
+    self._thread.start()
+
+  def _put(self, item: Any) -> bool:
+    """Puts an item in the queue, returns False if the iterator is closed."""
+    while not self._closed.is_set():
+      try:
+        self._queue.put(item, timeout=_PUT_POLL_INTERVAL_SECONDS)
+        return True
+      except queue.Full:
+        continue
+    return False
+
+  def _produce(
+      self, iterable: Union[Iterable[_T], AsyncIterable[_T]]
+  ) -> None:
+    try:
+      if isinstance(iterable, AsyncIterable):
+        asyncio.run(self._produce_async(iterable))
+      else:
+        for item in iterable:
+          if not self._put(item):
+            return
+    except BaseException as e:  # pylint: disable=broad-exception-caught
+      self._put(_ProducerError(e))
+      return
+    self._put(_EndOfData())
+
+  async def _produce_async(self, iterable: AsyncIterable[_T]) -> None:
+    async for item in iterable:
+      # The event loop runs in the producer thread, so it may block here.
+      if not self._put(item):
+        return
+
+  def __iter__(self) -> "PrefetchIterator[_T]":
+    return self
+
+  def __next__(self) -> _T:
+    if self._done:
+      raise StopIteration
+    item = self._queue.get()
+    if isinstance(item, _EndOfData):
+      self._done = True
+      raise StopIteration
+    if isinstance(item, _ProducerError):
+      self._done = True
+      raise item.error
+    return item
+
+  def close(self, timeout: float | None = _CLOSE_TIMEOUT_SECONDS) -> None:
+    """Stops the producer thread and discards the items read ahead.
+
+    The thread stops once the iterable returns its next item, so a slow
+    iterable may keep it running for a while. It is then left to stop in the
+    background after `timeout`, and its items are discarded.
+
+    Args:
+      timeout: The maximum time in seconds to wait for the thread to stop, or
+        None to wait until it stops.
+    """
+    self._done = True
+    self._closed.set()
+    self._thread.join(timeout)
+    if self._thread.is_alive():
+      logging.warning(
+          "The prefetch thread is still producing an item after %s seconds;"
+          " it will stop in the background.",
+          timeout,
+      )
+
+  def __enter__(self) -> "PrefetchIterator[_T]":
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback) -> None:
+    self.close()
+
+
+@contextlib.contextmanager
+def prefetch(
+    iterable: Union[Iterable[_T], AsyncIterable[_T]], depth: int
+) -> Generator[Iterator[_T], None, None]:
+  """Prefetches `iterable` in the background for the duration of the context.
+
+  Args:
+    iterable: The iterable (or async iterable) to prefetch.
+    depth: The maximum number of items read ahead. If 0, the items are read
+      synchronously (`iterable` must then be a regular iterable).
+
+  Yields:
+    An iterator over the items of `iterable`.
+
+  Raises:
+    ValueError: If `depth` is negative, or 0 for an async iterable.
+  """
+  if depth == 0:
+    if isinstance(iterable, AsyncIterable):
+      raise ValueError("Async iterables require a positive prefetch depth.")
+    yield iter(iterable)
+    return
+  with PrefetchIterator(iterable, depth) as iterator:
+    yield iterator
@@ -0,0 +1,113 @@
+# Copyright 2024 The AI Edge Quantizer Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+import threading
+import time
+
+from absl.testing import absltest
+from absl.testing import parameterized
+
+from ai_edge_quantizer.utils import prefetch_utils
+
+
+class PrefetchUtilsTest(parameterized.TestCase):
+
+  @parameterized.parameters(0, 1, 4)
+  def test_prefetch_yields_all_items_in_order(self, depth):
+    with prefetch_utils.prefetch(range(10), depth) as iterator:
+      self.assertEqual(list(iterator), list(range(10)))
+
+  def test_prefetch_async_iterable(self):
+    async def async_range(n):
+      for i in range(n):
+        yield i
+
+    with prefetch_utils.prefetch(async_range(5), depth=2) as iterator:
+      self.assertEqual(list(iterator), list(range(5)))
+
+  def test_prefetch_async_iterable_requires_positive_depth(self):
+    async def async_range(n):
+      for i in range(n):
+        yield i
+
+    with self.assertRaisesRegex(ValueError, "positive prefetch depth"):
+      with prefetch_utils.prefetch(async_range(5), depth=0):
+        pass
+
+  def test_prefetch_reraises_producer_error(self):
+    def failing_gen():
+      yield 0
+      yield 1
+      raise KeyError("bad sample")
+
+    items = []
+    with self.assertRaisesRegex(KeyError, "bad sample"):
+      with prefetch_utils.prefetch(failing_gen(), depth=4) as iterator:
+        for item in iterator:
+          items.append(item)
+    self.assertEqual(items, [0, 1])
+
+  def test_prefetch_reads_ahead_up_to_depth(self):
+    num_produced = 0
+
+    def counting_gen():
+      nonlocal num_produced
+      for i in range(100):
+        num_produced += 1
+        yield i
+
+    with prefetch_utils.prefetch(counting_gen(), depth=3) as iterator:
+      self.assertEqual(next(iterator), 0)
+      # Wait for the producer to fill the queue.
+      while num_produced < 5:
+        time.sleep(0.01)
+      time.sleep(0.1)
+    # 1 consumed item, 3 items in the queue and 1 blocked in put.
+    self.assertEqual(num_produced, 5)
+
+  def test_close_stops_producer(self):
+    iterator = prefetch_utils.PrefetchIterator(iter(range(1000)), depth=2)
+    self.assertEqual(next(iterator), 0)
+    iterator.close()
+    self.assertFalse(iterator._thread.is_alive())
+    with self.assertRaises(StopIteration):
+      next(iterator)
+
+  def test_close_does_not_wait_for_slow_producer(self):
+    release = threading.Event()
+
+    def slow_iterable():
+      yield 0
+      release.wait()
+      yield 1
+
+    iterator = prefetch_utils.PrefetchIterator(slow_iterable(), depth=1)
+    self.assertEqual(next(iterator), 0)
+    iterator.close(timeout=0.1)
+    # The producer is still blocked in the iterable.
+    self.assertTrue(iterator._thread.is_alive())
+    self.assertTrue(iterator._thread.daemon)
+    with self.assertRaises(StopIteration):
+      next(iterator)
+    release.set()
+    iterator._thread.join()
+
+  def test_invalid_depth_raises_error(self):
+    with self.assertRaisesRegex(ValueError, "must be positive"):
+      prefetch_utils.PrefetchIterator(range(10), depth=-1)
+
+
+if __name__ == "__main__":
+  absltest.main()
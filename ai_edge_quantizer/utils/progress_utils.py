@@ -59,7 +59,8 @@ def _format_base(
   return f'{value:.2f} {units[-1]}'
 
 
-def _format_bytes(value: int | float) -> str:
+def format_bytes(value: int | float) -> str:
+  """Converts a number of bytes to a `str` in B, KiB, MiB or GiB."""
   return _format_base(value, 1024, ['B', 'KiB', 'MiB', 'GiB'])
 
 
@@ -72,15 +73,25 @@ class ProgressBar:
 
   def __init__(
       self,
-      total_steps: int,
+      total_steps: int | None,
       description: str = '',
       disappear_on_finish: bool = False,
       enable: bool | None = None,
   ):
-
+    """Initializes the progress bar.
+
+    Args:
+      total_steps: The total number of steps. If None, the total is unknown and
+        an indeterminate progress display (step count and rate only) is shown.
+      description: The description displayed in front of the progress bar.
+      disappear_on_finish: Whether to remove the progress bar once finished.
+      enable: Whether to enable the progress bar. By default, it is disabled
+        for fewer than 100 steps and enabled otherwise (including when the
+        total is unknown).
+    """
     if enable is None:
       # Progress bar will be skipped for smaller models.
-      disable = total_steps < 100
+      disable = total_steps is not None and total_steps < 100
     else:
       disable = not enable
     self._progress_bar = tqdm.tqdm(
@@ -102,6 +113,10 @@ class ProgressBar:
     """Updates the progress bar by a single step."""
     self._progress_bar.update(1)
 
+  def update_steps(self, num_steps: int):
+    """Updates the progress bar by `num_steps` steps."""
+    self._progress_bar.update(num_steps)
+
   def close(self):
     """Closes the progress bar."""
     self._progress_bar.close()
@@ -157,12 +172,12 @@ class ProgressReport:
     # Print out the progress report.
     if self._model_name:
       print(f'Model name: {self._model_name}')
-    print(f'Original model size: {_format_bytes(original_model_size)}')
-    print(f'Quantized model size: {_format_bytes(quantized_model_size)}')
+    print(f'Original model size: {format_bytes(original_model_size)}')
+    print(f'Quantized model size: {format_bytes(quantized_model_size)}')
     print(
         f'Quantization Ratio: {quantization_ratio:.2f}'
         f' ({1/quantization_ratio:.1f}x smaller)'
     )
     print(f'Total time: {_format_ns(total_time * 1e9)}')
     if mem_peak_bytes is not None:
-      print(f'Memory peak: {_format_bytes(mem_peak_bytes)}')
+      print(f'Memory peak: {format_bytes(mem_peak_bytes)}')
@@ -48,6 +48,13 @@ class ProgressBarTest(absltest.TestCase):
     mock_progress_bar_instance.update.assert_called_with(1)
     mock_progress_bar_instance.close.assert_called_once()
 
+  def test_progress_bar_update_steps(self):
+    mock_progress_bar_instance = self.mock_tqdm.return_value
+    with progress_utils.ProgressBar(total_steps=10, enable=True) as pb:
+      pb.update_steps(7)
+
+    mock_progress_bar_instance.update.assert_called_once_with(7)
+
   def test_progress_bar_disable(self):
     mock_progress_bar_instance = self.mock_tqdm.return_value
     with progress_utils.ProgressBar(total_steps=10, enable=False):
@@ -69,6 +76,18 @@ class ProgressBarTest(absltest.TestCase):
     mock_progress_bar_instance.close.assert_called_once()
 
 
+  def test_progress_bar_unknown_total_is_enabled_by_default(self):
+    mock_progress_bar_instance = self.mock_tqdm.return_value
+    with progress_utils.ProgressBar(total_steps=None) as pb:
+      pb.update_single_step()
+
+    self.mock_tqdm.assert_called_once_with(
+        total=None, desc='', leave=True, disable=False
+    )
+    mock_progress_bar_instance.update.assert_called_once_with(1)
+    mock_progress_bar_instance.close.assert_called_once()
+
+
 class ProgressReportTest(parameterized.TestCase):
 
   def setUp(self):
@@ -15,11 +15,13 @@
 
 """Utilities for QSV update."""
 
-from typing import Any, Union
+from collections.abc import Sequence
+from typing import Any, Callable, Union
 
 import numpy as np
 
 from ai_edge_quantizer import qtyping
+from ai_edge_quantizer.utils import histogram_utils
 
 
 def _update_moving_average(
@@ -68,6 +70,47 @@ def moving_average_update(
   return updated_qsv
 
 
+def moving_average_update_many(
+    qsv: qtyping.QSV,
+    new_qsvs: Sequence[qtyping.QSV],
+    smoothing_factor: float = 0.95,
+) -> qtyping.QSV:
+  """Applies `moving_average_update` with each of `new_qsvs` in order, at once.
+
+  After k updates u_0, ..., u_{k-1}, the moving average w becomes
+  s^k * w + sum_i (1 - s) * s^(k - 1 - i) * u_i, with s the smoothing factor.
+
+  Args:
+    qsv: The quantization statistical value of the tensor (min/max) that need to
+      be updated.
+    new_qsvs: The new QSVs (e.g., from successive rounds of calibration).
+    smoothing_factor: The weight of moving average.
+
+  Returns:
+    The updated QSV for the tensor.
+  """
+  if not qsv and new_qsvs:
+    qsv, new_qsvs = new_qsvs[0], new_qsvs[1:]
+  if not new_qsvs:
+    return qsv
+
+  num_updates = len(new_qsvs)
+  update_weights = (1.0 - smoothing_factor) * smoothing_factor ** np.arange(
+      num_updates - 1, -1, -1
+  )
+  updated_qsv = {}
+  for key in ("min", "max"):
+    updates = np.stack(
+        np.broadcast_arrays(*[new_qsv[key] for new_qsv in new_qsvs])
+    )
+    dtype = np.result_type(qsv[key], updates)
+    updated_qsv[key] = (
+        smoothing_factor**num_updates * qsv[key]
+        + np.tensordot(update_weights, updates, axes=1)
+    ).astype(dtype, copy=False)
+  return updated_qsv
+
+
 def _gptq_merge_hessian(
     qsv: qtyping.QSV, new_qsv: qtyping.QSV
 ) -> tuple[Any, int]:
@@ -122,6 +165,10 @@ def min_max_update(qsv: qtyping.QSV, new_qsv: qtyping.QSV) -> qtyping.QSV:
   return updated_qsv
 
 
+# QSV update functions of the algorithms that only need tensor min/max.
+MIN_MAX_UPDATE_FUNCS = (moving_average_update, min_max_update)
+
+
 def _oscar_merge_mu2(qsv1: qtyping.QSV, qsv2: qtyping.QSV) -> tuple[Any, int]:
   """Merges mu2 and num_samples from qsv1 and qsv2 for OSCAR.
 
@@ -169,3 +216,194 @@ def oscar_and_moving_average_update(
   updated_qsv["mu2"] = merged_mu2
   updated_qsv["num_samples"] = total_samples
   return updated_qsv
+
+
+# QSV merge functions combine QSVs that were accumulated independently (e.g.,
+# by calibration workers running on disjoint shards of the calibration set).
+# Unlike the update functions above, they are associative: `weight` and
+# `other_weight` are the number of updates folded into each QSV, and merging
+# `(a, b)` then `c` with summed weights gives the same result as merging `a`
+# with `(b, c)`.
+
+
+def _merge_histograms(
+    histogram_dict: dict[str, Any], other_histogram_dict: dict[str, Any]
+) -> dict[str, Any]:
+  """Merges two histograms exported with `DynamicHistogram.to_dict`."""
+  if not histogram_dict:
+    return other_histogram_dict
+  if not other_histogram_dict:
+    return histogram_dict
+  histogram = histogram_utils.DynamicHistogram.from_dict(histogram_dict)
+  other_histogram = histogram_utils.DynamicHistogram.from_dict(
+      other_histogram_dict
+  )
+  histogram.merge(other_histogram)
+  return histogram.to_dict()
+
+
+def histogram_and_min_max_update(
+    qsv: qtyping.QSV, new_qsv: qtyping.QSV
+) -> qtyping.QSV:
+  """Update the QSV with min/max logic and merge the histograms.
+
+  Args:
+    qsv: The quantization statistical value of the tensor (min/max and
+      histogram) that need to be updated.
+    new_qsv: The new QSVs (e.g., from new round of calibration).
+
+  Returns:
+    The updated QSV for the tensor.
+  """
+  if not qsv:
+    return new_qsv
+  updated_qsv = min_max_update(qsv, new_qsv)
+  updated_qsv["histogram"] = _merge_histograms(
+      qsv.get("histogram", {}), new_qsv.get("histogram", {})
+  )
+  updated_qsv["num_samples"] = qsv.get("num_samples", 0) + new_qsv.get(
+      "num_samples", 0
+  )
+  return updated_qsv
+
+
+def min_max_merge(
+    qsv: qtyping.QSV,
+    other_qsv: qtyping.QSV,
+    weight: float = 1.0,
+    other_weight: float = 1.0,
+) -> qtyping.QSV:
+  """Merges two min/max QSVs by taking the overall minimum and maximum.
+
+  This is the exact merge for QSVs accumulated with `min_max_update`.
+
+  Args:
+    qsv: The first QSV to merge.
+    other_qsv: The second QSV to merge.
+    weight: Unused, kept for a uniform merge function signature.
+    other_weight: Unused, kept for a uniform merge function signature.
+
+  Returns:
+    The merged QSV.
+  """
+  del weight, other_weight  # Unused.
+  return min_max_update(qsv, other_qsv)
+
+
+def moving_average_merge(
+    qsv: qtyping.QSV,
+    other_qsv: qtyping.QSV,
+    weight: float = 1.0,
+    other_weight: float = 1.0,
+) -> qtyping.QSV:
+  """Merges two moving average QSVs with a weighted average of min/max.
+
+  The moving average is order dependent, so the merge of QSVs accumulated on
+  disjoint shards is an approximation of the sequential result: the merged
+  min/max is always within the range spanned by the shard QSVs.
+
+  Args:
+    qsv: The first QSV to merge.
+    other_qsv: The second QSV to merge.
+    weight: The number of updates folded into `qsv`.
+    other_weight: The number of updates folded into `other_qsv`.
+
+  Returns:
+    The merged QSV.
+  """
+  if not qsv:
+    return other_qsv
+  if not other_qsv:
+    return qsv
+  total_weight = weight + other_weight
+  if total_weight == 0:
+    return other_qsv
+  # The moving average helper computes `s * w + (1 - s) * update`.
+  smoothing_factor = weight / total_weight
+  return {
+      "min": _update_moving_average(
+          smoothing_factor, qsv["min"], other_qsv["min"]
+      ),
+      "max": _update_moving_average(
+          smoothing_factor, qsv["max"], other_qsv["max"]
+      ),
+  }
+
+
+def gptq_and_moving_average_merge(
+    qsv: qtyping.QSV,
+    other_qsv: qtyping.QSV,
+    weight: float = 1.0,
+    other_weight: float = 1.0,
+) -> qtyping.QSV:
+  """Merges two GPTQ QSVs; the hessian merge is exact up to rounding."""
+  if not qsv:
+    return other_qsv
+  if not other_qsv:
+    return qsv
+  merged_qsv = moving_average_merge(qsv, other_qsv, weight, other_weight)
+  merged_hessian, total_samples = _gptq_merge_hessian(qsv, other_qsv)
+  merged_qsv["hessian"] = merged_hessian
+  merged_qsv["num_samples"] = total_samples
+  return merged_qsv
+
+
+def oscar_and_moving_average_merge(
+    qsv: qtyping.QSV,
+    other_qsv: qtyping.QSV,
+    weight: float = 1.0,
+    other_weight: float = 1.0,
+) -> qtyping.QSV:
+  """Merges two OSCAR QSVs; the mu2 merge is exact up to rounding."""
+  if not qsv:
+    return other_qsv
+  if not other_qsv:
+    return qsv
+  merged_qsv = moving_average_merge(qsv, other_qsv, weight, other_weight)
+  merged_mu2, total_samples = _oscar_merge_mu2(qsv, other_qsv)
+  merged_qsv["mu2"] = merged_mu2
+  merged_qsv["num_samples"] = total_samples
+  return merged_qsv
+
+
+def histogram_and_min_max_merge(
+    qsv: qtyping.QSV,
+    other_qsv: qtyping.QSV,
+    weight: float = 1.0,
+    other_weight: float = 1.0,
+) -> qtyping.QSV:
+  """Merges two histogram QSVs; the merge is exact up to histogram resampling."""
+  del weight, other_weight  # Unused.
+  return histogram_and_min_max_update(qsv, other_qsv)
+
+
+_QSV_UPDATE_FUNC_TO_MERGE_FUNC = {
+    moving_average_update: moving_average_merge,
+    min_max_update: min_max_merge,
+    gptq_and_moving_average_update: gptq_and_moving_average_merge,
+    oscar_and_moving_average_update: oscar_and_moving_average_merge,
+    histogram_and_min_max_update: histogram_and_min_max_merge,
+}
+
+
+def get_merge_func(
+    qsv_update_func: Callable[[qtyping.QSV, qtyping.QSV], qtyping.QSV],
+) -> Callable[[qtyping.QSV, qtyping.QSV, float, float], qtyping.QSV]:
+  """Returns the merge function matching a QSV update function.
+
+  Args:
+    qsv_update_func: The function used to update the QSVs across calibration
+      steps.
+
+  Returns:
+    The associative merge function for QSVs accumulated with `qsv_update_func`.
+
+  Raises:
+    ValueError: If there is no merge function for `qsv_update_func`.
+  """
+  merge_func = _QSV_UPDATE_FUNC_TO_MERGE_FUNC.get(qsv_update_func)
+  if merge_func is None:
+    raise ValueError(
+        f"No QSV merge function is available for {qsv_update_func}."
+    )
+  return merge_func
@@ -17,6 +17,7 @@ from absl.testing import absltest
 from absl.testing import parameterized
 import numpy as np
 
+from ai_edge_quantizer.utils import histogram_utils
 from ai_edge_quantizer.utils import qsv_utils
 
 
@@ -70,6 +71,22 @@ class QsvUtilsTest(parameterized.TestCase):
     updated_qsv = qsv_utils.moving_average_update(None, new_qsv)
     self.assertEqual(updated_qsv, new_qsv)
 
+  @parameterized.parameters(({},), ({"min": -1.0, "max": 1.0},))
+  def test_moving_average_update_many_matches_successive_updates(self, qsv):
+    rng = np.random.default_rng(0)
+    new_qsvs = [
+        {"min": rng.normal(size=(1, 4)), "max": rng.normal(size=(1, 4))}
+        for _ in range(8)
+    ]
+    expected_qsv = qsv
+    for new_qsv in new_qsvs:
+      expected_qsv = qsv_utils.moving_average_update(expected_qsv, new_qsv)
+
+    updated_qsv = qsv_utils.moving_average_update_many(qsv, new_qsvs)
+    np.testing.assert_allclose(updated_qsv["min"], expected_qsv["min"])
+    np.testing.assert_allclose(updated_qsv["max"], expected_qsv["max"])
+    self.assertIs(qsv_utils.moving_average_update_many(qsv, []), qsv)
+
   @parameterized.named_parameters(
       dict(
           testcase_name="scalar",
@@ -241,5 +258,147 @@ class QsvUtilsTest(parameterized.TestCase):
     self.assertEqual(updated["num_samples"], expected_samples)
 
 
+  def test_min_max_merge(self):
+    qsv = {"min": np.array([-1.0, -5.0]), "max": np.array([2.0, 1.0])}
+    other_qsv = {"min": np.array([-3.0, -2.0]), "max": np.array([1.0, 4.0])}
+    merged = qsv_utils.min_max_merge(qsv, other_qsv, 3, 1)
+    np.testing.assert_array_equal(merged["min"], np.array([-3.0, -5.0]))
+    np.testing.assert_array_equal(merged["max"], np.array([2.0, 4.0]))
+
+  def test_moving_average_merge_is_weighted_by_num_updates(self):
+    qsv = {"min": np.array([-1.0]), "max": np.array([1.0])}
+    other_qsv = {"min": np.array([-5.0]), "max": np.array([5.0])}
+    merged = qsv_utils.moving_average_merge(qsv, other_qsv, 3, 1)
+    np.testing.assert_array_almost_equal(merged["min"], np.array([-2.0]))
+    np.testing.assert_array_almost_equal(merged["max"], np.array([2.0]))
+
+  def test_moving_average_merge_is_associative(self):
+    qsvs = [
+        {"min": np.array([-1.0]), "max": np.array([1.0])},
+        {"min": np.array([-5.0]), "max": np.array([3.0])},
+        {"min": np.array([-2.0]), "max": np.array([7.0])},
+    ]
+    weights = [2, 5, 3]
+    left = qsv_utils.moving_average_merge(
+        qsv_utils.moving_average_merge(qsvs[0], qsvs[1], *weights[:2]),
+        qsvs[2],
+        weights[0] + weights[1],
+        weights[2],
+    )
+    right = qsv_utils.moving_average_merge(
+        qsvs[0],
+        qsv_utils.moving_average_merge(qsvs[1], qsvs[2], *weights[1:]),
+        weights[0],
+        weights[1] + weights[2],
+    )
+    np.testing.assert_array_almost_equal(left["min"], right["min"])
+    np.testing.assert_array_almost_equal(left["max"], right["max"])
+
+  def test_gptq_and_moving_average_merge(self):
+    qsv = {
+        "min": np.array([-1.0]),
+        "max": np.array([1.0]),
+        "hessian": np.eye(2),
+        "num_samples": 1,
+    }
+    other_qsv = {
+        "min": np.array([-3.0]),
+        "max": np.array([3.0]),
+        "hessian": 4 * np.eye(2),
+        "num_samples": 3,
+    }
+    merged = qsv_utils.gptq_and_moving_average_merge(qsv, other_qsv, 1, 1)
+    np.testing.assert_array_almost_equal(merged["min"], np.array([-2.0]))
+    np.testing.assert_array_almost_equal(merged["hessian"], 3.25 * np.eye(2))
+    self.assertEqual(merged["num_samples"], 4)
+
+  def test_oscar_and_moving_average_merge(self):
+    qsv = {
+        "min": np.array([-1.0]),
+        "max": np.array([2.0]),
+        "mu2": np.array([2.0, 4.0]),
+        "num_samples": 10,
+    }
+    other_qsv = {
+        "min": np.array([-2.0]),
+        "max": np.array([3.0]),
+        "mu2": np.array([4.0, 8.0]),
+        "num_samples": 30,
+    }
+    merged = qsv_utils.oscar_and_moving_average_merge(qsv, other_qsv, 1, 1)
+    np.testing.assert_array_almost_equal(merged["mu2"], np.array([3.5, 7.0]))
+    self.assertEqual(merged["num_samples"], 40)
+
+  def test_histogram_and_min_max_update(self):
+    data = np.array([-1.0, 0.0, 1.0, 2.0])
+    new_data = np.array([-3.0, 0.5, 5.0])
+    qsv = {"min": np.array([-1.0]), "max": np.array([2.0]), "num_samples": 1}
+    new_qsv = {
+        "min": np.array([-3.0]),
+        "max": np.array([5.0]),
+        "num_samples": 2,
+    }
+    for q, d in ((qsv, data), (new_qsv, new_data)):
+      hist = histogram_utils.DynamicHistogram()
+      hist.add(d)
+      q["histogram"] = hist.to_dict()
+
+    updated_qsv = qsv_utils.histogram_and_min_max_update(qsv, new_qsv)
+
+    np.testing.assert_array_equal(updated_qsv["min"], np.array([-3.0]))
+    np.testing.assert_array_equal(updated_qsv["max"], np.array([5.0]))
+    self.assertEqual(updated_qsv["num_samples"], 3)
+    merged_hist = histogram_utils.DynamicHistogram.from_dict(
+        updated_qsv["histogram"]
+    )
+    self.assertEqual(np.sum(merged_hist.counts), 7)
+    self.assertEqual(merged_hist.global_min[0], -3.0)
+    self.assertEqual(merged_hist.global_max[0], 5.0)
+
+  def test_histogram_and_min_max_merge_with_empty_qsv(self):
+    hist = histogram_utils.DynamicHistogram()
+    hist.add(np.array([1.0, 2.0]))
+    qsv = {
+        "min": np.array([1.0]),
+        "max": np.array([2.0]),
+        "num_samples": 1,
+        "histogram": hist.to_dict(),
+    }
+    self.assertIs(qsv_utils.histogram_and_min_max_merge({}, qsv, 0, 1), qsv)
+
+  @parameterized.named_parameters(
+      dict(
+          testcase_name="moving_average",
+          update_func=qsv_utils.moving_average_update,
+          expected_merge_func=qsv_utils.moving_average_merge,
+      ),
+      dict(
+          testcase_name="min_max",
+          update_func=qsv_utils.min_max_update,
+          expected_merge_func=qsv_utils.min_max_merge,
+      ),
+      dict(
+          testcase_name="gptq",
+          update_func=qsv_utils.gptq_and_moving_average_update,
+          expected_merge_func=qsv_utils.gptq_and_moving_average_merge,
+      ),
+      dict(
+          testcase_name="oscar",
+          update_func=qsv_utils.oscar_and_moving_average_update,
+          expected_merge_func=qsv_utils.oscar_and_moving_average_merge,
+      ),
+      dict(
+          testcase_name="histogram",
+          update_func=qsv_utils.histogram_and_min_max_update,
+          expected_merge_func=qsv_utils.histogram_and_min_max_merge,
+      ),
+  )
+  def test_get_merge_func(self, update_func, expected_merge_func):
+    self.assertIs(qsv_utils.get_merge_func(update_func), expected_merge_func)
+
+  def test_get_merge_func_raises_for_unknown_update_func(self):
+    with self.assertRaisesRegex(ValueError, "No QSV merge function"):
+      qsv_utils.get_merge_func(lambda qsv, new_qsv: new_qsv)
+
 if __name__ == "__main__":
   absltest.main()
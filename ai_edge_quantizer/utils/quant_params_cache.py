@@ -0,0 +1,313 @@
+# Copyright 2024 The AI Edge Quantizer Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+"""On-disk cache of the quantization parameters of weights.
+
+Re-quantizing a model, or a fine-tuned variant sharing most of its weights,
+recomputes the quantization parameters (and quantized data) of every weight.
+The cache stores them keyed by the content hash of the weight, its
+`TensorQuantizationConfig`, and a digest of the op context they were computed
+in (algorithm, op config, tensor shapes and QSVs), so that only the weights
+that changed are quantized again.
+"""
+
+from collections.abc import Iterator, Mapping, Sequence
+import contextlib
+import hashlib
+import json
+import threading
+from typing import Any, Optional, Union
+
+import numpy as np
+
+from ai_edge_quantizer import qtyping
+from ai_edge_quantizer.algorithms.utils import common_utils
+from ai_edge_quantizer.utils import calibration_utils
+from ai_edge_quantizer.utils import file_cache
+from ai_edge_quantizer.utils import quantized_data_store as quantized_data_store_lib
+
+_QuantParams = Union[qtyping.UniformQuantParams, qtyping.NonLinearQuantParams]
+
+# Key of the encoded quantization parameters in a cache file.
+_PARAMS_KEY = "params"
+_UNIFORM_TYPE = "uniform"
+_NON_LINEAR_TYPE = "non_linear"
+
+
+def get_content_hash(value: Any) -> str:
+  """Returns the content hash of a value.
+
+  Args:
+    value: An array, a scalar, or a (nested) mapping or sequence of them. The
+      hash of a mapping doesn't depend on the order of its keys.
+  """
+  content_hash = hashlib.sha256()
+  _update_content_hash(content_hash, value)
+  return content_hash.hexdigest()
+
+
+def _update_content_hash(content_hash: Any, value: Any) -> None:
+  """Updates the hash with the content of the value."""
+  if isinstance(value, Mapping):
+    content_hash.update(b"{")
+    for key in sorted(value, key=str):
+      content_hash.update(repr(key).encode("utf-8"))
+      _update_content_hash(content_hash, value[key])
+    content_hash.update(b"}")
+  elif isinstance(value, (list, tuple)):
+    content_hash.update(b"[")
+    for item in value:
+      _update_content_hash(content_hash, item)
+    content_hash.update(b"]")
+  elif isinstance(value, np.ndarray):
+    content_hash.update(f"{value.dtype.str}{value.shape}".encode("utf-8"))
+    if value.dtype.hasobject:
+      content_hash.update(repr(value.tolist()).encode("utf-8"))
+    else:
+      content_hash.update(np.ascontiguousarray(value).data)
+  else:
+    content_hash.update(repr(value).encode("utf-8"))
+
+
+def _encode_quant_params(quant_params: _QuantParams) -> dict[str, Any]:
+  """Encodes quantization parameters in the calibration result format."""
+  if isinstance(quant_params, qtyping.NonLinearQuantParams):
+    return {
+        "type": _NON_LINEAR_TYPE,
+        "num_bits": quant_params.num_bits,
+        "quantized_data": quant_params.quantized_data,
+        "data_type": quant_params.data_type.value,
+    }
+  hadamard = quant_params.hadamard
+  quantized_data = quant_params.quantized_data
+  if isinstance(quantized_data, qtyping.LazyQuantizedData):
+    quantized_data = np.asarray(quantized_data)
+  return {
+      "type": _UNIFORM_TYPE,
+      "num_bits": quant_params.num_bits,
+      "quantized_dimension": quant_params.quantized_dimension,
+      "scale": quant_params.scale,
+      "zero_point": quant_params.zero_point,
+      "symmetric": quant_params.symmetric,
+      "quantized_data": quantized_data,
+      "block_size": quant_params.block_size,
+      "hadamard": (
+          None
+          if hadamard is None
+          else {
+              "random_binary_vector": hadamard.random_binary_vector,
+              "hadamard_size": hadamard.hadamard_size,
+          }
+      ),
+      "custom_algorithm_param": quant_params.custom_algorithm_param,
+  }
+
+
+def _decode_quant_params(encoded: Mapping[str, Any]) -> _QuantParams:
+  """Decodes quantization parameters encoded by `_encode_quant_params`."""
+  if encoded["type"] == _NON_LINEAR_TYPE:
+    return qtyping.NonLinearQuantParams(
+        num_bits=encoded["num_bits"],
+        quantized_data=encoded["quantized_data"],
+        data_type=qtyping.TensorDataType(encoded["data_type"]),
+    )
+  hadamard = encoded["hadamard"]
+  return qtyping.UniformQuantParams(
+      num_bits=encoded["num_bits"],
+      quantized_dimension=encoded["quantized_dimension"],
+      scale=encoded["scale"],
+      zero_point=encoded["zero_point"],
+      symmetric=encoded["symmetric"],
+      quantized_data=encoded["quantized_data"],
+      block_size=encoded["block_size"],
+      hadamard=None
+      if hadamard is None
+      else qtyping.UniformQuantParams.HadamardRotationParams(
+          hadamard["random_binary_vector"], hadamard["hadamard_size"]
+      ),
+      custom_algorithm_param=encoded["custom_algorithm_param"],
+  )
+
+
+class QuantParamsCache(file_cache.FileCache):
+  """An on-disk, size-capped cache of weight quantization parameters.
+
+  Each entry is stored in one file, in the binary calibration result format, so
+  its arrays (e.g., the quantized data) are read-only views into a
+  memory-mapped file. When the cache exceeds its size cap, the least recently
+  used entries are evicted. The cache can be shared by concurrent threads.
+  """
+
+  def __init__(self, directory: str, max_size_bytes: Optional[int] = None):
+    """Initializes the cache.
+
+    Args:
+      directory: The cache directory. Created if it doesn't exist.
+      max_size_bytes: The maximum size of the cache files. If None, the cache
+        is unbounded.
+    """
+    super().__init__(directory, max_size_bytes)
+    self._lock = threading.Lock()
+
+  def _get_params_file_name(
+      self,
+      weight_hash: str,
+      quant_config: qtyping.TensorQuantizationConfig,
+      op_digest: str,
+  ) -> str:
+    return self._get_file_name(
+        weight_hash,
+        json.dumps(quant_config.to_dict(), sort_keys=True, default=str),
+        op_digest,
+    )
+
+  def get(
+      self,
+      weight_hash: str,
+      quant_config: qtyping.TensorQuantizationConfig,
+      op_digest: str,
+  ) -> Optional[_QuantParams]:
+    """Gets the cached quantization parameters of a weight.
+
+    Args:
+      weight_hash: The content hash of the weight (see `get_content_hash`).
+      quant_config: The quantization config of the weight.
+      op_digest: The digest of the op context of the weight (see
+        `get_content_hash`).
+
+    Returns:
+      The cached quantization parameters, or None if they are not cached.
+    """
+    file_name = self._get_params_file_name(weight_hash, quant_config, op_digest)
+    with self._lock:
+      entries = self._read(
+          file_name, calibration_utils.MappedCalibrationResults
+      )
+    if entries is None:
+      return None
+    return _decode_quant_params(entries[_PARAMS_KEY])
+
+  def put(
+      self,
+      weight_hash: str,
+      quant_config: qtyping.TensorQuantizationConfig,
+      op_digest: str,
+      quant_params: _QuantParams,
+  ) -> None:
+    """Caches the quantization parameters of a weight.
+
+    Args:
+      weight_hash: The content hash of the weight (see `get_content_hash`).
+      quant_config: The quantization config of the weight.
+      op_digest: The digest of the op context of the weight (see
+        `get_content_hash`).
+      quant_params: The quantization parameters to cache.
+    """
+    file_name = self._get_params_file_name(weight_hash, quant_config, op_digest)
+    with self._lock:
+      self._write(
+          file_name, {_PARAMS_KEY: _encode_quant_params(quant_params)}, {}
+      )
+
+
+class PersistentTensorQuantParamsCache(common_utils.TensorQuantParamsCache):
+  """A `TensorQuantParamsCache` backed by a `QuantParamsCache`.
+
+  The params computed within an op scope (see `op_scope`) are also looked up
+  in, and inserted into, the persistent cache. Its entries are keyed on the
+  content of the buffers rather than on their IDs, so they can be reused by
+  other runs and by other models sharing the same weights.
+  """
+
+  def __init__(
+      self,
+      persistent_cache: QuantParamsCache,
+      buffers: Sequence[Any],
+      quantized_data_store: Optional[
+          quantized_data_store_lib.QuantizedDataStore
+      ] = None,
+  ):
+    """Initializes the cache.
+
+    Args:
+      persistent_cache: The persistent cache backing this cache.
+      buffers: The buffers of the model, indexed by the buffer IDs.
+      quantized_data_store: The store of the quantized data of the inserted
+        params, if any (see `TensorQuantParamsCache`).
+    """
+    super().__init__(quantized_data_store)
+    self._persistent_cache = persistent_cache
+    self._buffers = buffers
+    self._buffer_hashes: dict[int, str] = {}
+    self._op_scope = threading.local()
+
+  @contextlib.contextmanager
+  def op_scope(self, op_digest: str) -> Iterator[None]:
+    """Sets the op context of the lookups and inserts of the current thread.
+
+    Args:
+      op_digest: The digest of everything the params computed by the op depend
+        on, other than the buffer and the tensor quantization config (see
+        `get_content_hash`).
+
+    Yields:
+      None, while the op scope is set.
+    """
+    self._op_scope.op_digest = op_digest
+    try:
+      yield
+    finally:
+      self._op_scope.op_digest = None
+
+  def _get_persistent_key(self, buffer_id: int) -> Optional[tuple[str, str]]:
+    """Returns the buffer hash and the op digest, or None out of an op scope."""
+    op_digest = getattr(self._op_scope, "op_digest", None)
+    data = self._buffers[buffer_id].data
+    if op_digest is None or data is None:
+      return None
+    if buffer_id not in self._buffer_hashes:
+      self._buffer_hashes[buffer_id] = get_content_hash(np.asarray(data))
+    return self._buffer_hashes[buffer_id], op_digest
+
+  def lookup(
+      self, buffer_id: int, quant_config: qtyping.TensorQuantizationConfig
+  ) -> Optional[_QuantParams]:
+    if (quant_params := super().lookup(buffer_id, quant_config)) is not None:
+      return quant_params
+    if (persistent_key := self._get_persistent_key(buffer_id)) is None:
+      return None
+    buffer_hash, op_digest = persistent_key
+    quant_params = self._persistent_cache.get(
+        buffer_hash, quant_config, op_digest
+    )
+    if quant_params is not None:
+      # The cached arrays are already backed by a memory-mapped file, so they
+      # are not moved to the quantized data store.
+      self._cache[(buffer_id, quant_config)] = quant_params
+    return quant_params
+
+  def insert(
+      self,
+      buffer_id: int,
+      quant_config: qtyping.TensorQuantizationConfig,
+      quant_params: _QuantParams,
+  ) -> _QuantParams:
+    quant_params = super().insert(buffer_id, quant_config, quant_params)
+    if (persistent_key := self._get_persistent_key(buffer_id)) is not None:
+      buffer_hash, op_digest = persistent_key
+      self._persistent_cache.put(
+          buffer_hash, quant_config, op_digest, quant_params
+      )
+    return quant_params
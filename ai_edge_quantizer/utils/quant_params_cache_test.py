@@ -0,0 +1,147 @@
+# Copyright 2024 The AI Edge Quantizer Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+import types
+
+from absl.testing import absltest
+import numpy as np
+
+from ai_edge_quantizer import qtyping
+from ai_edge_quantizer.utils import quant_params_cache
+
+_CONFIG_4BIT = qtyping.TensorQuantizationConfig(num_bits=4)
+_CONFIG_8BIT = qtyping.TensorQuantizationConfig(num_bits=8)
+
+
+def _uniform_params(size: int = 1024) -> qtyping.UniformQuantParams:
+  return qtyping.UniformQuantParams(
+      num_bits=8,
+      quantized_dimension=0,
+      scale=np.full((2, 1), 0.5, dtype=np.float32),
+      zero_point=np.zeros((2, 1), dtype=np.int32),
+      quantized_data=np.ones((2, size // 2), dtype=np.int8),
+      hadamard=qtyping.UniformQuantParams.HadamardRotationParams(
+          np.ones(4, dtype=np.int8), 4
+      ),
+      custom_algorithm_param={"multiplier": np.ones(3, dtype=np.float32)},
+  )
+
+
+class QuantParamsCacheTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self._directory = self.create_tempdir().full_path
+
+  def test_get_content_hash(self):
+    value = {"x": np.ones((2, 3), np.float32), "y": [1, "a", None]}
+    same_value = {"y": [1, "a", None], "x": np.ones((2, 3), np.float32)}
+    self.assertEqual(
+        quant_params_cache.get_content_hash(value),
+        quant_params_cache.get_content_hash(same_value),
+    )
+    for other_value in (
+        {**value, "x": np.ones((3, 2), np.float32)},
+        {**value, "x": np.ones((2, 3), np.float64)},
+        {**value, "y": [1, "a"]},
+    ):
+      self.assertNotEqual(
+          quant_params_cache.get_content_hash(value),
+          quant_params_cache.get_content_hash(other_value),
+      )
+
+  def test_put_and_get(self):
+    cache = quant_params_cache.QuantParamsCache(self._directory)
+    self.assertIsNone(cache.get("weight", _CONFIG_8BIT, "op"))
+    uniform_params = _uniform_params()
+    non_linear_params = qtyping.NonLinearQuantParams(
+        num_bits=16, quantized_data=np.ones(4, dtype=np.float16)
+    )
+    cache.put("weight", _CONFIG_8BIT, "op", uniform_params)
+    cache.put("weight", _CONFIG_4BIT, "op", non_linear_params)
+
+    # Entries are shared with other cache instances.
+    cache = quant_params_cache.QuantParamsCache(self._directory)
+    self.assertLen(cache, 2)
+    self.assertEqual(cache.get("weight", _CONFIG_8BIT, "op"), uniform_params)
+    self.assertEqual(
+        cache.get("weight", _CONFIG_4BIT, "op"), non_linear_params
+    )
+    self.assertIsNone(cache.get("weight", _CONFIG_8BIT, "other_op"))
+    self.assertIsNone(cache.get("other_weight", _CONFIG_8BIT, "op"))
+
+  def test_put_evicts_least_recently_used(self):
+    cache = quant_params_cache.QuantParamsCache(self._directory)
+    cache.put("weight0", _CONFIG_8BIT, "op", _uniform_params())
+    entry_size = cache.size_bytes
+    cache = quant_params_cache.QuantParamsCache(
+        self._directory, max_size_bytes=2 * entry_size
+    )
+    cache.put("weight1", _CONFIG_8BIT, "op", _uniform_params())
+    self.assertIsNotNone(cache.get("weight0", _CONFIG_8BIT, "op"))
+    cache.put("weight2", _CONFIG_8BIT, "op", _uniform_params())
+
+    self.assertLen(cache, 2)
+    self.assertIsNotNone(cache.get("weight0", _CONFIG_8BIT, "op"))
+    self.assertIsNone(cache.get("weight1", _CONFIG_8BIT, "op"))
+    self.assertIsNotNone(cache.get("weight2", _CONFIG_8BIT, "op"))
+
+
+class PersistentTensorQuantParamsCacheTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self._persistent_cache = quant_params_cache.QuantParamsCache(
+        self.create_tempdir().full_path
+    )
+    weight = np.arange(16, dtype=np.uint8)
+    # Buffers 0 and 1 have the same content.
+    self._buffers = [
+        types.SimpleNamespace(data=weight),
+        types.SimpleNamespace(data=weight.copy()),
+        types.SimpleNamespace(data=weight + 1),
+    ]
+
+  def test_lookup_reads_persistent_cache_in_op_scope(self):
+    quant_params = _uniform_params()
+    cache = quant_params_cache.PersistentTensorQuantParamsCache(
+        self._persistent_cache, self._buffers
+    )
+    with cache.op_scope("op"):
+      cache.insert(0, _CONFIG_8BIT, quant_params)
+    self.assertLen(self._persistent_cache, 1)
+
+    cache = quant_params_cache.PersistentTensorQuantParamsCache(
+        self._persistent_cache, self._buffers
+    )
+    self.assertIsNone(cache.lookup(1, _CONFIG_8BIT))
+    with cache.op_scope("op"):
+      self.assertEqual(cache.lookup(1, _CONFIG_8BIT), quant_params)
+      self.assertIsNone(cache.lookup(2, _CONFIG_8BIT))
+      self.assertIsNone(cache.lookup(1, _CONFIG_4BIT))
+    with cache.op_scope("other_op"):
+      self.assertIsNone(cache.lookup(0, _CONFIG_8BIT))
+
+  def test_insert_out_of_op_scope_is_not_persisted(self):
+    cache = quant_params_cache.PersistentTensorQuantParamsCache(
+        self._persistent_cache, self._buffers
+    )
+    cache.insert(0, _CONFIG_8BIT, _uniform_params())
+    self.assertEmpty(self._persistent_cache)
+    self.assertIsNotNone(cache.lookup(0, _CONFIG_8BIT))
+
+
+if __name__ == "__main__":
+  absltest.main()
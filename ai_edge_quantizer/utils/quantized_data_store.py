@@ -0,0 +1,122 @@
+# Copyright 2024 The AI Edge Quantizer Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+"""Memory-mapped storage of the quantized data of weights.
+
+The quantized data of every weight is held from the moment it is computed until
+the quantized model is serialized, so the float model and a full quantized copy
+of it would otherwise be resident at the same time. The store writes the
+quantized data of each weight to a temporary memory-mapped file as soon as it
+is computed and releases its pages, so that only the tensors being processed
+are resident. The serialization reads them back sequentially, releasing them
+again once they are packed into the output.
+"""
+
+import mmap
+import os
+import tempfile
+import threading
+from typing import Optional
+
+import numpy as np
+
+from ai_edge_litert.tools import mmap_utils
+
+# The size of the memory-mapped segments. The files are sparse, so the unused
+# tail of a segment takes no space.
+_DEFAULT_SEGMENT_SIZE = 256 * 1024 * 1024
+
+
+def _round_up_16(offset: int) -> int:
+  """Round the given `offset` to the next multiple of 16."""
+  return (offset + 15) & ~15
+
+
+class QuantizedDataStore:
+  """Stores quantized data in temporary memory-mapped files.
+
+  The files are unlinked as soon as they are created, so they are removed once
+  the last array stored in them is garbage collected. The store can be shared
+  by concurrent threads.
+  """
+
+  def __init__(
+      self,
+      directory: Optional[str | os.PathLike[str]] = None,
+      segment_size: int = _DEFAULT_SEGMENT_SIZE,
+  ):
+    """Initializes the store.
+
+    Args:
+      directory: The directory of the temporary files. If None, the default
+        temporary directory is used.
+      segment_size: The size of each memory-mapped file. Arrays larger than
+        this are stored in a file of their own.
+    """
+    self._directory = directory
+    self._segment_size = segment_size
+    self._segment: Optional[memoryview] = None
+    self._segment_offset = 0
+    self._size_bytes = 0
+    self._lock = threading.Lock()
+
+  @property
+  def size_bytes(self) -> int:
+    """The total size of the stored data."""
+    return self._size_bytes
+
+  def _new_segment(self, size: int) -> memoryview:
+    """Returns a view of a new temporary memory-mapped file of `size` bytes."""
+    with tempfile.TemporaryFile(dir=self._directory) as f:
+      f.truncate(size)
+      segment = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_WRITE)
+    mmap_utils.advise_sequential(segment)
+    return memoryview(segment)
+
+  def _allocate(self, size: int) -> memoryview:
+    """Returns a writable view of `size` unused bytes of a segment."""
+    with self._lock:
+      self._size_bytes += size
+      if size > self._segment_size:
+        return self._new_segment(size)
+      if (
+          self._segment is None
+          or self._segment_offset + size > len(self._segment)
+      ):
+        self._segment = self._new_segment(self._segment_size)
+        self._segment_offset = 0
+      view = self._segment[self._segment_offset : self._segment_offset + size]
+      self._segment_offset = _round_up_16(self._segment_offset + size)
+      return view
+
+  def store(self, data: np.ndarray) -> np.ndarray:
+    """Stores an array.
+
+    Args:
+      data: The array to store.
+
+    Returns:
+      A read-only array equal to `data`, backed by a memory-mapped file whose
+      pages are released until the array is read.
+    """
+    data = np.asarray(data)
+    if data.dtype.hasobject or data.nbytes == 0:
+      return data
+    view = self._allocate(data.nbytes)
+    stored = np.frombuffer(view, dtype=data.dtype).reshape(data.shape)
+    stored[...] = data
+    stored.flags.writeable = False
+    mmap_utils.advise_dont_need(view)
+    return stored
@@ -0,0 +1,76 @@
+# Copyright 2024 The AI Edge Quantizer Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+import mmap
+
+from absl.testing import absltest
+from absl.testing import parameterized
+import numpy as np
+
+from ai_edge_quantizer.utils import quantized_data_store
+
+
+def _get_mapped_file(data: np.ndarray) -> mmap.mmap:
+  base = data.base
+  while isinstance(base, np.ndarray):
+    base = base.base
+  return base.obj
+
+
+class QuantizedDataStoreTest(parameterized.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self._directory = self.create_tempdir().full_path
+
+  @parameterized.parameters(
+      (np.arange(24, dtype=np.int8).reshape(2, 3, 4),),
+      (np.arange(6, dtype=np.float16).reshape(3, 2),),
+      (np.arange(5, dtype=np.int32),),
+  )
+  def test_store(self, data):
+    store = quantized_data_store.QuantizedDataStore(self._directory)
+    stored = store.store(data)
+    np.testing.assert_array_equal(stored, data)
+    self.assertEqual(stored.dtype, data.dtype)
+    self.assertFalse(stored.flags.writeable)
+    # The data is backed by a memory-mapped file.
+    self.assertIsInstance(_get_mapped_file(stored), mmap.mmap)
+    self.assertEqual(store.size_bytes, data.nbytes)
+
+  def test_store_spans_segments(self):
+    store = quantized_data_store.QuantizedDataStore(
+        self._directory, segment_size=64
+    )
+    arrays = [np.full(size, size, dtype=np.int8) for size in (20, 30, 30, 100)]
+    stored_arrays = [store.store(data) for data in arrays]
+    for data, stored in zip(arrays, stored_arrays):
+      np.testing.assert_array_equal(stored, data)
+    # The first two arrays share a segment, the others don't.
+    mapped_files = [_get_mapped_file(stored) for stored in stored_arrays]
+    self.assertIs(mapped_files[0], mapped_files[1])
+    self.assertIsNot(mapped_files[1], mapped_files[2])
+    self.assertIsNot(mapped_files[2], mapped_files[3])
+    self.assertEqual(store.size_bytes, 180)
+
+  def test_store_empty_array_is_not_stored(self):
+    store = quantized_data_store.QuantizedDataStore(self._directory)
+    data = np.zeros((0, 4), dtype=np.int8)
+    self.assertIs(store.store(data), data)
+    self.assertEqual(store.size_bytes, 0)
+
+
+if __name__ == "__main__":
+  absltest.main()
@@ -263,6 +263,26 @@ def get_tensor_data(
   return data
 
 
+def get_tensor_size_bytes(tensor: qtyping.TensorT) -> int:
+  """Estimates the size of a tensor in bytes from its static shape.
+
+  Dynamic dimensions count as 1. Tensors whose type has no fixed size (e.g.,
+  strings and resources) count as 0 bytes.
+
+  Args:
+    tensor: tensor in flatbuffer.
+
+  Returns:
+    The estimated size of the tensor in bytes.
+  """
+  try:
+    itemsize = np.dtype(TENSOR_CODE_TO_TYPE[tensor.type].lower()).itemsize
+  except TypeError:
+    return 0
+  shape = tensor.shape if tensor.shape is not None else []
+  return itemsize * int(np.prod([max(int(dim), 1) for dim in shape]))
+
+
 def has_same_quantization(
     tensor1: qtyping.TensorT, tensor2: qtyping.TensorT
 ) -> bool:
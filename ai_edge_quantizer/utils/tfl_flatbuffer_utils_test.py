@@ -163,6 +163,20 @@ class FlatbufferUtilsTest(absltest.TestCase):
     )
     self.assertIsNone(input_tensor_data)
 
+  def test_get_tensor_size_bytes(self):
+    subgraph0 = self._test_model.subgraphs[0]
+    subgraph_tensors = subgraph0.tensors
+    conv2d_op = subgraph0.operators[0]
+    weight_tensor = subgraph_tensors[conv2d_op.inputs[1]]
+    self.assertEqual(
+        tfl_flatbuffer_utils.get_tensor_size_bytes(weight_tensor),
+        4 * np.prod(weight_tensor.shape),
+    )
+    weight_tensor.type = tfl_flatbuffer_utils.TENSOR_TYPE_TO_CODE["STRING"]
+    self.assertEqual(
+        tfl_flatbuffer_utils.get_tensor_size_bytes(weight_tensor), 0
+    )
+
   def test_has_same_quantization_succeeds(self):
     tensor0, tensor1 = self._test_model.subgraphs[0].tensors[:2]
     tensor0.quantization.scale = np.array([1, 2, 3]).astype(np.float32)
@@ -15,12 +15,17 @@
 
 """Util functions for TFL interpreter."""
 
+import collections
+from collections.abc import Iterator, Mapping
+import contextlib
+import os
+import threading
 from typing import Any, Optional, Union
+import weakref
 
 import ml_dtypes
 import numpy as np
 
-from ai_edge_litert.tools import mmap_utils
 from ai_edge_quantizer import qtyping
 from ai_edge_quantizer.algorithms.uniform_quantize import uniform_quantize_tensor
 from ai_edge_litert import interpreter as tfl  # pylint: disable=g-direct-tensorflow-import
@@ -41,6 +46,11 @@ def create_tfl_interpreter(
 ) -> tfl.Interpreter:
   """Creates a TFLite interpreter from a model file.
 
+  A model file is loaded by the interpreter itself, which memory-maps it, so
+  the model stays file-backed and all interpreters of a file share its page
+  cache. The interpreter only accepts `bytes` contents, so any other buffer is
+  copied (see `get_model_content`).
+
   Args:
     tflite_model: Model file path or bytes.
     allocate_tensors: Whether to allocate tensors.
@@ -54,15 +64,17 @@ def create_tfl_interpreter(
   Returns:
     A TFLite interpreter.
   """
-  if isinstance(tflite_model, str):
-    tflite_model = mmap_utils.get_file_contents(tflite_model)  # pyrefly: ignore[bad-assignment]
+  if isinstance(tflite_model, (str, os.PathLike)):
+    model_source = dict(model_path=os.fspath(tflite_model))
+  else:
+    model_source = dict(model_content=get_model_content(tflite_model))
 
   if use_xnnpack:
     op_resolver = tfl.OpResolverType.BUILTIN
   else:
     op_resolver = tfl.OpResolverType.BUILTIN_WITHOUT_DEFAULT_DELEGATES
   tflite_interpreter = tfl.Interpreter(
-      model_content=bytes(tflite_model),  # pyrefly: ignore[bad-argument-type]
+      **model_source,
       num_threads=num_threads,
       experimental_op_resolver_type=op_resolver,
       experimental_preserve_all_tensors=preserve_all_tensors,
@@ -74,6 +86,221 @@ def create_tfl_interpreter(
   return tflite_interpreter
 
 
+def get_model_content(tflite_model: qtyping.BufferType) -> bytes:
+  """Returns the model buffer as `bytes`, without copying when possible.
+
+  A `bytes` object, or a view covering a whole `bytes` object, is returned as
+  is. Any other buffer (e.g., a `bytearray` or a memory-mapped file) is copied.
+
+  Args:
+    tflite_model: Model bytes or buffer.
+
+  Returns:
+    The model bytes.
+  """
+  if isinstance(tflite_model, bytes):
+    return tflite_model
+  if isinstance(tflite_model, memoryview):
+    view = tflite_model
+    while isinstance(view.obj, memoryview):
+      view = view.obj
+    if (
+        isinstance(view.obj, bytes)
+        and tflite_model.c_contiguous
+        and tflite_model.nbytes == len(view.obj)
+    ):
+      return view.obj
+  return bytes(tflite_model)
+
+
+def get_model_size(tflite_model: Union[str, qtyping.BufferType]) -> int:
+  """Returns the size of the model in bytes.
+
+  Args:
+    tflite_model: Model file path or bytes.
+  """
+  if isinstance(tflite_model, (str, os.PathLike)):
+    return os.path.getsize(tflite_model)
+  return memoryview(tflite_model).nbytes
+
+
+class InterpreterPool:
+  """A bounded pool of TFLite interpreters reused across calls.
+
+  Interpreters are keyed by the identity of their model and by their creation
+  options (the arguments of `create_tfl_interpreter`). A model file is
+  identified by its real path, size and modification time. A model buffer is
+  identified by the buffer object itself, so it must not be modified while its
+  interpreters are pooled.
+
+  An interpreter is borrowed exclusively, and returned to the pool with its
+  variables reset. At most `max_size` idle interpreters are kept; the least
+  recently returned ones are evicted first.
+  """
+
+  def __init__(self, max_size: int = 2):
+    """Initializes the pool.
+
+    Args:
+      max_size: The maximum number of idle interpreters kept in the pool. Zero
+        disables the pooling.
+    """
+    self._lock = threading.Lock()
+    self._max_size = 0
+    # Key to the idle interpreters, from the least to the most recently used.
+    self._idle_interpreters: collections.OrderedDict[
+        tuple[Any, ...], list[tfl.Interpreter]
+    ] = collections.OrderedDict()
+    # Key to its model buffer, kept alive so that the buffer id isn't reused.
+    self._models: dict[tuple[Any, ...], Any] = {}
+    # Borrowed interpreter to its key and model.
+    self._borrowed: weakref.WeakKeyDictionary[
+        tfl.Interpreter, tuple[tuple[Any, ...], Any]
+    ] = weakref.WeakKeyDictionary()
+    self.set_max_size(max_size)
+
+  @property
+  def max_size(self) -> int:
+    """The maximum number of idle interpreters kept in the pool."""
+    return self._max_size
+
+  def set_max_size(self, max_size: int) -> None:
+    """Sets the maximum number of idle interpreters, evicting the extra ones."""
+    if max_size < 0:
+      raise ValueError(f"max_size must be non-negative, got {max_size}.")
+    with self._lock:
+      self._max_size = max_size
+      self._evict()
+
+  def __len__(self) -> int:
+    """Returns the number of idle interpreters in the pool."""
+    with self._lock:
+      return sum(len(idle) for idle in self._idle_interpreters.values())
+
+  def acquire(
+      self, tflite_model: Union[str, bytes], **kwargs: Any
+  ) -> tfl.Interpreter:
+    """Takes an interpreter of the model from the pool, or creates one.
+
+    The interpreter must be returned with `release` to be reused.
+
+    Args:
+      tflite_model: Model file path or bytes.
+      **kwargs: The other arguments of `create_tfl_interpreter`.
+
+    Returns:
+      A TFLite interpreter, used by no one else until it is released.
+    """
+    key = _get_interpreter_key(tflite_model, kwargs)
+    with self._lock:
+      idle = self._idle_interpreters.get(key)
+      if idle:
+        interpreter = idle.pop()
+        if not idle:
+          del self._idle_interpreters[key]
+          self._models.pop(key, None)
+        self._borrowed[interpreter] = (key, tflite_model)
+        return interpreter
+    interpreter = create_tfl_interpreter(tflite_model, **kwargs)
+    with self._lock:
+      self._borrowed[interpreter] = (key, tflite_model)
+    return interpreter
+
+  def release(self, interpreter: tfl.Interpreter) -> None:
+    """Returns an interpreter taken with `acquire` to the pool.
+
+    Args:
+      interpreter: The interpreter to return. It must not be used afterwards.
+    """
+    with self._lock:
+      key, tflite_model = self._borrowed.pop(interpreter)
+      if self._max_size == 0:
+        return
+    interpreter.reset_all_variables()
+    with self._lock:
+      self._idle_interpreters.setdefault(key, []).append(interpreter)
+      self._idle_interpreters.move_to_end(key)
+      if not isinstance(tflite_model, str):
+        self._models[key] = tflite_model
+      self._evict()
+
+  @contextlib.contextmanager
+  def borrow(
+      self, tflite_model: Union[str, bytes], **kwargs: Any
+  ) -> Iterator[tfl.Interpreter]:
+    """Borrows an interpreter of the model for the duration of the context.
+
+    Args:
+      tflite_model: Model file path or bytes.
+      **kwargs: The other arguments of `create_tfl_interpreter`.
+
+    Yields:
+      A TFLite interpreter, returned to the pool when the context exits.
+    """
+    interpreter = self.acquire(tflite_model, **kwargs)
+    try:
+      yield interpreter
+    finally:
+      self.release(interpreter)
+
+  def clear(self) -> None:
+    """Drops all the idle interpreters."""
+    with self._lock:
+      self._idle_interpreters.clear()
+      self._models.clear()
+
+  def _evict(self) -> None:
+    """Evicts the least recently used idle interpreters beyond `max_size`."""
+    num_idle = sum(len(idle) for idle in self._idle_interpreters.values())
+    while num_idle > self._max_size:
+      key, idle = next(iter(self._idle_interpreters.items()))
+      idle.pop(0)
+      num_idle -= 1
+      if not idle:
+        del self._idle_interpreters[key]
+        self._models.pop(key, None)
+
+
+def _get_interpreter_key(
+    tflite_model: Union[str, bytes], kwargs: Mapping[str, Any]
+) -> tuple[Any, ...]:
+  """Returns the pool key of an interpreter of the model with the options."""
+  if isinstance(tflite_model, (str, os.PathLike)):
+    stat = os.stat(tflite_model)
+    model_key = (
+        os.path.realpath(tflite_model),
+        stat.st_size,
+        stat.st_mtime_ns,
+    )
+  else:
+    model_key = (id(tflite_model),)
+  return model_key + tuple(sorted(kwargs.items()))
+
+
+_INTERPRETER_POOL = InterpreterPool()
+
+
+def get_interpreter_pool() -> InterpreterPool:
+  """Returns the process-wide interpreter pool."""
+  return _INTERPRETER_POOL
+
+
+def borrow_tfl_interpreter(
+    tflite_model: Union[str, bytes], **kwargs: Any
+) -> contextlib.AbstractContextManager[tfl.Interpreter]:
+  """Borrows an interpreter of the model from the process-wide pool.
+
+  Args:
+    tflite_model: Model file path or bytes.
+    **kwargs: The other arguments of `create_tfl_interpreter`.
+
+  Returns:
+    A context manager yielding the interpreter, returned to the pool when the
+    context exits.
+  """
+  return _INTERPRETER_POOL.borrow(tflite_model, **kwargs)
+
+
 def has_quantization_params(tensor_detail: dict[str, Any]) -> bool:
   """Checks if a tensor contains quantization parameters.
 
@@ -225,6 +452,43 @@ def get_tensor_name_to_content_map(
   return tensors
 
 
+def get_tensor_name_to_view_map(
+    tflite_interpreter: Any,
+    tensor_index_to_name: Mapping[int, str],
+    subgraph_index: int = 0,
+) -> dict[str, np.ndarray]:
+  """Gets zero-copy views of the selected tensors from a TFLite interpreter.
+
+  Unlike `get_tensor_name_to_content_map`, the data is not copied: the views
+  point to the internal buffers of the interpreter. They must be released
+  before the interpreter is invoked or its tensors are reallocated, otherwise
+  the interpreter raises an error. Intermediate tensors are only readable if
+  the interpreter preserves all tensors.
+
+  Args:
+    tflite_interpreter: A TFLite interpreter.
+    tensor_index_to_name: The indices of the tensors to read (in the subgraph)
+      mapped to their names.
+    subgraph_index: The index of the subgraph that the tensors belong to.
+
+  Returns:
+    A dictionary of tensor name to (raw, not dequantized) tensor data view.
+  """
+  # The views keep the wrapper alive, which lets the interpreter detect
+  # outstanding references on invocation.
+  interpreter_wrapper = tflite_interpreter._interpreter  # pylint: disable=protected-access
+  tensors = {}
+  for tensor_index, tensor_name in tensor_index_to_name.items():
+    tensor_data = interpreter_wrapper.tensor(
+        interpreter_wrapper, tensor_index, subgraph_index
+    )
+    # Don't return tensors where any dimension of the shape is 0.
+    if not np.all(tensor_data.shape):
+      continue
+    tensors[tensor_name] = tensor_data
+  return tensors
+
+
 def get_tensor_name_to_details_map(
     tflite_interpreter: Any, subgraph_index: int = 0
 ) -> dict[str, Any]:
@@ -260,12 +524,13 @@ def get_input_tensor_names(
   Returns:
     A list of input tensor names.
   """
-
-  tfl_interpreter = create_tfl_interpreter(tflite_model, allocate_tensors=False)
-  signature_runner = tfl_interpreter.get_signature_runner(signature_name)
-  input_tensor_names = []
-  for _, input_detail in signature_runner.get_input_details().items():
-    input_tensor_names.append(input_detail["name"])
+  with borrow_tfl_interpreter(
+      tflite_model, allocate_tensors=False
+  ) as tfl_interpreter:
+    signature_runner = tfl_interpreter.get_signature_runner(signature_name)
+    input_tensor_names = []
+    for _, input_detail in signature_runner.get_input_details().items():
+      input_tensor_names.append(input_detail["name"])
   return input_tensor_names
 
 
@@ -281,11 +546,13 @@ def get_output_tensor_names(
   Returns:
     A list of output tensor names.
   """
-  tfl_interpreter = create_tfl_interpreter(tflite_model, allocate_tensors=False)
-  signature_runner = tfl_interpreter.get_signature_runner(signature_name)
-  output_tensor_names = []
-  for _, output_detail in signature_runner.get_output_details().items():
-    output_tensor_names.append(output_detail["name"])
+  with borrow_tfl_interpreter(
+      tflite_model, allocate_tensors=False
+  ) as tfl_interpreter:
+    signature_runner = tfl_interpreter.get_signature_runner(signature_name)
+    output_tensor_names = []
+    for _, output_detail in signature_runner.get_output_details().items():
+      output_tensor_names.append(output_detail["name"])
   return output_tensor_names
 
 
@@ -309,19 +576,23 @@ def get_constant_tensor_names(
     A list of names for constant tensor that bigger than min_constant_size and a
     list of names for constant tensor that smaller than min_constant_size.
   """
-  tfl_interpreter = create_tfl_interpreter(tflite_model, allocate_tensors=False)
   const_tensor_names = []
-  for tensor_detail in tfl_interpreter.get_tensor_details(subgraph_index):
-    if tensor_detail["dtype"] == np.object_:
-      continue
-    try:
-      tensor_data = get_tensor_data(
-          tfl_interpreter, tensor_detail, subgraph_index
-      )
-      if tensor_data.size >= min_constant_size:
-        const_tensor_names.append(tensor_detail["name"])
-    except ValueError:
-      continue
+  # Only the constant tensors have data in an interpreter whose tensors are not
+  # allocated, so the borrowers of such interpreters must not allocate them.
+  with borrow_tfl_interpreter(
+      tflite_model, allocate_tensors=False
+  ) as tfl_interpreter:
+    for tensor_detail in tfl_interpreter.get_tensor_details(subgraph_index):
+      if tensor_detail["dtype"] == np.object_:
+        continue
+      try:
+        tensor_data = get_tensor_data(
+            tfl_interpreter, tensor_detail, subgraph_index
+        )
+        if tensor_data.size >= min_constant_size:
+          const_tensor_names.append(tensor_detail["name"])
+      except ValueError:
+        continue
   return const_tensor_names
 
 
@@ -459,17 +730,16 @@ def create_random_normal_input_data(
     have multiple signatures so each set of inputs is also represented as
     list.
   """
-  tfl_interpreter = create_tfl_interpreter(tflite_model)
-  signature_defs = tfl_interpreter.get_signature_list()
-  signature_keys = list(signature_defs.keys())
   test_data = {}
-  for signature_key in signature_keys:
-    signature_runner = tfl_interpreter.get_signature_runner(signature_key)
-    input_details = signature_runner.get_input_details()
-    test_data[signature_key] = create_random_dataset(
-        input_details,
-        num_samples,
-        random_seed,
-        min_max_range,
-    )
+  with borrow_tfl_interpreter(tflite_model) as tfl_interpreter:
+    signature_defs = tfl_interpreter.get_signature_list()
+    for signature_key in signature_defs:
+      signature_runner = tfl_interpreter.get_signature_runner(signature_key)
+      input_details = signature_runner.get_input_details()
+      test_data[signature_key] = create_random_dataset(
+          input_details,
+          num_samples,
+          random_seed,
+          min_max_range,
+      )
   return test_data
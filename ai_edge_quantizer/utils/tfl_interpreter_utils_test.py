@@ -14,6 +14,7 @@
 # ==============================================================================
 
 import pathlib
+from unittest import mock
 
 from absl.testing import absltest
 import numpy as np
@@ -40,6 +41,51 @@ class TflUtilsSingleSignatureModelTest(absltest.TestCase):
     )
     self.assertIsNotNone(tfl_interpreter)
 
+  def test_create_tfl_interpreter_loads_model_from_path(self):
+    with mock.patch.object(
+        tfl_interpreter_utils.tfl,
+        "Interpreter",
+        wraps=tfl_interpreter_utils.tfl.Interpreter,
+    ) as interpreter_cls:
+      tfl_interpreter_utils.create_tfl_interpreter(
+          pathlib.Path(self._test_model_path)
+      )
+    self.assertEqual(
+        interpreter_cls.call_args.kwargs["model_path"], self._test_model_path
+    )
+    self.assertNotIn("model_content", interpreter_cls.call_args.kwargs)
+
+  def test_get_model_content_does_not_copy_bytes(self):
+    with open(self._test_model_path, "rb") as f:
+      model_content = f.read()
+    self.assertIs(
+        tfl_interpreter_utils.get_model_content(model_content), model_content
+    )
+    self.assertIs(
+        tfl_interpreter_utils.get_model_content(memoryview(model_content)),
+        model_content,
+    )
+    model_slice = memoryview(model_content)[1:]
+    self.assertEqual(
+        tfl_interpreter_utils.get_model_content(model_slice), model_content[1:]
+    )
+    self.assertEqual(
+        tfl_interpreter_utils.get_model_content(bytearray(model_content)),
+        model_content,
+    )
+
+  def test_get_model_size(self):
+    with open(self._test_model_path, "rb") as f:
+      model_content = f.read()
+    self.assertEqual(
+        tfl_interpreter_utils.get_model_size(self._test_model_path),
+        len(model_content),
+    )
+    self.assertEqual(
+        tfl_interpreter_utils.get_model_size(bytearray(model_content)),
+        len(model_content),
+    )
+
   def test_invoke_interpreter_once(self):
     tfl_interpreter = tfl_interpreter_utils.create_tfl_interpreter(
         self._test_model_path
@@ -92,6 +138,43 @@ class TflUtilsSingleSignatureModelTest(absltest.TestCase):
     ]
     self.assertEqual(tuple(average_pool_res.shape), (1, 14, 14, 8))
 
+  def test_get_tensor_name_to_view_map(self):
+    tfl_interpreter = tfl_interpreter_utils.create_tfl_interpreter(
+        self._test_model_path
+    )
+    tfl_interpreter_utils.invoke_interpreter_once(
+        tfl_interpreter, [self._input_data]
+    )
+    tensor_name_to_index = {
+        detail["name"]: detail["index"]
+        for detail in tfl_interpreter.get_tensor_details()
+    }
+    tensor_names = [
+        "serving_default_conv2d_input:0",
+        "sequential/average_pooling2d/AvgPool",
+    ]
+
+    tensor_name_to_view_map = tfl_interpreter_utils.get_tensor_name_to_view_map(
+        tfl_interpreter, {tensor_name_to_index[n]: n for n in tensor_names}
+    )
+    self.assertSameElements(tensor_name_to_view_map.keys(), tensor_names)
+    expected_content_map = tfl_interpreter_utils.get_tensor_name_to_content_map(
+        tfl_interpreter
+    )
+    for name in tensor_names:
+      np.testing.assert_array_equal(
+          tensor_name_to_view_map[name], expected_content_map[name]
+      )
+    # The views must be released before the interpreter can be invoked again.
+    with self.assertRaisesRegex(RuntimeError, "reference to internal data"):
+      tfl_interpreter_utils.invoke_interpreter_once(
+          tfl_interpreter, [self._input_data]
+      )
+    del tensor_name_to_view_map
+    tfl_interpreter_utils.invoke_interpreter_once(
+        tfl_interpreter, [self._input_data]
+    )
+
   def test_get_tensor_name_to_content_map_fails_no_preserve_all_tensors(self):
     tfl_interpreter = tfl_interpreter_utils.create_tfl_interpreter(
         self._test_model_path, preserve_all_tensors=False
@@ -432,5 +515,87 @@ class TflUtilsIntegerInputModelTest(absltest.TestCase):
     self.assertLess(data.max(), 10)
 
 
+
+class InterpreterPoolTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self._test_model_path = str(
+        pathlib.Path(TEST_DATA_PREFIX_PATH) / "single_fc.tflite"
+    )
+    with open(self._test_model_path, "rb") as f:
+      self._test_model = f.read()
+    self._pool = tfl_interpreter_utils.InterpreterPool(max_size=2)
+
+  def test_released_interpreter_is_reused(self):
+    interpreter = self._pool.acquire(self._test_model, num_threads=1)
+    self._pool.release(interpreter)
+    self.assertLen(self._pool, 1)
+
+    self.assertIs(
+        self._pool.acquire(self._test_model, num_threads=1), interpreter
+    )
+    self.assertEmpty(self._pool)
+    # Other options or another model buffer need other interpreters.
+    self._pool.release(interpreter)
+    self.assertIsNot(
+        self._pool.acquire(self._test_model, num_threads=2), interpreter
+    )
+    self.assertIsNot(
+        self._pool.acquire(bytes(bytearray(self._test_model)), num_threads=1),
+        interpreter,
+    )
+
+  def test_borrowed_interpreter_is_exclusive(self):
+    with self._pool.borrow(self._test_model_path) as interpreter:
+      with self._pool.borrow(self._test_model_path) as other_interpreter:
+        self.assertIsNot(other_interpreter, interpreter)
+    self.assertLen(self._pool, 2)
+    with self._pool.borrow(self._test_model_path) as reused_interpreter:
+      self.assertIn(reused_interpreter, (interpreter, other_interpreter))
+
+  def test_released_interpreter_variables_are_reset(self):
+    interpreter = self._pool.acquire(self._test_model)
+    with mock.patch.object(
+        interpreter, "reset_all_variables"
+    ) as reset_all_variables:
+      self._pool.release(interpreter)
+    reset_all_variables.assert_called_once()
+
+  def test_least_recently_released_interpreter_is_evicted(self):
+    interpreters = [
+        self._pool.acquire(self._test_model, num_threads=num_threads)
+        for num_threads in (1, 2, 3)
+    ]
+    for interpreter in interpreters:
+      self._pool.release(interpreter)
+    self.assertLen(self._pool, 2)
+    self.assertIsNot(
+        self._pool.acquire(self._test_model, num_threads=1), interpreters[0]
+    )
+    self.assertIs(
+        self._pool.acquire(self._test_model, num_threads=3), interpreters[2]
+    )
+
+    self._pool.set_max_size(0)
+    self.assertEmpty(self._pool)
+    self._pool.release(interpreters[2])
+    self.assertEmpty(self._pool)
+    with self.assertRaisesRegex(ValueError, "must be non-negative"):
+      self._pool.set_max_size(-1)
+
+  def test_clear(self):
+    with self._pool.borrow(self._test_model):
+      pass
+    self._pool.clear()
+    self.assertEmpty(self._pool)
+
+  def test_get_interpreter_pool(self):
+    self.assertIs(
+        tfl_interpreter_utils.get_interpreter_pool(),
+        tfl_interpreter_utils.get_interpreter_pool(),
+    )
+
+
 if __name__ == "__main__":
   absltest.main()